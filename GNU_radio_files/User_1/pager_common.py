@@ -0,0 +1,15 @@
+"""
+Shared pager modules (GNU_radio_files/common)
+
+The library modules both nodes use (pager_pdu, pager_crypto,
+pager_messaging, ...) live once in ../common. Importing this module puts
+that directory on sys.path; the embedded blocks and the launchers import
+it before any of them.
+"""
+
+import os
+import sys
+
+COMMON_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+if COMMON_DIR not in sys.path:
+    sys.path.insert(0, COMMON_DIR)
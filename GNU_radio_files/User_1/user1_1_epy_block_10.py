@@ -1,11 +1,26 @@
 from gnuradio import gr
 import pmt, threading, time
-from collections import deque
+import pager_common  # noqa: F401  (puts ../common on sys.path)
+import pager_mac
+import pager_pdu
 
 class payload_to_pdu_with_seq_arq(gr.basic_block):
     """
     PAYLOAD PDU -> PDU with SEQ + Stop-and-Wait ARQ
     + PRIORITIZATION: Pauses Data TX if an ACK is being sent.
+
+    Input meta is carried through to the output (plus "seq"), so
+    msg_id / frame_id set by the chat block stay attached to the frame.
+
+    'status' port: one dict per frame event
+        {frame_id, [msg_id], seq, [dest_addr], status, retries}
+        status = "sent"      first transmission (seq assigned)
+                 "delivered" matching ACK received
+                 "failed"    no ACK after max_retries
+    Frames without a frame_id get a negative one from a local counter, so
+    they never match a frame of a chat message.
+    When the frame carries "dest_addr" and the ACK carries "src_addr",
+    only an ACK from that destination completes the frame.
     """
 
     def __init__(self, payload_size=32, wait_time_s=0.1, max_retries=10, verbose=True):
@@ -20,26 +35,25 @@ class payload_to_pdu_with_seq_arq(gr.basic_block):
         self.verbose      = bool(verbose)
 
         # --- PORTS ---
-        self.message_port_register_in(pmt.intern("in"))       # Data to send
-        self.message_port_register_in(pmt.intern("ack_in"))   # ACKs received from other node
-        self.message_port_register_in(pmt.intern("busy_in"))  # New: Signal that WE are sending an ACK
-        self.message_port_register_out(pmt.intern("out"))     # Final PDU
+        self.message_port_register_in(pager_pdu.IN)       # Data to send
+        self.message_port_register_in(pager_pdu.ACK_IN)   # ACKs received from other node
+        self.message_port_register_in(pager_pdu.BUSY_IN)  # New: Signal that WE are sending an ACK
+        self.message_port_register_out(pager_pdu.OUT)     # Final PDU
+        self.message_port_register_out(pager_pdu.STATUS)  # Per-frame delivery status
 
-        self.set_msg_handler(pmt.intern("in"),     self._handle_payload)
-        self.set_msg_handler(pmt.intern("ack_in"), self._handle_ack)
-        self.set_msg_handler(pmt.intern("busy_in"), self._handle_busy)
+        self.set_msg_handler(pager_pdu.IN,     self._handle_payload)
+        self.set_msg_handler(pager_pdu.ACK_IN, self._handle_ack)
+        self.set_msg_handler(pager_pdu.BUSY_IN, self._handle_busy)
 
         # --- STATE ---
+        # Sequencing, retries and the ACK wait live in pager_mac.StopAndWait;
+        # this block feeds it PDUs and ACKs and runs it on a TX thread.
         self._run = threading.Event()
         self._tx_thread = None
-        self._seq = 0
-        self._last_ack = None
-        self._pending_payloads = deque()
-        self._payload_cv = threading.Condition()
-        self._ack_cv = threading.Condition()
-        
-        # Smart Backoff State
-        self._tx_blocked_until = 0.0
+        self._frame_id = 0
+        self._inflight_meta = None
+        self._arq = pager_mac.StopAndWait(self.wait_time_s, self.max_retries, busy_hold_s=0.15)
+        self._cv = threading.Condition()
 
     def start(self):
         self._run.set()
@@ -49,8 +63,7 @@ class payload_to_pdu_with_seq_arq(gr.basic_block):
 
     def stop(self):
         self._run.clear()
-        with self._payload_cv: self._payload_cv.notify_all()
-        with self._ack_cv: self._ack_cv.notify_all()
+        with self._cv: self._cv.notify_all()
         if self._tx_thread: self._tx_thread.join(timeout=1.0)
         return super().stop()
 
@@ -61,14 +74,15 @@ class payload_to_pdu_with_seq_arq(gr.basic_block):
     def _handle_busy(self, pdu):
         """Called when we are sending an ACK. Pause Data TX to avoid collision."""
         # Pause for 150ms to let the ACK clear the radio
-        self._tx_blocked_until = time.monotonic() + 0.15 
+        with self._cv:
+            self._arq.on_busy(time.monotonic())
         # self._log("Prioritizing ACK: Pausing Data TX")
 
     def _handle_payload(self, pdu):
         if not pmt.is_pair(pdu): return
         meta, pl = pmt.car(pdu), pmt.cdr(pdu)
         if not pmt.is_u8vector(pl): return
-        data = bytes(pmt.u8vector_elements(pl))
+        data = pager_pdu.pdu_bytes(pl)
 
         # Pad/Truncate
         if len(data) < self.payload_size:
@@ -76,80 +90,81 @@ class payload_to_pdu_with_seq_arq(gr.basic_block):
         elif len(data) > self.payload_size:
             data = data[:self.payload_size]
 
-        with self._payload_cv:
-            self._pending_payloads.append(data)
-            self._payload_cv.notify()
+        if not pmt.is_dict(meta): meta = pmt.make_dict()
+        dest = (pmt.to_long(pmt.dict_ref(meta, pager_pdu.DEST_ADDR, pmt.PMT_NIL)) & 0xFF
+                if pmt.dict_has_key(meta, pager_pdu.DEST_ADDR) else None)
+        with self._cv:
+            self._arq.submit((meta, data), dest)
+            self._cv.notify()
 
     def _handle_ack(self, pdu):
         ack_val = None
+        src = None
         if pmt.is_pair(pdu):
             meta = pmt.car(pdu)
-            if pmt.is_dict(meta) and pmt.dict_has_key(meta, pmt.intern("ack")):
-                try: ack_val = pmt.to_python(pmt.dict_ref(meta, pmt.intern("ack"), pmt.PMT_NIL))
+            if pmt.is_dict(meta) and pmt.dict_has_key(meta, pager_pdu.ACK):
+                try: ack_val = pmt.to_python(pmt.dict_ref(meta, pager_pdu.ACK, pmt.PMT_NIL))
                 except: pass
-        
+            if pmt.is_dict(meta) and pmt.dict_has_key(meta, pager_pdu.SRC_ADDR):
+                src = pmt.to_long(pmt.dict_ref(meta, pager_pdu.SRC_ADDR, pmt.PMT_NIL)) & 0xFF
+
         if ack_val is None: # Fallback to payload check
              pl = pmt.cdr(pdu)
              if pmt.is_u8vector(pl):
-                 d = bytes(pmt.u8vector_elements(pl))
+                 d = pager_pdu.pdu_bytes(pl)
                  if len(d) >= 1: ack_val = d[0]
 
         if ack_val is not None:
-            with self._ack_cv:
-                self._last_ack = ack_val & 0xFF
-                self._ack_cv.notify_all()
+            with self._cv:
+                accepted = self._arq.on_ack(ack_val, src)
+                self._cv.notify_all()
+            if not accepted:
+                self._log(f"Ignoring ACK from {src} (waiting on {self._arq.inflight_dest})")
+                return
             self._log(f"Received confirmation ACK={ack_val}")
 
     # --- TX LOOP ---
     def _tx_loop(self):
         while self._run.is_set():
-            # 1. Wait for Data
-            with self._payload_cv:
-                while self._run.is_set() and not self._pending_payloads:
-                    self._payload_cv.wait(timeout=0.1)
-                if not self._run.is_set(): break
-                payload = self._pending_payloads.popleft()
-
-            # 2. Frame it
-            seq = self._seq
-            expected_ack = (seq + 1) & 0xFF
-            frame = bytes([seq]) + payload
-            retries = 0
-            got_ack = False
-
-            # 3. Stop-and-Wait Loop
-            while self._run.is_set() and not got_ack:
-                
-                # --- BACKOFF CHECK ---
-                # If we are busy sending an ACK (from busy_in), wait here.
-                while time.monotonic() < self._tx_blocked_until:
-                    time.sleep(0.01)
-
-                # Transmit
-                self._publish(frame)
-                
-                # Wait for ACK
-                deadline = time.monotonic() + self.wait_time_s
-                while self._run.is_set() and time.monotonic() < deadline:
-                    with self._ack_cv:
-                        remaining = max(0.0, deadline - time.monotonic())
-                        self._ack_cv.wait(timeout=remaining)
-                        if self._last_ack == expected_ack:
-                            got_ack = True
-                            break
-                
-                if not got_ack:
-                    retries += 1
-                    if retries > self.max_retries:
-                        self._log(f"Dropping seq={seq} after {self.max_retries} retries")
-                        got_ack = True # Give up
-                    else:
-                        self._log(f"Retry {retries} for seq={seq}")
-
-            self._seq = expected_ack
-
-    def _publish(self, frame):
-        meta = pmt.make_dict()
-        meta = pmt.dict_add(meta, pmt.intern("seq"), pmt.from_long(frame[0]))
-        v = pmt.init_u8vector(len(frame), list(frame))
-        self.message_port_pub(pmt.intern("out"), pmt.cons(meta, v))
\ No newline at end of file
+            with self._cv:
+                actions = self._arq.poll(time.monotonic())
+                if not actions:
+                    # Sleep until the ACK deadline / end of the busy hold, or until a PDU or ACK arrives
+                    wake = self._arq.wake_time()
+                    timeout = 0.1 if wake is None else min(0.1, max(0.001, wake - time.monotonic()))
+                    self._cv.wait(timeout=timeout)
+                    continue
+            # Publish outside the lock: downstream handlers may run in this thread
+            for action in actions:
+                if action[0] == "tx":
+                    self._transmit(*action[1:])
+                else:
+                    self._done(*action[1:])
+
+    def _transmit(self, item, seq, retries):
+        meta, payload = item
+        if retries == 0:
+            # First transmission: frame_id + seq go into the meta for the status port
+            # (local ids are negative, the chat block numbers its frames from 1)
+            if not pmt.dict_has_key(meta, pager_pdu.FRAME_ID):
+                self._frame_id -= 1
+                meta = pmt.dict_add(meta, pager_pdu.FRAME_ID, pmt.from_long(self._frame_id))
+            meta = pmt.dict_add(meta, pager_pdu.SEQ, pmt.from_long(seq))
+            self._inflight_meta = meta
+        else:
+            self._log(f"Retry {retries} for seq={seq}")
+        self._publish(bytes([seq]) + payload, self._inflight_meta)
+        if retries == 0: self._status(self._inflight_meta, "sent", retries)
+
+    def _done(self, item, seq, delivered, retries):
+        if not delivered:
+            self._log(f"Dropping seq={seq} after {self.max_retries} retries")
+        if self._run.is_set():
+            self._status(self._inflight_meta, "delivered" if delivered else "failed", retries)
+
+    def _publish(self, frame, meta):
+        v = pager_pdu.u8vector(frame)
+        self.message_port_pub(pager_pdu.OUT, pmt.cons(meta, v))
+
+    def _status(self, meta, status, retries):
+        self.message_port_pub(pager_pdu.STATUS, pager_pdu.status_msg(meta, status, retries))
@@ -1,5 +1,9 @@
 from gnuradio import gr
+import numpy as np
 import pmt, zlib
+import pager_common  # noqa: F401  (puts ../common on sys.path)
+import pager_mac
+import pager_pdu
 
 class crc32_verify_and_ack(gr.basic_block):
     """
@@ -13,11 +17,15 @@ class crc32_verify_and_ack(gr.basic_block):
       - 'out'     → PAYLOAD only (40 bytes),
                     meta: {crc_ok=True, seq=<seq>, ...}
       - 'ack_out' → payload: [ NEXT_SEQ(1B) | PAYLOAD(40B) ]  (41 bytes)
-                    meta:   {ack=<next_seq>, crc_ok=True}
+                    meta:   {ack=<next_seq>, crc_ok=True, dest_addr=<src_addr>}
 
     On CRC fail:
       - 'drop'    → diagnostic PDU with {crc_ok=False, drop_reason=...}
 
+    Batch PDU (see pager_pdu): all frames are checked in one call and
+    the good ones leave as single PDUs on 'out' and 'ack_out', each with
+    its own seq / ack / dest_addr; failed frames are dropped one by one.
+
     Parameters
       variant : "ieee"  (init/xor=0xFFFFFFFF, reflected)
                 "zlib"  (init/xor=0x00000000, reflected)
@@ -34,11 +42,11 @@ class crc32_verify_and_ack(gr.basic_block):
         self.payload_len = 40
 
         # Ports
-        self.message_port_register_in(pmt.intern('in'))
-        self.set_msg_handler(pmt.intern('in'), self._handle)
-        self.message_port_register_out(pmt.intern('out'))      # 40B payload only
-        self.message_port_register_out(pmt.intern('ack_out'))  # NEXT_SEQ + PAYLOAD
-        self.message_port_register_out(pmt.intern('drop'))     # diagnostics
+        self.message_port_register_in(pager_pdu.IN)
+        self.set_msg_handler(pager_pdu.IN, self._handle)
+        self.message_port_register_out(pager_pdu.OUT)      # 40B payload only
+        self.message_port_register_out(pager_pdu.ACK_OUT)  # NEXT_SEQ + PAYLOAD
+        self.message_port_register_out(pager_pdu.DROP)     # diagnostics
 
     # CRC engines
     def _crc32(self, data: bytes) -> int:
@@ -49,14 +57,23 @@ class crc32_verify_and_ack(gr.basic_block):
             # zlib default: reflected, init=0x00000000, xorout=0x00000000
             return zlib.crc32(data) & 0xFFFFFFFF
 
+    def _crc32_rows(self, rows):
+        # Same CRC as _crc32, for every row of a batch
+        if self.variant == "ieee":
+            return pager_pdu.crc32_rows(rows, 0xFFFFFFFF) ^ np.uint32(0xFFFFFFFF)
+        return pager_pdu.crc32_rows(rows)
+
     def _handle(self, pdu):
         if not pmt.is_pair(pdu):
             return
         meta, pl = pmt.car(pdu), pmt.cdr(pdu)
+        if pager_pdu.is_batch(pl):
+            self._handle_batch(meta, pl)
+            return
         if not pmt.is_u8vector(pl):
             return
 
-        buf = bytes(pmt.u8vector_elements(pl))
+        buf = pager_pdu.pdu_bytes(pl)
 
         # Expect exactly SEQ(1) + PAYLOAD(40) + CRC(4) = 45 bytes
         expected_len = 1 + self.payload_len + 4
@@ -64,7 +81,7 @@ class crc32_verify_and_ack(gr.basic_block):
             self._emit_drop(meta, buf, "short_frame")
             return
 
-        body   = buf[:-4]  # [SEQ | PAYLOAD]
+        body   = memoryview(buf)[:-4]  # [SEQ | PAYLOAD], views from here on
         crc_rx = int.from_bytes(buf[-4:], byteorder='big')
 
         # Expect exactly 1 + payload_len bytes in body
@@ -82,39 +99,88 @@ class crc32_verify_and_ack(gr.basic_block):
         # ---- Publish PAYLOAD only on 'out' (40B) ----
         out_meta = meta
         try:
-            out_meta = pmt.dict_add(out_meta, pmt.intern("crc_ok"), pmt.from_bool(True))
-            out_meta = pmt.dict_add(out_meta, pmt.intern("seq"),    pmt.from_long(int(seq)))
+            out_meta = pmt.dict_add(out_meta, pager_pdu.CRC_OK, pager_pdu.TRUE)
+            out_meta = pmt.dict_add(out_meta, pager_pdu.SEQ,    pmt.from_long(int(seq)))
         except Exception:
             pass
 
         self.message_port_pub(
-            pmt.intern('out'),
-            pmt.cons(out_meta, pmt.init_u8vector(len(payload), list(payload)))
+            pager_pdu.OUT,
+            pager_pdu.make_pdu(out_meta, payload)
         )
 
         # ---- Publish ACK: [ NEXT_SEQ | PAYLOAD(40B) ] ----
-        ack_next = (seq + 1) & 0xFF
+        ack_next = pager_mac.ack_seq(seq)
         ack_meta = pmt.make_dict()
         try:
-            ack_meta = pmt.dict_add(ack_meta, pmt.intern("ack"),    pmt.from_long(ack_next))
-            ack_meta = pmt.dict_add(ack_meta, pmt.intern("crc_ok"), pmt.from_bool(True))
+            ack_meta = pmt.dict_add(ack_meta, pager_pdu.ACK,    pmt.from_long(ack_next))
+            ack_meta = pmt.dict_add(ack_meta, pager_pdu.CRC_OK, pager_pdu.TRUE)
+            if pmt.is_dict(meta) and pmt.dict_has_key(meta, pager_pdu.SRC_ADDR):
+                # Addressed to whoever sent the frame, not to the configured peer
+                ack_meta = pmt.dict_add(ack_meta, pager_pdu.DEST_ADDR,
+                                        pmt.dict_ref(meta, pager_pdu.SRC_ADDR, pmt.PMT_NIL))
         except Exception:
             pass
 
-        ack_bytes = [ack_next] + list(payload)  # 1 + 40 = 41 bytes
+        ack_bytes = bytes((ack_next,)) + payload  # 1 + 40 = 41 bytes
         self.message_port_pub(
-            pmt.intern('ack_out'),
-            pmt.cons(ack_meta, pmt.init_u8vector(len(ack_bytes), ack_bytes))
+            pager_pdu.ACK_OUT,
+            pager_pdu.make_pdu(ack_meta, ack_bytes)
         )
 
+    def _handle_batch(self, meta, pl):
+        frames = pager_pdu.batch_frames(pl)
+        n = len(frames)
+        rows = pager_pdu.batch_rows(frames)
+        if rows is None or rows.shape[1] != 1 + self.payload_len + 4:
+            # Not all [SEQ | PAYLOAD | CRC]: one at a time, which drops the bad ones
+            for i in range(n):
+                self._handle(pmt.cons(pager_pdu.frame_meta(meta, n, i), pmt.vector_ref(pl, i)))
+            return
+
+        body = rows[:, :-4]
+        ok = self._crc32_rows(body) == pager_pdu.be32_rows(rows[:, -4:])
+        for i in np.flatnonzero(~ok):
+            self._emit_drop(pager_pdu.frame_meta(meta, n, i), frames[i], "crc_fail")
+        if not ok.any():
+            return
+
+        seq     = body[ok, 0]
+        payload = body[ok, 1:]
+        meta    = pager_pdu.take_rows(meta, n, ok)
+
+        # ---- Publish PAYLOADs on 'out' ----
+        out_meta = meta
+        try:
+            out_meta = pmt.dict_add(out_meta, pager_pdu.CRC_OK, pager_pdu.TRUE)
+            out_meta = pmt.dict_add(out_meta, pager_pdu.SEQ,    pager_pdu.u8vector(seq))
+        except Exception:
+            pass
+        for frame in pager_pdu.frame_pdus(out_meta, payload):
+            self.message_port_pub(pager_pdu.OUT, frame)
+
+        # ---- Publish ACKs: [ NEXT_SEQ | PAYLOAD(40B) ] per frame ----
+        ack_next = pager_mac.ack_seq(seq)
+        ack_meta = pmt.make_dict()
+        try:
+            ack_meta = pmt.dict_add(ack_meta, pager_pdu.ACK,    pager_pdu.u8vector(ack_next))
+            ack_meta = pmt.dict_add(ack_meta, pager_pdu.CRC_OK, pager_pdu.TRUE)
+            src = pager_pdu.column(meta, pager_pdu.SRC_ADDR, len(seq))
+            if src is not None:
+                ack_meta = pmt.dict_add(ack_meta, pager_pdu.DEST_ADDR, pager_pdu.u8vector(src))
+        except Exception:
+            pass
+        for frame in pager_pdu.frame_pdus(ack_meta, np.column_stack((ack_next, payload))):
+            self.message_port_pub(pager_pdu.ACK_OUT, frame)
+
     def _emit_drop(self, meta, data_bytes, reason):
         try:
             m = meta
             if not pmt.is_dict(m):
                 m = pmt.make_dict()
-            m = pmt.dict_add(m, pmt.intern("crc_ok"),      pmt.from_bool(False))
-            m = pmt.dict_add(m, pmt.intern("drop_reason"), pmt.intern(str(reason)))
-            v = pmt.init_u8vector(len(data_bytes), list(data_bytes))
-            self.message_port_pub(pmt.intern('drop'), pmt.cons(m, v))
+            m = pmt.dict_add(m, pager_pdu.CRC_OK,      pager_pdu.FALSE)
+            m = pmt.dict_add(m, pager_pdu.DROP_REASON, pmt.intern(str(reason)))
+            v = pager_pdu.u8vector(data_bytes)
+            self.message_port_pub(pager_pdu.DROP, pmt.cons(m, v))
         except Exception:
             pass
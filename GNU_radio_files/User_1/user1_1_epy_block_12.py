@@ -1,5 +1,8 @@
 from gnuradio import gr
+import numpy as np
 import pmt, zlib
+import pager_common  # noqa: F401  (puts ../common on sys.path)
+import pager_pdu
 
 class ack_crc32_verify_minimal(gr.basic_block):
     """
@@ -11,13 +14,16 @@ class ack_crc32_verify_minimal(gr.basic_block):
 
     On CRC pass:
         → 'ack_out': PDU with
-             meta:    { ack: NEXT_SEQ, crc_ok: True }
+             meta:    { ack: NEXT_SEQ, crc_ok: True, [src_addr] }
              payload: [ NEXT_SEQ ]  (1 byte)
 
     On CRC fail:
         → 'drop': PDU with original frame and meta:
              { crc_ok: False, drop_reason: "crc_fail" or "bad_len" }
 
+    Batch PDU (see pager_pdu): checked in one call, the 1-byte ACKs
+    leave as single PDUs with their own ack / src_addr.
+
     Parameters
       variant : "ieee"  (init/xor=0xFFFFFFFF, reflected)
                 "zlib"  (init/xor=0x00000000, reflected)
@@ -37,11 +43,11 @@ class ack_crc32_verify_minimal(gr.basic_block):
         self.payload_len = 40
 
         # Ports
-        self.message_port_register_in(pmt.intern("in"))
-        self.set_msg_handler(pmt.intern("in"), self._handle)
+        self.message_port_register_in(pager_pdu.IN)
+        self.set_msg_handler(pager_pdu.IN, self._handle)
 
-        self.message_port_register_out(pmt.intern("ack_out"))
-        self.message_port_register_out(pmt.intern("drop"))
+        self.message_port_register_out(pager_pdu.ACK_OUT)
+        self.message_port_register_out(pager_pdu.DROP)
 
     # --- CRC helper ---
     def _crc32(self, data: bytes) -> int:
@@ -52,16 +58,25 @@ class ack_crc32_verify_minimal(gr.basic_block):
             # zlib default: reflected, init=0x00000000, xorout=0x00000000
             return zlib.crc32(data) & 0xFFFFFFFF
 
+    def _crc32_rows(self, rows):
+        # Same CRC as _crc32, for every row of a batch
+        if self.variant == "ieee":
+            return pager_pdu.crc32_rows(rows, 0xFFFFFFFF) ^ np.uint32(0xFFFFFFFF)
+        return pager_pdu.crc32_rows(rows)
+
     # --- main handler ---
     def _handle(self, pdu):
         if not pmt.is_pair(pdu):
             return
 
         meta, pl = pmt.car(pdu), pmt.cdr(pdu)
+        if pager_pdu.is_batch(pl):
+            self._handle_batch(meta, pl)
+            return
         if not pmt.is_u8vector(pl):
             return
 
-        buf = bytes(pmt.u8vector_elements(pl))
+        buf = pager_pdu.pdu_bytes(pl)
 
         # Expect exactly NEXT_SEQ(1) + PAYLOAD(40) + CRC32(4) = 45 bytes
         expected_len = 1 + self.payload_len + 4
@@ -80,28 +95,61 @@ class ack_crc32_verify_minimal(gr.basic_block):
         # --- Publish 1-byte ACK PDU ---
         ack_meta = pmt.make_dict()
         try:
-            ack_meta = pmt.dict_add(ack_meta, pmt.intern("ack"),
+            ack_meta = pmt.dict_add(ack_meta, pager_pdu.ACK,
                                     pmt.from_long(int(next_seq)))
-            ack_meta = pmt.dict_add(ack_meta, pmt.intern("crc_ok"),
-                                    pmt.from_bool(True))
+            ack_meta = pmt.dict_add(ack_meta, pager_pdu.CRC_OK,
+                                    pager_pdu.TRUE)
+            if pmt.is_dict(meta) and pmt.dict_has_key(meta, pager_pdu.SRC_ADDR):
+                ack_meta = pmt.dict_add(ack_meta, pager_pdu.SRC_ADDR,
+                                        pmt.dict_ref(meta, pager_pdu.SRC_ADDR, pmt.PMT_NIL))
         except Exception:
             pass
 
-        ack_payload = [int(next_seq) & 0xFF]
+        ack_payload = bytes((int(next_seq) & 0xFF,))
         self.message_port_pub(
-            pmt.intern("ack_out"),
-            pmt.cons(ack_meta, pmt.init_u8vector(1, ack_payload))
+            pager_pdu.ACK_OUT,
+            pager_pdu.make_pdu(ack_meta, ack_payload)
         )
 
+    def _handle_batch(self, meta, pl):
+        frames = pager_pdu.batch_frames(pl)
+        n = len(frames)
+        rows = pager_pdu.batch_rows(frames)
+        if rows is None or rows.shape[1] != 1 + self.payload_len + 4:
+            # Not all 45 bytes: one at a time, which drops the bad ones
+            for i in range(n):
+                self._handle(pmt.cons(pager_pdu.frame_meta(meta, n, i), pmt.vector_ref(pl, i)))
+            return
+
+        ok = self._crc32_rows(rows[:, :-4]) == pager_pdu.be32_rows(rows[:, -4:])
+        for i in np.flatnonzero(~ok):
+            self._emit_drop(pager_pdu.frame_meta(meta, n, i), frames[i], "crc_fail")
+        if not ok.any():
+            return
+
+        next_seq = rows[ok, :1]
+        ack_meta = pmt.make_dict()
+        try:
+            ack_meta = pmt.dict_add(ack_meta, pager_pdu.ACK,    pager_pdu.u8vector(next_seq[:, 0]))
+            ack_meta = pmt.dict_add(ack_meta, pager_pdu.CRC_OK, pager_pdu.TRUE)
+            src = pager_pdu.column(meta, pager_pdu.SRC_ADDR, n)
+            if src is not None:
+                ack_meta = pmt.dict_add(ack_meta, pager_pdu.SRC_ADDR, pager_pdu.u8vector(src[ok]))
+        except Exception:
+            pass
+
+        for frame in pager_pdu.frame_pdus(ack_meta, next_seq):
+            self.message_port_pub(pager_pdu.ACK_OUT, frame)
+
     def _emit_drop(self, meta, data_bytes, reason):
         try:
             m = meta
             if not pmt.is_dict(m):
                 m = pmt.make_dict()
-            m = pmt.dict_add(m, pmt.intern("crc_ok"), pmt.from_bool(False))
-            m = pmt.dict_add(m, pmt.intern("drop_reason"),
+            m = pmt.dict_add(m, pager_pdu.CRC_OK, pager_pdu.FALSE)
+            m = pmt.dict_add(m, pager_pdu.DROP_REASON,
                              pmt.intern(str(reason)))
-            v = pmt.init_u8vector(len(data_bytes), list(data_bytes))
-            self.message_port_pub(pmt.intern("drop"), pmt.cons(m, v))
+            v = pager_pdu.u8vector(data_bytes)
+            self.message_port_pub(pager_pdu.DROP, pmt.cons(m, v))
         except Exception:
             pass
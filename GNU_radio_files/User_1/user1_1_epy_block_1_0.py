@@ -3,11 +3,17 @@ Embedded Python Block: Add Preamble + Address + Type (ACK)
 """
 from gnuradio import gr
 import pmt
+import pager_common  # noqa: F401  (puts ../common on sys.path)
+import pager_pdu
 
 class add_ack_address_block(gr.basic_block):
     """
-    Adds [ PREAMBLE(128) | DEST(1) | TYPE(1) ] to ACK.
+    Adds [ PREAMBLE(128) | DEST(1) | TYPE(1) | SRC(1) ] to ACK.
     TYPE = 0x02 (ACK)
+    DEST is the ACK's "dest_addr" meta (the sender of the acknowledged
+    frame) when present, else the configured dest_addr. SRC is my_addr.
+    A batch PDU (see pager_pdu) is framed in one call; the frames leave
+    as single PDUs (DEST per frame), as the formatter expects.
     """
 
     def __init__(self):
@@ -19,38 +25,22 @@ class add_ack_address_block(gr.basic_block):
         )
 
         self.dest_addr = 0 & 0xFF
+        self.my_addr = 0 & 0xFF
 
         # Same Preamble as Data
-        self.preamble = [
-            0xD3, 0x42, 0xA1, 0x7F, 0x9C, 0xE2, 0x55, 0xAA,
-            0x13, 0x87, 0x4E, 0xB1, 0x2C, 0xF0, 0x99, 0x6D,
-            0x3A, 0xC4, 0x1F, 0x82, 0x5B, 0xD8, 0x66, 0xE7,
-            0x24, 0x91, 0x7C, 0x0B, 0x38, 0xF2, 0x4D, 0xC6,
-            0xD3, 0x42, 0xA1, 0x7F, 0x9C, 0xE2, 0x55, 0xAA,
-            0x13, 0x87, 0x4E, 0xB1, 0x2C, 0xF0, 0x99, 0x6D,
-            0x3A, 0xC4, 0x1F, 0x82, 0x5B, 0xD8, 0x66, 0xE7,
-            0x24, 0x91, 0x7C, 0x0B, 0x38, 0xF2, 0x4D, 0xC6,
-            0xD3, 0x42, 0xA1, 0x7F, 0x9C, 0xE2, 0x55, 0xAA,
-            0x13, 0x87, 0x4E, 0xB1, 0x2C, 0xF0, 0x99, 0x6D,
-            0x3A, 0xC4, 0x1F, 0x82, 0x5B, 0xD8, 0x66, 0xE7,
-            0x24, 0x91, 0x7C, 0x0B, 0x38, 0xF2, 0x4D, 0xC6,
-            0xD3, 0x42, 0xA1, 0x7F, 0x9C, 0xE2, 0x55, 0xAA,
-            0x13, 0x87, 0x4E, 0xB1, 0x2C, 0xF0, 0x99, 0x6D,
-            0x3A, 0xC4, 0x1F, 0x82, 0x5B, 0xD8, 0x66, 0xE7,
-            0x24, 0x91, 0x7C, 0x0B, 0x38, 0xF2, 0x4D, 0xC6
-        ]
-
-        self.message_port_register_in(pmt.intern('in'))
-        self.message_port_register_out(pmt.intern('out'))
-        self.message_port_register_in(pmt.intern('config'))
+        self.preamble = pager_pdu.PREAMBLE
+        self._header = pager_pdu.HeaderTemplate(pager_pdu.TYPE_ACK, self.preamble)
+
+        self.message_port_register_in(pager_pdu.IN)
+        self.message_port_register_out(pager_pdu.OUT)
+        self.message_port_register_in(pager_pdu.CONFIG)
         
-        self.set_msg_handler(pmt.intern('in'), self.handle_msg)
-        self.set_msg_handler(pmt.intern('config'), self.handle_config)
+        self.set_msg_handler(pager_pdu.IN, self.handle_msg)
+        self.set_msg_handler(pager_pdu.CONFIG, self.handle_config)
 
     def handle_config(self, msg):
-        if pmt.is_dict(msg) and pmt.dict_has_key(msg, pmt.intern("dest_addr")):
-            new_addr = pmt.to_long(pmt.dict_ref(msg, pmt.intern("dest_addr"), pmt.PMT_NIL))
-            self.dest_addr = new_addr & 0xFF
+        self.dest_addr = pager_pdu.meta_long(msg, pager_pdu.DEST_ADDR, self.dest_addr) & 0xFF
+        self.my_addr = pager_pdu.meta_long(msg, pager_pdu.MY_ADDR, self.my_addr) & 0xFF
 
     def handle_msg(self, pdu):
         if not pmt.is_pair(pdu):
@@ -59,19 +49,41 @@ class add_ack_address_block(gr.basic_block):
         meta = pmt.car(pdu)
         payload = pmt.cdr(pdu)
 
+        if pager_pdu.is_batch(payload):
+            self._handle_batch(meta, payload)
+            return
         if not pmt.is_u8vector(payload):
             return
 
-        data = list(pmt.u8vector_elements(payload))
+        dest = pager_pdu.meta_long(meta, pager_pdu.DEST_ADDR, self.dest_addr) & 0xFF
+
+        # Structure: [ PREAMBLE ] + [ DEST ] + [ TYPE=0x02 ] + [ SRC ] + [ DATA ]
+        new_frame = self._header.get(dest, self.my_addr) + pager_pdu.pdu_bytes(payload)
 
-        # --- MODIFIED HERE ---
-        # Structure: [ PREAMBLE ] + [ DEST ] + [ TYPE=0x02 ] + [ DATA ]
-        new_frame = self.preamble + [self.dest_addr] + [0x02] + data
+        try:
+            meta = pmt.dict_add(meta, pager_pdu.MY_ADDR, pmt.from_long(dest))
+        except:
+            pass
+
+        self.message_port_pub(pager_pdu.OUT, pager_pdu.make_pdu(meta, new_frame))
+
+    def _handle_batch(self, meta, payload):
+        # Batch of payloads: one call, the header goes onto every row at once
+        frames = pager_pdu.batch_frames(payload)
+        if not frames:
+            return
+        dest = pager_pdu.column(meta, pager_pdu.DEST_ADDR, len(frames), self.dest_addr)
+        rows = pager_pdu.batch_rows(frames)
+        if rows is None:
+            # Payloads of different lengths: header per frame
+            out = [self._header.get(int(d), self.my_addr) + f for d, f in zip(dest, frames)]
+        else:
+            out = self._header.stack(dest, self.my_addr, rows)
 
         try:
-            meta = pmt.dict_add(meta, pmt.intern("my_addr"), pmt.from_long(self.dest_addr))
+            meta = pmt.dict_add(meta, pager_pdu.MY_ADDR, pager_pdu.u8vector(dest))
         except:
             pass
 
-        new_payload_pmt = pmt.init_u8vector(len(new_frame), new_frame)
-        self.message_port_pub(pmt.intern('out'), pmt.cons(meta, new_payload_pmt))
\ No newline at end of file
+        for frame in pager_pdu.frame_pdus(meta, out):
+            self.message_port_pub(pager_pdu.OUT, frame)
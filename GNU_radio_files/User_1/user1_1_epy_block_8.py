@@ -0,0 +1,176 @@
+from gnuradio import gr
+import pmt
+import pager_common  # noqa: F401  (puts ../common on sys.path)
+import pager_crypto
+import pager_pdu
+
+class pdu_aes_decrypt(gr.basic_block):
+    """
+    PDU AES Decrypt (AES-CTR)
+
+    In:
+      - PDU: (meta, payload_bytes)
+      - config : dict {my_addr, dest_addr} (prefetches the peer's link key)
+             nonce_mode "random"   : payload = NONCE(8 bytes) | CIPHERTEXT
+             nonce_mode "implicit" : payload = CTR_LO(2 bytes) | CIPHERTEXT, or a SYNC frame
+
+    Out:
+      - PDU: same meta
+             payload = PLAINTEXT
+      - drop: replayed frames, and implicit mode frames with no session yet or a
+              counter outside the window; a SYNC whose SRC header byte is not the
+              session's source is dropped too (the CRC does not cover the link
+              header, so the session learned from it stays bound to its sender)
+
+    Parameters:
+      key_hex    : same key as encrypt block
+      nonce_mode : must match the encrypt block
+      window     : implicit mode, max distance from the highest counter seen before a resync is needed
+                   (also the size of the per-peer replay bitmap)
+      replay_capacity : random mode, nonces remembered by the replay filter
+      per_peer_keys : must match the encrypt block
+      verbose    : print debug
+    """
+
+    def __init__(self, key_hex="00112233445566778899AABBCCDDEEFF", nonce_mode="random", window=1024, replay_capacity=4096,
+                 per_peer_keys=True, verbose=True):
+        gr.basic_block.__init__(self,
+                                name="PDU AES Decrypt (CTR)",
+                                in_sig=None,
+                                out_sig=None)
+
+        self.verbose = bool(verbose)
+        self.implicit = str(nonce_mode).lower().strip() == "implicit"
+        self.window = int(window)
+        self._peers = {}          # sender address -> CounterWindow
+        self._last_peer = None    # sender of the most recent SYNC
+        self._nonces = pager_crypto.NonceFilter(replay_capacity)   # random mode
+        self.dest_addr = 0
+        self.per_peer_keys = bool(per_peer_keys)
+        self._keys = None
+        self.set_key_hex(key_hex)
+
+        self.message_port_register_in(pager_pdu.IN)
+        self.message_port_register_out(pager_pdu.OUT)
+        self.message_port_register_out(pager_pdu.DROP)
+        self.message_port_register_in(pager_pdu.CONFIG)
+        self.set_msg_handler(pager_pdu.IN, self._handle_msg)
+        self.set_msg_handler(pager_pdu.CONFIG, self.handle_config)
+
+    def _log(self, msg):
+        if self.verbose:
+            print(f"[pdu_aes_decrypt] {msg}")
+
+    # ---- key handling ----
+    def set_key_hex(self, key_hex):
+        key = pager_crypto.parse_key_hex(key_hex)
+        self._key = key
+        # Nonces arrive on the wire, so nothing can be precomputed; the ECB
+        # context is still built once per peer key instead of once per frame.
+        if self._keys is None:
+            self._keys = pager_crypto.KeyManager(key, derive=self.per_peer_keys)
+        else:
+            self._keys.set_master(key)
+        self._keys.prefetch(self.dest_addr)
+        self._log(f"Key set ({len(key)} bytes)")
+
+    def handle_config(self, msg):
+        if not pmt.is_dict(msg): return
+        if pmt.dict_has_key(msg, pager_pdu.MY_ADDR):
+            self._keys.set_my_addr(pmt.to_long(pmt.dict_ref(msg, pager_pdu.MY_ADDR, pmt.PMT_NIL)))
+        if pmt.dict_has_key(msg, pager_pdu.DEST_ADDR):
+            self.dest_addr = pmt.to_long(pmt.dict_ref(msg, pager_pdu.DEST_ADDR, pmt.PMT_NIL)) & 0xFF
+        self._keys.prefetch(self.dest_addr)
+
+    def _src_addr(self, meta, default):
+        if pmt.is_dict(meta) and pmt.dict_has_key(meta, pager_pdu.SRC_ADDR):
+            return pmt.to_long(pmt.dict_ref(meta, pager_pdu.SRC_ADDR, pmt.PMT_NIL)) & 0xFF
+        return default
+
+    # ---- message handler ----
+    def _handle_msg(self, pdu):
+        if not pmt.is_pair(pdu):
+            return
+
+        meta = pmt.car(pdu)
+        pl   = pmt.cdr(pdu)
+
+        if not pmt.is_u8vector(pl):
+            self._log("Ignoring non-u8vector payload")
+            return
+
+        data = pager_pdu.pdu_bytes(pl)
+        if self.implicit:
+            plaintext = self._open_implicit(meta, data)
+            if plaintext is None:
+                return
+        else:
+            if len(data) < pager_crypto.NONCE_LEN:
+                self._log("Payload too short (no nonce)")
+                return
+
+            nonce = data[:pager_crypto.NONCE_LEN]
+            ciphertext = data[pager_crypto.NONCE_LEN:]
+            if self._nonces.seen(nonce):
+                self._emit_drop(meta, data, "replay")
+                return
+            self._nonces.add(nonce)
+
+            gen = self._keys.get(self._src_addr(meta, self.dest_addr)).ctr
+            plaintext = gen.crypt(nonce, ciphertext)
+
+        payload_pmt = pager_pdu.u8vector(plaintext)
+        out_pdu = pmt.cons(meta, payload_pmt)
+        self.message_port_pub(pager_pdu.OUT, out_pdu)
+
+        self._log(f"Decrypted PDU: in_len={len(data)}, out_len={len(plaintext)}")
+
+    # ---- implicit nonces ----
+    def _open_implicit(self, meta, data):
+        n = pager_crypto.CTR_WIRE_LEN
+        if len(data) < n:
+            self._emit_drop(meta, data, "short_frame")
+            return None
+
+        if data[:n] == pager_crypto.SYNC_MARKER:
+            session = data[n:n + pager_crypto.SESSION_LEN]
+            ref = int.from_bytes(data[n + pager_crypto.SESSION_LEN:n + pager_crypto.SESSION_LEN + 4], "big")
+            peer = session[-1]
+            if self._src_addr(meta, peer) != peer:
+                # SESSION is under the CRC, the SRC header byte is not: trust neither
+                self._emit_drop(meta, data, "src_mismatch")
+                return None
+            if not self._peers.setdefault(peer, pager_crypto.CounterWindow(self.window)).sync(session, ref):
+                self._emit_drop(meta, data, "replay")
+                return None
+            self._last_peer = peer
+            # Session key schedule here, not on the session's first frame
+            self._keys.get(peer).session(session)
+            self._log(f"SYNC from {peer}: session={session.hex()} ref={ref}")
+            return None
+
+        peer = self._src_addr(meta, self._last_peer)
+        win = self._peers.get(peer)
+        counter = win.resolve(int.from_bytes(data[:n], "big")) if win else None
+        if counter is None:
+            # Wait for the sender's next SYNC
+            self._emit_drop(meta, data, "no_session" if win is None else "ctr_out_of_window")
+            return None
+        if not win.fresh(counter):
+            # ARQ retransmissions of an already delivered frame end up here too
+            self._emit_drop(meta, data, "replay")
+            return None
+        win.accept(counter)
+        gen = self._keys.get(peer).session(win.session).ctr
+        return gen.crypt(pager_crypto.implicit_nonce(counter), data[n:])
+
+    def _emit_drop(self, meta, data_bytes, reason):
+        try:
+            m = meta
+            if not pmt.is_dict(m):
+                m = pmt.make_dict()
+            m = pmt.dict_add(m, pager_pdu.DROP_REASON, pmt.intern(str(reason)))
+            v = pager_pdu.u8vector(data_bytes)
+            self.message_port_pub(pager_pdu.DROP, pmt.cons(m, v))
+        except Exception:
+            pass
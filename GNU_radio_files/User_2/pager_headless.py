@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Headless pager node: user2_1.py without Qt
+
+The same node (pager_node) with the headless messaging block instead of
+the Chat GUI, and no time / frequency / constellation sinks. Runs on a
+relay box without a display; messages are written to the inbox pipe,
+events go to the log (see user2_1_epy_block_15). --mac-engine runs the
+ARQ, the reassembly and the API on one asyncio loop (pager_engine).
+--phy pdu skips the modem: the frames go to the peer as PDUs over ZeroMQ
+PUB / SUB message sockets, with optional loss and delay (pager_channel
+pdu_link); both nodes need it. --iq sc16 / sc8 carries the baseband as
+quantized 16- / 8-bit blocks (pager_iq_zmq) instead of raw gr_complex,
+at a half / a quarter of the bandwidth; the peer needs it as well.
+
+    python3 pager_headless.py --inbox /tmp/pager20.in --event-log pager20.log
+    python3 pager_headless.py --phy pdu --loss 0.05 --delay-ms 20 --inbox /tmp/pager20.in
+    python3 pager_headless.py --iq sc8 --iq-burst-only --inbox /tmp/pager20.in
+    echo "hello" > /tmp/pager20.in
+    echo "@30 hello relay" > /tmp/pager20.in
+"""
+
+from argparse import ArgumentParser, RawDescriptionHelpFormatter
+from gnuradio import blocks
+from gnuradio import gr
+from gnuradio import zeromq
+import signal
+import sys
+import pager_common  # noqa: F401  (puts ../common on sys.path)
+import pager_channel
+import pager_iq_zmq
+import pager_node
+import user2_1_epy_block_15 as epy_block_15  # embedded python block
+
+
+class pager_headless(gr.top_block):
+
+    def __init__(self, my_id=20, target_id=15, link_crypto='ctr', nonce_mode='implicit', aes_key=pager_node.AES_KEY,
+                 rx_address='tcp://127.0.0.1:5555', tx_address='tcp://127.0.0.2:5555', samp_rate=600e3,
+                 inbox="", event_log="", history_db="", api_socket="", mac_engine=False, phy='qpsk', loss=0.0,
+                 delay_ms=0.0, jitter_ms=0.0, iq='fc32', iq_burst_only=False):
+        gr.top_block.__init__(self, "Headless pager", catch_exceptions=True)
+
+        ##################################################
+        # Variables
+        ##################################################
+        self.samp_rate = samp_rate
+        self.chat_payload_size, self.arq_payload_size = pager_node.payload_sizes(link_crypto, nonce_mode)
+
+        ##################################################
+        # Blocks
+        ##################################################
+        self.epy_block_15 = epy_block_15.chat_headless_block(payload_size=self.chat_payload_size, my_id=my_id,
+                                                             target_id=target_id, inbox=inbox, event_log=event_log,
+                                                             history_db=history_db, api_socket=api_socket,
+                                                             mac_engine=mac_engine,
+                                                             arq_payload_size=self.arq_payload_size,
+                                                             encrypt_first=link_crypto != 'aead')
+        self.node = pager_node.pager_node(self.epy_block_15, link_crypto=link_crypto, nonce_mode=nonce_mode,
+                                          aes_key=aes_key, phy=phy)
+        if phy == 'pdu':
+            self.zeromq_sub_msg_source_0 = zeromq.sub_msg_source(rx_address, 100, False)
+            self.zeromq_pub_msg_sink_0 = zeromq.pub_msg_sink(tx_address, 100, True)
+            self.pdu_link_0 = pager_channel.pdu_link(loss=loss, delay_ms=delay_ms, jitter_ms=jitter_ms)
+        else:
+            if iq == 'fc32':
+                self.zeromq_sub_source_1 = zeromq.sub_source(gr.sizeof_gr_complex, 1, rx_address, 100, True, (-1), '', False)
+                self.zeromq_pub_sink_0 = zeromq.pub_sink(gr.sizeof_gr_complex, 1, tx_address, 100, True, (-1), '', True, True)
+            else:
+                # Quantized blocks in ZMQ messages, same sockets and roles
+                self.zeromq_sub_source_1 = pager_iq_zmq.iq_sub_source(rx_address)
+                self.zeromq_pub_sink_0 = pager_iq_zmq.iq_pub_sink(tx_address, iq, burst_only=iq_burst_only)
+            self.blocks_multiply_const_vxx_0 = blocks.multiply_const_cc(0.8)
+            self.blocks_throttle2_1 = blocks.throttle(gr.sizeof_gr_complex*1, samp_rate, True)
+
+        ##################################################
+        # Connections
+        ##################################################
+        if phy == 'pdu':
+            self.msg_connect((self.zeromq_sub_msg_source_0, 'out'), (self.node, 'air_in'))
+            self.msg_connect((self.node, 'air_out'), (self.pdu_link_0, 'in'))
+            self.msg_connect((self.pdu_link_0, 'out'), (self.zeromq_pub_msg_sink_0, 'in'))
+        else:
+            self.connect((self.zeromq_sub_source_1, 0), (self.node, 0))
+            self.connect((self.node, 0), (self.blocks_multiply_const_vxx_0, 0))
+            self.connect((self.blocks_multiply_const_vxx_0, 0), (self.blocks_throttle2_1, 0))
+            self.connect((self.blocks_throttle2_1, 0), (self.zeromq_pub_sink_0, 0))
+
+    def send(self, text, dest=None):
+        return self.epy_block_15.send_text(text, dest)
+
+
+def argument_parser():
+    parser = ArgumentParser(description=__doc__, formatter_class=RawDescriptionHelpFormatter)
+    parser.add_argument("--my-id", type=int, default=20)
+    parser.add_argument("--target-id", type=int, default=15)
+    parser.add_argument("--link-crypto", choices=("aead", "ctr"), default='ctr')
+    parser.add_argument("--nonce-mode", choices=("implicit", "random"), default='implicit')
+    parser.add_argument("--aes-key", default=pager_node.AES_KEY)
+    parser.add_argument("--rx-address", default='tcp://127.0.0.1:5555', help="ZMQ SUB source (peer's TX)")
+    parser.add_argument("--tx-address", default='tcp://127.0.0.2:5555', help="ZMQ PUB sink")
+    parser.add_argument("--samp-rate", type=float, default=600e3)
+    parser.add_argument("--inbox", default="", help="named pipe for outgoing messages, '-' for stdin")
+    parser.add_argument("--event-log", default="", help="event log file (default: stderr)")
+    parser.add_argument("--history-db", default="", help="store the conversations in this SQLite file")
+    parser.add_argument("--api-socket", default="", help="Unix socket for the local messaging API (pager_api)")
+    parser.add_argument("--mac-engine", action="store_true", help="ARQ, reassembly and API on one asyncio loop")
+    parser.add_argument("--phy", choices=("qpsk", "pdu"), default='qpsk',
+                        help="pdu: frames as ZMQ PDUs to the peer, no modem")
+    parser.add_argument("--loss", type=float, default=0.0, help="phy pdu: probability a sent frame is lost")
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="phy pdu: delay of every sent frame")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="phy pdu: up to this much more delay")
+    parser.add_argument("--iq", choices=("fc32", "sc16", "sc8"), default='fc32',
+                        help="baseband sample format on the ZMQ link (sc16 / sc8: pager_iq_zmq)")
+    parser.add_argument("--iq-burst-only", action="store_true", help="sc16 / sc8: do not send idle blocks")
+    return parser
+
+
+def main(top_block_cls=pager_headless, options=None):
+    if options is None:
+        options = argument_parser().parse_args()
+    tb = top_block_cls(my_id=options.my_id, target_id=options.target_id, link_crypto=options.link_crypto,
+                       nonce_mode=options.nonce_mode, aes_key=options.aes_key, rx_address=options.rx_address,
+                       tx_address=options.tx_address, samp_rate=options.samp_rate, inbox=options.inbox,
+                       event_log=options.event_log, history_db=options.history_db, api_socket=options.api_socket,
+                       mac_engine=options.mac_engine, phy=options.phy, loss=options.loss,
+                       delay_ms=options.delay_ms, jitter_ms=options.jitter_ms, iq=options.iq,
+                       iq_burst_only=options.iq_burst_only)
+
+    def sig_handler(sig=None, frame=None):
+        tb.stop()
+        tb.wait()
+
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, sig_handler)
+    signal.signal(signal.SIGTERM, sig_handler)
+
+    tb.start()
+    tb.wait()
+
+
+if __name__ == '__main__':
+    main()
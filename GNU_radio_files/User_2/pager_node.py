@@ -0,0 +1,295 @@
+"""
+Pager Node (hierarchical block, no Qt)
+
+The whole node of user2_1.py between the messaging block and the
+radio, without the GUI sinks: ARQ, link crypto (AES-GCM or AES-CTR +
+CRC-32), addressing, framing, QPSK modulation on the TX side and
+synchronisation, demodulation and de-framing on the RX side.
+
+    complex in  (baseband from the radio / ZMQ)  -> RX chain -> app 'in', 'ack_in'
+    app 'out'   -> TX chain -> complex out (baseband to the radio / ZMQ)
+
+`app` is any block with the messaging ports (out, in, ack_in,
+arq_status, config_out): the Chat GUI block or the headless block.
+Size its payload with payload_sizes(link_crypto, nonce_mode)[0].
+Block parameters and connections are the same as in user2_1.py.
+
+The node is two halves joined only by message ports, so they can also
+run in separate processes (pager_split.py):
+
+    pager_tx  complex out   msg in: app_in, config, ack_in, ack_tx   msg out: status
+    pager_rx  complex in    msg in: config   msg out: app_out, ack_out, ack_tx
+
+ack_tx carries the ACKs the RX verifier decides to send (to be framed
+and modulated by the TX half), ack_out the ACKs received from the peer
+(for the ARQ and the app).
+
+An app that runs the ARQ itself (the headless block with mac_engine,
+pager_engine) gets pager_tx(arq=False): no ARQ block, its sequenced
+frames go to 'frames_in', and with AES-CTR its chunks go through the
+encryption first ('app_in' -> 'encrypted' -> the app's 'crypt_in').
+The ARQ status is then the app's 'status' port.
+
+phy='pdu' leaves out the modem: no formatter, modulator or
+synchronisation, no stream ports. The frames the TX half builds (data
+and ACKs, [ PREAMBLE | DEST | TYPE | SRC | ... ]) leave on the message
+port 'air_out' and the RX half's address filters take them on 'air_in',
+exactly as they come out of the demodulator. For wired links and for
+testing the MAC at full speed; pager_channel.pdu_link adds loss and
+delay, ZeroMQ message blocks carry them between processes.
+"""
+
+from gnuradio import blocks
+from gnuradio import digital
+from gnuradio import gr, pdu
+import user2_1_epy_block_0_0 as epy_block_0_0  # embedded python block
+import user2_1_epy_block_10 as epy_block_10  # embedded python block
+import user2_1_epy_block_11 as epy_block_11  # embedded python block
+import user2_1_epy_block_12 as epy_block_12  # embedded python block
+import user2_1_epy_block_13 as epy_block_13  # embedded python block
+import user2_1_epy_block_14 as epy_block_14  # embedded python block
+import user2_1_epy_block_1_0 as epy_block_1_0  # embedded python block
+import user2_1_epy_block_2 as epy_block_2  # embedded python block
+import user2_1_epy_block_4 as epy_block_4  # embedded python block
+import user2_1_epy_block_6 as epy_block_6  # embedded python block
+import user2_1_epy_block_8 as epy_block_8  # embedded python block
+
+ACCESS_KEY = '1110000101011010111010001001001111100001010110101110100010010011'
+AES_KEY = '9F3C7A12D4E8B5C1A0F2D39B7E5648AF'
+
+
+def payload_sizes(link_crypto='ctr', nonce_mode='implicit'):
+    """ (chat payload, ARQ payload) in bytes, as computed by user2_1.py """
+    chat = 38 if (nonce_mode == 'implicit' or link_crypto == 'aead') else 32
+    return chat, (chat if link_crypto == 'aead' else 40)
+
+
+class pager_tx(gr.hier_block2):
+
+    def __init__(self, link_crypto='ctr', nonce_mode='implicit', aes_key=AES_KEY, access_key=ACCESS_KEY, sps=4,
+                 verbose=False, arq=True, phy='qpsk'):
+        gr.hier_block2.__init__(self, "pager_tx",
+                                gr.io_signature(0, 0, 0),
+                                gr.io_signature(0, 0, 0) if phy == 'pdu' else gr.io_signature(1, 1, gr.sizeof_gr_complex))
+        self.link_crypto = link_crypto
+        if phy == 'pdu': self.message_port_register_hier_out("air_out")
+        if arq:
+            for port in ("app_in", "config", "ack_in", "ack_tx"):
+                self.message_port_register_hier_in(port)
+            self.message_port_register_hier_out("status")
+        else:
+            for port in ("frames_in", "config", "ack_tx") + (("app_in",) if link_crypto != 'aead' else ()):
+                self.message_port_register_hier_in(port)
+            if link_crypto != 'aead': self.message_port_register_hier_out("encrypted")
+        chat_payload_size, arq_payload_size = payload_sizes(link_crypto, nonce_mode)
+        qpsk = digital.constellation_rect([0.707+0.707j, -0.707+0.707j, -0.707-0.707j, 0.707-0.707j], [0, 1, 2, 3],
+            4, 2, 2, 1, 1).base()
+        hdr_format = digital.header_format_default(access_key, 0)
+
+        ##################################################
+        # Blocks
+        ##################################################
+        self.epy_block_0_0 = epy_block_0_0.add_address_block()
+        self.epy_block_1_0 = epy_block_1_0.add_ack_address_block()
+        if arq:
+            self.epy_block_10 = epy_block_10.payload_to_pdu_with_seq_arq(payload_size=arq_payload_size, wait_time_s=0.3, max_retries=10, verbose=verbose)
+        if link_crypto == 'aead':
+            self.epy_block_13 = epy_block_13.aead_seal(key_hex=aes_key, tag_len=4, sync_interval=64, per_peer_keys=True, verbose=verbose)
+        else:
+            self.epy_block_4 = epy_block_4.pdu_aes_encrypt(key_hex=aes_key, payload_size=chat_payload_size, pool_size=256, nonce_mode=nonce_mode, sync_interval=64, per_peer_keys=True, verbose=verbose)
+            self.digital_crc_append_0 = digital.crc_append(32, 0x4C11DB7, 0xFFFFFFFF, 0xFFFFFFFF, True, True, False, 0)
+        self.digital_crc_append_0_0 = digital.crc_append(32, 0x4C11DB7, 0xFFFFFFFF, 0xFFFFFFFF, True, True, False, 0)
+        if phy != 'pdu':
+            self.digital_protocol_formatter_async_0 = digital.protocol_formatter_async(hdr_format)
+            self.pdu_pdu_to_tagged_stream_0 = pdu.pdu_to_tagged_stream(gr.types.byte_t, 'packet_len')
+            self.pdu_pdu_to_tagged_stream_1 = pdu.pdu_to_tagged_stream(gr.types.byte_t, 'packet_len')
+            self.blocks_tagged_stream_mux_0 = blocks.tagged_stream_mux(gr.sizeof_char*1, 'packet_len', 0)
+            self.digital_constellation_modulator_0 = digital.generic_mod(
+                constellation=qpsk,
+                differential=True,
+                samples_per_symbol=sps,
+                pre_diff_code=True,
+                excess_bw=0.5,
+                verbose=False,
+                log=False,
+                truncate=False)
+
+        ##################################################
+        # Connections
+        ##################################################
+        self.msg_connect((self, 'ack_tx'), (self.digital_crc_append_0_0, 'in'))
+        self.msg_connect((self.digital_crc_append_0_0, 'out'), (self.epy_block_1_0, 'in'))
+        self.msg_connect((self, 'config'), (self.epy_block_0_0, 'config'))
+        self.msg_connect((self, 'config'), (self.epy_block_1_0, 'config'))
+        # Framed data and ACKs: to the modem, or straight out as PDUs
+        air = (self, 'air_out') if phy == 'pdu' else (self.digital_protocol_formatter_async_0, 'in')
+        self.msg_connect((self.epy_block_0_0, 'out'), air)
+        self.msg_connect((self.epy_block_1_0, 'out'), air)
+        # Sequenced frames: from the ARQ block, or from the app's own ARQ
+        frames = (self.epy_block_10, 'out') if arq else (self, 'frames_in')
+        if arq:
+            self.msg_connect((self.epy_block_10, 'status'), (self, 'status'))
+            self.msg_connect((self, 'ack_in'), (self.epy_block_10, 'busy_in'))
+            self.msg_connect((self, 'ack_in'), (self.epy_block_10, 'ack_in'))
+        if link_crypto == 'aead':
+            self.msg_connect((self, 'config'), (self.epy_block_13, 'config'))
+            if arq: self.msg_connect((self, 'app_in'), (self.epy_block_10, 'in'))
+            self.msg_connect(frames, (self.epy_block_13, 'in'))
+            self.msg_connect((self.epy_block_13, 'out'), (self.epy_block_0_0, 'in'))
+        else:
+            self.msg_connect((self.digital_crc_append_0, 'out'), (self.epy_block_0_0, 'in'))
+            self.msg_connect((self, 'app_in'), (self.epy_block_4, 'in'))
+            self.msg_connect((self, 'config'), (self.epy_block_4, 'config'))
+            self.msg_connect(frames, (self.digital_crc_append_0, 'in'))
+            self.msg_connect((self.epy_block_4, 'out'), (self.epy_block_10, 'in') if arq else (self, 'encrypted'))
+        if phy == 'pdu': return
+        self.msg_connect((self.digital_protocol_formatter_async_0, 'header'), (self.pdu_pdu_to_tagged_stream_0, 'pdus'))
+        self.msg_connect((self.digital_protocol_formatter_async_0, 'payload'), (self.pdu_pdu_to_tagged_stream_1, 'pdus'))
+        self.connect((self.pdu_pdu_to_tagged_stream_0, 0), (self.blocks_tagged_stream_mux_0, 0))
+        self.connect((self.pdu_pdu_to_tagged_stream_1, 0), (self.blocks_tagged_stream_mux_0, 1))
+        self.connect((self.blocks_tagged_stream_mux_0, 0), (self.digital_constellation_modulator_0, 0))
+        self.connect((self.digital_constellation_modulator_0, 0), (self, 0))
+
+    def set_key_hex(self, aes_key):
+        (self.epy_block_13 if self.link_crypto == 'aead' else self.epy_block_4).set_key_hex(aes_key)
+
+
+class pager_rx(gr.hier_block2):
+
+    def __init__(self, link_crypto='ctr', nonce_mode='implicit', aes_key=AES_KEY, access_key=ACCESS_KEY, sps=4,
+                 phase_bw=0.0628, verbose=False, phy='qpsk'):
+        gr.hier_block2.__init__(self, "pager_rx",
+                                gr.io_signature(0, 0, 0) if phy == 'pdu' else gr.io_signature(1, 1, gr.sizeof_gr_complex),
+                                gr.io_signature(0, 0, 0))
+        self.link_crypto = link_crypto
+        self.message_port_register_hier_in("config")
+        if phy == 'pdu': self.message_port_register_hier_in("air_in")
+        for port in ("app_out", "ack_out", "ack_tx"):
+            self.message_port_register_hier_out(port)
+
+        ##################################################
+        # Blocks
+        ##################################################
+        self.epy_block_2 = epy_block_2.address_filter_rx(preamble_len=128)
+        self.epy_block_6 = epy_block_6.ack_address_filter_rx(preamble_len=128)
+        self.epy_block_12 = epy_block_12.ack_crc32_verify_minimal(variant="zlib")
+        if link_crypto == 'aead':
+            self.epy_block_14 = epy_block_14.aead_verify_and_ack(key_hex=aes_key, tag_len=4, window=1024, payload_len=40, per_peer_keys=True)
+        else:
+            self.epy_block_8 = epy_block_8.pdu_aes_decrypt(key_hex=aes_key, nonce_mode=nonce_mode, window=1024, replay_capacity=4096, per_peer_keys=True, verbose=verbose)
+            self.epy_block_11 = epy_block_11.crc32_verify_and_ack(variant="zlib")
+        if phy != 'pdu': self._build_demod(access_key, sps, phase_bw)
+
+        ##################################################
+        # Connections
+        ##################################################
+        self.msg_connect((self, 'config'), (self.epy_block_2, 'config'))
+        self.msg_connect((self, 'config'), (self.epy_block_6, 'config'))
+        self.msg_connect((self.epy_block_12, 'ack_out'), (self, 'ack_out'))
+        self.msg_connect((self.epy_block_6, 'out'), (self.epy_block_12, 'in'))
+        # Received frames: from the demodulator, or straight in as PDUs
+        air_2 = (self, 'air_in') if phy == 'pdu' else (self.pdu_tagged_stream_to_pdu_0, 'pdus')
+        air_6 = (self, 'air_in') if phy == 'pdu' else (self.pdu_tagged_stream_to_pdu_0_0, 'pdus')
+        self.msg_connect(air_2, (self.epy_block_2, 'in'))
+        self.msg_connect(air_6, (self.epy_block_6, 'in'))
+        if link_crypto == 'aead':
+            self.msg_connect((self, 'config'), (self.epy_block_14, 'config'))
+            self.msg_connect((self.epy_block_14, 'ack_out'), (self, 'ack_tx'))
+            self.msg_connect((self.epy_block_14, 'out'), (self, 'app_out'))
+            self.msg_connect((self.epy_block_2, 'out'), (self.epy_block_14, 'in'))
+        else:
+            self.msg_connect((self, 'config'), (self.epy_block_8, 'config'))
+            self.msg_connect((self.epy_block_11, 'ack_out'), (self, 'ack_tx'))
+            self.msg_connect((self.epy_block_11, 'out'), (self.epy_block_8, 'in'))
+            self.msg_connect((self.epy_block_2, 'out'), (self.epy_block_11, 'in'))
+            self.msg_connect((self.epy_block_8, 'out'), (self, 'app_out'))
+
+    def _build_demod(self, access_key, sps, phase_bw):
+        qpsk = digital.constellation_rect([0.707+0.707j, -0.707+0.707j, -0.707-0.707j, 0.707-0.707j], [0, 1, 2, 3],
+            4, 2, 2, 1, 1).base()
+        self.digital_symbol_sync_xx_0_0 = digital.symbol_sync_cc(
+            digital.TED_SIGNAL_TIMES_SLOPE_ML,
+            sps,
+            phase_bw,
+            1.0,
+            1.0,
+            1.5,
+            2,
+            digital.constellation_bpsk().base(),
+            digital.IR_MMSE_8TAP,
+            128,
+            [])
+        self.digital_linear_equalizer_0_0 = digital.linear_equalizer(15, 2, digital.adaptive_algorithm_cma(qpsk, .0001, 4).base(), True, [ ], 'corr_est')
+        self.digital_costas_loop_cc_0_0 = digital.costas_loop_cc(phase_bw, 4, False)
+        self.digital_constellation_decoder_cb_0_0 = digital.constellation_decoder_cb(qpsk)
+        self.digital_diff_decoder_bb_0_0 = digital.diff_decoder_bb(4, digital.DIFF_DIFFERENTIAL)
+        self.digital_map_bb_0_0 = digital.map_bb([0,1,2,3])
+        self.blocks_unpack_k_bits_bb_0_0 = blocks.unpack_k_bits_bb(2)
+        self.digital_correlate_access_code_xx_ts_0_0 = digital.correlate_access_code_bb_ts(access_key,
+          2, 'packet_len')
+        self.blocks_repack_bits_bb_0_0 = blocks.repack_bits_bb(1, 8, "packet_len", False, gr.GR_MSB_FIRST)
+        self.pdu_tagged_stream_to_pdu_0 = pdu.tagged_stream_to_pdu(gr.types.byte_t, 'packet_len')
+        self.pdu_tagged_stream_to_pdu_0_0 = pdu.tagged_stream_to_pdu(gr.types.byte_t, 'packet_len')
+        self.connect((self, 0), (self.digital_symbol_sync_xx_0_0, 0))
+        self.connect((self.digital_symbol_sync_xx_0_0, 0), (self.digital_linear_equalizer_0_0, 0))
+        self.connect((self.digital_linear_equalizer_0_0, 0), (self.digital_costas_loop_cc_0_0, 0))
+        self.connect((self.digital_costas_loop_cc_0_0, 0), (self.digital_constellation_decoder_cb_0_0, 0))
+        self.connect((self.digital_constellation_decoder_cb_0_0, 0), (self.digital_diff_decoder_bb_0_0, 0))
+        self.connect((self.digital_diff_decoder_bb_0_0, 0), (self.digital_map_bb_0_0, 0))
+        self.connect((self.digital_map_bb_0_0, 0), (self.blocks_unpack_k_bits_bb_0_0, 0))
+        self.connect((self.blocks_unpack_k_bits_bb_0_0, 0), (self.digital_correlate_access_code_xx_ts_0_0, 0))
+        self.connect((self.digital_correlate_access_code_xx_ts_0_0, 0), (self.blocks_repack_bits_bb_0_0, 0))
+        self.connect((self.blocks_repack_bits_bb_0_0, 0), (self.pdu_tagged_stream_to_pdu_0, 0))
+        self.connect((self.blocks_repack_bits_bb_0_0, 0), (self.pdu_tagged_stream_to_pdu_0_0, 0))
+
+    def set_key_hex(self, aes_key):
+        (self.epy_block_14 if self.link_crypto == 'aead' else self.epy_block_8).set_key_hex(aes_key)
+
+
+class pager_node(gr.hier_block2):
+
+    def __init__(self, app, link_crypto='ctr', nonce_mode='implicit', aes_key=AES_KEY, access_key=ACCESS_KEY,
+                 sps=4, phase_bw=0.0628, verbose=False, phy='qpsk'):
+        stream = gr.io_signature(0, 0, 0) if phy == 'pdu' else gr.io_signature(1, 1, gr.sizeof_gr_complex)
+        gr.hier_block2.__init__(self, "pager_node", stream, stream)
+        self.app = app
+        self.link_crypto = link_crypto
+        self.phy = phy
+        engine = getattr(app, "mac_engine", False)
+        self.tx = pager_tx(link_crypto, nonce_mode, aes_key, access_key, sps, verbose, arq=not engine, phy=phy)
+        self.rx = pager_rx(link_crypto, nonce_mode, aes_key, access_key, sps, phase_bw, verbose, phy=phy)
+        # The blocks stay reachable as node.epy_block_N, as before the split
+        for half in (self.tx, self.rx):
+            for name, blk in vars(half).items():
+                if name.startswith(("epy_", "digital_", "pdu_", "blocks_")): setattr(self, name, blk)
+
+        ##################################################
+        # Connections
+        ##################################################
+        self.msg_connect((app, 'config_out'), (self.tx, 'config'))
+        self.msg_connect((app, 'config_out'), (self.rx, 'config'))
+        self.msg_connect((self.rx, 'app_out'), (app, 'in'))
+        self.msg_connect((self.rx, 'ack_out'), (app, 'ack_in'))
+        self.msg_connect((self.rx, 'ack_tx'), (self.tx, 'ack_tx'))
+        if engine:
+            self.msg_connect((app, 'out'), (self.tx, 'frames_in'))
+            self.msg_connect((self.rx, 'ack_out'), (app, 'busy_in'))
+            if link_crypto != 'aead':
+                self.msg_connect((app, 'crypt_out'), (self.tx, 'app_in'))
+                self.msg_connect((self.tx, 'encrypted'), (app, 'crypt_in'))
+        else:
+            self.msg_connect((app, 'out'), (self.tx, 'app_in'))
+            self.msg_connect((self.tx, 'status'), (app, 'arq_status'))
+            self.msg_connect((self.rx, 'ack_out'), (self.tx, 'ack_in'))
+        if phy == 'pdu':
+            self.message_port_register_hier_in("air_in")
+            self.message_port_register_hier_out("air_out")
+            self.msg_connect((self, 'air_in'), (self.rx, 'air_in'))
+            self.msg_connect((self.tx, 'air_out'), (self, 'air_out'))
+        else:
+            self.connect((self, 0), (self.rx, 0))
+            self.connect((self.tx, 0), (self, 0))
+
+    def set_key_hex(self, aes_key):
+        self.tx.set_key_hex(aes_key)
+        self.rx.set_key_hex(aes_key)
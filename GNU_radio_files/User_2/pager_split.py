@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Split pager node: TX, RX and the app in three processes
+
+The node of user2_1.py cut into pager_node's two halves and the
+messaging block, each in its own interpreter with its own GIL, linked by
+ZeroMQ PDU sockets instead of in-process message ports. A busy GUI (or
+the Qt sinks) then no longer delays the RX verifier's ACK or the ARQ's
+retransmissions.
+
+    rx   ZMQ SUB baseband -> pager_rx       (filters, verify + ACK decision, ACK decoding)
+    tx   pager_tx -> ZMQ PUB baseband       (ARQ, link crypto, framing of data and ACKs)
+    app  Chat GUI, or the headless block with --headless (plus --sinks: Qt sinks on the baseband)
+
+Links, one PUSH -> PULL socket each (the receiving process binds), pmt
+serialized by the gr-zeromq message blocks:
+
+    app     app out         -> tx app_in
+    cfg_tx  app config_out  -> tx config
+    cfg_rx  app config_out  -> rx config
+    rx      rx app_out      -> app in
+    ack     rx ack_out      -> app ack_in
+    arq     rx ack_out      -> tx ack_in (ARQ ack_in + busy_in)
+    ack_tx  rx ack_tx       -> tx ack_tx (ACKs to send)
+    status  tx status       -> app arq_status
+
+--phy pdu (both peers) skips the modem: tx publishes its frames as PDUs
+on a ZMQ PUB message socket at --tx-address, rx subscribes to the peer's
+at --rx-address (see pager_node).
+
+--iq sc16 / sc8 carries the baseband as quantized blocks (pager_iq_zmq)
+instead of raw gr_complex, on the same sockets; the peer needs it too.
+
+--links is ipc:///path/prefix (one socket file per link: prefix-app,
+prefix-rx, ...) or tcp://host:port (consecutive ports from there, in the
+order above).
+
+    python3 pager_split.py                                   all three, Chat GUI
+    python3 pager_split.py --headless --inbox /tmp/pager20.in
+    python3 pager_split.py --role rx                         one process (under a process manager)
+"""
+
+from argparse import ArgumentParser, RawDescriptionHelpFormatter
+from gnuradio import blocks
+from gnuradio import gr
+from gnuradio import zeromq
+import os
+import signal
+import subprocess
+import sys
+import time
+import pager_common  # noqa: F401  (puts ../common on sys.path)
+import pager_iq_zmq
+import pager_node
+
+LINKS = ("app", "cfg_tx", "cfg_rx", "rx", "ack", "arq", "ack_tx", "status")
+
+
+def endpoint(base, link):
+    """ ZMQ address of one link: ipc://prefix-<link>, or tcp://host:<port + index> """
+    if base.startswith("ipc://"):
+        return f"{base}-{link}"
+    host, port = base.rsplit(":", 1)
+    return f"{host}:{int(port) + LINKS.index(link)}"
+
+
+def baseband_source(address, iq='fc32'):
+    """ ZMQ SUB source of the peer's baseband: raw gr_complex, or quantized blocks """
+    if iq == 'fc32':
+        return zeromq.sub_source(gr.sizeof_gr_complex, 1, address, 100, True, (-1), '', False)
+    return pager_iq_zmq.iq_sub_source(address)
+
+
+def pull(tb, base, link, dst):
+    src = zeromq.pull_msg_source(endpoint(base, link), 100, True)
+    setattr(tb, f"zeromq_pull_msg_source_{link}", src)
+    tb.msg_connect((src, 'out'), dst)
+
+
+def push(tb, base, src, link):
+    sink = zeromq.push_msg_sink(endpoint(base, link), 100, False)
+    setattr(tb, f"zeromq_push_msg_sink_{link}", sink)
+    tb.msg_connect(src, (sink, 'in'))
+
+
+class split_tx(gr.top_block):
+
+    def __init__(self, links, link_crypto='ctr', nonce_mode='implicit', aes_key=pager_node.AES_KEY,
+                 tx_address='tcp://127.0.0.2:5555', samp_rate=600e3, phy='qpsk', iq='fc32', iq_burst_only=False):
+        gr.top_block.__init__(self, "Pager TX", catch_exceptions=True)
+        self.tx = pager_node.pager_tx(link_crypto=link_crypto, nonce_mode=nonce_mode, aes_key=aes_key, phy=phy)
+
+        pull(self, links, "app", (self.tx, 'app_in'))
+        pull(self, links, "cfg_tx", (self.tx, 'config'))
+        pull(self, links, "arq", (self.tx, 'ack_in'))
+        pull(self, links, "ack_tx", (self.tx, 'ack_tx'))
+        push(self, links, (self.tx, 'status'), "status")
+        if phy == 'pdu':
+            self.zeromq_pub_msg_sink_0 = zeromq.pub_msg_sink(tx_address, 100, True)
+            self.msg_connect((self.tx, 'air_out'), (self.zeromq_pub_msg_sink_0, 'in'))
+        else:
+            self.blocks_multiply_const_vxx_0 = blocks.multiply_const_cc(0.8)
+            self.blocks_throttle2_1 = blocks.throttle(gr.sizeof_gr_complex*1, samp_rate, True)
+            if iq == 'fc32':
+                self.zeromq_pub_sink_0 = zeromq.pub_sink(gr.sizeof_gr_complex, 1, tx_address, 100, True, (-1), '', True, True)
+            else:
+                self.zeromq_pub_sink_0 = pager_iq_zmq.iq_pub_sink(tx_address, iq, burst_only=iq_burst_only)
+            self.connect((self.tx, 0), (self.blocks_multiply_const_vxx_0, 0))
+            self.connect((self.blocks_multiply_const_vxx_0, 0), (self.blocks_throttle2_1, 0))
+            self.connect((self.blocks_throttle2_1, 0), (self.zeromq_pub_sink_0, 0))
+
+
+class split_rx(gr.top_block):
+
+    def __init__(self, links, link_crypto='ctr', nonce_mode='implicit', aes_key=pager_node.AES_KEY,
+                 rx_address='tcp://127.0.0.1:5555', phy='qpsk', iq='fc32'):
+        gr.top_block.__init__(self, "Pager RX", catch_exceptions=True)
+        self.rx = pager_node.pager_rx(link_crypto=link_crypto, nonce_mode=nonce_mode, aes_key=aes_key, phy=phy)
+
+        pull(self, links, "cfg_rx", (self.rx, 'config'))
+        push(self, links, (self.rx, 'app_out'), "rx")
+        push(self, links, (self.rx, 'ack_out'), "ack")
+        push(self, links, (self.rx, 'ack_out'), "arq")
+        push(self, links, (self.rx, 'ack_tx'), "ack_tx")
+        if phy == 'pdu':
+            self.zeromq_sub_msg_source_0 = zeromq.sub_msg_source(rx_address, 100, False)
+            self.msg_connect((self.zeromq_sub_msg_source_0, 'out'), (self.rx, 'air_in'))
+        else:
+            self.zeromq_sub_source_1 = baseband_source(rx_address, iq)
+            self.connect((self.zeromq_sub_source_1, 0), (self.rx, 0))
+
+
+class split_app(gr.top_block):
+
+    def __init__(self, links, app, rx_address='tcp://127.0.0.1:5555', samp_rate=600e3, sinks=False, iq='fc32'):
+        gr.top_block.__init__(self, "Pager app", catch_exceptions=True)
+        self.app = app
+
+        push(self, links, (app, 'out'), "app")
+        push(self, links, (app, 'config_out'), "cfg_tx")
+        push(self, links, (app, 'config_out'), "cfg_rx")
+        pull(self, links, "rx", (app, 'in'))
+        pull(self, links, "ack", (app, 'ack_in'))
+        pull(self, links, "status", (app, 'arq_status'))
+        if sinks:
+            self._add_sinks(rx_address, samp_rate, iq)
+
+    def _add_sinks(self, rx_address, samp_rate, iq):
+        # The received baseband, from its own SUB socket on the peer's PUB
+        from PyQt5 import Qt
+        from gnuradio import qtgui
+        from gnuradio.fft import window
+        import sip
+        self.zeromq_sub_source_2 = baseband_source(rx_address, iq)
+        self.qtgui_freq_sink_x_0 = qtgui.freq_sink_c(1024, window.WIN_BLACKMAN_hARRIS, 0, samp_rate, "RECEIVED", 1,
+                                                     None)
+        self.qtgui_freq_sink_x_0.set_update_time(0.10)
+        self.qtgui_freq_sink_x_0.set_y_axis((-140), 10)
+        self.qtgui_const_sink_x_0 = qtgui.const_sink_c(1024, "RECEIVED", 1, None)
+        self.qtgui_const_sink_x_0.set_update_time(0.10)
+        self.qtgui_const_sink_x_0.enable_autoscale(True)
+        self.connect((self.zeromq_sub_source_2, 0), (self.qtgui_freq_sink_x_0, 0))
+        self.connect((self.zeromq_sub_source_2, 0), (self.qtgui_const_sink_x_0, 0))
+        self.sinks_window = Qt.QWidget()
+        self.sinks_window.setWindowTitle("Pager sinks")
+        layout = Qt.QVBoxLayout(self.sinks_window)
+        layout.addWidget(sip.wrapinstance(self.qtgui_freq_sink_x_0.qwidget(), Qt.QWidget))
+        layout.addWidget(sip.wrapinstance(self.qtgui_const_sink_x_0.qwidget(), Qt.QWidget))
+        self.sinks_window.show()
+
+
+def make_app(options):
+    """ The messaging block of the app process: the Chat GUI, or the headless block """
+    chat_payload_size, _ = pager_node.payload_sizes(options.link_crypto, options.nonce_mode)
+    if options.headless:
+        import user2_1_epy_block_15 as epy_block_15  # embedded python block
+        return epy_block_15.chat_headless_block(payload_size=chat_payload_size, my_id=options.my_id,
+                                                target_id=options.target_id, inbox=options.inbox,
+                                                event_log=options.event_log, history_db=options.history_db,
+                                                api_socket=options.api_socket)
+    import user2_1_epy_block_0_1 as epy_block_0_1  # embedded python block
+    return epy_block_0_1.chat_gui_block(payload_size=chat_payload_size, history_db=options.history_db,
+                                        api_socket=options.api_socket)
+
+
+def argument_parser():
+    parser = ArgumentParser(description=__doc__, formatter_class=RawDescriptionHelpFormatter)
+    parser.add_argument("--role", choices=("all", "tx", "rx", "app"), default="all")
+    parser.add_argument("--links", default="",
+                        help="ipc:///prefix or tcp://host:port for the PDU links (default ipc:///tmp/pager<my-id>)")
+    parser.add_argument("--my-id", type=int, default=20)
+    parser.add_argument("--target-id", type=int, default=15)
+    parser.add_argument("--link-crypto", choices=("aead", "ctr"), default='ctr')
+    parser.add_argument("--nonce-mode", choices=("implicit", "random"), default='implicit')
+    parser.add_argument("--aes-key", default=pager_node.AES_KEY)
+    parser.add_argument("--rx-address", default='tcp://127.0.0.1:5555', help="ZMQ SUB source (peer's TX)")
+    parser.add_argument("--tx-address", default='tcp://127.0.0.2:5555', help="ZMQ PUB sink")
+    parser.add_argument("--samp-rate", type=float, default=600e3)
+    parser.add_argument("--phy", choices=("qpsk", "pdu"), default='qpsk',
+                        help="pdu: frames as ZMQ PDUs to the peer, no modem")
+    parser.add_argument("--iq", choices=("fc32", "sc16", "sc8"), default='fc32',
+                        help="baseband sample format on the ZMQ link (sc16 / sc8: pager_iq_zmq)")
+    parser.add_argument("--iq-burst-only", action="store_true", help="sc16 / sc8: do not send idle blocks")
+    parser.add_argument("--headless", action="store_true", help="headless messaging block instead of the Chat GUI")
+    parser.add_argument("--sinks", action="store_true", help="Qt frequency / constellation sinks in the app process")
+    parser.add_argument("--inbox", default="", help="headless: named pipe for outgoing messages, '-' for stdin")
+    parser.add_argument("--event-log", default="", help="headless: event log file (default: stderr)")
+    parser.add_argument("--history-db", default="", help="store the conversations in this SQLite file")
+    parser.add_argument("--api-socket", default="", help="Unix socket for the local messaging API (pager_api)")
+    return parser
+
+
+def run_all():
+    """ Starts rx, tx and app as child processes; stops the others when one of them ends """
+    # The last --role on the command line wins
+    procs = [subprocess.Popen([sys.executable, os.path.abspath(__file__)] + sys.argv[1:] + ["--role", role])
+             for role in ("rx", "tx", "app")]
+
+    def stop_all(sig=None, frame=None):
+        for p in procs:
+            if p.poll() is None: p.terminate()
+
+    signal.signal(signal.SIGINT, stop_all)
+    signal.signal(signal.SIGTERM, stop_all)
+    while all(p.poll() is None for p in procs):
+        time.sleep(0.2)
+    stop_all()
+    for p in procs:
+        try:
+            p.wait(timeout=5.0)
+        except subprocess.TimeoutExpired:
+            p.kill()
+    sys.exit(max(abs(p.returncode or 0) for p in procs))
+
+
+def main(options=None):
+    if options is None:
+        options = argument_parser().parse_args()
+    if options.role == "all":
+        run_all()
+    links = options.links or f"ipc:///tmp/pager{options.my_id}"
+
+    qapp = None
+    if options.role == "tx":
+        tb = split_tx(links, options.link_crypto, options.nonce_mode, options.aes_key, options.tx_address,
+                      options.samp_rate, options.phy, options.iq, options.iq_burst_only)
+    elif options.role == "rx":
+        tb = split_rx(links, options.link_crypto, options.nonce_mode, options.aes_key, options.rx_address, options.phy,
+                      options.iq)
+    else:
+        if not options.headless or options.sinks:
+            from PyQt5 import Qt
+            qapp = Qt.QApplication(sys.argv)
+        tb = split_app(links, make_app(options), options.rx_address, options.samp_rate, options.sinks, options.iq)
+
+    def sig_handler(sig=None, frame=None):
+        tb.stop()
+        tb.wait()
+        if qapp is not None:
+            qapp.quit()
+        else:
+            sys.exit(0)
+
+    signal.signal(signal.SIGINT, sig_handler)
+    signal.signal(signal.SIGTERM, sig_handler)
+
+    tb.start()
+    if qapp is not None:
+        from PyQt5 import Qt
+        timer = Qt.QTimer()
+        timer.start(500)
+        timer.timeout.connect(lambda: None)
+        qapp.exec_()
+        tb.stop()
+        tb.wait()
+    else:
+        tb.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -33,9 +33,13 @@ import user2_1_epy_block_0_1 as epy_block_0_1  # embedded python block
 import user2_1_epy_block_10 as epy_block_10  # embedded python block
 import user2_1_epy_block_11 as epy_block_11  # embedded python block
 import user2_1_epy_block_12 as epy_block_12  # embedded python block
+import user2_1_epy_block_13 as epy_block_13  # embedded python block
+import user2_1_epy_block_14 as epy_block_14  # embedded python block
 import user2_1_epy_block_1_0 as epy_block_1_0  # embedded python block
 import user2_1_epy_block_2 as epy_block_2  # embedded python block
+import user2_1_epy_block_4 as epy_block_4  # embedded python block
 import user2_1_epy_block_6 as epy_block_6  # embedded python block
+import user2_1_epy_block_8 as epy_block_8  # embedded python block
 
 
 
@@ -76,6 +80,8 @@ class user2_1(gr.top_block, Qt.QWidget):
         # Variables
         ##################################################
         self.sps = sps = 4
+        self.nonce_mode = nonce_mode = 'implicit'
+        self.link_crypto = link_crypto = 'ctr'
         self.qpsk = qpsk = digital.constellation_rect([0.707+0.707j, -0.707+0.707j, -0.707-0.707j, 0.707-0.707j], [0, 1, 2, 3],
         4, 2, 2, 1, 1).base()
         self.nfilts = nfilts = 32
@@ -85,6 +91,8 @@ class user2_1(gr.top_block, Qt.QWidget):
         self.samp_rate = samp_rate = 600e3
         self.rrc_taps = rrc_taps = firdes.root_raised_cosine(nfilts, nfilts, 1.0/float(sps), 0.35, 11*sps*nfilts)
         self.phase_bw = phase_bw = 0.0628
+        self.chat_payload_size = chat_payload_size = 38 if (nonce_mode == 'implicit' or link_crypto == 'aead') else 32
+        self.arq_payload_size = arq_payload_size = chat_payload_size if link_crypto == 'aead' else 40
         self.hdr_format = hdr_format = digital.header_format_default(access_key, 0)
         self.excess_bw = excess_bw = 0.5
         self.aes_key = aes_key = '9F3C7A12D4E8B5C1A0F2D39B7E5648AF'
@@ -275,13 +283,17 @@ class user2_1(gr.top_block, Qt.QWidget):
         self.pdu_tagged_stream_to_pdu_0 = pdu.tagged_stream_to_pdu(gr.types.byte_t, 'packet_len')
         self.pdu_pdu_to_tagged_stream_1 = pdu.pdu_to_tagged_stream(gr.types.byte_t, 'packet_len')
         self.pdu_pdu_to_tagged_stream_0 = pdu.pdu_to_tagged_stream(gr.types.byte_t, 'packet_len')
+        self.epy_block_8 = epy_block_8.pdu_aes_decrypt(key_hex=aes_key, nonce_mode=nonce_mode, window=1024, replay_capacity=4096, per_peer_keys=True, verbose=False)
         self.epy_block_6 = epy_block_6.ack_address_filter_rx(preamble_len=128)
+        self.epy_block_4 = epy_block_4.pdu_aes_encrypt(key_hex=aes_key, payload_size=chat_payload_size, pool_size=256, nonce_mode=nonce_mode, sync_interval=64, per_peer_keys=True, verbose=False)
         self.epy_block_2 = epy_block_2.address_filter_rx(preamble_len=128)
         self.epy_block_1_0 = epy_block_1_0.add_ack_address_block()
+        self.epy_block_14 = epy_block_14.aead_verify_and_ack(key_hex=aes_key, tag_len=4, window=1024, payload_len=40, per_peer_keys=True)
+        self.epy_block_13 = epy_block_13.aead_seal(key_hex=aes_key, tag_len=4, sync_interval=64, per_peer_keys=True, verbose=False)
         self.epy_block_12 = epy_block_12.ack_crc32_verify_minimal(variant="zlib")
         self.epy_block_11 = epy_block_11.crc32_verify_and_ack(variant="zlib")
-        self.epy_block_10 = epy_block_10.payload_to_pdu_with_seq_arq(payload_size=40, wait_time_s=0.3, max_retries=10, verbose=True)
-        self.epy_block_0_1 = epy_block_0_1.chat_gui_block(payload_size=32)
+        self.epy_block_10 = epy_block_10.payload_to_pdu_with_seq_arq(payload_size=arq_payload_size, wait_time_s=0.3, max_retries=10, verbose=True)
+        self.epy_block_0_1 = epy_block_0_1.chat_gui_block(payload_size=chat_payload_size)
         self.epy_block_0_0 = epy_block_0_0.add_address_block()
         self.digital_symbol_sync_xx_0_0 = digital.symbol_sync_cc(
             digital.TED_SIGNAL_TIMES_SLOPE_ML,
@@ -326,28 +338,43 @@ class user2_1(gr.top_block, Qt.QWidget):
         ##################################################
         # Connections
         ##################################################
-        self.msg_connect((self.digital_crc_append_0, 'out'), (self.epy_block_0_0, 'in'))
         self.msg_connect((self.digital_crc_append_0_0, 'out'), (self.epy_block_1_0, 'in'))
         self.msg_connect((self.digital_protocol_formatter_async_0, 'header'), (self.pdu_pdu_to_tagged_stream_0, 'pdus'))
         self.msg_connect((self.digital_protocol_formatter_async_0, 'payload'), (self.pdu_pdu_to_tagged_stream_1, 'pdus'))
         self.msg_connect((self.epy_block_0_0, 'out'), (self.digital_protocol_formatter_async_0, 'in'))
         self.msg_connect((self.epy_block_0_1, 'config_out'), (self.epy_block_0_0, 'config'))
-        self.msg_connect((self.epy_block_0_1, 'out'), (self.epy_block_10, 'in'))
         self.msg_connect((self.epy_block_0_1, 'config_out'), (self.epy_block_1_0, 'config'))
         self.msg_connect((self.epy_block_0_1, 'config_out'), (self.epy_block_2, 'config'))
         self.msg_connect((self.epy_block_0_1, 'config_out'), (self.epy_block_6, 'config'))
-        self.msg_connect((self.epy_block_10, 'out'), (self.digital_crc_append_0, 'in'))
-        self.msg_connect((self.epy_block_11, 'ack_out'), (self.digital_crc_append_0_0, 'in'))
-        self.msg_connect((self.epy_block_11, 'out'), (self.epy_block_0_1, 'in'))
+        self.msg_connect((self.epy_block_10, 'status'), (self.epy_block_0_1, 'arq_status'))
         self.msg_connect((self.epy_block_12, 'ack_out'), (self.epy_block_0_1, 'ack_in'))
         self.msg_connect((self.epy_block_12, 'ack_out'), (self.epy_block_10, 'busy_in'))
         self.msg_connect((self.epy_block_12, 'ack_out'), (self.epy_block_10, 'ack_in'))
         self.msg_connect((self.epy_block_1_0, 'out'), (self.digital_protocol_formatter_async_0, 'in'))
-        self.msg_connect((self.epy_block_2, 'out'), (self.epy_block_11, 'in'))
         self.msg_connect((self.epy_block_6, 'out'), (self.blocks_message_debug_0, 'print'))
         self.msg_connect((self.epy_block_6, 'out'), (self.epy_block_12, 'in'))
         self.msg_connect((self.pdu_tagged_stream_to_pdu_0, 'pdus'), (self.epy_block_2, 'in'))
         self.msg_connect((self.pdu_tagged_stream_to_pdu_0_0, 'pdus'), (self.epy_block_6, 'in'))
+        if link_crypto == 'aead':
+            self.msg_connect((self.epy_block_0_1, 'config_out'), (self.epy_block_13, 'config'))
+            self.msg_connect((self.epy_block_0_1, 'config_out'), (self.epy_block_14, 'config'))
+            self.msg_connect((self.epy_block_0_1, 'out'), (self.epy_block_10, 'in'))
+            self.msg_connect((self.epy_block_10, 'out'), (self.epy_block_13, 'in'))
+            self.msg_connect((self.epy_block_13, 'out'), (self.epy_block_0_0, 'in'))
+            self.msg_connect((self.epy_block_14, 'ack_out'), (self.digital_crc_append_0_0, 'in'))
+            self.msg_connect((self.epy_block_14, 'out'), (self.epy_block_0_1, 'in'))
+            self.msg_connect((self.epy_block_2, 'out'), (self.epy_block_14, 'in'))
+        else:
+            self.msg_connect((self.digital_crc_append_0, 'out'), (self.epy_block_0_0, 'in'))
+            self.msg_connect((self.epy_block_0_1, 'out'), (self.epy_block_4, 'in'))
+            self.msg_connect((self.epy_block_0_1, 'config_out'), (self.epy_block_4, 'config'))
+            self.msg_connect((self.epy_block_0_1, 'config_out'), (self.epy_block_8, 'config'))
+            self.msg_connect((self.epy_block_10, 'out'), (self.digital_crc_append_0, 'in'))
+            self.msg_connect((self.epy_block_11, 'ack_out'), (self.digital_crc_append_0_0, 'in'))
+            self.msg_connect((self.epy_block_11, 'out'), (self.epy_block_8, 'in'))
+            self.msg_connect((self.epy_block_2, 'out'), (self.epy_block_11, 'in'))
+            self.msg_connect((self.epy_block_4, 'out'), (self.epy_block_10, 'in'))
+            self.msg_connect((self.epy_block_8, 'out'), (self.epy_block_0_1, 'in'))
         self.connect((self.blocks_char_to_float_0_0, 0), (self.qtgui_time_sink_x_0, 0))
         self.connect((self.blocks_multiply_const_vxx_0, 0), (self.blocks_throttle2_1, 0))
         self.connect((self.blocks_repack_bits_bb_0_0, 0), (self.pdu_tagged_stream_to_pdu_0, 0))
@@ -388,6 +415,20 @@ class user2_1(gr.top_block, Qt.QWidget):
         self.set_rrc_taps(firdes.root_raised_cosine(self.nfilts, self.nfilts, 1.0/float(self.sps), 0.35, 11*self.sps*self.nfilts))
         self.digital_symbol_sync_xx_0_0.set_sps(self.sps)
 
+    def get_nonce_mode(self):
+        return self.nonce_mode
+
+    def set_nonce_mode(self, nonce_mode):
+        self.nonce_mode = nonce_mode
+        self.set_chat_payload_size(38 if (self.nonce_mode == 'implicit' or self.link_crypto == 'aead') else 32)
+
+    def get_link_crypto(self):
+        return self.link_crypto
+
+    def set_link_crypto(self, link_crypto):
+        self.link_crypto = link_crypto
+        self.set_chat_payload_size(38 if (self.nonce_mode == 'implicit' or self.link_crypto == 'aead') else 32)
+
     def get_qpsk(self):
         return self.qpsk
 
@@ -436,6 +477,19 @@ class user2_1(gr.top_block, Qt.QWidget):
     def set_rrc_taps(self, rrc_taps):
         self.rrc_taps = rrc_taps
 
+    def get_chat_payload_size(self):
+        return self.chat_payload_size
+
+    def set_chat_payload_size(self, chat_payload_size):
+        self.chat_payload_size = chat_payload_size
+        self.set_arq_payload_size(self.chat_payload_size if self.link_crypto == 'aead' else 40)
+
+    def get_arq_payload_size(self):
+        return self.arq_payload_size
+
+    def set_arq_payload_size(self, arq_payload_size):
+        self.arq_payload_size = arq_payload_size
+
     def get_phase_bw(self):
         return self.phase_bw
 
@@ -461,6 +515,10 @@ class user2_1(gr.top_block, Qt.QWidget):
 
     def set_aes_key(self, aes_key):
         self.aes_key = aes_key
+        self.epy_block_4.set_key_hex(self.aes_key)
+        self.epy_block_8.set_key_hex(self.aes_key)
+        self.epy_block_13.set_key_hex(self.aes_key)
+        self.epy_block_14.set_key_hex(self.aes_key)
 
 
 
@@ -1,14 +1,29 @@
 """
 Embedded Python Block: WhatsApp GUI (Menu-Based Address Config + TXT Only)
+
+One conversation per peer address. Received messages are routed by the
+frame's source address (src_addr); outgoing ones carry the open
+conversation's address as dest_addr.
+
+The radio side (chunking, reassembly, compression caps, file transfers)
+is pager_messaging.MessagingCore, shared with the headless block
+(user2_1_epy_block_15); this block only adds the window. With
+api_socket set, other programs can page through pager_api as well.
 """
 
 from gnuradio import gr
-from PyQt5 import QtWidgets, QtCore, QtGui
+from PyQt5 import QtWidgets, QtCore
 import sys
 import pmt
 from datetime import datetime
 import base64
 import os
+import pager_common  # noqa: F401  (puts ../common on sys.path)
+import pager_api
+import pager_chatview
+import pager_delivery
+import pager_history
+import pager_messaging
 
 # --- 1. VISUAL HELPERS & THEMES ---
 
@@ -27,11 +42,18 @@ THEMES = {
     }
 }
 
-class WallpaperScrollArea(QtWidgets.QScrollArea):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setWidgetResizable(True)
-        self.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+HISTORY_PAGE = 200     # messages loaded per scroll to the top
+SEARCH_LIMIT = 200
+
+def _history_time(ts):
+    """ HH:MM today, DD/MM HH:MM for older messages """
+    when = datetime.fromtimestamp(ts)
+    return when.strftime("%H:%M" if when.date() == datetime.now().date() else "%d/%m %H:%M")
+
+def _history_message(row):
+    """ HistoryStore row -> ChatMessage """
+    hid, _, ts, is_own, status, text = row
+    return pager_chatview.ChatMessage(text, bool(is_own), _history_time(ts), status, hid)
 
 class ConfigDialog(QtWidgets.QDialog):
     """ Small popup to change Source and Dest IDs """
@@ -86,19 +108,52 @@ class ConfigDialog(QtWidgets.QDialog):
         except ValueError:
             return None, None
 
-class _GuiPoster(QtCore.QObject):
-    rx_sig = QtCore.pyqtSignal(str, int)     
-    ack_sig = QtCore.pyqtSignal()            
-    file_save_sig = QtCore.pyqtSignal(str, str) 
-    def __init__(self): super().__init__()
+class SearchDialog(QtWidgets.QDialog):
+    """ Full-text search over the stored conversation, results shown as bubbles """
+    def __init__(self, history, peer, theme_name, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.peer = peer
+        self.setWindowTitle("Search History")
+        self.resize(420, 560)
+        theme = THEMES[theme_name]
+        layout = QtWidgets.QVBoxLayout(self)
+        self.query = QtWidgets.QLineEdit()
+        self.query.setPlaceholderText("Search messages...")
+        self.query.returnPressed.connect(self.run_search)
+        layout.addWidget(self.query)
+        self.status = QtWidgets.QLabel("")
+        layout.addWidget(self.status)
+        self.model = pager_chatview.ChatModel(self)
+        self.view = pager_chatview.ChatView(self.model, pager_chatview.BubbleDelegate(theme))
+        self.view.set_theme(theme)
+        layout.addWidget(self.view)
+        self.setStyleSheet(f"""
+            QDialog {{ background-color: {theme['dialog_bg']}; color: {theme['text_primary']}; }}
+            QLabel {{ color: {theme['time_color']}; }}
+            QLineEdit {{ background-color: {theme['input_box']}; color: {theme['text_primary']};
+                         border: 1px solid {theme['border']}; padding: 5px; border-radius: 5px; }}
+        """)
+
+    def run_search(self):
+        text = self.query.text().strip()
+        self.model.clear()
+        if not text: return
+        self.history.flush(timeout=2.0)
+        rows = self.history.search(self.peer, text, limit=SEARCH_LIMIT)
+        self.model.prepend([_history_message(r) for r in rows])
+        self.status.setText(f"{len(rows)}{'+' if len(rows) == SEARCH_LIMIT else ''} matches")
+        self.view.scrollToBottom()
 
 # --- 2. MAIN GUI WINDOW ---
 
 class ChatWindow(QtWidgets.QWidget):
-    def __init__(self, send_callback, config_callback, payload_size=32, dest_name="Node A"):
+    def __init__(self, send_callback, config_callback, payload_size=32, dest_name="Node A", file_callback=None,
+                 history_path=""):
         super(ChatWindow, self).__init__()
         self.send_callback = send_callback
         self.config_callback = config_callback
+        self.file_callback = file_callback
         self.payload_size = payload_size
         self.dest_name = dest_name
         
@@ -107,14 +162,29 @@ class ChatWindow(QtWidgets.QWidget):
         self.target_id = 15   # Default
         
         self.current_theme = "light" 
-        self.chat_history = [] 
-        self.pending_confirmations = []
-        self.bubble_widgets = [] 
+        # Conversation on disk; the view holds the newest page plus whatever was scrolled in
+        self.history = pager_history.HistoryStore(history_path or f"chat_history_node_{self.my_id}.db")
+        self.view_peer = self.target_id
+        self._history_done = False
+        self.deliveries = pager_delivery.DeliveryTracker()   # msg/frame/seq -> history id
+        self.pending_transfers = {}   # transfer ID -> history id of the file bubble
+        self._live = {}               # history id -> model handle, own messages awaiting ticks
 
         self.setWindowTitle(f"SDR Chat - {self.dest_name}")
-        self.resize(450, 750)
-        
-        self.main_layout = QtWidgets.QVBoxLayout(self)
+        self.resize(640, 750)
+
+        # -- Conversations (left) | open chat (right) --
+        self.root_layout = QtWidgets.QHBoxLayout(self)
+        self.root_layout.setContentsMargins(0,0,0,0)
+        self.root_layout.setSpacing(0)
+        self.conv_list = pager_chatview.ConversationList()
+        self.conv_list.setFixedWidth(190)
+        self.conv_list.peer_selected.connect(self.open_conversation)
+        self.root_layout.addWidget(self.conv_list)
+        self.chat_panel = QtWidgets.QWidget()
+        self.root_layout.addWidget(self.chat_panel)
+        
+        self.main_layout = QtWidgets.QVBoxLayout(self.chat_panel)
         self.main_layout.setContentsMargins(0,0,0,0)
         
         # -- Top Bar --
@@ -151,9 +221,11 @@ class ChatWindow(QtWidgets.QWidget):
         self.menu.addSeparator()
         
         # 2. Other actions
+        search_action = self.menu.addAction("🔍 Search History")
         export_action = self.menu.addAction("Export Chat Log")
         clear_action = self.menu.addAction("Clear Chat")
         
+        search_action.triggered.connect(self.open_search_dialog)
         export_action.triggered.connect(self.export_chat)
         clear_action.triggered.connect(self.clear_chat)
         
@@ -166,16 +238,15 @@ class ChatWindow(QtWidgets.QWidget):
         top_layout.addWidget(self.menu_btn)
         self.main_layout.addWidget(self.top_bar)
 
-        # -- Chat Area --
-        self.scroll_area = WallpaperScrollArea() 
-        self.chat_container = QtWidgets.QWidget()
-        self.chat_container.setStyleSheet("background: transparent;")
-        self.chat_layout = QtWidgets.QVBoxLayout(self.chat_container)
-        self.chat_layout.setAlignment(QtCore.Qt.AlignTop)
-        self.chat_layout.setSpacing(8)
-        self.chat_layout.setContentsMargins(15, 15, 15, 15)
-        self.scroll_area.setWidget(self.chat_container)
-        self.main_layout.addWidget(self.scroll_area)
+        # -- Chat Area (model + painted bubbles, only visible rows are drawn) --
+        # The model holds the open conversation only; it is rebuilt from the store on a switch
+        self.chat_model = pager_chatview.ChatModel(self)
+        self.chat_view = pager_chatview.ChatView(
+            self.chat_model, pager_chatview.BubbleDelegate(THEMES[self.current_theme]))
+        self.chat_view.top_reached.connect(self._load_older)
+        self.main_layout.addWidget(self.chat_view)
+        # rx/ACK events from the flowgraph threads are applied here at ~60 Hz
+        self.updates = pager_chatview.UpdateBatcher(self.chat_model, self.chat_view, interval_ms=16, parent=self)
 
         # -- Input Area --
         self.input_frame = QtWidgets.QFrame()
@@ -220,6 +291,10 @@ class ChatWindow(QtWidgets.QWidget):
         self.main_layout.addWidget(self.input_frame)
 
         self.apply_theme()
+        for peer, _, text, unread in self.history.conversations():
+            self.conv_list.update_peer(peer, text, unread, to_top=False)
+        self.conv_list.update_peer(self.view_peer)
+        self._show_conversation(self.view_peer)
 
     def open_config_dialog(self):
         """ Opens the dialog to change IDs via the menu """
@@ -231,20 +306,26 @@ class ChatWindow(QtWidgets.QWidget):
 
     def update_ids(self, my_id, target_id):
         self.my_id = my_id
+        self._select_peer(target_id)
+        self._add_bubble(f"🔁 System: Updated IDs.\nMy ID: {my_id}\nTarget ID: {target_id}", True, "SYS")
+
+    def open_conversation(self, peer):
+        """ Conversation list click """
+        if peer != self.view_peer: self._select_peer(peer)
+
+    def _select_peer(self, target_id):
         self.target_id = target_id
         
-        # Create PMT dict for config
-        cfg = pmt.make_dict()
-        cfg = pmt.dict_add(cfg, pmt.intern("my_addr"), pmt.from_long(my_id))
-        cfg = pmt.dict_add(cfg, pmt.intern("dest_addr"), pmt.from_long(target_id))
-        
-        # Send config to blocks
-        self.config_callback(cfg)
+        # Send config to blocks (default destination; chat frames also carry it in their meta)
+        self.config_callback(pager_messaging.make_config(self.my_id, target_id))
         
         # Update UI
         self.dest_name = f"Node {target_id}"
         self.header_label.setText(f"👤 {self.dest_name}")
-        self._add_bubble(f"🔁 System: Updated IDs.\nMy ID: {my_id}\nTarget ID: {target_id}", True, "SYS")
+        self.setWindowTitle(f"SDR Chat - {self.dest_name}")
+        if target_id != self.view_peer:
+            self.conv_list.update_peer(target_id)
+            self._show_conversation(target_id)
 
     def toggle_theme(self):
         self.current_theme = "dark" if self.current_theme == "light" else "light"
@@ -255,41 +336,63 @@ class ChatWindow(QtWidgets.QWidget):
         t = THEMES[self.current_theme]
         self.setStyleSheet(f"QWidget {{ font-family: 'Segoe UI', sans-serif; color: {t['text_primary']}; }}")
         self.top_bar.setStyleSheet(f"background-color: {t['top_bar']}; border: none;")
-        self.scroll_area.setStyleSheet(f"border: none; background-color: {t['bg_color']};")
+        self.conv_list.set_theme(t)
+        self.chat_view.set_theme(t)
         self.input_frame.setStyleSheet(f"background-color: {t['input_area']}; border-top: 1px solid {t['border']};")
         self.input_box.setStyleSheet(f"""
             QLineEdit {{ background-color: {t['input_box']}; color: {t['text_primary']}; border: 1px solid {t['border']}; border-radius: 20px; padding: 10px; }}
         """)
-        for w in self.bubble_widgets:
-            self._style_bubble(w['bubble'], w['stack'], w['ts'], w['is_own'])
 
-    def _style_bubble(self, bubble_lbl, stack_widget, time_lbl, is_own):
-        t = THEMES[self.current_theme]
-        bg = t['bubble_own'] if is_own else t['bubble_other']
-        bubble_lbl.setStyleSheet(f"background-color: transparent; color: {t['text_primary']}; font-size: 14px;")
-        stack_widget.setStyleSheet(f"background-color: {bg}; border-radius: 10px; border: 1px solid {t['border']};")
-        current_text = time_lbl.text()
-        if "✓✓" in current_text and ("#4DF0F0" in current_text or "#53bdeb" in current_text): pass 
-        else: time_lbl.setStyleSheet(f"color: {t['time_color']}; font-size: 11px; margin-top: 4px; background-color: transparent;")
+    def open_search_dialog(self):
+        SearchDialog(self.history, self.view_peer, self.current_theme, self).exec_()
 
     def export_chat(self):
         filename, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Save Chat Log", "", "Text Files (*.txt)")
         if filename:
             try:
+                # Streamed from the store page by page, never the whole conversation in memory
+                self.history.flush(timeout=5.0)
                 with open(filename, 'w', encoding='utf-8') as f:
                     f.write(f"--- Chat Log with {self.dest_name} ---\n")
-                    for msg in self.chat_history:
-                        sender = "ME" if msg['is_own'] else self.dest_name
-                        f.write(f"[{msg['time']}] {sender}: {msg['text']}\n")
-            except: pass
+                    for _, _, ts, is_own, _, text in self.history.export(self.view_peer):
+                        sender = "ME" if is_own else self.dest_name
+                        f.write(f"[{datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M')}] {sender}: {text}\n")
+            except Exception as e:
+                print(f"[System] Export failed: {e}")
 
     def clear_chat(self):
-        self.chat_history = []
-        self.pending_confirmations = []
-        self.bubble_widgets = []
-        while self.chat_layout.count():
-            item = self.chat_layout.takeAt(0)
-            if item.widget(): item.widget().deleteLater()
+        self.history.clear(self.view_peer)
+        self.deliveries.clear()
+        self.pending_transfers = {}
+        self._live = {}
+        self.chat_model.clear()
+        self.conv_list.update_peer(self.view_peer, "", 0, to_top=False)
+        self._history_done = True
+
+    def _show_conversation(self, peer):
+        """ Builds a model with the newest page of `peer`'s stored conversation and shows it """
+        self.view_peer = peer
+        self._live = {}                  # ticks of messages no longer shown still reach the store
+        # Rows still in the writer queue would be missing from the page yet marked read
+        upto = self.history.last_id()
+        self.history.flush(timeout=2.0)
+        rows = self.history.page(peer, limit=HISTORY_PAGE)
+        self._history_done = len(rows) < HISTORY_PAGE
+        model = pager_chatview.ChatModel(self)
+        model.prepend([_history_message(r) for r in rows])
+        old, self.chat_model = self.chat_model, model
+        self.chat_view.set_model(model)
+        self.updates.model = model
+        old.deleteLater()
+        self.conv_list.set_active(peer)
+        self.history.mark_read(peer, upto)
+        self.updates.scroll_to_bottom()
+
+    def _load_older(self):
+        if self._history_done: return
+        rows = self.history.page(self.view_peer, before=self.chat_model.oldest_hid(), limit=HISTORY_PAGE)
+        self._history_done = len(rows) < HISTORY_PAGE
+        self.chat_view.prepend_keeping_position([_history_message(r) for r in rows])
 
     def handle_send_click(self):
         text = self.input_box.text()
@@ -313,196 +416,143 @@ class ChatWindow(QtWidgets.QWidget):
         # 3. Proceed if valid
         try:
             with open(path, "rb") as f: 
-                b64 = base64.b64encode(f.read()).decode('utf-8')
+                data = f.read()
+        except: return
+
+        # 4. Resumable transfer (hash-identified) if the block supports it, else legacy FILE: text
+        if self.file_callback is None:
+            b64 = base64.b64encode(data).decode('utf-8')
             self._process_outgoing(f"FILE:{filename}:{b64}", is_file=True, filename=filename)
-        except: pass
+            return
+        hid = self._record(f"📎 Sending File: {filename}...", is_own=True)
+        xfer_id = self.file_callback(filename, data, self.view_peer)
+        self.pending_transfers[xfer_id] = hid
 
     def _process_outgoing(self, data_str, is_file=False, filename=""):
-        chunk_cap = self.payload_size - 1
-        data_len = len(data_str.encode("utf-8", "ignore"))
-        num_chunks = (data_len + chunk_cap - 1) // chunk_cap
-        if num_chunks == 0: num_chunks = 1
         disp = f"📎 Sending File: {filename}..." if is_file else data_str
-        time_str = datetime.now().strftime("%H:%M")
-        self.chat_history.append({'text': disp, 'is_own': True, 'time': time_str})
-        ts = self._add_bubble(disp, is_own=True, time_str=time_str)
-        self.pending_confirmations.append({'widget': ts, 'remaining': num_chunks, 'completed': False})
-        self.send_callback(data_str)
+        hid = self._record(disp, is_own=True)
+        # Ticks follow the exact frames the block sent (it may compress)
+        msg_id, frame_ids = self.send_callback(data_str, self.view_peer)
+        self.deliveries.register(msg_id, frame_ids, hid)
 
-    def on_rx_message(self, text, seq):
+    def on_rx_message(self, text, seq, src=None):
         disp = text
         if text.startswith("FILE:"):
             try: disp = f"📎 Received File: {text.split(':', 2)[1]} (Saved)"
             except: disp = "📎 Received Corrupted File"
-        time_str = datetime.now().strftime("%H:%M")
-        self.chat_history.append({'text': disp, 'is_own': False, 'time': time_str})
-        self._add_bubble(disp, is_own=False, time_str=time_str)
-
-    def on_ack_received(self):
-        for item in self.pending_confirmations:
-            if not item['completed']:
-                if item['remaining'] > 0:
-                    item['remaining'] -= 1
-                    if item['remaining'] == 0:
-                        item['completed'] = True
-                        t = THEMES[self.current_theme]
-                        now = datetime.now().strftime("%H:%M")
-                        item['widget'].setText(f"{now} <span style='color: {t['tick_color']}; font-weight: bold;'>✓✓</span>")
-                return
-
-    def _add_bubble(self, text, is_own, time_str):
-        row = QtWidgets.QWidget()
-        layout = QtWidgets.QHBoxLayout(row)
-        layout.setContentsMargins(0,0,0,0)
-        bubble = QtWidgets.QLabel(text)
-        bubble.setWordWrap(True)
-        bubble.setTextInteractionFlags(QtCore.Qt.TextSelectableByMouse)
-        
-        ts_html = f"{time_str} <span style='color: gray; font-weight: bold;'>✓✓</span>" if is_own else time_str
-        ts = QtWidgets.QLabel(ts_html)
-        ts.setAlignment(QtCore.Qt.AlignRight)
-        ts.setTextFormat(QtCore.Qt.RichText)
-
-        stack = QtWidgets.QWidget()
-        vbox = QtWidgets.QVBoxLayout(stack)
-        vbox.setContentsMargins(8,8,8,5)
-        vbox.addWidget(bubble)
-        vbox.addWidget(ts)
-        
-        shadow = QtWidgets.QGraphicsDropShadowEffect()
-        shadow.setBlurRadius(5)
-        shadow.setXOffset(1)
-        shadow.setYOffset(1)
-        shadow.setColor(QtGui.QColor(0, 0, 0, 40))
-        stack.setGraphicsEffect(shadow)
-
-        self._style_bubble(bubble, stack, ts, is_own)
-        self.bubble_widgets.append({'bubble': bubble, 'stack': stack, 'ts': ts, 'is_own': is_own})
-
-        if is_own: 
-            layout.addStretch()
-            layout.addWidget(stack)
-        else: 
-            layout.addWidget(stack)
-            layout.addStretch()
-        self.chat_layout.addWidget(row)
-        QtWidgets.QApplication.processEvents()
-        QtCore.QTimer.singleShot(10, lambda: self.scroll_area.verticalScrollBar().setValue(self.scroll_area.verticalScrollBar().maximum()))
-        return ts
+        if src is None or src == self.view_peer:
+            hid = self._record(disp, is_own=False)
+            self.history.mark_read(self.view_peer, hid)
+        else:
+            # Other conversation: stored and counted, no model is built for it
+            self.history.append(src, disp, False)
+            self.conv_list.add_unread(src, disp)
+
+    def on_xfer_done(self, xfer_id):
+        hid = self.pending_transfers.pop(xfer_id, None)
+        if hid is None: return
+        self._settle(hid, pager_chatview.STATUS_DELIVERED)
+
+    def on_ack_received(self, ack_val):
+        self._apply_delivery(self.deliveries.on_ack(ack_val))
+
+    def on_arq_status(self, frame_id, seq, status, msg_id):
+        if status == "sent":
+            self.deliveries.on_sent(frame_id, seq, msg_id)
+        else:
+            self._apply_delivery(self.deliveries.on_frame(frame_id, status == "delivered", msg_id))
+
+    def _apply_delivery(self, settled):
+        if settled is not None: self._settle(*settled)
+
+    def _settle(self, hid, state):
+        self.history.set_status(hid, state)
+        handle = self._live.pop(hid, None)
+        if handle is None: return
+        if state == pager_chatview.STATUS_DELIVERED:
+            self.chat_model.set_delivered(handle, datetime.now().strftime("%H:%M"))
+        else:
+            self.chat_model.set_failed(handle)
+
+    def _record(self, text, is_own):
+        """ Stores a chat message and shows it; returns its history id """
+        status = pager_chatview.STATUS_SENT if is_own else pager_chatview.STATUS_NONE
+        hid = self.history.append(self.view_peer, text, is_own, status)
+        self.conv_list.update_peer(self.view_peer, text)
+        handle = self._add_bubble(text, is_own, datetime.now().strftime("%H:%M"), hid)
+        if is_own: self._live[hid] = handle
+        return hid
+
+    def _add_bubble(self, text, is_own, time_str, hid=None):
+        """ Appends a message row; returns the handle used for later tick updates """
+        handle = self.chat_model.append(text, is_own, time_str, hid)
+        self.updates.scroll_to_bottom()
+        return handle
 
 # --- 3. GNU RADIO BLOCK ---
 
 class chat_gui_block(gr.basic_block):
-    def __init__(self, payload_size=32):
+    """ Message ports around pager_messaging.MessagingCore, events shown in a ChatWindow """
+    def __init__(self, payload_size=32, xfer_idle_timeout_s=20.0, xfer_max_queries=5, compression=True,
+                 history_db="", api_socket="", api_max_outstanding=4):
         gr.basic_block.__init__(self, name="WhatsApp Chat GUI", in_sig=None, out_sig=None)
         self.payload_size = payload_size
-        self.rx_buffer = b""            
-        self.last_radio_seq_seen = -1 
-        self.last_ack_val_seen = -1
-        self.dummy_seq = 0
+        self.api_socket = api_socket
+        self.api_max_outstanding = api_max_outstanding
+        self.api = None
         
         # Message Ports
         self.message_port_register_out(pmt.intern("out"))
         self.message_port_register_in(pmt.intern("in"))      
         self.message_port_register_in(pmt.intern("ack_in"))
+        self.message_port_register_in(pmt.intern("arq_status"))  # delivered / failed per frame
         self.message_port_register_out(pmt.intern("config_out")) # Config Port
         
-        self.set_msg_handler(pmt.intern("in"), self.handle_rx_msg)
-        self.set_msg_handler(pmt.intern("ack_in"), self.handle_ack_msg)
-        
-        self._poster = _GuiPoster()
         self.qapp = QtWidgets.QApplication.instance()
         if not self.qapp: self.qapp = QtWidgets.QApplication(sys.argv)
         
         # GUI
-        self.gui = ChatWindow(self.send_pdus, self.publish_config, payload_size=self.payload_size, dest_name=str(0))
-        
-        self._poster.rx_sig.connect(self.gui.on_rx_message)
-        self._poster.ack_sig.connect(self.gui.on_ack_received)
-        self._poster.file_save_sig.connect(self._save_file_on_disk)
+        self.gui = ChatWindow(self.send_pdus, self.publish_config, payload_size=self.payload_size, dest_name=str(0),
+                              file_callback=self.send_file, history_path=history_db)
+        # Chunking, reassembly, caps and transfers; events reach the window through its ~60 Hz batcher
+        self.core = pager_messaging.MessagingCore(
+            lambda port, msg: self.message_port_pub(pmt.intern(port), msg), self.gui, lambda: self.gui.target_id,
+            payload_size=payload_size, xfer_idle_timeout_s=xfer_idle_timeout_s,
+            xfer_max_queries=xfer_max_queries, compression=compression, dispatch=self.gui.updates.post)
+        
+        self.set_msg_handler(pmt.intern("in"), self.core.handle_rx_msg)
+        self.set_msg_handler(pmt.intern("ack_in"), self.core.handle_ack_msg)
+        self.set_msg_handler(pmt.intern("arq_status"), self.core.handle_arq_status)
         self.gui.show()
 
     def publish_config(self, pmt_msg):
-        self.message_port_pub(pmt.intern("config_out"), pmt_msg)
-
-    def send_pdus(self, text):
-        data = text.encode("utf-8", "ignore")
-        chunk_size = self.payload_size - 1
-        chunks = [data[i:i+chunk_size] for i in range(0, len(data), chunk_size)]
-        if not chunks: chunks = [b'']
-        for i, chunk in enumerate(chunks):
-            header = 0x01 if i == len(chunks) - 1 else 0x00
-            payload = bytes([header]) + chunk
-            if len(payload) < self.payload_size: payload += b'\x00' * (self.payload_size - len(payload))
-            meta = pmt.make_dict()
-            pmt.dict_add(meta, pmt.intern("seq"), pmt.from_long(self.dummy_seq))
-            self.dummy_seq = (self.dummy_seq + 1) % 256
-            vec = pmt.init_u8vector(len(payload), list(payload))
-            self.message_port_pub(pmt.intern("out"), pmt.cons(meta, vec))
-
-    def handle_rx_msg(self, pdu):
-        if not pmt.is_pair(pdu): return
-        meta = pmt.car(pdu)
-        payload = pmt.cdr(pdu)
-        if not pmt.is_u8vector(payload): return
-        seq = -1
-        if pmt.dict_has_key(meta, pmt.intern("seq")):
-            try: seq = pmt.to_python(pmt.dict_ref(meta, pmt.intern("seq"), pmt.PMT_NIL))
-            except: pass
-        if seq != -1:
-            if seq == self.last_radio_seq_seen: return 
-            self.last_radio_seq_seen = seq
-        data = bytes(pmt.u8vector_elements(payload))
-        if len(data) > 0:
-            header, content = data[0], data[1:]
-            self.rx_buffer += content.rstrip(b'\x00')
-            if header == 0x01:
-                try:
-                    txt = self.rx_buffer.decode('utf-8', 'ignore')
-                    self._poster.rx_sig.emit(txt, seq)
-                    if txt.startswith("FILE:"):
-                        parts = txt.split(":", 2)
-                        self._poster.file_save_sig.emit(parts[1], parts[2])
-                except: pass
-                self.rx_buffer = b""
-
-    def handle_ack_msg(self, pdu):
-        if not pmt.is_pair(pdu): return
-        meta = pmt.car(pdu)
-        payload = pmt.cdr(pdu)
-        ack_seq = -1
-        if pmt.dict_has_key(meta, pmt.intern("ack")):
-            try: ack_seq = pmt.to_python(pmt.dict_ref(meta, pmt.intern("ack"), pmt.PMT_NIL))
-            except: pass
-        elif pmt.is_u8vector(payload):
-            data = bytes(pmt.u8vector_elements(payload))
-            if len(data) > 0: ack_seq = int(data[0])
-        if ack_seq != -1:
-            if ack_seq == self.last_ack_val_seen: return
-            self.last_ack_val_seen = ack_seq
-            self._poster.ack_sig.emit()
-
-    def _save_file_on_disk(self, fname, b64_data):
-        # 1. Get the Target Node ID from the GUI
-        # This gets the ID of the person you are chatting with
-        node_id = self.gui.target_id 
-        
-        # 2. Create a dynamic folder name (e.g., "downloads_node_20")
-        folder_name = f"downloads_node_{node_id}"
-        
-        # 3. Create the directory if it doesn't exist
-        if not os.path.exists(folder_name): 
-            os.makedirs(folder_name)
-            
-        # 4. Save the file inside that specific folder
-        try:
-            full_path = os.path.join(folder_name, fname)
-            with open(full_path, "wb") as f: 
-                f.write(base64.b64decode(b64_data))
-            print(f"[System] File saved to: {full_path}")
-        except Exception as e: 
-            print(f"[System] Error saving file: {e}")
+        self.core.publish_config(pmt_msg, self.gui.target_id)
+
+    def send_pdus(self, text, dest=None):
+        return self.core.send_pdus(text, dest)
+
+    def send_file(self, filename, data, dest=None):
+        return self.core.send_file(filename, data, dest)
+
+    def start(self):
+        self.core.start()
+        if self.api_socket:
+            # Pages from other programs (pager_api); receipts go back on the socket, not into the window
+            self.api = pager_api.ApiServer(self.api_socket, self.core.send_pdus, self.api_max_outstanding)
+            self.core.listeners.append(self.api)
+            self.api.start()
+        return super().start()
 
     def stop(self):
+        self.core.stop()
+        if self.api: self.api.stop()
+        st = self.gui.updates.stats()
+        print(f"[GUI] {st['events']} updates in {st['ticks']} ticks (max batch {st['max_batch']}), "
+              f"display latency p50 {st['latency_p50_ms']:.1f} ms / p99 {st['latency_p99_ms']:.1f} ms, "
+              f"{st['apply_ms_per_tick']:.2f} ms per tick")
         self.gui.close()
-        return super().stop()
\ No newline at end of file
+        self.gui.history.close()
+        hs = self.gui.history.stats()
+        print(f"[History] {hs['rows_written']} writes in {hs['batches']} transactions "
+              f"(mean {hs['mean_batch']:.1f}), {hs['write_ms_per_batch']:.2f} ms per transaction")
+        return super().stop()
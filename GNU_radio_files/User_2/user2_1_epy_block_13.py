@@ -0,0 +1,132 @@
+from gnuradio import gr
+import pmt
+import pager_common  # noqa: F401  (puts ../common on sys.path)
+import pager_crypto
+import pager_pdu
+
+class aead_seal(gr.basic_block):
+    """
+    AEAD Seal (AES-GCM)  -- replaces AES-CTR encrypt + CRC32 append
+    ----------------------------------------------------------------
+    Input  PDU : [ SEQ(1B) | PLAINTEXT(N) ]           (from the ARQ block)
+    Output PDU : [ SEQ(1B) | CTR_LO(2B) | CIPHERTEXT(N) | TAG(tag_len) ]
+    AAD        : [ DEST | TYPE=0x01 | SEQ | CTR_LO ]
+
+    With N=38 and tag_len=4 the frame is 45 bytes, the same size the
+    CRC32 path produces, but every byte is authenticated.
+
+    A SYNC frame (CTR_LO=0xFFFF, session + reference counter in the
+    clear, authenticated) goes out before the first frame of a session,
+    every sync_interval frames and before every ARQ retransmission, so a
+    receiver that lost the session resyncs on the retry.
+
+    The destination is the PDU's "dest_addr" meta when present, else the
+    configured dest_addr; SYNC spacing is tracked per destination.
+
+    Parameters
+      key_hex       : AES key in hex (16/24/32 bytes)
+      tag_len       : GCM tag bytes (4..16)
+      sync_interval : frames between SYNC frames
+      per_peer_keys : derive a link key per (my_addr, dest_addr) pair from key_hex (HKDF)
+    """
+
+    def __init__(self, key_hex="00112233445566778899AABBCCDDEEFF", tag_len=4, sync_interval=64, per_peer_keys=True, verbose=False):
+        gr.basic_block.__init__(self, name="AEAD Seal (GCM)",
+                                in_sig=None, out_sig=None)
+        self.verbose = bool(verbose)
+        self.tag_len = int(tag_len)
+        self.sync_interval = max(1, int(sync_interval))
+        self.dest_addr = 0
+        self._counter = pager_crypto.NonceCounter()
+        self._frames_since_sync = {}     # dest -> frames since its last SYNC (missing = due)
+        self._last_seq = None
+        self.per_peer_keys = bool(per_peer_keys)
+        self._keys = None
+        self.set_key_hex(key_hex)
+
+        # Ports
+        self.message_port_register_in(pager_pdu.IN)
+        self.message_port_register_in(pager_pdu.CONFIG)
+        self.message_port_register_out(pager_pdu.OUT)
+        self.set_msg_handler(pager_pdu.IN, self._handle)
+        self.set_msg_handler(pager_pdu.CONFIG, self.handle_config)
+
+    def _log(self, msg):
+        if self.verbose: print(f"[aead_seal] {msg}")
+
+    def set_key_hex(self, key_hex):
+        key = pager_crypto.parse_key_hex(key_hex)
+        if self._keys is None:
+            self._keys = pager_crypto.KeyManager(key, tag_len=self.tag_len, derive=self.per_peer_keys)
+        else:
+            self._keys.set_master(key)
+        self._new_session()
+
+    def handle_config(self, msg):
+        if not pmt.is_dict(msg): return
+        changed = False
+        if pmt.dict_has_key(msg, pager_pdu.MY_ADDR):
+            my_addr = pmt.to_long(pmt.dict_ref(msg, pager_pdu.MY_ADDR, pmt.PMT_NIL)) & 0xFF
+            changed |= my_addr != self._counter.src_addr
+            self._counter.src_addr = my_addr
+            self._keys.set_my_addr(my_addr)
+        if pmt.dict_has_key(msg, pager_pdu.DEST_ADDR):
+            dest = pmt.to_long(pmt.dict_ref(msg, pager_pdu.DEST_ADDR, pmt.PMT_NIL)) & 0xFF
+            changed |= dest != self.dest_addr
+            self.dest_addr = dest
+        if changed: self._new_session()
+
+    def _new_session(self):
+        # Peer and session contexts built here, on the config message, not on the next frame
+        self._keys.prefetch(self.dest_addr)
+        self._counter.new_session()
+        self._keys.get(self.dest_addr).session(self._counter.session)
+        self._frames_since_sync = {}
+        self._log(f"New session {self._counter.session.hex()}")
+
+    def _handle(self, pdu):
+        if not pmt.is_pair(pdu):
+            return
+        meta, pl = pmt.car(pdu), pmt.cdr(pdu)
+        if not pmt.is_u8vector(pl):
+            return
+
+        buf = pager_pdu.pdu_bytes(pl)
+        if len(buf) < 1:
+            return
+        seq, plaintext = buf[0], buf[1:]
+
+        if self._counter.rotated: self._new_session()
+        dest = self.dest_addr
+        if pmt.is_dict(meta) and pmt.dict_has_key(meta, pager_pdu.DEST_ADDR):
+            dest = pmt.to_long(pmt.dict_ref(meta, pager_pdu.DEST_ADDR, pmt.PMT_NIL)) & 0xFF
+        gcm = self._keys.get(dest).session(self._counter.session).gcm
+        retransmit = seq == self._last_seq
+        self._last_seq = seq
+        sent = self._frames_since_sync.get(dest)
+        if retransmit or sent is None or sent >= self.sync_interval:
+            # Own meta, like the CTR block's SYNC: no msg_id/frame_id of the frame behind it
+            sync_meta = pmt.dict_add(pmt.make_dict(), pager_pdu.DEST_ADDR, pmt.from_long(dest))
+            self._publish(sync_meta, seq, self._sync_frame(gcm, dest, seq, len(plaintext)))
+            sent = 0
+        self._frames_since_sync[dest] = sent + 1
+
+        nonce8 = self._counter.next_nonce()                     # COUNTER(8) under the session key
+        counter = int.from_bytes(nonce8, "big")
+        ctr_lo = nonce8[-pager_crypto.CTR_WIRE_LEN:]
+        aad = pager_crypto.aead_aad(dest, 0x01, seq, ctr_lo)
+        sealed = gcm.seal(pager_crypto.aead_nonce(counter), aad, plaintext)
+        self._publish(meta, seq, ctr_lo + sealed)
+
+    def _sync_frame(self, gcm, dest, seq, body_len):
+        # [ 0xFFFF | SESSION(9) | REF(4) | 0x00.. ]  all in the AAD, empty ciphertext
+        body = self._counter.sync_frame(pager_crypto.CTR_WIRE_LEN + body_len)
+        ref = int.from_bytes(body[2 + pager_crypto.SESSION_LEN:6 + pager_crypto.SESSION_LEN], "big")
+        aad = pager_crypto.aead_aad(dest, 0x01, seq, body)
+        tag = gcm.seal(pager_crypto.aead_nonce(ref, sync=True), aad, b"")
+        return body + tag
+
+    def _publish(self, meta, seq, body):
+        frame = bytes([seq]) + body
+        self.message_port_pub(pager_pdu.OUT,
+                              pager_pdu.make_pdu(meta, frame))
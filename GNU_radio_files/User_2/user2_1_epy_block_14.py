@@ -0,0 +1,181 @@
+from gnuradio import gr
+import pmt
+import pager_common  # noqa: F401  (puts ../common on sys.path)
+import pager_crypto
+import pager_mac
+import pager_pdu
+
+class aead_verify_and_ack(gr.basic_block):
+    """
+    AEAD Verify & ACK (AES-GCM)  -- replaces CRC32 verify + AES-CTR decrypt
+    ----------------------------------------------------------------
+    Input  PDU : [ SEQ(1B) | CTR_LO(2B) | CIPHERTEXT(N) | TAG(tag_len) ]
+                 meta: {dest_addr, [src_addr]} from the address filter
+    config     : dict {my_addr, dest_addr} (prefetches the peer's link key)
+    AAD        : [ DEST | TYPE=0x01 | SEQ | CTR_LO ]
+
+    One tag check authenticates header and payload and decrypts in the
+    same call.
+
+    On tag pass:
+      - 'out'     -> PLAINTEXT (N bytes), meta: {auth_ok=True, seq=<seq>, ...}
+      - 'ack_out' -> payload: [ NEXT_SEQ(1B) | FRAME[1:1+payload_len] ]
+                     meta:    {ack=<next_seq>, crc_ok=True, dest_addr=<src_addr>}
+    SYNC frames (CTR_LO=0xFFFF) update the sender's session and are not ACKed.
+
+    On fail:
+      - 'drop'    -> diagnostic PDU with {auth_ok=False, drop_reason=...}
+                     (auth_fail, replay, no_session, ctr_out_of_window, bad_len)
+    The replay window is checked before the tag, so replayed frames cost
+    no decryption and are never ACKed.
+
+    Parameters
+      key_hex     : AES key in hex (same as the seal block)
+      tag_len     : GCM tag bytes (4..16)
+      window      : max distance from the highest counter seen (also the replay bitmap size)
+      payload_len : length of the echoed payload in the ACK (ACK frame layout)
+      per_peer_keys : must match the seal block
+    """
+
+    def __init__(self, key_hex="00112233445566778899AABBCCDDEEFF", tag_len=4, window=1024, payload_len=40, per_peer_keys=True):
+        gr.basic_block.__init__(self, name="AEAD Verifier",
+                                in_sig=None, out_sig=None)
+        self.tag_len = int(tag_len)
+        self.window = int(window)
+        self.payload_len = int(payload_len)
+        self.my_addr = 0
+        self.dest_addr = 0
+        self._peers = {}          # sender address -> CounterWindow
+        self._last_peer = None
+        self.per_peer_keys = bool(per_peer_keys)
+        self._keys = None
+        self.set_key_hex(key_hex)
+
+        # Ports
+        self.message_port_register_in(pager_pdu.IN)
+        self.set_msg_handler(pager_pdu.IN, self._handle)
+        self.message_port_register_in(pager_pdu.CONFIG)
+        self.set_msg_handler(pager_pdu.CONFIG, self.handle_config)
+        self.message_port_register_out(pager_pdu.OUT)      # plaintext only
+        self.message_port_register_out(pager_pdu.ACK_OUT)  # NEXT_SEQ + PAYLOAD
+        self.message_port_register_out(pager_pdu.DROP)     # diagnostics
+
+    def set_key_hex(self, key_hex):
+        key = pager_crypto.parse_key_hex(key_hex)
+        if self._keys is None:
+            self._keys = pager_crypto.KeyManager(key, tag_len=self.tag_len, derive=self.per_peer_keys)
+        else:
+            self._keys.set_master(key)
+        self._keys.prefetch(self.dest_addr)
+
+    def handle_config(self, msg):
+        if not pmt.is_dict(msg): return
+        self.my_addr = self._meta_long(msg, pager_pdu.MY_ADDR, self.my_addr) & 0xFF
+        self.dest_addr = self._meta_long(msg, pager_pdu.DEST_ADDR, self.dest_addr) & 0xFF
+        self._keys.set_my_addr(self.my_addr)
+        self._keys.prefetch(self.dest_addr)
+
+    def _meta_long(self, meta, key, default):
+        if pmt.is_dict(meta) and pmt.dict_has_key(meta, key):
+            try: return pmt.to_long(pmt.dict_ref(meta, key, pmt.PMT_NIL))
+            except Exception: pass
+        return default
+
+    def _handle(self, pdu):
+        if not pmt.is_pair(pdu):
+            return
+        meta, pl = pmt.car(pdu), pmt.cdr(pdu)
+        if not pmt.is_u8vector(pl):
+            return
+
+        buf = pager_pdu.pdu_bytes(pl)
+        n = pager_crypto.CTR_WIRE_LEN
+        if len(buf) < 1 + n + self.tag_len:
+            self._emit_drop(meta, buf, "bad_len")
+            return
+
+        seq = buf[0]
+        ctr_lo = buf[1:1 + n]
+        dest = self._meta_long(meta, pager_pdu.DEST_ADDR, self.my_addr)
+
+        # ---- SYNC: session + reference counter in the clear, tag over the header ----
+        if ctr_lo == pager_crypto.SYNC_MARKER:
+            body = buf[1:-self.tag_len]
+            session = body[n:n + pager_crypto.SESSION_LEN]
+            ref = int.from_bytes(body[n + pager_crypto.SESSION_LEN:n + pager_crypto.SESSION_LEN + 4], "big")
+            aad = pager_crypto.aead_aad(dest, 0x01, seq, body)
+            gcm = self._keys.get(session[-1]).session(session).gcm
+            if gcm.open(pager_crypto.aead_nonce(ref, sync=True), aad, buf[-self.tag_len:]) is None:
+                self._emit_drop(meta, buf, "auth_fail")
+                return
+            peer = session[-1]
+            if not self._peers.setdefault(peer, pager_crypto.CounterWindow(self.window)).sync(session, ref):
+                self._emit_drop(meta, buf, "replay")
+                return
+            self._last_peer = peer
+            return
+
+        # ---- DATA ----
+        peer = self._meta_long(meta, pager_pdu.SRC_ADDR, self._last_peer)
+        win = self._peers.get(peer)
+        counter = win.resolve(int.from_bytes(ctr_lo, "big")) if win else None
+        if counter is None:
+            # Not ACKed: the sender retransmits with a SYNC in front
+            self._emit_drop(meta, buf, "no_session" if win is None else "ctr_out_of_window")
+            return
+        if not win.fresh(counter):
+            self._emit_drop(meta, buf, "replay")
+            return
+
+        aad = pager_crypto.aead_aad(dest, 0x01, seq, ctr_lo)
+        gcm = self._keys.get(peer).session(win.session).gcm
+        plaintext = gcm.open(pager_crypto.aead_nonce(counter), aad, buf[1 + n:])
+        if plaintext is None:
+            self._emit_drop(meta, buf, "auth_fail")
+            return
+        win.accept(counter)
+
+        # ---- Publish PLAINTEXT on 'out' ----
+        out_meta = meta
+        try:
+            out_meta = pmt.dict_add(out_meta, pager_pdu.AUTH_OK, pager_pdu.TRUE)
+            out_meta = pmt.dict_add(out_meta, pager_pdu.SEQ,     pmt.from_long(int(seq)))
+        except Exception:
+            pass
+        self.message_port_pub(
+            pager_pdu.OUT,
+            pager_pdu.make_pdu(out_meta, plaintext)
+        )
+
+        # ---- Publish ACK: [ NEXT_SEQ | PAYLOAD(payload_len) ] (same layout as the CRC path) ----
+        ack_next = pager_mac.ack_seq(seq)
+        ack_meta = pmt.make_dict()
+        try:
+            ack_meta = pmt.dict_add(ack_meta, pager_pdu.ACK,    pmt.from_long(ack_next))
+            ack_meta = pmt.dict_add(ack_meta, pager_pdu.CRC_OK, pager_pdu.TRUE)
+            if pmt.is_dict(meta) and pmt.dict_has_key(meta, pager_pdu.SRC_ADDR):
+                # Addressed to whoever sent the frame, not to the configured peer
+                ack_meta = pmt.dict_add(ack_meta, pager_pdu.DEST_ADDR,
+                                        pmt.dict_ref(meta, pager_pdu.SRC_ADDR, pmt.PMT_NIL))
+        except Exception:
+            pass
+
+        echo = buf[1:1 + self.payload_len]
+        echo += b"\x00" * (self.payload_len - len(echo))
+        ack_bytes = bytes((ack_next,)) + echo
+        self.message_port_pub(
+            pager_pdu.ACK_OUT,
+            pager_pdu.make_pdu(ack_meta, ack_bytes)
+        )
+
+    def _emit_drop(self, meta, data_bytes, reason):
+        try:
+            m = meta
+            if not pmt.is_dict(m):
+                m = pmt.make_dict()
+            m = pmt.dict_add(m, pager_pdu.AUTH_OK,     pager_pdu.FALSE)
+            m = pmt.dict_add(m, pager_pdu.DROP_REASON, pmt.intern(str(reason)))
+            v = pager_pdu.u8vector(data_bytes)
+            self.message_port_pub(pager_pdu.DROP, pmt.cons(m, v))
+        except Exception:
+            pass
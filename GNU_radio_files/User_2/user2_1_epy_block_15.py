@@ -0,0 +1,241 @@
+"""
+Embedded Python Block: Headless Messaging (no Qt)
+
+Drop-in for the Chat GUI block on machines without a display: same
+ports (out, in, ack_in, arq_status, config_out), same chunking,
+reassembly, compression and file transfers (pager_messaging), but no
+QApplication and no window.
+
+Messages come in through a local inbox, one command per line:
+    <text>                    to the current target
+    @<dest> <text>            to another peer
+    [@<dest>] /file <path>    resumable file transfer
+    /ids <my_id> <target_id>  change the addresses
+The inbox is a named pipe (created if missing), "-" for stdin, or ""
+for none; submit() takes the same lines from Python. For batches with
+priorities and delivery receipts, set api_socket (pager_api).
+
+Events (received messages, deliveries, failures, files) go to a log:
+the event_log file, or stderr when it is "". With history_db set they
+are also stored in a pager_history database, like the GUI does.
+
+With mac_engine=True the block also runs the stop-and-wait ARQ, on one
+asyncio loop with the reassembly and the API (pager_engine), and stands
+in for the ARQ block (pager_node leaves it out): 'out' carries
+sequenced frames, 'status' the ARQ status, 'busy_in' takes the ARQ's
+busy signal, and encrypt_first routes chunks through the link
+encryption ('crypt_out' -> 'crypt_in') before they are sequenced.
+"""
+
+from gnuradio import gr
+import pmt
+import logging
+import os
+import select
+import stat
+import sys
+import threading
+import pager_common  # noqa: F401  (puts ../common on sys.path)
+import pager_api
+import pager_delivery
+import pager_engine
+import pager_history
+import pager_messaging
+
+class chat_headless_block(gr.basic_block):
+    def __init__(self, payload_size=32, my_id=20, target_id=15, inbox="", event_log="", history_db="",
+                 xfer_idle_timeout_s=20.0, xfer_max_queries=5, compression=True, api_socket="", api_max_outstanding=4,
+                 mac_engine=False, arq_payload_size=0, wait_time_s=0.3, max_retries=10, encrypt_first=False):
+        gr.basic_block.__init__(self, name="Headless Messaging", in_sig=None, out_sig=None)
+        self.payload_size = payload_size
+        self.my_id = int(my_id)
+        self.target_id = int(target_id)
+        self.inbox = inbox
+        self.api_socket = api_socket
+        self.api_max_outstanding = api_max_outstanding
+        self.api = None
+        self.mac_engine = bool(mac_engine)
+
+        self.log = logging.getLogger(f"pager.node{self.my_id}")
+        self.log.setLevel(logging.INFO)
+        self.log.propagate = False
+        handler = logging.FileHandler(event_log) if event_log else logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        self.log.addHandler(handler)
+        self._handler = handler
+
+        self.history = pager_history.HistoryStore(history_db) if history_db else None
+        self.deliveries = pager_delivery.DeliveryTracker()   # msg/frame/seq -> (msg_id, dest, history id)
+        self.pending_transfers = {}                           # transfer ID -> (dest, name)
+        self.counts = {"rx": 0, "sent": 0, "delivered": 0, "failed": 0}
+        # Held from send to register, so a fast ARQ status cannot reach the tracker first
+        self._lock = threading.RLock()
+        self._run = threading.Event()
+        self._reader = None
+
+        # Message Ports
+        self.message_port_register_out(pmt.intern("out"))
+        self.message_port_register_in(pmt.intern("in"))
+        self.message_port_register_in(pmt.intern("ack_in"))
+        self.message_port_register_in(pmt.intern("arq_status"))
+        self.message_port_register_out(pmt.intern("config_out"))
+
+        # Events are handled on the flowgraph threads (or the engine loop), there is no GUI thread to hand them to
+        publish = lambda port, msg: self.message_port_pub(pmt.intern(port), msg)
+        if self.mac_engine:
+            for port in ("status", "crypt_out"): self.message_port_register_out(pmt.intern(port))
+            for port in ("busy_in", "crypt_in"): self.message_port_register_in(pmt.intern(port))
+            self.core = pager_engine.MacEngine(
+                publish, self, lambda: self.target_id, payload_size=payload_size, arq_payload_size=arq_payload_size,
+                wait_time_s=wait_time_s, max_retries=max_retries, encrypt_first=encrypt_first,
+                xfer_idle_timeout_s=xfer_idle_timeout_s, xfer_max_queries=xfer_max_queries, compression=compression)
+            self.set_msg_handler(pmt.intern("busy_in"), self.core.handle_busy)
+            self.set_msg_handler(pmt.intern("crypt_in"), self.core.handle_encrypted)
+        else:
+            self.core = pager_messaging.MessagingCore(
+                publish, self, lambda: self.target_id, payload_size=payload_size,
+                xfer_idle_timeout_s=xfer_idle_timeout_s, xfer_max_queries=xfer_max_queries, compression=compression)
+
+        self.set_msg_handler(pmt.intern("in"), self.core.handle_rx_msg)
+        self.set_msg_handler(pmt.intern("ack_in"), self.core.handle_ack_msg)
+        self.set_msg_handler(pmt.intern("arq_status"), self.core.handle_arq_status)
+
+    # --- LOCAL API ---
+    def set_ids(self, my_id, target_id):
+        self.my_id, self.target_id = int(my_id), int(target_id)
+        self.core.publish_config(pager_messaging.make_config(self.my_id, self.target_id), self.target_id)
+        self.log.info(f"ids my={self.my_id} target={self.target_id}")
+
+    def send_text(self, text, dest=None):
+        """ Queues a chat message; returns its msg_id """
+        dest = self.target_id if dest is None else int(dest)
+        hid = self.history.append(dest, text, True, pager_delivery.STATUS_SENT) if self.history else None
+        with self._lock:
+            msg_id, frame_ids = self.core.send_pdus(text, dest)
+            self.deliveries.register(msg_id, frame_ids, (msg_id, dest, hid))
+            self.counts["sent"] += 1
+        self.log.info(f"sent msg={msg_id} dest={dest} frames={len(frame_ids)} text={text!r}")
+        return msg_id
+
+    def send_file(self, path, dest=None):
+        """ Offers a file to `dest`; returns the transfer ID """
+        dest = self.target_id if dest is None else int(dest)
+        with open(path, "rb") as f:
+            data = f.read()
+        xfer_id = self.core.send_file(os.path.basename(path), data, dest)
+        self.pending_transfers[xfer_id] = (dest, os.path.basename(path))
+        self.log.info(f"file_offer xfer={xfer_id} dest={dest} name={os.path.basename(path)!r} bytes={len(data)}")
+        return xfer_id
+
+    def submit(self, line):
+        """ One inbox command (see module docstring) """
+        line = line.rstrip("\r\n")
+        if not line.strip(): return None
+        dest = None
+        if line.startswith("@"):
+            head, _, line = line.partition(" ")
+            try: dest = int(head[1:])
+            except ValueError:
+                self.log.info(f"bad_command {head!r}")
+                return None
+        try:
+            if line.startswith("/file "):
+                return self.send_file(line[len("/file "):].strip(), dest)
+            if line.startswith("/ids "):
+                my_id, target_id = line.split()[1:3]
+                return self.set_ids(my_id, target_id)
+            return self.send_text(line, dest)
+        except (OSError, ValueError) as e:
+            self.log.info(f"bad_command {line!r}: {e}")
+            return None
+
+    def _inbox_loop(self):
+        if self.inbox == "-":
+            for line in sys.stdin:
+                if not self._run.is_set(): return
+                self.submit(line)
+            return
+        if not os.path.exists(self.inbox):
+            os.mkfifo(self.inbox)
+        if not stat.S_ISFIFO(os.stat(self.inbox).st_mode):
+            self.log.info(f"inbox {self.inbox!r} is not a named pipe, local API disabled")
+            return
+        # Opened read/write so the pipe never reports EOF between writers
+        fd = os.open(self.inbox, os.O_RDWR | os.O_NONBLOCK)
+        buf = b""
+        try:
+            while self._run.is_set():
+                if not select.select([fd], [], [], 0.5)[0]: continue
+                buf += os.read(fd, 4096)
+                *lines, buf = buf.split(b"\n")
+                for line in lines:
+                    self.submit(line.decode("utf-8", "replace"))
+        finally:
+            os.close(fd)
+
+    # --- EVENTS (MessagingCore sink) ---
+    def on_rx_message(self, text, seq, src=None):
+        src = self.target_id if src is None else src
+        self.counts["rx"] += 1
+        if self.history: self.history.append(src, text, False)
+        if text.startswith("FILE:"):
+            self.log.info(f"file src={src} name={text.split(':', 2)[1]!r}")
+        else:
+            self.log.info(f"rx src={src} seq={seq} text={text!r}")
+
+    def on_ack_received(self, ack_val):
+        with self._lock:
+            settled = self.deliveries.on_ack(ack_val)
+        self._settle(settled)
+
+    def on_arq_status(self, frame_id, seq, status, msg_id):
+        with self._lock:
+            if status == "sent":
+                self.deliveries.on_sent(frame_id, seq, msg_id)
+                return
+            settled = self.deliveries.on_frame(frame_id, status == "delivered", msg_id)
+        self._settle(settled)
+
+    def on_xfer_done(self, xfer_id):
+        dest, name = self.pending_transfers.pop(xfer_id, (None, ""))
+        self.log.info(f"file_delivered xfer={xfer_id} dest={dest} name={name!r}")
+
+    def _settle(self, settled):
+        if settled is None: return
+        (msg_id, dest, hid), state = settled
+        ok = state == pager_delivery.STATUS_DELIVERED
+        self.counts["delivered" if ok else "failed"] += 1
+        if self.history and hid is not None: self.history.set_status(hid, state)
+        self.log.info(f"{'delivered' if ok else 'failed'} msg={msg_id} dest={dest}")
+
+    def start(self):
+        # The address blocks start with no IDs; the GUI sends them from its dialog, here they are parameters
+        self.core.publish("config_out", pager_messaging.make_config(self.my_id, self.target_id))
+        self.core.start()
+        if self.api_socket:
+            self.api = pager_api.ApiServer(self.api_socket, self.core.send_pdus, self.api_max_outstanding)
+            self.core.listeners.append(self.api)
+            self.api.start(self.core.loop if self.mac_engine else None)
+        self._run.set()
+        if self.inbox:
+            self._reader = threading.Thread(target=self._inbox_loop, name="pager-inbox", daemon=True)
+            self._reader.start()
+        self.log.info(f"started my={self.my_id} target={self.target_id} inbox={self.inbox or 'none'}")
+        return super().start()
+
+    def stop(self):
+        self._run.clear()
+        if self.api:
+            a = self.api.stats()
+            self.log.info(f"api accepted={a['accepted']} delivered={a['delivered']} failed={a['failed']} "
+                          f"rejected={a['rejected']} queued={a['queued']}")
+            self.api.stop()
+        self.core.stop()
+        if self._reader and self.inbox != "-": self._reader.join(timeout=2.0)
+        c = self.counts
+        self.log.info(f"stopped rx={c['rx']} sent={c['sent']} delivered={c['delivered']} failed={c['failed']} "
+                      f"pending={self.deliveries.pending()}")
+        if self.history: self.history.close()
+        self.log.removeHandler(self._handler)
+        self._handler.close()
+        return super().stop()
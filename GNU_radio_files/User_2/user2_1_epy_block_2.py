@@ -2,13 +2,22 @@
 Embedded Python Block: Address Filter (DATA Only) - Auto-Align
 """
 from gnuradio import gr
+import numpy as np
 import pmt
+import pager_common  # noqa: F401  (puts ../common on sys.path)
+import pager_pdu
 
 class address_filter_rx(gr.basic_block):
     """
     Scans for [ PREAMBLE ] inside the PDU.
-    Expects after preamble: [ DEST(1) | TYPE(1) | SEQ(1) | PAYLOAD... ]
+    Expects after preamble: [ DEST(1) | TYPE(1) | SRC(1) | SEQ(1) | PAYLOAD... ]
     Accepts only if DEST == my_addr AND TYPE == 0x01
+    Output meta: dest_addr, src_addr (the sender, used to route the
+    message to its conversation and the ACK back), seq
+    A batch PDU (see pager_pdu) is filtered in one call: frames with the
+    preamble at the start are checked as a 2-D array and the accepted
+    ones go out as single PDUs with their own dest_addr, src_addr and
+    seq; the others take the single-PDU path.
     """
 
     def __init__(self, preamble_len=32):
@@ -17,44 +26,27 @@ class address_filter_rx(gr.basic_block):
         self.my_addr = 0 & 0xFF
         
         # Exact 128-byte Preamble (Must match TX)
-        self.preamble = bytes([
-            0xD3, 0x42, 0xA1, 0x7F, 0x9C, 0xE2, 0x55, 0xAA,
-            0x13, 0x87, 0x4E, 0xB1, 0x2C, 0xF0, 0x99, 0x6D,
-            0x3A, 0xC4, 0x1F, 0x82, 0x5B, 0xD8, 0x66, 0xE7,
-            0x24, 0x91, 0x7C, 0x0B, 0x38, 0xF2, 0x4D, 0xC6,
-            0xD3, 0x42, 0xA1, 0x7F, 0x9C, 0xE2, 0x55, 0xAA,
-            0x13, 0x87, 0x4E, 0xB1, 0x2C, 0xF0, 0x99, 0x6D,
-            0x3A, 0xC4, 0x1F, 0x82, 0x5B, 0xD8, 0x66, 0xE7,
-            0x24, 0x91, 0x7C, 0x0B, 0x38, 0xF2, 0x4D, 0xC6,
-            0xD3, 0x42, 0xA1, 0x7F, 0x9C, 0xE2, 0x55, 0xAA,
-            0x13, 0x87, 0x4E, 0xB1, 0x2C, 0xF0, 0x99, 0x6D,
-            0x3A, 0xC4, 0x1F, 0x82, 0x5B, 0xD8, 0x66, 0xE7,
-            0x24, 0x91, 0x7C, 0x0B, 0x38, 0xF2, 0x4D, 0xC6,
-            0xD3, 0x42, 0xA1, 0x7F, 0x9C, 0xE2, 0x55, 0xAA,
-            0x13, 0x87, 0x4E, 0xB1, 0x2C, 0xF0, 0x99, 0x6D,
-            0x3A, 0xC4, 0x1F, 0x82, 0x5B, 0xD8, 0x66, 0xE7,
-            0x24, 0x91, 0x7C, 0x0B, 0x38, 0xF2, 0x4D, 0xC6
-        ])
-
-        self.message_port_register_in(pmt.intern('in'))
-        self.message_port_register_out(pmt.intern('out'))
-        self.message_port_register_out(pmt.intern('drop'))
-        self.message_port_register_in(pmt.intern('config'))
+        self.preamble = pager_pdu.PREAMBLE
+        self._pre = np.frombuffer(self.preamble, dtype=np.uint8)
+
+        self.message_port_register_in(pager_pdu.IN)
+        self.message_port_register_out(pager_pdu.OUT)
+        self.message_port_register_out(pager_pdu.DROP)
+        self.message_port_register_in(pager_pdu.CONFIG)
         
-        self.set_msg_handler(pmt.intern('in'), self._handle)
-        self.set_msg_handler(pmt.intern('config'), self.handle_config)
+        self.set_msg_handler(pager_pdu.IN, self._handle)
+        self.set_msg_handler(pager_pdu.CONFIG, self.handle_config)
 
     def handle_config(self, msg):
-        if pmt.is_dict(msg) and pmt.dict_has_key(msg, pmt.intern("my_addr")):
-            new_addr = pmt.to_long(pmt.dict_ref(msg, pmt.intern("my_addr"), pmt.PMT_NIL))
-            self.my_addr = new_addr & 0xFF
+        self.my_addr = pager_pdu.meta_long(msg, pager_pdu.MY_ADDR, self.my_addr) & 0xFF
 
     def _handle(self, pdu):
         if not pmt.is_pair(pdu): return
         meta, pl = pmt.car(pdu), pmt.cdr(pdu)
+        if pager_pdu.is_batch(pl): return self._handle_batch(meta, pl)
         if not pmt.is_u8vector(pl): return
 
-        data = bytes(pmt.u8vector_elements(pl))
+        data = pager_pdu.pdu_bytes(pl)
 
         # 1. SEARCH for the preamble pattern to find exact start
         start_idx = data.find(self.preamble)
@@ -63,18 +55,16 @@ class address_filter_rx(gr.basic_block):
             return
 
         # 2. Identify the packet content after the preamble
-        # Structure: [DEST(1)] [TYPE(1)] [SEQ(1)] ...
+        # Structure: [DEST(1)] [TYPE(1)] [SRC(1)] [SEQ(1)] ...
         payload_idx = start_idx + len(self.preamble)
         
-        # Check if we have enough bytes remaining for Dest+Type
-        if len(data) < payload_idx + 2:
+        # Check if we have enough bytes remaining for Dest+Type+Src
+        if len(data) < payload_idx + 3:
             self._emit_drop(meta, data, reason="short_after_preamble")
             return
 
-        frame = data[payload_idx:]
-        
-        dest = frame[0]
-        msg_type = frame[1]
+        dest = data[payload_idx]
+        msg_type = data[payload_idx + 1]
 
         # 3. Check Address
         if dest != self.my_addr:
@@ -82,11 +72,12 @@ class address_filter_rx(gr.basic_block):
             return
 
         # 4. Check Type (Must be 0x01 for Data)
-        if msg_type != 0x01:
+        if msg_type != pager_pdu.TYPE_DATA:
             return # Silently ignore ACKs or others
 
-        # 5. Strip Dest(1) + Type(1) -> Keep [ SEQ | PAYLOAD | CRC ]
-        fwd = frame[2:]
+        # 5. Strip Dest(1) + Type(1) + Src(1) -> Keep [ SEQ | PAYLOAD | CRC ] (a view, copied once into the PDU)
+        src = data[payload_idx + 2]
+        fwd = memoryview(data)[payload_idx + 3:]
         
         if len(fwd) < 1: 
             return
@@ -95,16 +86,51 @@ class address_filter_rx(gr.basic_block):
 
         # Publish
         try:
-            meta = pmt.dict_add(meta, pmt.intern("dest_addr"), pmt.from_long(dest))
-            meta = pmt.dict_add(meta, pmt.intern("seq"), pmt.from_long(seq))
+            meta = pmt.dict_add(meta, pager_pdu.DEST_ADDR, pmt.from_long(dest))
+            meta = pmt.dict_add(meta, pager_pdu.SRC_ADDR, pmt.from_long(src))
+            meta = pmt.dict_add(meta, pager_pdu.SEQ, pmt.from_long(seq))
+        except: pass
+
+        self.message_port_pub(pager_pdu.OUT, pager_pdu.make_pdu(meta, fwd))
+
+    def _handle_batch(self, meta, pl):
+        frames = pager_pdu.batch_frames(pl)
+        n = len(frames)
+        rows = pager_pdu.batch_rows(frames)
+        P = len(self.preamble)
+        if rows is None or rows.shape[1] < P + 4:
+            # Frames of different lengths (or too short): one at a time
+            for i in range(n):
+                self._handle(pmt.cons(pager_pdu.frame_meta(meta, n, i), pmt.vector_ref(pl, i)))
+            return
+
+        # Header fields of all frames at once; the preamble is searched for only where it is not at the start
+        aligned = (rows[:, :P] == self._pre).all(axis=1)
+        dest, msg_type, src = rows[:, P], rows[:, P + 1], rows[:, P + 2]
+        mine = aligned & (dest == self.my_addr)
+        accept = mine & (msg_type == pager_pdu.TYPE_DATA)
+
+        for i in np.flatnonzero(~aligned):
+            self._handle(pmt.cons(pager_pdu.frame_meta(meta, n, i), pmt.vector_ref(pl, i)))
+        for i in np.flatnonzero(aligned & ~mine):
+            self._emit_drop(pager_pdu.frame_meta(meta, n, i), frames[i], reason="addr_mismatch")
+        if not accept.any():
+            return
+
+        # Strip Dest(1) + Type(1) + Src(1) -> Keep [ SEQ | PAYLOAD | CRC ] of every accepted frame
+        fwd = rows[accept, P + 3:]
+        try:
+            meta = pager_pdu.take_rows(meta, n, accept)
+            meta = pmt.dict_add(meta, pager_pdu.DEST_ADDR, pager_pdu.u8vector(dest[accept]))
+            meta = pmt.dict_add(meta, pager_pdu.SRC_ADDR, pager_pdu.u8vector(src[accept]))
+            meta = pmt.dict_add(meta, pager_pdu.SEQ, pager_pdu.u8vector(fwd[:, 0]))
         except: pass
 
-        out_vec = pmt.init_u8vector(len(fwd), list(fwd))
-        self.message_port_pub(pmt.intern('out'), pmt.cons(meta, out_vec))
+        for frame in pager_pdu.frame_pdus(meta, fwd):
+            self.message_port_pub(pager_pdu.OUT, frame)
 
     def _emit_drop(self, meta, data_bytes, reason="drop"):
         try:
-            m = pmt.dict_add(meta, pmt.intern("drop_reason"), pmt.intern(reason))
-            v = pmt.init_u8vector(len(data_bytes), list(data_bytes))
-            self.message_port_pub(pmt.intern('drop'), pmt.cons(m, v))
-        except: pass
\ No newline at end of file
+            m = pmt.dict_add(meta, pager_pdu.DROP_REASON, pmt.intern(reason))
+            self.message_port_pub(pager_pdu.DROP, pager_pdu.make_pdu(m, data_bytes))
+        except: pass
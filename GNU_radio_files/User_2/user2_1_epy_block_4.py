@@ -0,0 +1,196 @@
+from gnuradio import gr
+import pmt
+from collections import OrderedDict
+import pager_common  # noqa: F401  (puts ../common on sys.path)
+import pager_crypto
+import pager_pdu
+
+class pdu_aes_encrypt(gr.basic_block):
+    """
+    PDU AES Encrypt (AES-CTR)
+
+    In:
+      - PDU: (meta, payload_bytes); a "dest_addr" in meta selects that peer's key
+        (switching peers costs a key change, like a config message)
+
+      - config : dict {my_addr, dest_addr} (selects the peer's link key)
+
+    Out:
+      - PDU: same meta
+              nonce_mode "random"   : payload = NONCE(8 bytes) | CIPHERTEXT(len(payload_bytes))
+              nonce_mode "implicit" : payload = CTR_LO(2 bytes) | CIPHERTEXT(len(payload_bytes))
+                                      plus a SYNC PDU at session start and every sync_interval frames
+
+    A background thread keeps a pool of precomputed (nonce, keystream)
+    pairs, so the per-frame work here is a pool pop and an XOR.
+    Each destination has its own counter, session and pool
+    (pager_crypto.PeerSender, last few destinations kept), so switching
+    target and back continues the session.
+
+    Parameters:
+      key_hex       : AES key in hex (16/24/32 bytes => 32/48/64 hex chars)
+      payload_size  : plaintext bytes per frame (keystream length kept in the pool)
+      pool_size     : number of precomputed keystreams (0 = no pool, compute per frame)
+      nonce_mode    : "random" (8B nonce on the wire) or "implicit" (session + counter, 2B on the wire)
+      sync_interval : implicit mode, frames between SYNC PDUs (lets a restarted receiver catch up)
+      per_peer_keys : derive a link key per (my_addr, dest_addr) pair from key_hex (HKDF);
+                      False uses key_hex for every peer
+      verbose       : print debug
+    """
+
+    def __init__(self, key_hex="00112233445566778899AABBCCDDEEFF", payload_size=32, pool_size=256,
+                 nonce_mode="random", sync_interval=64, per_peer_keys=True, verbose=True):
+        gr.basic_block.__init__(self,
+                                name="PDU AES Encrypt (CTR)",
+                                in_sig=None,
+                                out_sig=None)
+
+        self.verbose = bool(verbose)
+        self.payload_size = int(payload_size)
+        self.pool_size = int(pool_size)
+        self.implicit = str(nonce_mode).lower().strip() == "implicit"
+        self.sync_interval = max(1, int(sync_interval))
+        self.dest_addr = None
+        self.my_addr = 0
+        self.per_peer_keys = bool(per_peer_keys)
+        self._keys = None
+        self._senders = OrderedDict()    # dest -> PeerSender, LRU like the KeyManager
+        self._tx = None                  # sender state of the current destination
+        self._running = False
+        self.set_key_hex(key_hex)
+
+        self.message_port_register_in(pager_pdu.IN)
+        self.message_port_register_in(pager_pdu.CONFIG)
+        self.message_port_register_out(pager_pdu.OUT)
+        self.set_msg_handler(pager_pdu.IN, self._handle_msg)
+        self.set_msg_handler(pager_pdu.CONFIG, self.handle_config)
+
+    def _log(self, msg):
+        if self.verbose:
+            print(f"[pdu_aes_encrypt] {msg}")
+
+    # ---- lifecycle ----
+    def start(self):
+        self._running = True
+        for tx in self._senders.values():
+            if tx.pool: tx.pool.start()
+        return super().start()
+
+    def stop(self):
+        self._running = False
+        for tx in self._senders.values():
+            if tx.pool:
+                tx.pool.stop()
+                self._log(f"Keystream pool {tx.peer}: hits={tx.pool.hits} misses={tx.pool.misses}")
+        return super().stop()
+
+    # ---- key handling ----
+    def set_key_hex(self, key_hex):
+        """
+        Set AES key as hex string (32/48/64 hex chars).
+        Can be used as a GRC callback.
+        """
+        key = pager_crypto.parse_key_hex(key_hex)
+        if self._keys is None:
+            self._keys = pager_crypto.KeyManager(key, derive=self.per_peer_keys)
+        else:
+            self._keys.set_master(key)
+        self._drop_senders()
+        self._use_peer()
+        self._log(f"Key set ({len(key)} bytes)")
+
+    def _peer(self):
+        return self.dest_addr if self.dest_addr is not None else 0
+
+    def handle_config(self, msg):
+        if not pmt.is_dict(msg): return
+        changed = False
+        if pmt.dict_has_key(msg, pager_pdu.MY_ADDR):
+            my_addr = pmt.to_long(pmt.dict_ref(msg, pager_pdu.MY_ADDR, pmt.PMT_NIL)) & 0xFF
+            if my_addr != self.my_addr:
+                # New link keys and a new SRC byte in the sessions: start every peer over
+                self.my_addr = my_addr
+                self._keys.set_my_addr(my_addr)
+                self._drop_senders()
+                changed = True
+        if pmt.dict_has_key(msg, pager_pdu.DEST_ADDR):
+            dest = pmt.to_long(pmt.dict_ref(msg, pager_pdu.DEST_ADDR, pmt.PMT_NIL)) & 0xFF
+            changed |= dest != self.dest_addr
+            self.dest_addr = dest
+        if changed: self._use_peer()
+
+    def _use_peer(self):
+        # Key schedule and pool here, on the config message, not on the next frame
+        peer = self._peer()
+        tx = self._senders.get(peer)
+        if tx is None:
+            tx = pager_crypto.PeerSender(peer, self._keys.get(peer), self.my_addr, self.implicit,
+                                         self.payload_size, self.pool_size)
+            if tx.pool:
+                if self._running: tx.pool.start()
+                else: tx.pool.fill()
+            self._senders[peer] = tx
+            while len(self._senders) > self._keys.capacity:
+                _, old = self._senders.popitem(last=False)
+                if old.pool: old.pool.stop()
+            if self.implicit: self._log(f"New session {tx.counter.session.hex()} for {peer}")
+        else:
+            self._senders.move_to_end(peer)
+        self._tx = tx
+
+    def _drop_senders(self):
+        for tx in self._senders.values():
+            if tx.pool: tx.pool.stop()
+        self._senders.clear()
+        self._tx = None
+
+    # ---- implicit nonce session ----
+    def _new_session(self, tx):
+        # Every session encrypts under its own key, derived from the link key
+        tx.new_session(self._keys.get(tx.peer))
+        self._log(f"New session {tx.counter.session.hex()} for {tx.peer}")
+
+    def _send_sync(self, tx):
+        # Own meta: the SYNC is not part of the message that triggered it (no msg_id/frame_id)
+        sync = tx.sync_frame(pager_crypto.CTR_WIRE_LEN + self.payload_size)
+        meta = pmt.dict_add(pmt.make_dict(), pager_pdu.DEST_ADDR, pmt.from_long(tx.peer))
+        self.message_port_pub(pager_pdu.OUT, pager_pdu.make_pdu(meta, sync))
+        tx.frames_since_sync = 0
+
+    # ---- message handler ----
+    def _handle_msg(self, pdu):
+        if not pmt.is_pair(pdu):
+            return
+
+        meta = pmt.car(pdu)
+        pl   = pmt.cdr(pdu)
+
+        if not pmt.is_u8vector(pl):
+            self._log("Ignoring non-u8vector payload")
+            return
+
+        plaintext = pager_pdu.pdu_bytes(pl)
+
+        if pmt.is_dict(meta) and pmt.dict_has_key(meta, pager_pdu.DEST_ADDR):
+            dest = pmt.to_long(pmt.dict_ref(meta, pager_pdu.DEST_ADDR, pmt.PMT_NIL)) & 0xFF
+            if dest != self.dest_addr:
+                self.dest_addr = dest
+                self._use_peer()
+
+        tx = self._tx
+        if self.implicit:
+            if tx.counter.rotated: self._new_session(tx)
+            if tx.frames_since_sync is None or tx.frames_since_sync >= self.sync_interval:
+                self._send_sync(tx)
+            tx.frames_since_sync += 1
+
+        nonce, ciphertext = tx.encrypt(plaintext)
+
+        # Implicit mode: only the low 16 bits of the frame counter go on the wire
+        out_bytes = (nonce[-pager_crypto.CTR_WIRE_LEN:] if self.implicit else nonce) + ciphertext
+
+        payload_pmt = pager_pdu.u8vector(out_bytes)
+        out_pdu = pmt.cons(meta, payload_pmt)
+        self.message_port_pub(pager_pdu.OUT, out_pdu)
+
+        self._log(f"Encrypted PDU: in_len={len(plaintext)}, out_len={len(out_bytes)}")
@@ -2,13 +2,19 @@
 Embedded Python Block: ACK Address Filter (ACK Only) - Auto-Align
 """
 from gnuradio import gr
+import numpy as np
 import pmt
+import pager_common  # noqa: F401  (puts ../common on sys.path)
+import pager_pdu
 
 class ack_address_filter_rx(gr.basic_block):
     """
     Scans for [ PREAMBLE ] inside the PDU.
-    Expects: [ DEST(1) | TYPE(1) | NEXT_SEQ(1) | PAYLOAD(40) | CRC(4) ]
+    Expects: [ DEST(1) | TYPE(1) | SRC(1) | NEXT_SEQ(1) | PAYLOAD(40) | CRC(4) ]
     Accepts only if DEST == my_addr AND TYPE == 0x02
+    Output meta: dest_addr, src_addr (who sent the ACK), next_seq
+    A batch PDU (see pager_pdu) is filtered in one call, as in the data
+    address filter; accepted ACKs leave as single PDUs.
     """
 
     def __init__(self, preamble_len=32):
@@ -17,48 +23,31 @@ class ack_address_filter_rx(gr.basic_block):
         self.my_addr = 0 & 0xFF
         
         # Exact 128-byte Preamble
-        self.preamble = bytes([
-            0xD3, 0x42, 0xA1, 0x7F, 0x9C, 0xE2, 0x55, 0xAA,
-            0x13, 0x87, 0x4E, 0xB1, 0x2C, 0xF0, 0x99, 0x6D,
-            0x3A, 0xC4, 0x1F, 0x82, 0x5B, 0xD8, 0x66, 0xE7,
-            0x24, 0x91, 0x7C, 0x0B, 0x38, 0xF2, 0x4D, 0xC6,
-            0xD3, 0x42, 0xA1, 0x7F, 0x9C, 0xE2, 0x55, 0xAA,
-            0x13, 0x87, 0x4E, 0xB1, 0x2C, 0xF0, 0x99, 0x6D,
-            0x3A, 0xC4, 0x1F, 0x82, 0x5B, 0xD8, 0x66, 0xE7,
-            0x24, 0x91, 0x7C, 0x0B, 0x38, 0xF2, 0x4D, 0xC6,
-            0xD3, 0x42, 0xA1, 0x7F, 0x9C, 0xE2, 0x55, 0xAA,
-            0x13, 0x87, 0x4E, 0xB1, 0x2C, 0xF0, 0x99, 0x6D,
-            0x3A, 0xC4, 0x1F, 0x82, 0x5B, 0xD8, 0x66, 0xE7,
-            0x24, 0x91, 0x7C, 0x0B, 0x38, 0xF2, 0x4D, 0xC6,
-            0xD3, 0x42, 0xA1, 0x7F, 0x9C, 0xE2, 0x55, 0xAA,
-            0x13, 0x87, 0x4E, 0xB1, 0x2C, 0xF0, 0x99, 0x6D,
-            0x3A, 0xC4, 0x1F, 0x82, 0x5B, 0xD8, 0x66, 0xE7,
-            0x24, 0x91, 0x7C, 0x0B, 0x38, 0xF2, 0x4D, 0xC6
-        ])
+        self.preamble = pager_pdu.PREAMBLE
+        self._pre = np.frombuffer(self.preamble, dtype=np.uint8)
 
         # Length of ACK Frame Content (after preamble)
-        # Dest(1) + Type(1) + NextSeq(1) + Payload(40) + CRC(4) = 47 bytes
-        self.ACK_CONTENT_LEN = 1 + 1 + 1 + 40 + 4 
+        # Dest(1) + Type(1) + Src(1) + NextSeq(1) + Payload(40) + CRC(4) = 48 bytes
+        self.ACK_CONTENT_LEN = 1 + 1 + 1 + 1 + 40 + 4 
 
-        self.message_port_register_in(pmt.intern('in'))
-        self.message_port_register_out(pmt.intern('out'))
-        self.message_port_register_out(pmt.intern('drop'))
-        self.message_port_register_in(pmt.intern('config'))
+        self.message_port_register_in(pager_pdu.IN)
+        self.message_port_register_out(pager_pdu.OUT)
+        self.message_port_register_out(pager_pdu.DROP)
+        self.message_port_register_in(pager_pdu.CONFIG)
 
-        self.set_msg_handler(pmt.intern('in'), self._handle)
-        self.set_msg_handler(pmt.intern('config'), self.handle_config)
+        self.set_msg_handler(pager_pdu.IN, self._handle)
+        self.set_msg_handler(pager_pdu.CONFIG, self.handle_config)
 
     def handle_config(self, msg):
-        if pmt.is_dict(msg) and pmt.dict_has_key(msg, pmt.intern("my_addr")):
-            new_addr = pmt.to_long(pmt.dict_ref(msg, pmt.intern("my_addr"), pmt.PMT_NIL))
-            self.my_addr = new_addr & 0xFF
+        self.my_addr = pager_pdu.meta_long(msg, pager_pdu.MY_ADDR, self.my_addr) & 0xFF
 
     def _handle(self, pdu):
         if not pmt.is_pair(pdu): return
         meta, pl = pmt.car(pdu), pmt.cdr(pdu)
+        if pager_pdu.is_batch(pl): return self._handle_batch(meta, pl)
         if not pmt.is_u8vector(pl): return
 
-        data = bytes(pmt.u8vector_elements(pl))
+        data = pager_pdu.pdu_bytes(pl)
         
         # 1. Search for Preamble
         start_idx = data.find(self.preamble)
@@ -71,37 +60,70 @@ class ack_address_filter_rx(gr.basic_block):
         if len(data) < payload_idx + self.ACK_CONTENT_LEN:
             return
 
-        # Extract exactly one ACK frame
-        frame = data[payload_idx : payload_idx + self.ACK_CONTENT_LEN]
-
-        dest = frame[0]
-        msg_type = frame[1]
+        dest = data[payload_idx]
+        msg_type = data[payload_idx + 1]
 
         # 2. Check Address
         if dest != self.my_addr:
             return
 
         # 3. Check Type (Must be 0x02 for ACK)
-        if msg_type != 0x02:
+        if msg_type != pager_pdu.TYPE_ACK:
             return 
 
-        # 4. Strip Dest(1) + Type(1) -> Keep [ NEXT_SEQ | PAYLOAD | CRC ]
-        # Offset = 2
-        stripped = frame[2:]
+        # 4. Strip Dest(1) + Type(1) + Src(1) -> Keep exactly one [ NEXT_SEQ | PAYLOAD | CRC ]
+        # Offset = 3; a view, copied once into the PDU
+        src = data[payload_idx + 2]
+        stripped = memoryview(data)[payload_idx + 3 : payload_idx + self.ACK_CONTENT_LEN]
         
         next_seq = stripped[0]
 
         out_meta = meta
         try:
-            out_meta = pmt.dict_add(out_meta, pmt.intern("dest_addr"), pmt.from_long(int(dest)))
-            out_meta = pmt.dict_add(out_meta, pmt.intern("next_seq"), pmt.from_long(int(next_seq)))
+            out_meta = pmt.dict_add(out_meta, pager_pdu.DEST_ADDR, pmt.from_long(int(dest)))
+            out_meta = pmt.dict_add(out_meta, pager_pdu.SRC_ADDR, pmt.from_long(int(src)))
+            out_meta = pmt.dict_add(out_meta, pager_pdu.NEXT_SEQ, pmt.from_long(int(next_seq)))
+        except: pass
+
+        self.message_port_pub(pager_pdu.OUT, pager_pdu.make_pdu(out_meta, stripped))
+
+    def _handle_batch(self, meta, pl):
+        frames = pager_pdu.batch_frames(pl)
+        n = len(frames)
+        rows = pager_pdu.batch_rows(frames)
+        P = len(self.preamble)
+        if rows is None or rows.shape[1] < P + self.ACK_CONTENT_LEN:
+            # Frames of different lengths (or too short): one at a time
+            for i in range(n):
+                self._handle(pmt.cons(pager_pdu.frame_meta(meta, n, i), pmt.vector_ref(pl, i)))
+            return
+
+        # Header fields of all frames at once; the preamble is searched for only where it is not at the start
+        aligned = (rows[:, :P] == self._pre).all(axis=1)
+        dest, msg_type, src = rows[:, P], rows[:, P + 1], rows[:, P + 2]
+        accept = aligned & (dest == self.my_addr) & (msg_type == pager_pdu.TYPE_ACK)
+
+        for i in np.flatnonzero(~aligned):
+            self._handle(pmt.cons(pager_pdu.frame_meta(meta, n, i), pmt.vector_ref(pl, i)))
+        if not accept.any():
+            return
+
+        # Strip Dest(1) + Type(1) + Src(1) -> Keep exactly one [ NEXT_SEQ | PAYLOAD | CRC ] per frame
+        stripped = rows[accept, P + 3 : P + self.ACK_CONTENT_LEN]
+
+        out_meta = meta
+        try:
+            out_meta = pager_pdu.take_rows(out_meta, n, accept)
+            out_meta = pmt.dict_add(out_meta, pager_pdu.DEST_ADDR, pager_pdu.u8vector(dest[accept]))
+            out_meta = pmt.dict_add(out_meta, pager_pdu.SRC_ADDR, pager_pdu.u8vector(src[accept]))
+            out_meta = pmt.dict_add(out_meta, pager_pdu.NEXT_SEQ, pager_pdu.u8vector(stripped[:, 0]))
         except: pass
 
-        self.message_port_pub(pmt.intern('out'), pmt.cons(out_meta, pmt.init_u8vector(len(stripped), list(stripped))))
+        for frame in pager_pdu.frame_pdus(out_meta, stripped):
+            self.message_port_pub(pager_pdu.OUT, frame)
 
     def _emit_drop(self, meta, bytes_list, reason):
         try:
-            m = pmt.dict_add(meta, pmt.intern("drop_reason"), pmt.intern(str(reason)))
-            v = pmt.init_u8vector(len(bytes_list), list(bytes_list))
-            self.message_port_pub(pmt.intern('drop'), pmt.cons(m, v))
-        except: pass
\ No newline at end of file
+            m = pmt.dict_add(meta, pager_pdu.DROP_REASON, pmt.intern(str(reason)))
+            self.message_port_pub(pager_pdu.DROP, pager_pdu.make_pdu(m, bytes_list))
+        except: pass
@@ -0,0 +1,309 @@
+"""
+Local Messaging API (used by the Chat GUI and the headless block)
+
+A Unix-socket server next to the messaging block, for programs that
+page at volume. One JSON object per line in both directions:
+
+  client -> node
+    {"op": "send", "req": 1, "messages": [{"dest": 20, "text": "...", "priority": 2}, ...]}
+    {"op": "subscribe", "req": 2}          also stream received messages
+    {"op": "stats", "req": 3}
+  node -> client
+    {"req": 1, "ok": true, "msg_ids": [41, 42]}
+    {"req": 1, "ok": false, "error": "queue full"}
+    {"event": "delivered", "msg_id": 41, "dest": 20, "latency_ms": 812.5}
+    {"event": "failed", "msg_id": 42, "dest": 20, "latency_ms": 3312.0}
+    {"event": "rx", "src": 20, "seq": 7, "text": "..."}
+
+msg_ids are handed out by the API when a batch is accepted; delivery
+events go back on the connection that sent the message. Accepted
+messages wait in a priority queue (higher priority first, then FIFO)
+and at most `max_outstanding` of them are handed to the radio at a
+time: the ARQ is stop-and-wait, so anything queued behind it could no
+longer be overtaken by an urgent page.
+
+The server runs its own asyncio loop in a thread, or on the loop of a
+pager_engine.MacEngine (start(engine.loop)), where sends reach the ARQ
+and delivery events reach the socket without a thread handoff. It hooks
+into the node as a MessagingCore listener, with its own DeliveryTracker,
+so ticks in the GUI and receipts on the socket do not interfere.
+
+PagerClient is the asyncio client:
+    async with PagerClient("/tmp/pager_node_15.sock") as c:
+        ids = await c.send([(20, "unit 4 to gate B", 1)])
+        async for ev in c.events(): ...
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+
+import pager_delivery
+
+MAX_BATCH = 1000
+
+
+class ApiServer:
+    """
+    Parameters
+      path            : Unix socket path (a stale socket file is replaced)
+      send            : send(text, dest) -> (msg_id, frame_ids), MessagingCore.send_pdus
+      max_outstanding : messages handed to the radio and not yet settled
+      max_queue       : messages waiting in the priority queue before sends are refused
+    """
+
+    def __init__(self, path, send, max_outstanding=4, max_queue=10000):
+        self.path = path
+        self.send = send
+        self.max_outstanding = max(1, int(max_outstanding))
+        self.max_queue = int(max_queue)
+        self.deliveries = pager_delivery.DeliveryTracker()   # core msg/frame/seq -> API msg_id
+        self._lock = threading.RLock()                       # send + register vs. ARQ events
+        self._queue = []                                     # heap of (-priority, order, msg_id)
+        self._order = itertools.count()
+        self._ids = itertools.count(1)
+        self._msgs = {}                                      # API msg_id -> [conn, dest, text, accepted_at]
+        self._outstanding = 0
+        self._subscribers = set()
+        self.counts = {"accepted": 0, "delivered": 0, "failed": 0, "rejected": 0}
+        self._loop = None
+        self._shared = False                                 # on a MacEngine's loop: events arrive on it
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    # --- lifecycle (flowgraph thread) ---
+    def start(self, loop=None):
+        """ Own loop in a thread, or `loop`, already running in another thread """
+        if loop is not None:
+            self._loop, self._shared = loop, True
+            asyncio.run_coroutine_threadsafe(self._listen(), loop).result(5.0)
+            return
+        self._thread = threading.Thread(target=self._run, name="pager-api", daemon=True)
+        self._thread.start()
+        self._ready.wait(5.0)
+
+    def stop(self):
+        if self._loop is None: return
+        if self._shared:
+            if self._loop.is_running():
+                asyncio.run_coroutine_threadsafe(self._close(), self._loop).result(2.0)
+        else:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=2.0)
+        try: os.unlink(self.path)
+        except OSError: pass
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._listen())
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            self._loop.close()
+
+    async def _listen(self):
+        if os.path.exists(self.path): os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+        print(f"[API] Listening on {self.path}")
+
+    async def _close(self):
+        self._server.close()
+        for writer in list(self._subscribers) + [m[0] for m in self._msgs.values()]:
+            writer.close()
+
+    # --- connections (API loop) ---
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                req = None
+                try:
+                    req = json.loads(line)
+                    reply = self._request(writer, req)
+                except (ValueError, TypeError, KeyError) as e:
+                    reply = {"req": req.get("req") if isinstance(req, dict) else None, "ok": False, "error": str(e)}
+                self._write(writer, reply)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._subscribers.discard(writer)
+            writer.close()
+
+    def _request(self, writer, req):
+        op, rid = req["op"], req.get("req")
+        if op == "send":
+            return dict(self._accept(writer, req["messages"]), req=rid)
+        if op == "subscribe":
+            self._subscribers.add(writer)
+            return {"req": rid, "ok": True}
+        if op == "stats":
+            return dict(self.stats(), req=rid, ok=True)
+        raise ValueError(f"unknown op {op!r}")
+
+    def _accept(self, writer, messages):
+        if not isinstance(messages, list) or len(messages) > MAX_BATCH:
+            raise ValueError(f"messages must be a list of at most {MAX_BATCH}")
+        batch = []
+        for m in messages:
+            dest, text, prio = int(m["dest"]), m["text"], int(m.get("priority", 0))
+            if not 0 <= dest <= 255 or not isinstance(text, str):
+                raise ValueError(f"bad message {m!r}")
+            batch.append((dest, text, prio))
+        # All or nothing, so a client never has to work out which half of a batch got in
+        if len(self._queue) + len(batch) > self.max_queue:
+            self.counts["rejected"] += len(batch)
+            return {"ok": False, "error": "queue full"}
+        now = time.monotonic()
+        ids = []
+        for dest, text, prio in batch:
+            mid = next(self._ids)
+            self._msgs[mid] = [writer, dest, text, now]
+            heapq.heappush(self._queue, (-prio, next(self._order), mid))
+            ids.append(mid)
+        self.counts["accepted"] += len(ids)
+        self._pump()
+        return {"ok": True, "msg_ids": ids}
+
+    def _pump(self):
+        """ Hands queued messages to the radio while the window has room """
+        while self._queue and self._outstanding < self.max_outstanding:
+            _, _, mid = heapq.heappop(self._queue)
+            _, dest, text, _ = self._msgs[mid]
+            with self._lock:
+                core_id, frame_ids = self.send(text, dest)
+                self.deliveries.register(core_id, frame_ids, mid)
+            self._outstanding += 1
+
+    def _settled(self, mid, state):
+        entry = self._msgs.pop(mid, None)
+        if entry is None: return
+        writer, dest, _, accepted = entry
+        self._outstanding -= 1
+        ok = state == pager_delivery.STATUS_DELIVERED
+        self.counts["delivered" if ok else "failed"] += 1
+        self._write(writer, {"event": "delivered" if ok else "failed", "msg_id": mid, "dest": dest,
+                             "latency_ms": round((time.monotonic() - accepted) * 1000.0, 1)})
+        self._pump()
+
+    def _write(self, writer, obj):
+        if writer.is_closing(): return
+        writer.write(json.dumps(obj).encode("utf-8") + b"\n")
+
+    def stats(self):
+        return dict(self.counts, queued=len(self._queue), outstanding=self._outstanding)
+
+    # --- MessagingCore listener (flowgraph threads, or the engine loop) ---
+    def _post(self, fn, *args):
+        if self._shared:
+            fn(*args)
+        elif self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(fn, *args)
+
+    def on_rx_message(self, text, seq, src):
+        self._post(self._broadcast, {"event": "rx", "src": src, "seq": seq, "text": text})
+
+    def _broadcast(self, obj):
+        for writer in list(self._subscribers):
+            self._write(writer, obj)
+
+    def on_ack_received(self, ack_val):
+        with self._lock:
+            settled = self.deliveries.on_ack(ack_val)
+        if settled is not None: self._post(self._settled, *settled)
+
+    def on_arq_status(self, frame_id, seq, status, msg_id):
+        with self._lock:
+            if status == "sent":
+                self.deliveries.on_sent(frame_id, seq, msg_id)
+                return
+            settled = self.deliveries.on_frame(frame_id, status == "delivered", msg_id)
+        if settled is not None: self._post(self._settled, *settled)
+
+    def on_xfer_done(self, xfer_id):
+        pass
+
+
+class PagerClient:
+    """ asyncio client for ApiServer; responses are matched by request number """
+
+    def __init__(self, path):
+        self.path = path
+        self._reqs = itertools.count(1)
+        self._pending = {}                 # req -> Future
+        self._events = asyncio.Queue()
+        self._reader = self._writer = self._task = None
+
+    async def connect(self):
+        # Large limit: a stats reply or a long rx text must fit in one readline()
+        self._reader, self._writer = await asyncio.open_unix_connection(self.path, limit=1 << 20)
+        self._task = asyncio.ensure_future(self._read_loop())
+        return self
+
+    async def close(self):
+        if self._writer is None: return
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._task.cancel()
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _read_loop(self):
+        while True:
+            line = await self._reader.readline()
+            if not line: break
+            msg = json.loads(line)
+            if "event" in msg:
+                self._events.put_nowait(msg)
+                continue
+            fut = self._pending.pop(msg.get("req"), None)
+            if fut is not None and not fut.done(): fut.set_result(msg)
+        for fut in self._pending.values():
+            if not fut.done(): fut.set_exception(ConnectionError("API connection closed"))
+        self._events.put_nowait(None)
+
+    async def _call(self, **req):
+        rid = next(self._reqs)
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[rid] = fut
+        self._writer.write(json.dumps(dict(req, req=rid)).encode("utf-8") + b"\n")
+        await self._writer.drain()
+        reply = await fut
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error", "request failed"))
+        return reply
+
+    async def send(self, messages):
+        """ messages: (dest, text[, priority]) tuples or dicts; returns their msg_ids """
+        batch = [m if isinstance(m, dict) else dict(zip(("dest", "text", "priority"), m)) for m in messages]
+        return (await self._call(op="send", messages=batch))["msg_ids"]
+
+    async def subscribe(self):
+        await self._call(op="subscribe")
+
+    async def stats(self):
+        reply = await self._call(op="stats")
+        return {k: v for k, v in reply.items() if k not in ("req", "ok")}
+
+    async def next_event(self):
+        """ Next delivery / rx event, None once the connection is closed """
+        return await self._events.get()
+
+    async def events(self):
+        while True:
+            ev = await self._events.get()
+            if ev is None: return
+            yield ev
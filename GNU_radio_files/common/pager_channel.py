@@ -0,0 +1,257 @@
+"""
+Channel Emulator (hierarchical block, for loopback tests without hardware)
+
+Goes between one node's TX and the other node's RX, in place of the
+ideal ZMQ link:
+
+    burst_loss  ->  channels.channel_model  ->  awgn_snr
+    (fades)         (multipath, CFO, timing)    (noise at a given SNR)
+
+  burst_loss   Gilbert-Elliott fades: the stream is cut in chunks of
+               `burst_chunk` samples; a good chunk turns bad with
+               probability burst_p, a bad one recovers with burst_r. Bad
+               chunks carry no signal (noise only), so whole frames are
+               lost in bursts. Mean burst = burst_chunk / burst_r samples.
+  channel_model CFO in Hz (normalised by samp_rate), sample clock offset
+               in ppm, multipath FIR taps. Its own noise is not used.
+  awgn_snr     complex AWGN with its power set from the signal power, so
+               snr_db holds whatever the TX amplitude is: a running
+               average of |x|^2 over the samples above `eps` only (idle
+               zeros and faded chunks do not pull it down), or a fixed
+               `signal_power` when one is given.
+
+The TX chain only produces samples while it has a frame to send. For a
+receiver that sees a continuous stream, as with a radio, put
+gap_filler + throttle in front of the emulator: it passes the TX
+samples through and fills the idle time with zeros.
+
+pdu_link is the same idea for pager_node(phy='pdu'), whose frames skip
+the modem: it goes between one node's 'air_out' and the other's
+'air_in' and loses and delays whole frames instead of samples.
+
+  loss         probability that a frame is lost, each frame on its own
+  burst_p/_r   Gilbert-Elliott fades per frame (as burst_loss, with a
+               frame for a chunk): mean burst = 1 / burst_r frames
+  delay_ms     one-way delay, plus up to jitter_ms (uniform); frames
+               keep their order
+  rate_bps     0, or the link rate: each frame then takes its length in
+               bits / rate_bps and waits for the frames before it
+"""
+
+import collections
+import threading
+import time
+
+import numpy as np
+import pmt
+from gnuradio import channels
+from gnuradio import gr
+
+
+class burst_loss(gr.sync_block):
+    def __init__(self, burst_p=0.0, burst_r=1.0, burst_chunk=2048, seed=0):
+        gr.sync_block.__init__(self, name="burst_loss", in_sig=[np.complex64], out_sig=[np.complex64])
+        self.burst_p = float(burst_p)
+        self.burst_r = float(burst_r)
+        self.burst_chunk = max(1, int(burst_chunk))
+        self._rng = np.random.default_rng(seed)
+        self._bad = False
+        self._left = self.burst_chunk          # samples left in the current chunk
+        self.chunks = 0
+        self.bad_chunks = 0
+
+    def work(self, input_items, output_items):
+        inp, out = input_items[0], output_items[0]
+        n, i = len(out), 0
+        while i < n:
+            k = min(self._left, n - i)
+            if self._bad: out[i:i+k] = 0
+            else: out[i:i+k] = inp[i:i+k]
+            i += k
+            self._left -= k
+            if self._left == 0:
+                self._left = self.burst_chunk
+                self.chunks += 1
+                self.bad_chunks += self._bad
+                self._bad = self._rng.random() < (1.0 - self.burst_r if self._bad else self.burst_p)
+        return n
+
+
+class awgn_snr(gr.sync_block):
+    def __init__(self, snr_db=20.0, seed=0, alpha=0.05, signal_power=0.0, eps=1e-6):
+        gr.sync_block.__init__(self, name="awgn_snr", in_sig=[np.complex64], out_sig=[np.complex64])
+        self.set_snr_db(snr_db)
+        self.alpha = float(alpha)
+        self.eps = float(eps)                  # |x|^2 at or below this is not signal
+        self.set_signal_power(signal_power)
+        self._rng = np.random.default_rng(seed)
+
+    def set_snr_db(self, snr_db):
+        self.snr_db = float(snr_db)
+        self._snr_lin = 10.0 ** (self.snr_db / 10.0)
+
+    def set_signal_power(self, signal_power):
+        """ > 0: fixed signal power; 0: estimate it from the input """
+        self.fixed_power = float(signal_power) > 0
+        self.signal_power = float(signal_power) if self.fixed_power else None
+
+    def work(self, input_items, output_items):
+        inp, out = input_items[0], output_items[0]
+        n = len(out)
+        if not self.fixed_power:
+            mag2 = inp.real * inp.real + inp.imag * inp.imag
+            on = mag2[mag2 > self.eps]
+            if len(on):
+                p = float(np.mean(on))
+                self.signal_power = p if self.signal_power is None else (1 - self.alpha) * self.signal_power + self.alpha * p
+        sigma = np.sqrt((self.signal_power or 1.0) / self._snr_lin / 2.0)
+        noise = self._rng.standard_normal((2, n)).astype(np.float32) * sigma
+        out[:] = inp
+        out.real += noise[0]
+        out.imag += noise[1]
+        return n
+
+
+class gap_filler(gr.basic_block):
+    """ Copies the (bursty) input, produces zeros when none is waiting. Follow it with a throttle. """
+    def __init__(self, idle_chunk=1024):
+        gr.basic_block.__init__(self, name="gap_filler", in_sig=[np.complex64], out_sig=[np.complex64])
+        self.idle_chunk = int(idle_chunk)
+        self.set_tag_propagation_policy(gr.TPP_DONT)
+
+    def forecast(self, noutput_items, ninputs):
+        return [0] * ninputs
+
+    def general_work(self, input_items, output_items):
+        inp, out = input_items[0], output_items[0]
+        n = min(len(inp), len(out))
+        if n:
+            out[:n] = inp[:n]
+            self.consume(0, n)
+            return n
+        n = min(self.idle_chunk, len(out))
+        out[:n] = 0
+        return n
+
+
+class pdu_link(gr.basic_block):
+    """ Loss, delay and rate limit for frames as PDUs (see module docstring). Message ports: in -> out. """
+    def __init__(self, loss=0.0, burst_p=0.0, burst_r=1.0, delay_ms=0.0, jitter_ms=0.0, rate_bps=0.0, seed=0):
+        gr.basic_block.__init__(self, name="pdu_link", in_sig=None, out_sig=None)
+        self.message_port_register_in(pmt.intern("in"))
+        self.message_port_register_out(pmt.intern("out"))
+        self.set_msg_handler(pmt.intern("in"), self._handle)
+        self.loss = float(loss)
+        self.burst_p = float(burst_p)
+        self.burst_r = float(burst_r)
+        self.delay_s = float(delay_ms) / 1e3
+        self.jitter_s = float(jitter_ms) / 1e3
+        self.rate_bps = float(rate_bps)
+        self._rng = np.random.default_rng(seed)
+        self._bad = False
+        self._queue = collections.deque()      # (due, msg), due in order
+        self._cv = threading.Condition()
+        self._last_due = 0.0
+        self._link_free = 0.0                  # end of the last frame on a rate-limited link
+        self._running = False
+        self._thread = None
+        self.frames = 0
+        self.dropped = 0
+
+    def _handle(self, msg):
+        self.frames += 1
+        bad, self._bad = self._bad, self._rng.random() < (1.0 - self.burst_r if self._bad else self.burst_p)
+        if bad or (self.loss > 0 and self._rng.random() < self.loss):
+            self.dropped += 1
+            return
+        if self.delay_s <= 0 and self.jitter_s <= 0 and self.rate_bps <= 0:
+            self.message_port_pub(pmt.intern("out"), msg)
+            return
+        now = time.monotonic()
+        with self._cv:
+            due = now
+            if self.rate_bps > 0 and pmt.is_pair(msg):
+                self._link_free = max(now, self._link_free) + pmt.length(pmt.cdr(msg)) * 8 / self.rate_bps
+                due = self._link_free
+            due += self.delay_s + (self._rng.random() * self.jitter_s if self.jitter_s > 0 else 0.0)
+            self._last_due = due = max(due, self._last_due)
+            self._queue.append((due, msg))
+            self._cv.notify()
+
+    def _deliver(self):
+        while True:
+            with self._cv:
+                while self._running and not self._queue:
+                    self._cv.wait()
+                if not self._running: return
+                due, msg = self._queue[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._cv.wait(wait)
+                    continue
+                self._queue.popleft()
+            self.message_port_pub(pmt.intern("out"), msg)
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._deliver, name="pdu-link", daemon=True)
+        self._thread.start()
+        return super().start()
+
+    def stop(self):
+        with self._cv:
+            self._running = False
+            self._cv.notify()
+        if self._thread is not None: self._thread.join(timeout=1.0)
+        return super().stop()
+
+
+class channel_emulator(gr.hier_block2):
+    """
+    Parameters
+      snr_db      : signal-to-noise ratio per sample
+      cfo_hz      : carrier frequency offset, samp_rate gives the scale
+      timing_ppm  : sample clock offset between TX and RX
+      taps        : multipath FIR (complex), [1.0] for none
+      burst_p / burst_r / burst_chunk : Gilbert-Elliott fades (see module docstring)
+      signal_power : 0 to estimate it (awgn_snr), or the known TX power per sample
+    """
+
+    def __init__(self, samp_rate=600e3, snr_db=20.0, cfo_hz=0.0, timing_ppm=0.0, taps=(1.0,),
+                 burst_p=0.0, burst_r=1.0, burst_chunk=2048, seed=0, signal_power=0.0):
+        gr.hier_block2.__init__(self, "channel_emulator",
+                                gr.io_signature(1, 1, gr.sizeof_gr_complex),
+                                gr.io_signature(1, 1, gr.sizeof_gr_complex))
+        self.samp_rate = float(samp_rate)
+        self.fades = burst_loss(burst_p, burst_r, burst_chunk, seed)
+        self.channel = channels.channel_model(
+            noise_voltage=0.0,
+            frequency_offset=cfo_hz / self.samp_rate,
+            epsilon=1.0 + timing_ppm * 1e-6,
+            taps=list(taps),
+            noise_seed=seed,
+            block_tags=False)
+        self.noise = awgn_snr(snr_db, seed + 1, signal_power=signal_power)
+        self.connect((self, 0), (self.fades, 0))
+        self.connect((self.fades, 0), (self.channel, 0))
+        self.connect((self.channel, 0), (self.noise, 0))
+        self.connect((self.noise, 0), (self, 0))
+
+    def set_snr_db(self, snr_db):
+        self.noise.set_snr_db(snr_db)
+
+    def set_signal_power(self, signal_power):
+        self.noise.set_signal_power(signal_power)
+
+    def set_cfo_hz(self, cfo_hz):
+        self.channel.set_frequency_offset(cfo_hz / self.samp_rate)
+
+    def set_timing_ppm(self, timing_ppm):
+        self.channel.set_timing_offset(1.0 + timing_ppm * 1e-6)
+
+    def set_taps(self, taps):
+        self.channel.set_taps(list(taps))
+
+    def set_burst(self, burst_p, burst_r):
+        self.fades.burst_p, self.fades.burst_r = float(burst_p), float(burst_r)
+
@@ -0,0 +1,457 @@
+"""
+Virtualized Chat View (used by the Chat GUI block)
+
+The conversation is a QListView over a ChatModel; a BubbleDelegate
+paints every bubble. Nothing per message lives in Qt widgets:
+    ChatModel      : one small ChatMessage per row (text, side, time, status)
+    BubbleDelegate : shared theme, fonts and metrics; paints only the rows
+                     in the viewport and caches row heights per view width
+    ChatView       : QListView with pixel scrolling, no selection chrome
+A theme switch is one delegate update and a viewport repaint.
+Older history is loaded a page at a time: ChatView emits top_reached
+when scrolled to the top, the owner prepends a page with
+ChatModel.prepend() and the view keeps the visible bubble in place.
+Row handles returned by append() stay valid across prepends.
+
+ConversationList is the per-peer sidebar (last message, unread count).
+Only the open conversation has a ChatModel; ChatView.set_model() swaps
+it in when another peer is selected and the previous one is released.
+
+UpdateBatcher coalesces GUI work posted from the flowgraph threads
+(received messages, ACK ticks, transfer completions): events are queued
+and applied together on a ~60 Hz tick, with one model insert and one
+scroll per tick instead of a repaint per event.
+
+Bubbles are found by history id: pager_delivery.DeliveryTracker maps
+each outgoing message to the frames that carry it, so an ACK or ARQ
+status event finds its bubble with one dict lookup.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from PyQt5 import QtWidgets, QtCore, QtGui
+
+# Tick states and the frame bookkeeping are shared with the headless block
+from pager_delivery import STATUS_NONE, STATUS_SENT, STATUS_DELIVERED, STATUS_FAILED
+
+TICKS = "✓✓"
+FAILED_MARK = "⚠"
+
+
+class ChatMessage:
+    __slots__ = ("text", "is_own", "time", "status", "hid")
+
+    def __init__(self, text, is_own, time_str, status=STATUS_NONE, hid=None):
+        self.text = text
+        self.is_own = is_own
+        self.time = time_str
+        self.status = status
+        self.hid = hid                # history store id, None for system messages
+
+
+class ChatModel(QtCore.QAbstractListModel):
+    MessageRole = QtCore.Qt.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._pending = None          # rows appended inside batch(), not yet inserted
+        self._first = 0               # handle of row 0 (goes down as older pages are prepended)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid(): return None
+        msg = self._rows[index.row()]
+        if role == self.MessageRole: return msg
+        if role == QtCore.Qt.DisplayRole: return msg.text
+        return None
+
+    def messages(self):
+        return self._rows
+
+    def append(self, text, is_own, time_str, hid=None):
+        """ Adds one message, returns its handle (used for tick updates, stable across prepends) """
+        msg = ChatMessage(text, is_own, time_str, STATUS_SENT if is_own else STATUS_NONE, hid)
+        if self._pending is not None:
+            self._pending.append(msg)
+            return self._first + len(self._rows) + len(self._pending) - 1
+        row = len(self._rows)
+        self.beginInsertRows(QtCore.QModelIndex(), row, row)
+        self._rows.append(msg)
+        self.endInsertRows()
+        return self._first + row
+
+    def prepend(self, msgs):
+        """ Inserts older ChatMessages (oldest first) above the first row """
+        if not msgs: return
+        self.beginInsertRows(QtCore.QModelIndex(), 0, len(msgs) - 1)
+        self._rows[0:0] = msgs
+        self._first -= len(msgs)
+        self.endInsertRows()
+
+    def oldest_hid(self):
+        """ History id of the oldest stored message shown, None if there is none """
+        for msg in self._rows:
+            if msg.hid is not None: return msg.hid
+        return None
+
+    @contextmanager
+    def batch(self):
+        """ Appends inside the block become a single row insertion at the end """
+        if self._pending is not None:
+            yield
+            return
+        self._pending = []
+        try:
+            yield
+        finally:
+            pending, self._pending = self._pending, None
+            if pending:
+                first = len(self._rows)
+                self.beginInsertRows(QtCore.QModelIndex(), first, first + len(pending) - 1)
+                self._rows.extend(pending)
+                self.endInsertRows()
+
+    def set_delivered(self, row, time_str):
+        self._set_status(row, STATUS_DELIVERED, time_str)
+
+    def set_failed(self, row):
+        self._set_status(row, STATUS_FAILED)
+
+    def _set_status(self, handle, status, time_str=None):
+        row = handle - self._first
+        if self._pending is not None and row >= len(self._rows):
+            # Not inserted yet: the view picks the status up with the insert
+            i = row - len(self._rows)
+            if i < len(self._pending):
+                self._pending[i].status = status
+                if time_str: self._pending[i].time = time_str
+            return
+        if not 0 <= row < len(self._rows): return
+        msg = self._rows[row]
+        msg.status = status
+        if time_str: msg.time = time_str
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [self.MessageRole])
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows = []
+        self._first = 0
+        self.endResetModel()
+
+
+class BubbleDelegate(QtWidgets.QStyledItemDelegate):
+    """ Paints WhatsApp-style bubbles; all styling is shared across rows """
+    MARGIN_X, MARGIN_Y = 15, 4        # row margins (the old chat layout used 15px / 8px spacing)
+    PAD_X, PAD_TOP, PAD_BOTTOM = 8, 8, 5
+    RADIUS = 10
+    MAX_WIDTH = 0.78                  # of the viewport width
+
+    def __init__(self, theme, parent=None):
+        super().__init__(parent)
+        self.font = QtGui.QFont("Segoe UI")
+        self.font.setPixelSize(14)
+        self.time_font = QtGui.QFont("Segoe UI")
+        self.time_font.setPixelSize(11)
+        self._fm = QtGui.QFontMetrics(self.font)
+        self._tfm = QtGui.QFontMetrics(self.time_font)
+        self._heights = {}            # row -> height, valid for self._width
+        self._width = -1
+        self.set_theme(theme)
+
+    def set_theme(self, theme):
+        self.theme = theme
+        self._bg_own = QtGui.QColor(theme['bubble_own'])
+        self._bg_other = QtGui.QColor(theme['bubble_other'])
+        self._border = QtGui.QPen(QtGui.QColor(theme['border']))
+        self._text = QtGui.QColor(theme['text_primary'])
+        self._time = QtGui.QColor(theme['time_color'])
+        self._tick = QtGui.QColor(theme['tick_color'])
+        self._failed = QtGui.QColor("#d93025")
+        self._shadow = QtGui.QColor(0, 0, 0, 40)
+
+    def invalidate(self, row=None):
+        if row is None: self._heights.clear()
+        else: self._heights.pop(row, None)
+
+    def shift(self, n):
+        """ n rows were inserted at the top: cached heights move down with their rows """
+        self._heights = {row + n: h for row, h in self._heights.items()}
+
+    def _layout(self, msg, width):
+        """ (text rect size, time line width) for a bubble in a view `width` px wide """
+        max_text = max(40, int(width * self.MAX_WIDTH) - 2 * self.PAD_X)
+        text = self._fm.boundingRect(0, 0, max_text, 1 << 20, QtCore.Qt.TextWordWrap, msg.text)
+        stamp = msg.time + (" " + TICKS if msg.is_own else "")
+        return text, self._tfm.horizontalAdvance(stamp)
+
+    def sizeHint(self, option, index):
+        width = option.rect.width() or (option.widget.viewport().width() if option.widget else 400)
+        if width != self._width:
+            self._heights.clear()
+            self._width = width
+        row = index.row()
+        h = self._heights.get(row)
+        if h is None:
+            text, _ = self._layout(index.data(ChatModel.MessageRole), width)
+            h = self.PAD_TOP + text.height() + 4 + self._tfm.height() + self.PAD_BOTTOM + 2 * self.MARGIN_Y
+            self._heights[row] = h
+        return QtCore.QSize(width, h)
+
+    def paint(self, painter, option, index):
+        msg = index.data(ChatModel.MessageRole)
+        r = option.rect
+        text, stamp_w = self._layout(msg, r.width())
+        bw = max(text.width(), stamp_w) + 2 * self.PAD_X
+        bh = r.height() - 2 * self.MARGIN_Y
+        x = r.right() - self.MARGIN_X - bw if msg.is_own else r.left() + self.MARGIN_X
+        bubble = QtCore.QRectF(x, r.top() + self.MARGIN_Y, bw, bh)
+
+        painter.save()
+        painter.setRenderHint(QtGui.QPainter.Antialiasing, True)
+        painter.setPen(QtCore.Qt.NoPen)
+        painter.setBrush(self._shadow)
+        painter.drawRoundedRect(bubble.translated(1, 1), self.RADIUS, self.RADIUS)
+        painter.setPen(self._border)
+        painter.setBrush(self._bg_own if msg.is_own else self._bg_other)
+        painter.drawRoundedRect(bubble, self.RADIUS, self.RADIUS)
+
+        painter.setFont(self.font)
+        painter.setPen(self._text)
+        text_rect = QtCore.QRectF(bubble.left() + self.PAD_X, bubble.top() + self.PAD_TOP, text.width(), text.height())
+        painter.drawText(text_rect, QtCore.Qt.TextWordWrap, msg.text)
+
+        painter.setFont(self.time_font)
+        th = self._tfm.height()
+        right = bubble.right() - self.PAD_X
+        y = bubble.bottom() - self.PAD_BOTTOM - th
+        if msg.is_own:
+            mark = FAILED_MARK if msg.status == STATUS_FAILED else TICKS
+            tick_w = self._tfm.horizontalAdvance(mark)
+            painter.setPen(self._failed if msg.status == STATUS_FAILED else
+                           self._tick if msg.status == STATUS_DELIVERED else self._time)
+            painter.drawText(QtCore.QRectF(right - tick_w, y, tick_w, th), QtCore.Qt.AlignRight, mark)
+            right -= tick_w + self._tfm.horizontalAdvance(" ")
+        painter.setPen(self._time)
+        painter.drawText(QtCore.QRectF(bubble.left(), y, right - bubble.left(), th), QtCore.Qt.AlignRight, msg.time)
+        painter.restore()
+
+
+class ChatView(QtWidgets.QListView):
+    """ QListView configured for a long conversation, appended at the bottom, paged in at the top """
+    top_reached = QtCore.pyqtSignal()
+
+    def __init__(self, model, delegate, parent=None):
+        super().__init__(parent)
+        self.setModel(model)
+        self.setItemDelegate(delegate)
+        self.delegate = delegate
+        self.setVerticalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        self.verticalScrollBar().setSingleStep(20)
+        self.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
+        self.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.setResizeMode(QtWidgets.QListView.Adjust)
+        # Lay large histories out in batches so the event loop stays responsive
+        self.setLayoutMode(QtWidgets.QListView.Batched)
+        self.setBatchSize(200)
+        self.setUniformItemSizes(False)
+        self.setFocusPolicy(QtCore.Qt.ClickFocus)
+        self._watch(model)
+        self.verticalScrollBar().valueChanged.connect(self._on_scroll)
+
+    def _watch(self, model):
+        model.modelReset.connect(self.delegate.invalidate)
+        model.dataChanged.connect(self._on_data_changed)
+        model.rowsInserted.connect(self._on_rows_inserted)
+
+    def set_model(self, model):
+        """ Shows another conversation; the previous model is no longer referenced by the view """
+        old = self.model()
+        if old is not None:
+            for sig, slot in ((old.modelReset, self.delegate.invalidate), (old.dataChanged, self._on_data_changed),
+                              (old.rowsInserted, self._on_rows_inserted)):
+                sig.disconnect(slot)
+        self.delegate.invalidate()
+        self.setModel(model)
+        self._watch(model)
+
+    def _on_scroll(self, value):
+        sb = self.verticalScrollBar()
+        if value == sb.minimum() and sb.maximum() > sb.minimum():
+            self.top_reached.emit()
+
+    def _on_rows_inserted(self, parent, first, last):
+        if first == 0 and self.model().rowCount() > last + 1:
+            self.delegate.shift(last - first + 1)
+
+    def prepend_keeping_position(self, msgs):
+        """ Prepends an older page without moving the bubbles on screen """
+        top = self.indexAt(QtCore.QPoint(0, 0))
+        offset = self.visualRect(top).top() if top.isValid() else 0
+        self.model().prepend(msgs)
+        if not top.isValid(): return
+        # Batched layout would leave the new rows unplaced; heights of the old rows are cached
+        self.setLayoutMode(QtWidgets.QListView.SinglePass)
+        self.doItemsLayout()
+        self.scrollTo(self.model().index(top.row() + len(msgs)), QtWidgets.QAbstractItemView.PositionAtTop)
+        sb = self.verticalScrollBar()
+        sb.setValue(sb.value() - offset)
+        self.setLayoutMode(QtWidgets.QListView.Batched)
+
+    def _on_data_changed(self, top_left, bottom_right, roles=()):
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            self.delegate.invalidate(row)
+
+    def set_theme(self, theme):
+        self.delegate.set_theme(theme)
+        self.setStyleSheet(f"QListView {{ border: none; background-color: {theme['bg_color']}; }}"
+                           f"QListView::item:selected {{ background: transparent; }}")
+        self.viewport().update()
+
+    def keyPressEvent(self, event):
+        # Bubbles are painted, not QLabels: Ctrl+C copies the selected message
+        if event.matches(QtGui.QKeySequence.Copy) and self.currentIndex().isValid():
+            QtWidgets.QApplication.clipboard().setText(self.currentIndex().data())
+            return
+        super().keyPressEvent(event)
+
+
+class ConversationList(QtWidgets.QListWidget):
+    """ One row per peer: name, unread badge and a preview of the last message, most recent on top """
+    peer_selected = QtCore.pyqtSignal(int)
+    PREVIEW = 28
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items = {}              # peer -> QListWidgetItem
+        self._unread = {}
+        self._preview = {}
+        self.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.itemClicked.connect(lambda item: self.peer_selected.emit(item.data(QtCore.Qt.UserRole)))
+
+    def peers(self):
+        return list(self._items)
+
+    def unread(self, peer):
+        return self._unread.get(peer, 0)
+
+    def update_peer(self, peer, last_text=None, unread=None, to_top=True):
+        """ Adds the peer if new; last_text moves it to the top, unread sets the badge """
+        item = self._items.get(peer)
+        if item is None:
+            item = QtWidgets.QListWidgetItem()
+            item.setData(QtCore.Qt.UserRole, peer)
+            self._items[peer] = item
+            self.addItem(item)
+        if last_text is not None:
+            text = last_text.replace("\n", " ")
+            self._preview[peer] = text[:self.PREVIEW] + ("…" if len(text) > self.PREVIEW else "")
+        if unread is not None:
+            self._unread[peer] = unread
+        badge = f"  ({self._unread[peer]})" if self._unread.get(peer) else ""
+        item.setText(f"👤 Node {peer}{badge}\n{self._preview.get(peer, '')}")
+        font = item.font()
+        font.setBold(bool(badge))
+        item.setFont(font)
+        if to_top and last_text is not None and self.row(item) > 0:
+            current = self.currentItem()
+            self.insertItem(0, self.takeItem(self.row(item)))
+            if current is not None: self.setCurrentItem(current)
+
+    def add_unread(self, peer, last_text):
+        self.update_peer(peer, last_text, self._unread.get(peer, 0) + 1)
+
+    def set_active(self, peer):
+        self.update_peer(peer, unread=0)
+        self.setCurrentItem(self._items[peer])
+
+    def set_theme(self, theme):
+        self.setStyleSheet(f"QListWidget {{ background-color: {theme['input_area']}; color: {theme['text_primary']}; "
+                           f"border: none; border-right: 1px solid {theme['border']}; }}"
+                           f"QListWidget::item {{ padding: 8px; border-bottom: 1px solid {theme['border']}; }}"
+                           f"QListWidget::item:selected {{ background-color: {theme['bubble_own']}; "
+                           f"color: {theme['text_primary']}; }}")
+
+
+class UpdateBatcher(QtCore.QObject):
+    """
+    Thread-safe queue of GUI calls applied in batches on the GUI thread.
+    post() may be called from any thread; the first event after an idle
+    period arms a single-shot timer, so an idle GUI gets no wakeups.
+    Instrumentation: post-to-apply latency of recent events, batch sizes
+    and the time spent applying each tick.
+    """
+    _wake = QtCore.pyqtSignal()
+
+    def __init__(self, model=None, view=None, interval_ms=16, history=4096, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.view = view
+        self._q = deque()
+        self._lock = threading.Lock()
+        self._armed = False
+        self._scroll = False
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(int(interval_ms))
+        self._timer.timeout.connect(self._tick)
+        self._wake.connect(self._timer.start, QtCore.Qt.QueuedConnection)
+        # Stats
+        self.events = 0
+        self.ticks = 0
+        self.max_batch = 0
+        self.apply_s = 0.0
+        self._latency = deque(maxlen=history)
+
+    def post(self, fn, *args):
+        with self._lock:
+            self._q.append((time.monotonic(), fn, args))
+            wake = not self._armed
+            self._armed = True
+        if wake: self._wake.emit()
+
+    def scroll_to_bottom(self):
+        """ GUI thread: scroll once at the next tick """
+        self._scroll = True
+        if not self._armed:
+            self._armed = True
+            self._timer.start()
+
+    def _tick(self):
+        with self._lock:
+            batch, self._q = self._q, deque()
+            self._armed = False
+        t0 = time.monotonic()
+        if self.model is not None:
+            with self.model.batch():
+                for _, fn, args in batch: fn(*args)
+        else:
+            for _, fn, args in batch: fn(*args)
+        if self._scroll and self.view is not None:
+            self.view.scrollToBottom()
+        self._scroll = False
+        t1 = time.monotonic()
+        for posted, _, _ in batch:
+            self._latency.append(t1 - posted)
+        self.events += len(batch)
+        self.ticks += 1
+        self.max_batch = max(self.max_batch, len(batch))
+        self.apply_s += t1 - t0
+
+    def stats(self):
+        lat = sorted(self._latency)
+        pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] * 1000.0 if lat else 0.0
+        return {
+            "events": self.events, "ticks": self.ticks, "max_batch": self.max_batch,
+            "mean_batch": self.events / self.ticks if self.ticks else 0.0,
+            "latency_p50_ms": pct(0.50), "latency_p99_ms": pct(0.99), "latency_max_ms": pct(1.0),
+            "apply_ms_per_tick": self.apply_s * 1000.0 / self.ticks if self.ticks else 0.0,
+            "apply_us_per_event": self.apply_s * 1e6 / self.events if self.events else 0.0,
+        }
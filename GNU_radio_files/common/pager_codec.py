@@ -0,0 +1,74 @@
+"""
+Paging Payload Compression (used by the Chat GUI block)
+
+Raw DEFLATE (no zlib header/trailer) primed with a preset dictionary of
+typical paging text. Short pages ("ACK", status codes, canned replies)
+compress poorly on their own; with the dictionary most of them shrink to
+a handful of back-references.
+
+Both ends must hold the exact same dictionary, so it is versioned
+(CODEC_ID) and only used after the peer has advertised that ID:
+    CAPS?:<ids>   hello / capability query
+    CAPS!:<ids>   answer
+"""
+
+import zlib
+from collections import Counter
+
+CODEC_ID = "zd1"
+
+CAPS_QUERY_PREFIX = "CAPS?:"
+CAPS_REPLY_PREFIX = "CAPS!:"
+
+# Most frequent material last: DEFLATE reaches the end of the window cheapest.
+_PHRASES = [
+    "FILE:", ".txt", "XBLK:", "XFER?:", "XFER!:",
+    "Battery low", "Signal lost", "Link restored", "Out of range",
+    "Maintenance window", "Shift change at ", "Call dispatch on ",
+    "Meet at the ", "north gate", "south gate", "main entrance", "control room",
+    "Reply when free", "Please confirm", "Running late", "On my way",
+    "Thank you", "Thanks", "See you", "Call me", "Call back ASAP",
+    "STATUS: ", "CODE ", "ALERT: ", "PRIORITY: HIGH", "PRIORITY: LOW",
+    "Unit ", "Room ", "Node ", "Team ", "minutes", "hours", "today", "tomorrow",
+    "OK", "NO", "YES", "ACK", "NACK", "Copy that", "Roger", "Standing by",
+    "Received", "Message received", "Will do", "Understood",
+    "Where are you?", "What is your status?", "Are you available?",
+    "All clear", "Emergency", "Urgent: ", "Test message", "Hello ",
+    "the ", "you ", "and ", " to ", " at ", " is ", " for ", " on ", " in ",
+    " please", " now", ". ", ", ", "? ", "! ",
+]
+PAGING_DICT = "".join(_PHRASES).encode("utf-8")
+
+
+def compress(data, zdict=PAGING_DICT):
+    c = zlib.compressobj(9, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, zdict)
+    return c.compress(data) + c.flush()
+
+def decompress(data, zdict=PAGING_DICT):
+    """ Trailing bytes after the end of the DEFLATE stream (frame padding) are ignored """
+    d = zlib.decompressobj(-15, zdict)
+    return d.decompress(data)
+
+
+def train_dictionary(samples, size=1024, min_len=3, max_len=24):
+    """
+    Greedy substring dictionary from a corpus of pages.
+    Score = documents containing the substring * bytes it saves.
+    """
+    df = Counter()
+    for s in samples:
+        seen = set()
+        for n in range(min_len, max_len + 1):
+            for i in range(len(s) - n + 1):
+                seen.add(s[i:i + n])
+        df.update(seen)
+
+    ranked = sorted(((c * (len(sub) - 2), sub) for sub, c in df.items() if c > 1), reverse=True)
+    picked, total = [], 0
+    for _, sub in ranked:
+        if total + len(sub) > size: continue
+        if any(sub in p for p in picked): continue
+        picked.append(sub)
+        total += len(sub)
+    # Highest score at the end of the dictionary
+    return b"".join(reversed(picked))
@@ -0,0 +1,577 @@
+"""
+AES-CTR Helpers (used by the PDU AES Encrypt / Decrypt blocks)
+
+Counter blocks follow pycryptodome's AES.new(key, MODE_CTR, nonce=<8B>):
+    NONCE(8B) | BLOCK_COUNTER(8B, big-endian, starts at 0)
+so the keystream for a frame is simply ECB(key, counter blocks). One ECB
+object per key is reused, so the key schedule is never rebuilt per frame.
+
+KeystreamPool keeps a background thread filling a queue of
+(nonce, keystream) pairs; encrypting a frame on the hot path is then a
+queue pop and an XOR.
+
+Implicit nonces ("implicit" mode) replace the 8-byte random nonce on the
+wire with a 2-byte compact counter:
+    SESSION = SESSION_ID(8B random) | SRC_ADDR(1B)
+    KEY     = HKDF(link key, SESSION)     (one key per session)
+    NONCE   = FRAME_COUNTER(8B)
+    DATA    = [ CTR_LO(2B) | CIPHERTEXT ]
+    SYNC    = [ 0xFFFF | SESSION(9B) | REF_COUNTER(4B) | 0x00... ]
+Every session (restart, key or address change, counter rotation) runs
+under its own key, so counters restarting at 0 never repeat a keystream,
+and two sessions share a key only if their 64-bit IDs collide. The
+sender keeps one session per destination (PeerSender), so changing
+target does not start a new one.
+The receiver rebuilds the full counter from CTR_LO and the highest
+counter seen; frames outside its window are dropped until the next SYNC.
+
+AEAD mode (AES-GCM, truncated tag) seals [SEQ | CTR_LO | PLAINTEXT] in
+one call with the link header as associated data, replacing both the
+CRC-32 trailer and the separate CTR pass:
+    FRAME  = [ SEQ(1B) | CTR_LO(2B) | CIPHERTEXT | TAG ]
+    AAD    = [ DEST | TYPE | SEQ | CTR_LO ]
+    NONCE  = 0(4B) | FRAME_COUNTER(8B)     (session key; bit 63 set for SYNC frames)
+SYNC frames carry SESSION and REF_COUNTER in the clear (inside the AAD)
+with an empty ciphertext, so they are authenticated too.
+
+Per-peer keys: each pair of addresses gets its own link key, derived
+with HKDF-SHA256 from the shared aes_key (both ends compute the same
+key from the sorted address pair). KeyManager keeps the expanded
+cipher contexts of the most recently used peers in an LRU, and each of
+them the contexts of that link's most recent session keys.
+
+Replay protection keeps constant memory per peer: a sliding window
+(highest counter + bitmap) for counter nonces, and a rotating pair of
+Bloom filters for random nonces.
+"""
+
+import hmac
+import os
+import threading
+from collections import OrderedDict, deque
+
+from Crypto.Cipher import AES
+from Crypto.Hash import SHA256
+from Crypto.Protocol.KDF import HKDF
+
+NONCE_LEN = 8
+
+CTR_WIRE_LEN = 2
+SYNC_MARKER = b"\xFF\xFF"
+SESSION_ID_LEN = 8
+SESSION_LEN = SESSION_ID_LEN + 1        # SESSION_ID | SRC_ADDR
+COUNTER_LIMIT = 0xFFFFFFFF              # REF_COUNTER is 4 bytes on the wire
+ROTATE_AT = COUNTER_LIMIT - 0xFFFF      # headroom for keystreams already in a pool
+
+
+def parse_key_hex(key_hex):
+    """ AES key from hex (16/24/32 bytes => 32/48/64 hex chars) """
+    key_hex = key_hex.replace(" ", "")
+    try:
+        key = bytes.fromhex(key_hex)
+    except ValueError:
+        raise ValueError("key_hex must be valid hex")
+    if len(key) not in (16, 24, 32):
+        raise ValueError("AES key must be 16, 24, or 32 bytes (32/48/64 hex chars)")
+    return key
+
+def xor_bytes(data, keystream):
+    n = len(data)
+    return (int.from_bytes(data, "big") ^ int.from_bytes(keystream[:n], "big")).to_bytes(n, "big")
+
+
+class CtrKeystream:
+    """ AES-CTR keystream generator bound to one key """
+    def __init__(self, key):
+        self._ecb = AES.new(key, AES.MODE_ECB)
+
+    def keystream(self, nonce, length):
+        nblocks = (length + 15) // 16
+        ctr_blocks = b"".join(nonce + i.to_bytes(8, "big") for i in range(nblocks))
+        return self._ecb.encrypt(ctr_blocks)[:length]
+
+    def crypt(self, nonce, data):
+        """ Encrypt or decrypt (CTR is symmetric) """
+        return xor_bytes(data, self.keystream(nonce, len(data)))
+
+
+class KeystreamPool:
+    """
+    Precomputed (nonce, keystream) pairs for the encrypt hot path.
+    Nonces are random unless nonce_fn is given (e.g. NonceCounter.next_nonce).
+    take() never blocks: if the pool runs dry it computes one inline and
+    counts a miss.
+    """
+    def __init__(self, key, length=32, size=256, nonce_fn=None):
+        self.length = int(length)
+        self.size = int(size)
+        self._gen = CtrKeystream(key)
+        self._nonce_fn = nonce_fn
+        self._generation = 0
+        self._pool = deque()
+        self._cv = threading.Condition()
+        self._run = threading.Event()
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+
+    def _make(self):
+        nonce = self._nonce_fn() if self._nonce_fn else os.urandom(NONCE_LEN)
+        return nonce, self._gen.keystream(nonce, self.length)
+
+    def reset(self, nonce_fn=None, keystream=None):
+        """ Drop every precomputed item (new session, or a new key via a CtrKeystream) """
+        with self._cv:
+            self._generation += 1
+            self._nonce_fn = nonce_fn
+            if keystream is not None:
+                self._gen = keystream
+            self._pool.clear()
+            self._cv.notify()
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        self._run.set()
+        self._thread = threading.Thread(target=self._fill_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._run.clear()
+        with self._cv: self._cv.notify_all()
+        if self._thread: self._thread.join(timeout=1.0)
+
+    def fill(self):
+        """ Top the pool up synchronously (used at start and by benchmarks) """
+        while len(self._pool) < self.size:
+            self._pool.append(self._make())
+
+    def _fill_loop(self):
+        while self._run.is_set():
+            with self._cv:
+                while self._run.is_set() and len(self._pool) >= self.size:
+                    self._cv.wait(timeout=0.5)
+                generation = self._generation
+            if not self._run.is_set(): break
+            # Generate outside the lock, discard it if a reset happened meanwhile
+            item = self._make()
+            with self._cv:
+                if generation == self._generation:
+                    self._pool.append(item)
+
+    def peek_nonce(self):
+        """ Nonce the next take() hands out, or None if the pool is empty """
+        try:
+            return self._pool[0][0]
+        except IndexError:
+            return None
+
+    def take(self):
+        try:
+            item = self._pool.popleft()
+            self.hits += 1
+        except IndexError:
+            item = self._make()
+            self.misses += 1
+        if len(self._pool) < self.size // 2:
+            with self._cv: self._cv.notify()
+        return item
+
+    def encrypt(self, plaintext):
+        """ Returns (nonce, ciphertext) """
+        if len(plaintext) > self.length:
+            nonce = self._nonce_fn() if self._nonce_fn else os.urandom(NONCE_LEN)
+            return nonce, self._gen.crypt(nonce, plaintext)
+        nonce, ks = self.take()
+        return nonce, xor_bytes(plaintext, ks)
+
+
+# --- Per-peer keys ---
+
+def derive_link_key(master, addr_a, addr_b):
+    """ HKDF-SHA256 key for the link between two addresses (symmetric in a, b) """
+    lo, hi = sorted((addr_a & 0xFF, addr_b & 0xFF))
+    return HKDF(master, len(master), b"pager-link-v1", SHA256, context=bytes([lo, hi]))
+
+def derive_session_key(link_key, session):
+    """ HKDF-SHA256 key for one implicit-nonce session (SESSION_ID | SRC) on a link """
+    return HKDF(link_key, len(link_key), b"pager-session-v1", SHA256, context=session)
+
+class PeerContext:
+    """ Ready-to-use cipher state for one peer (or one session on its link) """
+    __slots__ = ("peer", "key", "tag_len", "ctr", "gcm", "_sessions")
+
+    SESSIONS = 4
+
+    def __init__(self, peer, key, tag_len=None):
+        self.peer = peer
+        self.key = key
+        self.tag_len = tag_len
+        self.ctr = CtrKeystream(key)
+        self.gcm = GcmContext(key, tag_len) if tag_len else None
+        self._sessions = OrderedDict()   # session -> PeerContext
+
+    def session(self, session):
+        """ Context for a session's key, kept for the link's last few sessions """
+        ctx = self._sessions.get(session)
+        if ctx is None:
+            ctx = PeerContext(self.peer, derive_session_key(self.key, session), self.tag_len)
+            self._sessions[session] = ctx
+            while len(self._sessions) > self.SESSIONS:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session)
+        return ctx
+
+class KeyManager:
+    """
+    Per-peer link keys and their expanded contexts, LRU-bounded.
+    get() on the frame path is a dict lookup; prefetch() builds a
+    context ahead of time (e.g. when the GUI switches target).
+    derive=False gives every peer the master key (one network-wide key).
+    """
+    def __init__(self, master, my_addr=0, capacity=8, tag_len=None, derive=True):
+        self.capacity = max(1, int(capacity))
+        self.tag_len = tag_len
+        self.derive = bool(derive)
+        self._lock = threading.Lock()
+        self._ctx = OrderedDict()   # peer -> PeerContext
+        self.hits = 0
+        self.misses = 0
+        self.master = master
+        self.my_addr = my_addr & 0xFF
+
+    def set_master(self, master):
+        with self._lock:
+            self.master = master
+            self._ctx.clear()
+
+    def set_my_addr(self, my_addr):
+        with self._lock:
+            if (my_addr & 0xFF) != self.my_addr:
+                self.my_addr = my_addr & 0xFF
+                if self.derive: self._ctx.clear()
+
+    def get(self, peer):
+        peer &= 0xFF
+        with self._lock:
+            ctx = self._ctx.get(peer)
+            if ctx is not None:
+                self._ctx.move_to_end(peer)
+                self.hits += 1
+                return ctx
+            self.misses += 1
+            master, my_addr = self.master, self.my_addr
+        # Key schedule outside the lock
+        key = derive_link_key(master, my_addr, peer) if self.derive else master
+        ctx = PeerContext(peer, key, self.tag_len)
+        with self._lock:
+            if master is self.master and my_addr == self.my_addr:
+                self._ctx[peer] = ctx
+                self._ctx.move_to_end(peer)
+                while len(self._ctx) > self.capacity:
+                    self._ctx.popitem(last=False)
+        return ctx
+
+    def prefetch(self, peer):
+        with self._lock:
+            if (peer & 0xFF) in self._ctx: return
+        self.get(peer)
+        self.misses -= 1   # not a frame-path miss
+
+
+# --- Implicit nonces ---
+
+def implicit_nonce(counter):
+    """ CTR nonce under a session key: the frame counter """
+    return counter.to_bytes(NONCE_LEN, "big")
+
+class NonceCounter:
+    """
+    Sender side: session ID + monotonically increasing frame counter.
+    `rotated` is set once the counter nears COUNTER_LIMIT; the caller
+    then starts a new session (new key) and resyncs. The counter itself
+    never wraps.
+    """
+    def __init__(self, src_addr=0):
+        self._lock = threading.Lock()
+        self.new_session(src_addr)
+
+    def new_session(self, src_addr=None):
+        with self._lock:
+            if src_addr is not None:
+                self.src_addr = src_addr & 0xFF
+            self.session = os.urandom(SESSION_ID_LEN) + bytes([self.src_addr])
+            self.counter = 0
+            self.rotated = False
+
+    def next_nonce(self):
+        with self._lock:
+            c = self.counter
+            self.counter += 1
+            # CTR_LO == 0xFFFF is the SYNC marker on the wire
+            if (self.counter & 0xFFFF) == 0xFFFF:
+                self.counter += 1
+            if c > COUNTER_LIMIT:
+                raise OverflowError("session counter exhausted without a new session")
+            if self.counter >= ROTATE_AT:
+                # Near the end of the counter space: caller starts a new session
+                self.rotated = True
+            return implicit_nonce(c)
+
+    def sync_frame(self, length, ref=None):
+        """ SYNC payload announcing the session and a reference counter (default: the next one) """
+        with self._lock:
+            if ref is None: ref = self.counter
+            body = SYNC_MARKER + self.session + ref.to_bytes(4, "big")
+        return body + b"\x00" * (length - len(body))
+
+class PeerSender:
+    """
+    Encrypt-side state for one destination: its nonce counter (implicit
+    mode), keystream pool and SYNC spacing. The sender keeps one per
+    destination, so switching peers and back resumes the session instead
+    of starting a new one and discarding the precomputed keystreams.
+    """
+    __slots__ = ("peer", "counter", "gen", "pool", "frames_since_sync")
+
+    def __init__(self, peer, ctx, src_addr=0, implicit=False, length=32, pool_size=0):
+        self.peer = peer
+        self.counter = NonceCounter(src_addr) if implicit else None
+        self.gen = ctx.ctr
+        self.pool = None
+        if pool_size > 0:
+            self.pool = KeystreamPool(ctx.key, length=length, size=pool_size)
+        self.frames_since_sync = None   # None = SYNC due before the next frame
+        if implicit: self.new_session(ctx)
+
+    def new_session(self, ctx):
+        """ Fresh session ID and counter; every session encrypts under its own key """
+        self.counter.new_session()
+        self.gen = ctx.session(self.counter.session).ctr
+        if self.pool: self.pool.reset(self.counter.next_nonce, self.gen)
+        self.frames_since_sync = None
+
+    def next_nonce(self):
+        return self.counter.next_nonce() if self.counter else os.urandom(NONCE_LEN)
+
+    def sync_frame(self, length):
+        """
+        SYNC referencing the counter of the next frame. A pool has already
+        drawn its keystreams' counters, so that is the pool head, up to
+        pool_size behind the generator.
+        """
+        nonce = self.pool.peek_nonce() if self.pool else None
+        return self.counter.sync_frame(length, int.from_bytes(nonce, "big") if nonce else None)
+
+    def encrypt(self, plaintext):
+        """ Returns (nonce, ciphertext) """
+        if self.pool: return self.pool.encrypt(plaintext)
+        nonce = self.next_nonce()
+        return nonce, self.gen.crypt(nonce, plaintext)
+
+class ReplayWindow:
+    """
+    Sliding anti-replay window over frame counters (RFC 4303 style):
+    the highest counter accepted plus a bitmap of the `size` counters
+    below it. Anything older than the window counts as a replay.
+    """
+    def __init__(self, size=1024):
+        self.size = int(size)
+        self._mask = (1 << self.size) - 1
+        self.reset()
+
+    def reset(self):
+        self.highest = None
+        self.bitmap = 0
+
+    def check(self, counter):
+        """ True if the counter has not been accepted yet """
+        if self.highest is None or counter > self.highest:
+            return True
+        d = self.highest - counter
+        return d < self.size and not (self.bitmap >> d) & 1
+
+    def update(self, counter):
+        if self.highest is None:
+            self.highest, self.bitmap = counter, 1
+        elif counter > self.highest:
+            self.bitmap = ((self.bitmap << (counter - self.highest)) | 1) & self._mask
+            self.highest = counter
+        else:
+            self.bitmap |= 1 << (self.highest - counter)
+
+class CounterWindow:
+    """ Receiver side: rebuilds full frame counters from CTR_LO for one peer """
+    def __init__(self, window=1024, retired=8):
+        self.window = int(window)
+        self.session = None
+        self.highest = None
+        self.replay = ReplayWindow(window)
+        self._retired = deque(maxlen=retired)
+
+    def sync(self, session, ref_counter):
+        """ False if the SYNC names a session this peer already left (replayed SYNC) """
+        if session in self._retired:
+            return False
+        if session != self.session or self.highest is None:
+            if self.session is not None:
+                self._retired.append(self.session)
+            self.session = session
+            self.highest = ref_counter - 1
+            self.replay.reset()
+        else:
+            self.highest = max(self.highest, ref_counter - 1)
+        return True
+
+    def resolve(self, ctr_lo):
+        """ Full counter for CTR_LO, or None if unknown session / out of window """
+        if self.session is None:
+            return None
+        h = self.highest
+        cand = (h & ~0xFFFF) | ctr_lo
+        if cand - h > 0x8000: cand -= 0x10000
+        elif h - cand > 0x8000: cand += 0x10000
+        if cand < 0 or abs(cand - h) > self.window:
+            return None
+        return cand
+
+    def fresh(self, counter):
+        return self.replay.check(counter)
+
+    def accept(self, counter):
+        self.highest = max(self.highest, counter)
+        self.replay.update(counter)
+
+
+class NonceFilter:
+    """
+    Replay filter for random nonces: two Bloom filters of `capacity`
+    nonces each. When the current one fills up it becomes the previous
+    one and the oldest is dropped, so memory is fixed and at least the
+    last `capacity` nonces are always remembered.
+    Nonces are uniformly random, so their own bits serve as the hashes.
+    """
+    def __init__(self, capacity=4096, bits_per_item=32, hashes=10):
+        self.capacity = int(capacity)
+        self.nbits = self.capacity * int(bits_per_item)
+        self.hashes = int(hashes)
+        self._cur = bytearray((self.nbits + 7) // 8)
+        self._prev = bytearray(len(self._cur))
+        self._count = 0
+
+    def seen(self, nonce):
+        v = int.from_bytes(nonce, "big")
+        h1, h2 = v & 0xFFFFFFFF, (v >> 32) | 1
+        for bits in (self._cur, self._prev):
+            # Early exit on the first clear bit: a fresh nonce usually costs 1-2 probes
+            p = h1
+            for _ in range(self.hashes):
+                q = p % self.nbits
+                if not bits[q >> 3] >> (q & 7) & 1:
+                    break
+                p += h2
+            else:
+                return True
+        return False
+
+    def add(self, nonce):
+        if self._count >= self.capacity:
+            self._prev, self._cur = self._cur, self._prev
+            self._cur[:] = bytes(len(self._cur))
+            self._count = 0
+        v = int.from_bytes(nonce, "big")
+        p, h2 = v & 0xFFFFFFFF, (v >> 32) | 1
+        for _ in range(self.hashes):
+            q = p % self.nbits
+            self._cur[q >> 3] |= 1 << (q & 7)
+            p += h2
+        self._count += 1
+
+
+# --- AEAD (AES-GCM) ---
+
+def aead_nonce(counter, sync=False):
+    """ GCM nonce under a session key """
+    return bytes(4) + (((1 << 63) if sync else 0) | counter).to_bytes(8, "big")
+
+def aead_aad(dest, msg_type, seq, ctr_lo_bytes):
+    return bytes([dest & 0xFF, msg_type & 0xFF, seq & 0xFF]) + ctr_lo_bytes
+
+_GF_R = 0xE1 << 120
+
+def _ghash_tables(h):
+    """ T[p][b] = (byte b at position p of a block) * H in GF(2^128), GCM bit order """
+    powers = []
+    v = int.from_bytes(h, "big")
+    for _ in range(128):
+        powers.append(v)
+        v = (v >> 1) ^ _GF_R if v & 1 else v >> 1
+    tables = []
+    for p in range(16):
+        t = [0] * 256
+        for b in range(1, 256):
+            low = b & -b
+            t[b] = t[b ^ low] ^ powers[8 * p + 7 - (low.bit_length() - 1)]
+        tables.append(t)
+    return tables
+
+class GcmContext:
+    """
+    AES-GCM seal/open (12-byte nonces) with a truncated tag (4..16 bytes).
+    The AES key schedule and the GHASH tables for the key are built once
+    per context (lazily, on the first frame), so a frame costs one ECB call
+    over its counter blocks plus table lookups. A pycryptodome GCM object
+    per frame would rebuild two CTR ciphers, an ECB and the GHASH key each
+    time.
+    """
+    def __init__(self, key, tag_len=4):
+        if not 4 <= int(tag_len) <= 16:
+            raise ValueError("tag_len must be 4..16 bytes")
+        self.key = key
+        self.tag_len = int(tag_len)
+        self._ecb = None
+        self._tables = None
+
+    def _prepare(self):
+        ecb = AES.new(self.key, AES.MODE_ECB)
+        self._tables = _ghash_tables(ecb.encrypt(bytes(16)))
+        self._ecb = ecb
+
+    def _ghash(self, aad, ct):
+        t0, t1, t2, t3, t4, t5, t6, t7, t8, t9, t10, t11, t12, t13, t14, t15 = self._tables
+        data = aad + bytes(-len(aad) % 16) + ct + bytes(-len(ct) % 16)
+        data += (8 * len(aad)).to_bytes(8, "big") + (8 * len(ct)).to_bytes(8, "big")
+        y = 0
+        for i in range(0, len(data), 16):
+            x = y ^ int.from_bytes(data[i:i + 16], "big")
+            y = (t0[x >> 120] ^ t1[(x >> 112) & 0xFF] ^ t2[(x >> 104) & 0xFF] ^ t3[(x >> 96) & 0xFF]
+                 ^ t4[(x >> 88) & 0xFF] ^ t5[(x >> 80) & 0xFF] ^ t6[(x >> 72) & 0xFF] ^ t7[(x >> 64) & 0xFF]
+                 ^ t8[(x >> 56) & 0xFF] ^ t9[(x >> 48) & 0xFF] ^ t10[(x >> 40) & 0xFF] ^ t11[(x >> 32) & 0xFF]
+                 ^ t12[(x >> 24) & 0xFF] ^ t13[(x >> 16) & 0xFF] ^ t14[(x >> 8) & 0xFF] ^ t15[x & 0xFF])
+        return y
+
+    def _keystream(self, nonce, length):
+        """ E(J0) for the tag, then the CTR keystream from inc32(J0) """
+        if self._ecb is None:
+            self._prepare()
+        nblocks = (length + 15) // 16 + 1
+        blocks = b"".join(nonce + (i + 1).to_bytes(4, "big") for i in range(nblocks))
+        ks = self._ecb.encrypt(blocks)
+        return ks[:16], ks[16:16 + length]
+
+    def seal(self, nonce, aad, plaintext):
+        ek0, ks = self._keystream(nonce, len(plaintext))
+        ct = xor_bytes(plaintext, ks)
+        tag = (self._ghash(aad, ct) ^ int.from_bytes(ek0, "big")).to_bytes(16, "big")
+        return ct + tag[:self.tag_len]
+
+    def open(self, nonce, aad, data):
+        """ Plaintext, or None if the tag does not match """
+        if len(data) < self.tag_len:
+            return None
+        ct, tag = data[:-self.tag_len], data[-self.tag_len:]
+        ek0, ks = self._keystream(nonce, len(ct))
+        expected = (self._ghash(aad, ct) ^ int.from_bytes(ek0, "big")).to_bytes(16, "big")
+        if not hmac.compare_digest(expected[:self.tag_len], tag):
+            return None
+        return xor_bytes(ct, ks)
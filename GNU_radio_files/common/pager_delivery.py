@@ -0,0 +1,79 @@
+"""
+Delivery Tracking (used by the Chat GUI and the headless block)
+
+Tick states of an outgoing message and the message -> frames map that
+resolves ACK and ARQ status events to it. Plain Python, so both the Qt
+view and the Qt-free messaging core can import it.
+"""
+
+
+STATUS_NONE = 0        # received / system message: time only
+STATUS_SENT = 1        # own message, gray ticks
+STATUS_DELIVERED = 2   # own message, every chunk ACKed: colored ticks
+STATUS_FAILED = 3      # own message, the ARQ gave up on one of its frames
+
+
+class DeliveryTracker:
+    """
+    Outgoing message -> frames bookkeeping for the double-tick status.
+        register(msg_id, frame_ids, row)   when the message is handed to the radio
+        on_sent(frame_id, seq, msg_id)     ARQ assigned a sequence number
+        on_frame(frame_id, ok, msg_id)     ARQ delivered / gave up on a frame
+        on_ack(ack_val)                    raw ACK (NEXT_SEQ) from the air
+    on_frame / on_ack return (row, STATUS_DELIVERED | STATUS_FAILED) once a
+    message is settled, else None. All lookups are dict operations.
+    Status events without a msg_id (control traffic, ARQ-local frame ids)
+    are ignored; a control frame's "sent" only frees its seq, so an ACK
+    for it cannot settle an older chat frame that had the same seq.
+    """
+    def __init__(self):
+        self._frame_msg = {}     # frame_id -> msg_id
+        self._msgs = {}          # msg_id -> [row, set of outstanding frame_ids]
+        self._in_flight = {}     # ARQ seq -> frame_id
+
+    def register(self, msg_id, frame_ids, row):
+        self._msgs[msg_id] = [row, set(frame_ids)]
+        for f in frame_ids:
+            self._frame_msg[f] = msg_id
+
+    def on_sent(self, frame_id, seq, msg_id):
+        if msg_id is None or self._frame_msg.get(frame_id) != msg_id:
+            self._in_flight.pop(seq & 0xFF, None)
+            return
+        self._in_flight[seq & 0xFF] = frame_id
+
+    def on_ack(self, ack_val):
+        frame_id = self._in_flight.pop((ack_val - 1) & 0xFF, None)
+        return None if frame_id is None else self._settle(frame_id, True)
+
+    def on_frame(self, frame_id, ok, msg_id):
+        if msg_id is None or self._frame_msg.get(frame_id) != msg_id: return None
+        return self._settle(frame_id, ok)
+
+    def _settle(self, frame_id, ok):
+        msg_id = self._frame_msg.pop(frame_id, None)
+        if msg_id is None: return None
+        entry = self._msgs.get(msg_id)
+        if entry is None: return None
+        row, outstanding = entry
+        outstanding.discard(frame_id)
+        if not ok:
+            self._forget(msg_id)
+            return row, STATUS_FAILED
+        if not outstanding:
+            del self._msgs[msg_id]
+            return row, STATUS_DELIVERED
+        return None
+
+    def _forget(self, msg_id):
+        _, outstanding = self._msgs.pop(msg_id)
+        for f in outstanding:
+            self._frame_msg.pop(f, None)
+
+    def pending(self):
+        return len(self._msgs)
+
+    def clear(self):
+        self._frame_msg.clear()
+        self._msgs.clear()
+        self._in_flight.clear()
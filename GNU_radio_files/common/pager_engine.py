@@ -0,0 +1,259 @@
+"""
+MAC Engine (asyncio; used by the headless block with mac_engine=True)
+
+Sequencing, retransmit timers, reassembly and the local API on one
+asyncio loop in one thread, in place of the ARQ block's TX thread and
+condition variable, the messaging block's handler threads and the
+transfer watchdog thread:
+
+    GNU Radio handler threads --call_soon_threadsafe--> loop:
+        StopAndWait (pager_mac)         sequencing, ACK wait, retries; one loop timer
+        MessagingCore                   chunking, reassembly, caps, transfers
+        ApiServer (pager_api)           start(engine.loop)
+    loop --message_port_pub--> GNU Radio
+
+A frame's path is one hop into the loop and one hop out: an ACK that
+arrives on 'ack_in' completes the frame, raises the delivery events and
+publishes the next frame in the same loop callback.
+
+MacEngine has the MessagingCore interface the blocks use (handle_*_msg,
+send_pdus, send_file, publish_config, publish, listeners, start, stop),
+so a block swaps it in for its core. All of it may be called from any
+thread: the handle_* methods post to the loop, and sends are chunked
+in the caller (MessagingCore's send path is thread-safe), which posts
+only the chunks to the ARQ. Sink events are raised on the loop through
+the same dispatch as with MessagingCore.
+
+Ports of the owning block, published through publish(port, msg):
+    out         sequenced frames [ SEQ | payload ], what the ARQ block sends
+    crypt_out   encrypt_first=True: chunks to the link encryption, which
+                returns them to handle_encrypted() ('crypt_in'), to be sequenced
+    status      ARQ status per frame, as the ARQ block's 'status' port
+    config_out  as MessagingCore
+"""
+
+import asyncio
+import threading
+
+import pmt
+
+import pager_mac
+import pager_messaging
+import pager_pdu
+
+
+class MacEngine:
+    """
+    Parameters
+      publish          : publish(port_name, msg), the owning block's message_port_pub
+      sink             : event receiver (see pager_messaging)
+      default_dest     : callable, destination when send_pdus() is given none
+      payload_size     : bytes per chunk, header byte included
+      arq_payload_size : bytes per frame after the SEQ byte (0: payload_size); frames are padded / cut to it
+      encrypt_first    : chunks go out on 'crypt_out' and are sequenced when they come back encrypted
+      dispatch         : dispatch(fn, *args) used to raise sink events
+    """
+
+    def __init__(self, publish, sink, default_dest, payload_size=32, arq_payload_size=0, wait_time_s=0.3,
+                 max_retries=10, busy_hold_s=0.15, encrypt_first=False, xfer_idle_timeout_s=20.0,
+                 xfer_max_queries=5, compression=True, dispatch=None, verbose=False):
+        self._publish = publish
+        self.arq_payload_size = int(arq_payload_size or payload_size)
+        self.encrypt_first = bool(encrypt_first)
+        self.verbose = bool(verbose)
+        self.core = pager_messaging.MessagingCore(
+            self.publish, sink, default_dest, payload_size=payload_size, xfer_idle_timeout_s=xfer_idle_timeout_s,
+            xfer_max_queries=xfer_max_queries, compression=compression, dispatch=dispatch)
+        self.listeners = self.core.listeners
+        self.arq = pager_mac.StopAndWait(wait_time_s, max_retries, busy_hold_s)
+        self.loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._running = False
+        self._timer = None              # loop timer for the ARQ's next deadline
+        self._kicked = False            # an ARQ run is already scheduled
+        self._watchdog = None
+        self._frame_id = 0
+        self._inflight_meta = None
+        self.counts = {"callbacks": 0, "frames": 0, "retries": 0}
+
+    def _log(self, msg):
+        if self.verbose: print(f"[MAC engine] {msg}")
+
+    # --- from any thread ---
+    def _post(self, fn, *args):
+        loop = self.loop
+        if loop is not None and self._running:
+            loop.call_soon_threadsafe(fn, *args)
+
+    def _on_loop(self):
+        return threading.current_thread() is self._thread
+
+    def handle_rx_msg(self, pdu):
+        self._post(self._on_rx, pdu)
+
+    def handle_ack_msg(self, pdu):
+        self._post(self._on_ack, pdu)
+
+    def handle_busy(self, pdu):
+        self._post(self._on_busy, pdu)
+
+    def handle_encrypted(self, pdu):
+        self._post(self._submit, pdu)
+
+    def handle_arq_status(self, msg):
+        # The engine runs the ARQ itself; an external ARQ's status is passed on as it is
+        self._post(self.core.handle_arq_status, msg)
+
+    def send_pdus(self, text, dest=None):
+        return self.core.send_pdus(text, dest)
+
+    def send_file(self, filename, data, dest=None):
+        return self.core.send_file(filename, data, dest)
+
+    def publish_config(self, pmt_msg, dest):
+        self.core.publish_config(pmt_msg, dest)
+
+    def publish(self, port, msg):
+        if port != "out":
+            self._publish(port, msg)
+        elif self.encrypt_first:
+            self._publish("crypt_out", msg)
+        elif self._on_loop():
+            self._submit(msg, defer=True)
+        else:
+            self._post(self._submit, msg)
+
+    # --- on the loop ---
+    def _on_rx(self, pdu):
+        self.counts["callbacks"] += 1
+        self.core.handle_rx_msg(pdu)
+
+    def _on_busy(self, pdu):
+        self.counts["callbacks"] += 1
+        self.arq.on_busy(self.loop.time())
+
+    def _on_ack(self, pdu):
+        self.counts["callbacks"] += 1
+        if not pmt.is_pair(pdu): return
+        meta = pmt.car(pdu)
+        ack_val = pager_pdu.meta_long(meta, pager_pdu.ACK)
+        if ack_val is None:
+            pl = pmt.cdr(pdu)
+            if pmt.is_u8vector(pl):
+                d = pager_pdu.pdu_bytes(pl)
+                if len(d) >= 1: ack_val = d[0]
+        if ack_val is not None:
+            src = pager_pdu.meta_long(meta, pager_pdu.SRC_ADDR)
+            if not self.arq.on_ack(ack_val, None if src is None else src & 0xFF):
+                self._log(f"Ignoring ACK from {src} (waiting on {self.arq.inflight_dest})")
+        self.core.handle_ack_msg(pdu)
+        # Delivered: status, events and the next frame in this same callback
+        self._arq_run()
+
+    def _submit(self, pdu, defer=False):
+        """ A chunk for the ARQ (from the core, or back from the link encryption) """
+        if not pmt.is_pair(pdu): return
+        meta, pl = pmt.car(pdu), pmt.cdr(pdu)
+        if not pmt.is_u8vector(pl): return
+        data = pager_pdu.pdu_bytes(pl)
+        size = self.arq_payload_size
+        if len(data) != size:
+            data = data[:size] if len(data) > size else data + b"\x00" * (size - len(data))
+        if not pmt.is_dict(meta): meta = pmt.make_dict()
+        dest = pager_pdu.meta_long(meta, pager_pdu.DEST_ADDR)
+        self.arq.submit((meta, data), None if dest is None else dest & 0xFF)
+        if not defer:
+            self._arq_run()
+        elif not self._kicked:
+            # Sent from the loop (the API): run the ARQ on the next pass, once the sender has let go of
+            # MessagingCore's TX lock; its events could otherwise wait on a sender queued behind that lock
+            self._kicked = True
+            self.loop.call_soon(self._arq_run)
+
+    def _arq_run(self):
+        self._kicked = False
+        if not self._running: return
+        now = self.loop.time()
+        for action in self.arq.poll(now):
+            if action[0] == "tx":
+                self._transmit(*action[1:])
+            else:
+                self._done(*action[1:])
+        wake = self.arq.wake_time()
+        if wake is not None: wake = max(wake, now)
+        if self._timer is not None:
+            if self._timer.when() == wake: return
+            self._timer.cancel()
+            self._timer = None
+        if wake is not None:
+            self._timer = self.loop.call_at(wake, self._arq_timer)
+
+    def _arq_timer(self):
+        self._timer = None
+        self.counts["callbacks"] += 1
+        self._arq_run()
+
+    def _transmit(self, item, seq, retries):
+        meta, payload = item
+        if retries == 0:
+            if not pmt.dict_has_key(meta, pager_pdu.FRAME_ID):
+                self._frame_id -= 1    # negative: never collides with MessagingCore's ids
+                meta = pmt.dict_add(meta, pager_pdu.FRAME_ID, pmt.from_long(self._frame_id))
+            meta = pmt.dict_add(meta, pager_pdu.SEQ, pmt.from_long(seq))
+            self._inflight_meta = meta
+            self.counts["frames"] += 1
+        else:
+            self.counts["retries"] += 1
+            self._log(f"Retry {retries} for seq={seq}")
+        self._publish("out", pager_pdu.make_pdu(self._inflight_meta, bytes((seq,)) + payload))
+        if retries == 0: self._status("sent", retries)
+
+    def _done(self, item, seq, delivered, retries):
+        if not delivered:
+            self._log(f"Dropping seq={seq} after {self.arq.max_retries} retries")
+        self._status("delivered" if delivered else "failed", retries)
+
+    def _status(self, status, retries):
+        msg = pager_pdu.status_msg(self._inflight_meta, status, retries)
+        self._publish("status", msg)
+        self.core.handle_arq_status(msg)
+
+    def _check_transfers(self):
+        self.counts["callbacks"] += 1
+        self.core.check_transfers()
+        self._watchdog = self.loop.call_later(1.0, self._check_transfers)
+
+    # --- lifecycle ---
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._running = True
+        self.loop.call_soon(self._ready.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            # Let the API's connection tasks finish before the loop goes away
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks: task.cancel()
+            if tasks: self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="pager-mac", daemon=True)
+        self._thread.start()
+        self._ready.wait(5.0)
+        self.core.start(watchdog=False)
+        self._watchdog = self.loop.call_soon_threadsafe(self._check_transfers)
+
+    def stop(self):
+        if self.loop is None or not self._running: return
+
+        def halt():
+            self._running = False
+            for handle in (self._timer, self._watchdog):
+                if handle is not None: handle.cancel()
+            self.loop.stop()
+        self.loop.call_soon_threadsafe(halt)
+        self._thread.join(timeout=2.0)
+        self.core.stop()
@@ -0,0 +1,232 @@
+"""
+Persistent Chat History (used by the Chat GUI block)
+
+One SQLite database per node, one row per message, keyed by peer:
+    messages(id, peer, ts, is_own, status, text)   + index on (peer, id)
+    messages_fts                                    FTS5 index over text
+    peers(peer, read_upto)                          last message seen, for unread counts
+Writes never run on the GUI thread: append() / set_status() queue the
+operation and return at once (append() hands out the row id up front,
+so the caller can update the row before it reaches the disk). A writer
+thread drains the queue and commits each batch in one transaction.
+
+Reads (page, search, export) use their own connection; the database is
+in WAL mode, so they do not wait for the writer. page() returns one
+screen of messages older than a given id for lazy loading, export()
+streams rows in chunks instead of materialising the conversation.
+If the SQLite build has no FTS5, search() falls back to LIKE.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id     INTEGER PRIMARY KEY,
+    peer   INTEGER NOT NULL,
+    ts     REAL    NOT NULL,
+    is_own INTEGER NOT NULL,
+    status INTEGER NOT NULL DEFAULT 0,
+    text   TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_peer ON messages(peer, id);
+CREATE TABLE IF NOT EXISTS peers (
+    peer      INTEGER PRIMARY KEY,
+    read_upto INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts
+    USING fts5(text, content='messages', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+_INSERT = "INSERT INTO messages(id, peer, ts, is_own, status, text) VALUES (?, ?, ?, ?, ?, ?)"
+_STATUS = "UPDATE messages SET status = ? WHERE id = ?"
+_COLUMNS = "id, peer, ts, is_own, status, text"
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class HistoryStore:
+    """
+    Parameters
+      path       : database file (":memory:" is not shared between the two connections)
+      batch_size : operations per transaction at most
+      flush_ms   : how long the writer waits to fill a batch after the first operation
+    Rows are returned as (id, peer, ts, is_own, status, text) tuples.
+    """
+
+    def __init__(self, path, batch_size=256, flush_ms=100):
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self.flush_s = max(0.0, flush_ms / 1000.0)
+        self._db = _connect(path)
+        self._db.executescript(_SCHEMA)
+        try:
+            self._db.executescript(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+        self._rdb = _connect(path)
+        self._read_lock = threading.Lock()
+        self._next_id = (self._db.execute("SELECT MAX(id) FROM messages").fetchone()[0] or 0) + 1
+        self._id_lock = threading.Lock()
+        self._q = queue.Queue()
+        # Stats
+        self.rows_written = 0
+        self.batches = 0
+        self.write_s = 0.0
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    # --- writes (any thread, non-blocking) ---
+    def append(self, peer, text, is_own, status=0, ts=None):
+        """ Queues a message, returns its id """
+        with self._id_lock:
+            mid = self._next_id
+            self._next_id += 1
+        self._q.put((_INSERT, (mid, int(peer), time.time() if ts is None else ts, int(bool(is_own)), int(status), text)))
+        return mid
+
+    def set_status(self, mid, status):
+        self._q.put((_STATUS, (int(status), mid)))
+
+    def clear(self, peer):
+        self._q.put(("DELETE FROM messages WHERE peer = ?", (int(peer),)))
+
+    def mark_read(self, peer, upto):
+        """ Messages of `peer` up to id `upto` no longer count as unread """
+        self._q.put(("INSERT INTO peers(peer, read_upto) VALUES (?, ?) ON CONFLICT(peer) "
+                     "DO UPDATE SET read_upto = MAX(read_upto, excluded.read_upto)", (int(peer), int(upto))))
+
+    def flush(self, timeout=None):
+        """ Blocks until everything queued so far is on disk """
+        done = threading.Event()
+        self._q.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        self._q.put(None)
+        self._writer.join()
+        self._db.close()
+        self._rdb.close()
+
+    def _write_loop(self):
+        while True:
+            op = self._q.get()
+            batch, events, stop = [], [], False
+            deadline = time.monotonic() + self.flush_s
+            while True:
+                if op is None: stop = True
+                elif isinstance(op, threading.Event): events.append(op)
+                else: batch.append(op)
+                if stop or events or len(batch) >= self.batch_size: break
+                try: op = self._q.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty: break
+            if batch: self._commit(batch)
+            for e in events: e.set()
+            if stop: return
+
+    def _commit(self, batch):
+        t0 = time.monotonic()
+        try:
+            self._db.execute("BEGIN")
+            # Consecutive operations of the same kind go through executemany
+            i = 0
+            while i < len(batch):
+                sql, j = batch[i][0], i
+                while j < len(batch) and batch[j][0] == sql: j += 1
+                self._db.executemany(sql, [args for _, args in batch[i:j]])
+                i = j
+            self._db.execute("COMMIT")
+        except sqlite3.Error as e:
+            print(f"[History] Write failed, {len(batch)} operations lost: {e}")
+            try: self._db.execute("ROLLBACK")
+            except sqlite3.Error: pass
+            return
+        self.rows_written += len(batch)
+        self.batches += 1
+        self.write_s += time.monotonic() - t0
+
+    # --- reads ---
+    def _query(self, sql, args):
+        with self._read_lock:
+            return self._rdb.execute(sql, args).fetchall()
+
+    def page(self, peer, before=None, limit=200):
+        """ Up to `limit` messages with id < before (newest page if None), oldest first """
+        if before is None:
+            rows = self._query(f"SELECT {_COLUMNS} FROM messages WHERE peer = ? ORDER BY id DESC LIMIT ?",
+                               (int(peer), int(limit)))
+        else:
+            rows = self._query(f"SELECT {_COLUMNS} FROM messages WHERE peer = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                               (int(peer), int(before), int(limit)))
+        rows.reverse()
+        return rows
+
+    def search(self, peer, text, limit=200):
+        """ Newest `limit` matches of `text` (FTS5 query syntax when available), oldest first """
+        if self.fts:
+            # CROSS JOIN keeps the FTS index as the outer loop, walked newest first:
+            # otherwise SQLite scans the peer's rows and probes FTS for each one
+            sql = ("SELECT m.id, m.peer, m.ts, m.is_own, m.status, m.text FROM messages_fts f "
+                   "CROSS JOIN messages m ON m.id = f.rowid WHERE messages_fts MATCH ? AND m.peer = ? "
+                   "ORDER BY f.rowid DESC LIMIT ?")
+            try:
+                rows = self._query(sql, (text, int(peer), int(limit)))
+            except sqlite3.OperationalError:
+                # Not a valid FTS query (stray quote, operator...): search it as a phrase
+                rows = self._query(sql, ('"' + text.replace('"', '""') + '"', int(peer), int(limit)))
+            rows.reverse()
+            return rows
+        rows = self._query(f"SELECT {_COLUMNS} FROM messages WHERE peer = ? AND text LIKE ? "
+                           "ORDER BY id DESC LIMIT ?", (int(peer), f"%{text}%", int(limit)))
+        rows.reverse()
+        return rows
+
+    def last_id(self):
+        """ Id of the newest message handed out so far (written or still queued) """
+        with self._id_lock:
+            return self._next_id - 1
+
+    def conversations(self):
+        """ (peer, last ts, last text, unread) for every peer with stored messages, most recent first """
+        return self._query(
+            "SELECT m.peer, m.ts, m.text, (SELECT COUNT(*) FROM messages u WHERE u.peer = m.peer "
+            "AND u.id > COALESCE(p.read_upto, 0) AND u.is_own = 0) "
+            "FROM messages m JOIN (SELECT peer, MAX(id) AS id FROM messages GROUP BY peer) l ON m.id = l.id "
+            "LEFT JOIN peers p ON p.peer = m.peer ORDER BY m.id DESC", ())
+
+    def count(self, peer):
+        return self._query("SELECT COUNT(*) FROM messages WHERE peer = ?", (int(peer),))[0][0]
+
+    def export(self, peer, chunk=500):
+        """ Yields the peer's messages oldest first, `chunk` rows per query """
+        last = 0
+        while True:
+            rows = self._query(f"SELECT {_COLUMNS} FROM messages WHERE peer = ? AND id > ? ORDER BY id LIMIT ?",
+                               (int(peer), last, int(chunk)))
+            if not rows: return
+            yield from rows
+            last = rows[-1][0]
+
+    def stats(self):
+        return {
+            "rows_written": self.rows_written, "batches": self.batches, "queued": self._q.qsize(),
+            "mean_batch": self.rows_written / self.batches if self.batches else 0.0,
+            "write_ms_per_batch": self.write_s * 1000.0 / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,126 @@
+"""
+Quantized IQ Codec (used by pager_iq_zmq and tools/iq_evm.py)
+
+Baseband as blocks of 8- or 16-bit integers instead of gr_complex,
+for carrying IQ between a node and a remote radio host over ZeroMQ:
+
+    fc32   8 bytes per sample (the raw stream, not handled here)
+    sc16   4 bytes per sample + 12-byte header per block
+    sc8    2 bytes per sample + 12-byte header per block
+
+Each block of up to block_len samples has its own scale: the largest
+|I| or |Q| in the block maps to full scale, so the quantization noise
+follows the signal level and no gain has to be set. One message is
+
+    [ FMT(1) | FLAGS(1) | N(2) | GAP(4) | SCALE(4, float32) | I0 Q0 I1 Q1 ... ]
+
+little-endian, N samples of I/Q pairs, sample = int * SCALE. GAP is the
+number of idle samples the encoder skipped just before this block
+(burst_only): a block whose largest |I|, |Q| is at most idle_level is
+not sent at all. With idle_level 0 only exact zeros are idle; with a
+radio's noise floor on the stream it works as a squelch. The decoder can
+put the skipped samples back as zeros, or leave them out.
+
+Pure numpy, no GNU Radio: the encoder cuts whatever it is given into
+blocks and keeps nothing back, so it adds no latency.
+"""
+
+import struct
+
+import numpy as np
+
+FORMATS = {"sc16": 1, "sc8": 2}
+_DTYPES = {1: (np.dtype("<i2"), 32767), 2: (np.dtype("i1"), 127)}
+_HEADER = struct.Struct("<BBHIf")
+HEADER_LEN = _HEADER.size
+MAX_BLOCK = 0xFFFF
+
+
+def bytes_per_sample(fmt):
+    """ Payload bytes per complex sample, header not included (fc32: 8) """
+    return 8 if fmt == "fc32" else 2 * _DTYPES[FORMATS[fmt]][0].itemsize
+
+
+def encode_block(x, fmt, gap=0):
+    """ One block of complex samples -> message bytes """
+    code = FORMATS[fmt]
+    dtype, full = _DTYPES[code]
+    iq = np.ascontiguousarray(x, dtype=np.complex64).view(np.float32)
+    peak = float(np.max(np.abs(iq))) if len(iq) else 0.0
+    scale = peak / full
+    q = np.rint(iq * (full / peak)).astype(dtype) if peak > 0 else np.zeros(len(iq), dtype)
+    return _HEADER.pack(code, 0, len(x), min(int(gap), 0xFFFFFFFF), scale) + q.tobytes()
+
+
+def decode_block(buf):
+    """ Message bytes -> (gap, complex64 samples); ValueError if it is not one """
+    if len(buf) < HEADER_LEN:
+        raise ValueError("short IQ block")
+    code, _, n, gap, scale = _HEADER.unpack_from(buf)
+    if code not in _DTYPES:
+        raise ValueError(f"unknown IQ format {code}")
+    dtype, _ = _DTYPES[code]
+    if len(buf) != HEADER_LEN + 2 * n * dtype.itemsize:
+        raise ValueError("IQ block length does not match its header")
+    q = np.frombuffer(buf, dtype, 2 * n, HEADER_LEN)
+    return gap, (q.astype(np.float32) * np.float32(scale)).view(np.complex64)
+
+
+class IqEncoder:
+    """
+    Parameters
+      fmt        : "sc16" or "sc8"
+      block_len  : samples per block at most (one scale each)
+      burst_only : leave out idle blocks, count them in the next block's GAP
+      idle_level : a block is idle when no |I|, |Q| in it is above this
+    """
+
+    def __init__(self, fmt="sc16", block_len=1024, burst_only=False, idle_level=0.0):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown IQ format {fmt!r}")
+        self.fmt = fmt
+        self.block_len = max(1, min(int(block_len), MAX_BLOCK))
+        self.burst_only = bool(burst_only)
+        self.idle_level = float(idle_level)
+        self._gap = 0
+        self.samples = 0
+        self.skipped = 0
+        self.blocks = 0
+        self.bytes = 0
+
+    def encode(self, x):
+        """ Complex samples -> list of messages (bytes), the input cut into blocks """
+        out = []
+        self.samples += len(x)
+        for i in range(0, len(x), self.block_len):
+            blk = x[i:i + self.block_len]
+            if self.burst_only and not np.any(np.abs(blk.view(np.float32)) > self.idle_level):
+                self._gap += len(blk)
+                self.skipped += len(blk)
+                continue
+            msg = encode_block(blk, self.fmt, self._gap)
+            self._gap = 0
+            self.blocks += 1
+            self.bytes += len(msg)
+            out.append(msg)
+        return out
+
+
+class IqDecoder:
+    """ Messages -> complex samples; fill_gaps puts the idle samples the encoder skipped back as zeros """
+
+    def __init__(self, fill_gaps=False):
+        self.fill_gaps = bool(fill_gaps)
+        self.blocks = 0
+        self.errors = 0
+
+    def decode(self, buf):
+        try:
+            gap, x = decode_block(buf)
+        except ValueError:
+            self.errors += 1
+            return np.zeros(0, np.complex64)
+        self.blocks += 1
+        if self.fill_gaps and gap:
+            return np.concatenate((np.zeros(gap, np.complex64), x))
+        return x
@@ -0,0 +1,113 @@
+"""
+Quantized IQ over ZeroMQ (blocks, used by pager_headless / pager_split --iq)
+
+Drop-in replacements for the baseband zeromq.pub_sink / sub_source pair
+that carry the samples as sc16 or sc8 blocks (pager_iq) in ZMQ PDU
+messages instead of raw gr_complex:
+
+    iq_pub_sink    complex in -> iq_encode -> zeromq.pub_msg_sink   (binds, as pub_sink)
+    iq_sub_source  zeromq.sub_msg_source -> iq_decode -> complex out (connects, as sub_source)
+
+At 600 kS/s that is 2.4 MB/s (sc16) or 1.2 MB/s (sc8) per direction
+instead of 4.8 MB/s, less with burst_only on a stream with idle time.
+Both ends of a link must use them; sc16 and sc8 can be mixed, the
+format travels with each block. tools/iq_evm.py measures what the
+quantization costs.
+"""
+
+import collections
+import threading
+
+import numpy as np
+import pmt
+from gnuradio import gr
+from gnuradio import zeromq
+
+import pager_iq
+import pager_pdu
+
+
+class iq_encode(gr.sync_block):
+    """ Complex samples -> one PDU per block on 'out' (see pager_iq) """
+    def __init__(self, fmt="sc16", block_len=1024, burst_only=False, idle_level=0.0):
+        gr.sync_block.__init__(self, name="iq_encode", in_sig=[np.complex64], out_sig=None)
+        self.message_port_register_out(pager_pdu.OUT)
+        self.encoder = pager_iq.IqEncoder(fmt, block_len, burst_only, idle_level)
+
+    def work(self, input_items, output_items):
+        inp = input_items[0]
+        for msg in self.encoder.encode(inp):
+            self.message_port_pub(pager_pdu.OUT, pager_pdu.make_pdu(pmt.PMT_NIL, msg))
+        return len(inp)
+
+
+class iq_decode(gr.sync_block):
+    """ PDUs from iq_encode on 'in' -> complex samples, as they arrive """
+    def __init__(self, fill_gaps=False, timeout_s=0.1):
+        gr.sync_block.__init__(self, name="iq_decode", in_sig=None, out_sig=[np.complex64])
+        self.message_port_register_in(pager_pdu.IN)
+        self.set_msg_handler(pager_pdu.IN, self._handle)
+        self.decoder = pager_iq.IqDecoder(fill_gaps)
+        self.timeout_s = float(timeout_s)
+        self._queue = collections.deque()
+        self._offset = 0                       # samples of _queue[0] already out
+        self._cv = threading.Condition()
+        self._running = True
+
+    def _handle(self, msg):
+        if not pmt.is_pair(msg): return
+        pl = pmt.cdr(msg)
+        if not pmt.is_u8vector(pl): return
+        x = self.decoder.decode(pager_pdu.pdu_bytes(pl))
+        if not len(x): return
+        with self._cv:
+            self._queue.append(x)
+            self._cv.notify()
+
+    def work(self, input_items, output_items):
+        out = output_items[0]
+        n = 0
+        with self._cv:
+            if not self._queue and self._running:
+                # Nothing yet: wait a little, like sub_source's poll, then give the scheduler back a 0
+                self._cv.wait(self.timeout_s)
+            while self._queue and n < len(out):
+                x = self._queue[0]
+                k = min(len(x) - self._offset, len(out) - n)
+                out[n:n + k] = x[self._offset:self._offset + k]
+                n += k
+                self._offset += k
+                if self._offset == len(x):
+                    self._queue.popleft()
+                    self._offset = 0
+        return n
+
+    def stop(self):
+        with self._cv:
+            self._running = False
+            self._cv.notify()
+        return super().stop()
+
+
+class iq_pub_sink(gr.hier_block2):
+    """ Baseband out to a ZMQ PUB socket as quantized blocks, in place of zeromq.pub_sink """
+    def __init__(self, address, fmt="sc16", block_len=1024, burst_only=False, idle_level=0.0, timeout=100):
+        gr.hier_block2.__init__(self, "iq_pub_sink",
+                                gr.io_signature(1, 1, gr.sizeof_gr_complex),
+                                gr.io_signature(0, 0, 0))
+        self.encode = iq_encode(fmt, block_len, burst_only, idle_level)
+        self.zeromq_pub_msg_sink = zeromq.pub_msg_sink(address, timeout, True)
+        self.connect((self, 0), (self.encode, 0))
+        self.msg_connect((self.encode, 'out'), (self.zeromq_pub_msg_sink, 'in'))
+
+
+class iq_sub_source(gr.hier_block2):
+    """ Baseband in from a ZMQ SUB socket carrying iq_pub_sink's blocks, in place of zeromq.sub_source """
+    def __init__(self, address, fill_gaps=False, timeout=100):
+        gr.hier_block2.__init__(self, "iq_sub_source",
+                                gr.io_signature(0, 0, 0),
+                                gr.io_signature(1, 1, gr.sizeof_gr_complex))
+        self.zeromq_sub_msg_source = zeromq.sub_msg_source(address, timeout, False)
+        self.decode = iq_decode(fill_gaps)
+        self.msg_connect((self.zeromq_sub_msg_source, 'out'), (self.decode, 'in'))
+        self.connect((self.decode, 0), (self, 0))
@@ -0,0 +1,91 @@
+"""
+Stop-and-Wait ARQ state machine (used by the ARQ block and the MAC simulator)
+
+The sender side of payload_to_pdu_with_seq_arq, without threads, PMT or
+a clock of its own: the caller passes the time in and acts on what
+poll() returns. The ARQ block drives it with time.monotonic() and a
+condition variable; tools/sim_mac.py drives it with simulated time.
+
+    arq.submit(item, dest)        queue a payload (item is opaque to the ARQ)
+    arq.on_ack(ack, src)          an ACK arrived -> False if it is from the wrong peer
+    arq.on_busy(now)              hold data TX for busy_hold_s
+    arq.poll(now)                 -> [("tx", item, seq, retries),
+                                      ("done", item, seq, delivered, retries), ...]
+    arq.wake_time()               when poll() has work without new input, or None
+
+One frame is in flight at a time. A frame is done when an ACK with
+NEXT_SEQ = seq + 1 arrives within wait_time_s of a transmission, or
+failed after max_retries retransmissions. The receiver side is
+ack_seq(): the verify blocks answer every good frame with it.
+"""
+
+from collections import deque
+
+
+def ack_seq(seq):
+    """ NEXT_SEQ carried by the ACK for a data frame with `seq` """
+    return (seq + 1) & 0xFF
+
+
+class StopAndWait:
+
+    def __init__(self, wait_time_s=0.1, max_retries=10, busy_hold_s=0.15):
+        self.wait_time_s = float(wait_time_s)
+        self.max_retries = int(max_retries)
+        self.busy_hold_s = float(busy_hold_s)
+        self.seq = 0
+        self.pending = deque()          # (item, dest)
+        self.last_ack = None
+        self.inflight_dest = None       # stays set after the frame is done, like the block's
+        self.blocked_until = 0.0
+        self._cur = None                # [item, seq, retries, ack deadline or None = due for TX]
+
+    def submit(self, item, dest=None):
+        self.pending.append((item, dest))
+
+    def on_ack(self, ack, src=None):
+        dest = self.inflight_dest
+        if src is not None and dest is not None and src != dest:
+            return False
+        self.last_ack = ack & 0xFF
+        return True
+
+    def on_busy(self, now):
+        self.blocked_until = now + self.busy_hold_s
+
+    def poll(self, now):
+        actions = []
+        while True:
+            cur = self._cur
+            if cur is None:
+                if not self.pending: return actions
+                item, self.inflight_dest = self.pending.popleft()
+                cur = self._cur = [item, self.seq, 0, None]
+            item, seq, retries, deadline = cur
+            if deadline is not None:
+                if self.last_ack == ack_seq(seq):
+                    self._finish(actions, True)
+                    continue
+                if now < deadline: return actions
+                cur[2] = retries = retries + 1
+                cur[3] = None
+                if retries > self.max_retries:
+                    self._finish(actions, False)
+                    continue
+            if now < self.blocked_until: return actions
+            actions.append(("tx", item, seq, retries))
+            cur[3] = now + self.wait_time_s
+
+    def _finish(self, actions, delivered):
+        item, seq, retries, _ = self._cur
+        actions.append(("done", item, seq, delivered, retries))
+        self.seq = ack_seq(seq)
+        self._cur = None
+
+    def wake_time(self):
+        if self._cur is None:
+            return 0.0 if self.pending else None
+        return self.blocked_until if self._cur[3] is None else self._cur[3]
+
+    def idle(self):
+        return self._cur is None and not self.pending
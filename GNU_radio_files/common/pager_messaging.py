@@ -0,0 +1,325 @@
+"""
+Messaging Core (shared by the Chat GUI block and the headless block)
+
+Everything the messaging block does that is not drawing, with no Qt
+dependency:
+    send_pdus()        text -> numbered, optionally compressed chunks for one peer
+    handle_rx_msg()    per-sender reassembly and duplicate suppression
+    handle_ack_msg()   raw ACKs from the air
+    handle_arq_status  sent / delivered / failed per frame from the ARQ block
+    CAPS? / CAPS!      compression negotiation, per peer
+    XFER? / XFER! / XBLK resumable file transfers and their idle watchdog
+
+The owner supplies publish(port, msg) for its message ports, a callable
+returning the default destination, and a sink that receives the events:
+    sink.on_rx_message(text, seq, src)
+    sink.on_ack_received(ack_val)
+    sink.on_arq_status(frame_id, seq, status, msg_id)   msg_id None for control frames
+    sink.on_xfer_done(xfer_id)
+Events are raised on the flowgraph threads through dispatch(fn, *args);
+the GUI passes its UpdateBatcher.post so they are applied on the Qt
+thread, the headless block calls them directly. Under pager_engine the
+core runs on the engine's loop, and so do the events. Objects in `listeners`
+(the local API, pager_api) get the same events, called directly.
+
+The sinks turn ACK / ARQ status events into per-message ticks with
+pager_delivery.DeliveryTracker.
+"""
+
+import base64
+import os
+import threading
+import time
+
+import pmt
+
+import pager_codec
+import pager_pdu
+import pager_transfer
+
+
+def make_config(my_addr, dest_addr):
+    """ config_out message understood by the address and crypto blocks """
+    cfg = pmt.make_dict()
+    cfg = pmt.dict_add(cfg, pager_pdu.MY_ADDR, pmt.from_long(my_addr))
+    cfg = pmt.dict_add(cfg, pager_pdu.DEST_ADDR, pmt.from_long(dest_addr))
+    return cfg
+
+
+def _direct(fn, *args):
+    fn(*args)
+
+
+class MessagingCore:
+    """
+    Parameters
+      publish       : publish(port_name, msg), the owning block's message_port_pub
+      sink          : event receiver (see module docstring)
+      default_dest  : callable, destination when send_pdus() is given none
+      payload_size  : bytes per chunk, header byte included
+      dispatch      : dispatch(fn, *args) used to raise sink events
+    """
+
+    def __init__(self, publish, sink, default_dest, payload_size=32, xfer_idle_timeout_s=20.0,
+                 xfer_max_queries=5, compression=True, dispatch=None):
+        self.publish = publish
+        self.sink = sink
+        self.default_dest = default_dest
+        self.dispatch = dispatch or _direct
+        self.listeners = []             # extra event receivers, called on the flowgraph thread (pager_api)
+        self.payload_size = payload_size
+        self._rx = {}                   # src_addr -> [reassembly buffer, compressed, last seq seen]
+        self._msg_id = 0
+        self._frame_id = 0
+
+        # Payload compression (used only towards peers that advertised the same codec)
+        self.compression = bool(compression)
+        self._peer_caps = {}                 # peer ID -> set of codec IDs
+
+        # Resumable file transfers
+        self.xfer_idle_timeout_s = float(xfer_idle_timeout_s)
+        self.xfer_max_queries = int(xfer_max_queries)
+        self._xfers_out = {}                 # transfer ID -> OutgoingTransfer
+        self._xfer_lock = threading.Lock()
+        self._tx_lock = threading.Lock()     # keeps the chunks of one message contiguous
+        self._xfer_rx = pager_transfer.TransferReceiver()
+        self._run = threading.Event()
+        self._watchdog = None
+
+    def _emit(self, event, *args):
+        self.dispatch(getattr(self.sink, event), *args)
+        for listener in self.listeners:
+            getattr(listener, event)(*args)
+
+    def publish_config(self, pmt_msg, dest):
+        self.publish("config_out", pmt_msg)
+        if dest not in self._peer_caps:
+            self._send_caps(query=True, dest=dest)
+
+    # --- COMPRESSION NEGOTIATION ---
+    def _send_caps(self, query, dest=None):
+        if not self.compression: return
+        prefix = pager_codec.CAPS_QUERY_PREFIX if query else pager_codec.CAPS_REPLY_PREFIX
+        self.send_pdus(prefix + pager_codec.CODEC_ID, dest)
+
+    def _handle_caps_msg(self, txt, src):
+        ids = txt.split(":", 1)[1]
+        self._peer_caps[src] = set(ids.split(","))
+        if txt.startswith(pager_codec.CAPS_QUERY_PREFIX):
+            self._send_caps(query=False, dest=src)
+
+    def _peer_has_codec(self, dest):
+        return self.compression and pager_codec.CODEC_ID in self._peer_caps.get(dest, ())
+
+    def send_pdus(self, text, dest=None):
+        """ Chunks `text` into frames for `dest`; returns (msg_id, frame_ids) """
+        if dest is None: dest = self.default_dest()
+        data = text.encode("utf-8", "ignore")
+        chunk_size = self.payload_size - 1
+        # Header bit 0x02 = message body is DEFLATE (with preset dictionary)
+        flags = 0x00
+        if self._peer_has_codec(dest):
+            packed = pager_codec.compress(data)
+            if (len(packed) + chunk_size - 1) // chunk_size < (len(data) + chunk_size - 1) // chunk_size:
+                data, flags = packed, 0x02
+        chunks = [data[i:i+chunk_size] for i in range(0, len(data), chunk_size)]
+        if not chunks: chunks = [b'']
+        frame_ids = []
+        with self._tx_lock:
+            self._msg_id += 1
+            msg_id = self._msg_id
+            for i, chunk in enumerate(chunks):
+                header = (0x01 if i == len(chunks) - 1 else 0x00) | flags
+                payload = bytes([header]) + chunk
+                if len(payload) < self.payload_size: payload += b'\x00' * (self.payload_size - len(payload))
+                self._frame_id += 1
+                frame_ids.append(self._frame_id)
+                meta = pmt.make_dict()
+                meta = pmt.dict_add(meta, pager_pdu.MSG_ID, pmt.from_long(msg_id))
+                meta = pmt.dict_add(meta, pager_pdu.FRAME_ID, pmt.from_long(self._frame_id))
+                meta = pmt.dict_add(meta, pager_pdu.DEST_ADDR, pmt.from_long(dest))
+                self.publish("out", pager_pdu.make_pdu(meta, payload))
+        return msg_id, frame_ids
+
+    def handle_rx_msg(self, pdu):
+        if not pmt.is_pair(pdu): return
+        meta = pmt.car(pdu)
+        payload = pmt.cdr(pdu)
+        if not pmt.is_u8vector(payload): return
+        seq = -1
+        if pmt.dict_has_key(meta, pager_pdu.SEQ):
+            try: seq = pmt.to_python(pmt.dict_ref(meta, pager_pdu.SEQ, pmt.PMT_NIL))
+            except: pass
+        src = self.default_dest()
+        if pmt.dict_has_key(meta, pager_pdu.SRC_ADDR):
+            try: src = pmt.to_long(pmt.dict_ref(meta, pager_pdu.SRC_ADDR, pmt.PMT_NIL))
+            except: pass
+        # Reassembly and duplicate suppression per sender: interleaved chunks do not mix
+        rx = self._rx.setdefault(src, [b"", False, -1])
+        if seq != -1:
+            if seq == rx[2]: return
+            rx[2] = seq
+        data = pager_pdu.pdu_bytes(payload)
+        if len(data) > 0:
+            header, content = data[0], data[1:]
+            if header & 0x02:
+                # Compressed bytes may end in 0x00; the DEFLATE stream ignores the padding
+                rx[0] += content
+                rx[1] = True
+            else:
+                rx[0] += content.rstrip(b'\x00')
+            if header & 0x01:
+                try:
+                    body = rx[0]
+                    if rx[1]:
+                        body = pager_codec.decompress(body)
+                    txt = body.decode('utf-8', 'ignore')
+                    if txt.startswith((pager_codec.CAPS_QUERY_PREFIX, pager_codec.CAPS_REPLY_PREFIX)):
+                        self._handle_caps_msg(txt, src)
+                    elif pager_transfer.is_control(txt):
+                        self._handle_xfer_msg(txt, src)
+                    else:
+                        self._emit("on_rx_message", txt, seq, src)
+                    if txt.startswith("FILE:"):
+                        parts = txt.split(":", 2)
+                        self._save_file_on_disk(parts[1], parts[2], src)
+                except: pass
+                rx[0] = b""
+                rx[1] = False
+
+    def handle_ack_msg(self, pdu):
+        if not pmt.is_pair(pdu): return
+        meta = pmt.car(pdu)
+        payload = pmt.cdr(pdu)
+        ack_seq = -1
+        if pmt.dict_has_key(meta, pager_pdu.ACK):
+            try: ack_seq = pmt.to_python(pmt.dict_ref(meta, pager_pdu.ACK, pmt.PMT_NIL))
+            except: pass
+        elif pmt.is_u8vector(payload):
+            data = pager_pdu.pdu_bytes(payload)
+            if len(data) > 0: ack_seq = int(data[0])
+        if ack_seq != -1:
+            # Duplicates are harmless: the tracker resolves each in-flight seq once
+            self._emit("on_ack_received", int(ack_seq))
+            # Link is alive: push back the resume watchdog for running transfers
+            now = time.monotonic()
+            with self._xfer_lock:
+                for x in self._xfers_out.values():
+                    x.last_activity = now
+
+    def handle_arq_status(self, msg):
+        if not pmt.is_dict(msg): return
+        try:
+            frame_id = pmt.to_long(pmt.dict_ref(msg, pager_pdu.FRAME_ID, pmt.PMT_NIL))
+            seq = pmt.to_long(pmt.dict_ref(msg, pager_pdu.SEQ, pmt.from_long(-1)))
+            status = pmt.symbol_to_string(pmt.dict_ref(msg, pager_pdu.STATUS, pmt.PMT_NIL))
+            msg_id = pager_pdu.meta_long(msg, pager_pdu.MSG_ID)
+        except Exception:
+            return
+        if status == "failed":
+            print(f"[System] Frame {frame_id} (seq={seq}) not delivered")
+        self._emit("on_arq_status", frame_id, seq, status, msg_id)
+
+    # --- RESUMABLE FILE TRANSFER ---
+    def _downloads_dir(self, peer):
+        folder_name = f"downloads_node_{peer}"
+        os.makedirs(folder_name, exist_ok=True)
+        return folder_name
+
+    def send_file(self, filename, data, dest=None):
+        """ Offer a file by content hash. The peer answers with the blocks it already has. """
+        x = pager_transfer.OutgoingTransfer(filename, data, dest=self.default_dest() if dest is None else dest)
+        with self._xfer_lock:
+            x.last_activity = time.monotonic()
+            self._xfers_out[x.id] = x
+        print(f"[System] Offering {x.filename} ({len(data)} B, {x.nblocks} blocks, id={x.id}) to {x.dest}")
+        self.send_pdus(x.offer_msg(), x.dest)
+        return x.id
+
+    def _handle_xfer_msg(self, txt, src):
+        try:
+            if txt.startswith(pager_transfer.OFFER_PREFIX):
+                sha, size, name = txt[len(pager_transfer.OFFER_PREFIX):].split(":", 2)
+                root = self._downloads_dir(src)
+                tid, bitmap, done_path = self._xfer_rx.offer(root, sha, int(size), name)
+                self.send_pdus(f"{pager_transfer.MAP_PREFIX}{tid}:{base64.b64encode(bitmap).decode('ascii')}", src)
+                if done_path:
+                    self._announce_file(done_path, src)
+
+            elif txt.startswith(pager_transfer.MAP_PREFIX):
+                tid, b64_map = txt[len(pager_transfer.MAP_PREFIX):].split(":", 1)
+                with self._xfer_lock:
+                    x = self._xfers_out.get(tid)
+                    if x is None or x.completed: return
+                    x.unanswered_queries = 0
+                    x.last_activity = time.monotonic()
+                    missing = x.missing_from_map(b64_map)
+                    if not missing:
+                        x.completed = True
+                        del self._xfers_out[tid]
+                if not missing:
+                    print(f"[System] Transfer {tid} complete")
+                    self._emit("on_xfer_done", tid)
+                    return
+                print(f"[System] Transfer {tid}: sending {len(missing)}/{x.nblocks} missing blocks")
+                for idx in missing:
+                    self.send_pdus(x.block_msg(idx), x.dest)
+                # Queued behind the blocks, so the peer answers once they are through
+                self.send_pdus(x.offer_msg(), x.dest)
+
+            elif txt.startswith(pager_transfer.BLOCK_PREFIX):
+                tid, idx, crc, b64 = txt[len(pager_transfer.BLOCK_PREFIX):].split(":", 3)
+                done_path = self._xfer_rx.put_block(self._downloads_dir(src), tid, int(idx), int(crc, 16),
+                                                    base64.b64decode(b64))
+                if done_path:
+                    self._announce_file(done_path, src)
+        except Exception as e:
+            print(f"[System] Bad transfer message dropped: {e}")
+
+    def _announce_file(self, path, src):
+        print(f"[System] File saved to: {path}")
+        self._emit("on_rx_message", f"FILE:{os.path.basename(path)}:", -1, src)
+
+    def _xfer_watchdog(self):
+        while self._run.is_set():
+            time.sleep(1.0)
+            self.check_transfers()
+
+    def check_transfers(self):
+        """ Re-query idle transfers (lost offer/map after a link outage); run about once a second """
+        now = time.monotonic()
+        with self._xfer_lock:
+            idle = [x for x in self._xfers_out.values()
+                    if now - x.last_activity > self.xfer_idle_timeout_s]
+            for x in idle:
+                x.last_activity = now
+                x.unanswered_queries += 1
+                if x.unanswered_queries > self.xfer_max_queries:
+                    # Parked: re-attaching the same file later resumes it
+                    print(f"[System] Transfer {x.id} paused (no answer from peer)")
+                    del self._xfers_out[x.id]
+        for x in idle:
+            if x.unanswered_queries <= self.xfer_max_queries:
+                self.send_pdus(x.offer_msg(), x.dest)
+
+    def _save_file_on_disk(self, fname, b64_data, src):
+        """ Legacy FILE:<name>:<base64> message, saved under the sender's folder """
+        try:
+            full_path = os.path.join(self._downloads_dir(src), fname)
+            with open(full_path, "wb") as f:
+                f.write(base64.b64decode(b64_data))
+            print(f"[System] File saved to: {full_path}")
+        except Exception as e:
+            print(f"[System] Error saving file: {e}")
+
+    def start(self, watchdog=True):
+        """ watchdog=False: the owner calls check_transfers() itself (pager_engine, from its loop) """
+        self._send_caps(query=True)
+        self._run.set()
+        if watchdog:
+            self._watchdog = threading.Thread(target=self._xfer_watchdog, daemon=True)
+            self._watchdog.start()
+
+    def stop(self):
+        self._run.clear()
+        if self._watchdog: self._watchdog.join(timeout=2.0)
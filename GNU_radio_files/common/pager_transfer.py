@@ -0,0 +1,338 @@
+"""
+Resumable File Transfer Helpers (used by the Chat GUI block)
+
+Files are identified by their SHA-256 content hash and split into fixed
+blocks. The receiver keeps a persistent received-block bitmap so a
+transfer interrupted by a link outage or an app restart only resends the
+blocks that are still missing.
+
+Before any block is sent the receiver looks the hash up in a local
+content-addressed store (an index over its downloads_node_* folders), so
+a file it already holds costs a single offer/answer round trip.
+
+Control messages travel as normal chat text (same chunking as "FILE:"):
+    XFER?:<SHA256(64 hex)>:<SIZE>:<FILENAME>     sender  -> receiver (offer/query)
+    XFER!:<ID(16 hex)>:<BITMAP(base64)>          receiver -> sender (have-map)
+    XBLK:<ID>:<INDEX>:<CRC32(8 hex)>:<DATA(base64)>  one file block
+"""
+
+import base64
+import hashlib
+import json
+import os
+import shutil
+import zlib
+
+XFER_BLOCK_SIZE = 512
+XFER_ID_LEN = 16
+
+OFFER_PREFIX = "XFER?:"
+MAP_PREFIX = "XFER!:"
+BLOCK_PREFIX = "XBLK:"
+
+
+# --- 1. HELPERS ---
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def xfer_id(sha256_hex):
+    return sha256_hex[:XFER_ID_LEN]
+
+def num_blocks(size, block_size=XFER_BLOCK_SIZE):
+    return (size + block_size - 1) // block_size
+
+def missing_blocks(bitmap, nblocks):
+    """ Indices of blocks whose bit is not set in the bitmap """
+    return [i for i in range(nblocks) if not (bitmap[i >> 3] >> (i & 7)) & 1]
+
+def is_control(text):
+    return text.startswith((OFFER_PREFIX, MAP_PREFIX, BLOCK_PREFIX))
+
+
+# --- 2. SENDER SIDE ---
+
+class OutgoingTransfer:
+    """ One file being sent. Kept in memory only; a restart re-offers by hash. """
+    def __init__(self, filename, data, block_size=XFER_BLOCK_SIZE, dest=None):
+        self.filename = os.path.basename(filename)
+        self.dest = dest              # peer address the offer and blocks go to
+        self.data = data
+        self.block_size = block_size
+        self.sha256 = content_hash(data)
+        self.id = xfer_id(self.sha256)
+        self.nblocks = num_blocks(len(data), block_size)
+        self.completed = False
+        self.unanswered_queries = 0
+        self.last_activity = 0.0
+
+    def offer_msg(self):
+        return f"{OFFER_PREFIX}{self.sha256}:{len(self.data)}:{self.filename}"
+
+    def block_msg(self, idx):
+        chunk = self.data[idx * self.block_size:(idx + 1) * self.block_size]
+        crc = zlib.crc32(chunk) & 0xFFFFFFFF
+        b64 = base64.b64encode(chunk).decode("ascii")
+        return f"{BLOCK_PREFIX}{self.id}:{idx}:{crc:08x}:{b64}"
+
+    def missing_from_map(self, b64_bitmap):
+        try:
+            bitmap = base64.b64decode(b64_bitmap)
+        except Exception:
+            return list(range(self.nblocks))
+        if len(bitmap) * 8 < self.nblocks:
+            return list(range(self.nblocks))
+        return missing_blocks(bitmap, self.nblocks)
+
+
+# --- 3. CONTENT-ADDRESSED STORE ---
+
+class ContentStore:
+    """
+    SHA-256 index over every file in the downloads_node_* folders.
+    Persisted in <base>/.content_index.json as {path: [size, mtime, sha256]};
+    a refresh only re-hashes files whose size or mtime changed. lookup()
+    stats just the indexed candidate and scans the folders only on a miss
+    (or when the candidate changed on disk).
+    """
+    def __init__(self, base_dir=".", folder_prefix="downloads_node_", index_name=".content_index.json"):
+        self.base_dir = base_dir
+        self.folder_prefix = folder_prefix
+        self.index_path = os.path.join(base_dir, index_name)
+        self._entries = {}   # path -> [size, mtime, sha256]
+        self._by_hash = {}   # sha256 -> path
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except Exception:
+            self._entries = {}
+        self._rebuild()
+        self.refresh()
+
+    def _rebuild(self):
+        self._by_hash = {e[2]: path for path, e in self._entries.items()}
+
+    def _scan(self):
+        try:
+            folders = [d for d in os.listdir(self.base_dir) if d.startswith(self.folder_prefix)]
+        except OSError:
+            return
+        for d in folders:
+            folder = os.path.join(self.base_dir, d)
+            if not os.path.isdir(folder): continue
+            for fn in os.listdir(folder):
+                if fn.startswith("."): continue
+                yield os.path.normpath(os.path.join(folder, fn))
+
+    def refresh(self):
+        seen, changed = set(), False
+        for path in self._scan():
+            try: stt = os.stat(path)
+            except OSError: continue
+            if not os.path.isfile(path): continue
+            seen.add(path)
+            e = self._entries.get(path)
+            if e and e[0] == stt.st_size and e[1] == stt.st_mtime:
+                continue
+            with open(path, "rb") as f:
+                self._entries[path] = [stt.st_size, stt.st_mtime, content_hash(f.read())]
+            changed = True
+        for path in [p for p in self._entries if p not in seen]:
+            del self._entries[path]
+            changed = True
+        if changed:
+            self._rebuild()
+            self._save()
+
+    def _save(self):
+        tmp = self.index_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp, self.index_path)
+        except OSError:
+            pass
+
+    def _current(self, sha256_hex, size):
+        path = self._by_hash.get(sha256_hex)
+        if path is None: return None
+        e = self._entries[path]
+        try: stt = os.stat(path)
+        except OSError: return None
+        if e[0] == size == stt.st_size and e[1] == stt.st_mtime:
+            return path
+        return None
+
+    def lookup(self, sha256_hex, size):
+        """ Path of a stored file with this content, or None """
+        path = self._current(sha256_hex, size)
+        if path is None:
+            self.refresh()
+            path = self._current(sha256_hex, size)
+        return path
+
+    def path_in(self, folder, sha256_hex):
+        """ An indexed file in `folder` with this content, or None (stats the matches only) """
+        folder = os.path.normpath(folder)
+        for path, e in self._entries.items():
+            if e[2] == sha256_hex and os.path.dirname(path) == folder and os.path.isfile(path):
+                return path
+        return None
+
+    def matches(self, path, sha256_hex):
+        """ True if the file at path holds this content (hashed only if not indexed as unchanged) """
+        path = os.path.normpath(path)
+        try: stt = os.stat(path)
+        except OSError: return False
+        e = self._entries.get(path)
+        if not (e and e[0] == stt.st_size and e[1] == stt.st_mtime):
+            self.add(path)
+            e = self._entries[path]
+        return e[2] == sha256_hex
+
+    def add(self, path):
+        path = os.path.normpath(path)
+        stt = os.stat(path)
+        with open(path, "rb") as f:
+            self._entries[path] = [stt.st_size, stt.st_mtime, content_hash(f.read())]
+        self._by_hash[self._entries[path][2]] = path
+        self._save()
+
+
+# --- 4. RECEIVER SIDE ---
+
+class TransferReceiver:
+    """
+    Persistent partial-file store.
+    Layout under <root>/.partial/ :
+        <ID>.part  : file data written in place at block offsets
+        <ID>.json  : {sha256, size, name, block_size, have(base64 bitmap)}
+    """
+    def __init__(self, block_size=XFER_BLOCK_SIZE, store=None):
+        self.block_size = block_size
+        self.store = store if store is not None else ContentStore()
+        self._state = {}     # (root, ID) -> dict (cached copy of <ID>.json)
+
+    def _paths(self, root, tid):
+        part_dir = os.path.join(root, ".partial")
+        return part_dir, os.path.join(part_dir, tid + ".part"), os.path.join(part_dir, tid + ".json")
+
+    def _load(self, root, tid):
+        key = (root, tid)
+        if key in self._state:
+            return self._state[key]
+        _, _, meta_path = self._paths(root, tid)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                st = json.load(f)
+            st["have"] = bytearray(base64.b64decode(st["have"]))
+        except Exception:
+            return None
+        self._state[key] = st
+        return st
+
+    def _save(self, root, tid, st):
+        _, _, meta_path = self._paths(root, tid)
+        disk = dict(st)
+        disk["have"] = base64.b64encode(bytes(st["have"])).decode("ascii")
+        tmp = meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(disk, f)
+        os.replace(tmp, meta_path)
+
+    def offer(self, root, sha256_hex, size, name):
+        """ Register (or resume) a transfer. Returns (ID, bitmap bytes, final path or None). """
+        tid = xfer_id(sha256_hex)
+        st = self._load(root, tid)
+        nblocks = num_blocks(size, self.block_size)
+        full_map = bytes([0xFF]) * ((nblocks + 7) // 8)
+        if st is None:
+            # Known content (resend, or our XFER! reply was lost): no blocks needed.
+            # A path only when a new copy was placed, so a re-offer is not announced twice
+            known = self.store.lookup(sha256_hex, size)
+            if known:
+                return tid, full_map, self._place_known(known, root, name, sha256_hex)
+        if st is None or st["sha256"] != sha256_hex or st["size"] != size:
+            part_dir, part_path, _ = self._paths(root, tid)
+            os.makedirs(part_dir, exist_ok=True)
+            with open(part_path, "wb") as f:
+                f.truncate(size)
+            st = {"sha256": sha256_hex, "size": size, "name": os.path.basename(name),
+                  "block_size": self.block_size, "have": bytearray((nblocks + 7) // 8)}
+            self._state[(root, tid)] = st
+            self._save(root, tid, st)
+        if not missing_blocks(st["have"], nblocks):
+            return tid, bytes(st["have"]), self._finish(root, tid, st)
+        return tid, bytes(st["have"]), None
+
+    def put_block(self, root, tid, idx, crc, data):
+        """ Store one block. Returns the final file path once the transfer completes. """
+        st = self._load(root, tid)
+        if st is None:
+            return None
+        nblocks = num_blocks(st["size"], st["block_size"])
+        if not 0 <= idx < nblocks or (zlib.crc32(data) & 0xFFFFFFFF) != crc:
+            return None
+        if (st["have"][idx >> 3] >> (idx & 7)) & 1:
+            return None
+        _, part_path, _ = self._paths(root, tid)
+        with open(part_path, "r+b") as f:
+            f.seek(idx * st["block_size"])
+            f.write(data)
+        st["have"][idx >> 3] |= 1 << (idx & 7)
+        self._save(root, tid, st)
+        if missing_blocks(st["have"], nblocks):
+            return None
+        return self._finish(root, tid, st)
+
+    def bitmap(self, root, tid):
+        st = self._load(root, tid)
+        return bytes(st["have"]) if st else b""
+
+    def _free_path(self, root, name):
+        """ <root>/<name>, or <root>/<stem> (n)<ext> if that name is taken: earlier downloads are kept """
+        dst = os.path.join(root, name)
+        stem, ext = os.path.splitext(name)
+        n = 1
+        while os.path.exists(dst):
+            dst = os.path.join(root, f"{stem} ({n}){ext}")
+            n += 1
+        return dst
+
+    def _place_known(self, src, root, name, sha256_hex):
+        """ Copy of a stored file under root; None if root already holds it under that name """
+        name = os.path.basename(name)
+        dst = os.path.join(root, name)
+        if os.path.abspath(src) == os.path.abspath(dst) or self.store.path_in(root, sha256_hex):
+            return None
+        if os.path.exists(dst):
+            if self.store.matches(dst, sha256_hex): return None
+            dst = self._free_path(root, name)
+        os.makedirs(root, exist_ok=True)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+        self.store.add(dst)
+        return dst
+
+    def _finish(self, root, tid, st):
+        _, part_path, meta_path = self._paths(root, tid)
+        final_path = os.path.join(root, st["name"])
+        if os.path.exists(part_path):
+            if os.path.exists(final_path): final_path = self._free_path(root, st["name"])
+            with open(part_path, "rb") as f:
+                ok = content_hash(f.read()) == st["sha256"]
+            if not ok:
+                # Corrupt reassembly: start over, the sender will resend everything
+                st["have"] = bytearray(len(st["have"]))
+                self._save(root, tid, st)
+                return None
+            os.replace(part_path, final_path)
+            self.store.add(final_path)
+        try: os.remove(meta_path)
+        except OSError: pass
+        self._state.pop((root, tid), None)
+        return final_path
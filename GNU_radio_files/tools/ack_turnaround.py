@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Measurement: ACK turnaround under GUI load, one process vs. split
+-----------------------------------------------------------------
+Node A (ID 15, in this process, no load) pages node B (ID 20) over the
+ZMQ baseband, one page at a time, and times each data frame from its
+first transmission to its ACK (ARQ status 'sent' -> 'delivered'). B runs
+
+    single  pager_headless.py, everything in one process
+    split   pager_split.py --headless, rx / tx / app in three processes
+
+with a synthetic GUI load in the process that holds B's messaging block:
+--gui-load of every 100 ms spent in Python code (which lets go of the GIL
+every sys.getswitchinterval(), like a repaint driven from Python) and,
+once per period, one --stall-ms GIL hold in a single C call (like a model
+reset or a large paint).
+
+Reported per mode: frames, delivered, frames that needed a retransmission,
+and the round trip of the frames ACKed on the first try, p50 / p90 / p99 /
+max. The round trip minus the air time of a data and an ACK frame is B's
+turnaround: RX chain, verifier, ACK framing and modulation, plus the ZMQ
+hops. Needs GNU Radio. Runs in real time.
+
+Usage:
+    python3 ack_turnaround.py --mode both --gui-load 0.6 --stall-ms 40 --messages 100
+    python3 ack_turnaround.py --mode split --gui-load 0 --json out.json
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+USER_DIR = os.path.join(HERE, "..", "User_1")
+sys.path.insert(0, USER_DIR)
+
+A_ID, B_ID = 15, 20
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))] if xs else float("nan")
+
+
+# ---------------------------------------------------------------------------
+# Node B side: the GUI load, run inside B's app process
+# ---------------------------------------------------------------------------
+
+def start_load(duty, stall_ms, period_s=0.1):
+    """ Busy 'GUI' thread: duty x period of Python work every period, one stall_ms GIL hold among it """
+    if duty <= 0 and stall_ms <= 0: return
+    data = list(range(200000))
+    random.Random(1).shuffle(data)
+    t0 = time.perf_counter()
+    sorted(data)
+    n = int(len(data) * stall_ms / 1e3 / (time.perf_counter() - t0)) if stall_ms > 0 else 0
+    data = data[:n] if n <= len(data) else data * (n // len(data) + 1)
+
+    def run():
+        while True:
+            t0 = time.perf_counter()
+            if n: sorted(data)               # one C call: holds the GIL throughout
+            while time.perf_counter() - t0 < duty * period_s:
+                sum(i * i for i in range(256))
+            time.sleep(max(0.0, period_s - (time.perf_counter() - t0)))
+
+    threading.Thread(target=run, name="gui-load", daemon=True).start()
+
+
+def node_b(argv):
+    """ --node-b single|app [--gui-load D --stall-ms S] -- <pager_headless / pager_split arguments> """
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--node-b", choices=("single", "app"))
+    ap.add_argument("--gui-load", type=float, default=0.0)
+    ap.add_argument("--stall-ms", type=float, default=0.0)
+    split = argv.index("--")
+    opts = ap.parse_args(argv[:split])
+    start_load(opts.gui_load, opts.stall_ms)
+    if opts.node_b == "single":
+        import pager_headless
+        pager_headless.main(options=pager_headless.argument_parser().parse_args(argv[split + 1:]))
+    else:
+        import pager_split
+        pager_split.main(options=pager_split.argument_parser().parse_args(argv[split + 1:]))
+
+
+def start_b(args, mode, tmp, a_tx, b_tx):
+    common = ["--my-id", str(B_ID), "--target-id", str(A_ID), "--link-crypto", args.link_crypto,
+              "--rx-address", a_tx, "--tx-address", b_tx, "--samp-rate", str(args.samp_rate),
+              "--event-log", os.path.join(tmp, f"b-{mode}.log")]
+    load = ["--gui-load", str(args.gui_load), "--stall-ms", str(args.stall_ms)]
+    me = os.path.abspath(__file__)
+    if mode == "single":
+        return [subprocess.Popen([sys.executable, me, "--node-b", "single"] + load + ["--"] + common)]
+    split = os.path.join(USER_DIR, "pager_split.py")
+    common += ["--links", f"ipc://{tmp}/b", "--headless"]
+    return [subprocess.Popen([sys.executable, split, "--role", "rx"] + common),
+            subprocess.Popen([sys.executable, split, "--role", "tx"] + common),
+            subprocess.Popen([sys.executable, me, "--node-b", "app"] + load + ["--", "--role", "app"] + common)]
+
+
+# ---------------------------------------------------------------------------
+# Node A side: this process
+# ---------------------------------------------------------------------------
+
+def node_a(args, tmp, a_tx, b_tx):
+    import pmt
+    from gnuradio import blocks, gr, zeromq
+    import pager_node
+    import user1_1_epy_block_15 as epy_block_15
+
+    class rtt_probe(gr.basic_block):
+        """ First transmission and outcome of every frame, from the ARQ 'status' port """
+        def __init__(self):
+            gr.basic_block.__init__(self, name="rtt_probe", in_sig=None, out_sig=None)
+            self.message_port_register_in(pmt.intern("in"))
+            self.set_msg_handler(pmt.intern("in"), self._handle)
+            self.sent, self.done = {}, []
+            self.cv = threading.Condition()
+
+        def _handle(self, msg):
+            now = time.monotonic()
+            status = pmt.symbol_to_string(pmt.dict_ref(msg, pmt.intern("status"), pmt.intern("")))
+            frame = pmt.to_long(pmt.dict_ref(msg, pmt.intern("frame_id"), pmt.from_long(-1)))
+            if status == "sent":
+                self.sent[frame] = now
+                return
+            retries = pmt.to_long(pmt.dict_ref(msg, pmt.intern("retries"), pmt.from_long(0)))
+            with self.cv:
+                self.done.append((frame, status == "delivered", retries, now - self.sent.get(frame, now)))
+                self.cv.notify_all()
+
+    class node(gr.top_block):
+        def __init__(self):
+            gr.top_block.__init__(self, "node A", catch_exceptions=True)
+            chat_size, _ = pager_node.payload_sizes(args.link_crypto, 'implicit')
+            self.app = epy_block_15.chat_headless_block(payload_size=chat_size, my_id=A_ID, target_id=B_ID,
+                                                        event_log=os.path.join(tmp, "a.log"))
+            self.node = pager_node.pager_node(self.app, link_crypto=args.link_crypto)
+            self.src = zeromq.sub_source(gr.sizeof_gr_complex, 1, b_tx, 100, True, (-1), '', False)
+            self.scale = blocks.multiply_const_cc(0.8)
+            self.throttle = blocks.throttle(gr.sizeof_gr_complex*1, args.samp_rate, True)
+            self.sink = zeromq.pub_sink(gr.sizeof_gr_complex, 1, a_tx, 100, True, (-1), '', True, True)
+            self.probe = rtt_probe()
+            self.connect((self.src, 0), (self.node, 0))
+            self.connect((self.node, 0), (self.scale, 0))
+            self.connect((self.scale, 0), (self.throttle, 0))
+            self.connect((self.throttle, 0), (self.sink, 0))
+            self.msg_connect((self.node.epy_block_10, 'status'), (self.probe, 'in'))
+
+    tb = node()
+    tb.start()
+    time.sleep(1.0)
+    probe = tb.probe
+    for i in range(args.messages):
+        tb.app.send_text(f"{i:04d} turnaround", B_ID)
+        with probe.cv:
+            probe.cv.wait_for(lambda: len(probe.done) > i, timeout=5.0)
+        time.sleep(args.interval)
+    tb.stop()
+    tb.wait()
+    return probe.done
+
+
+def run_mode(args, mode):
+    with tempfile.TemporaryDirectory(prefix="pager-turnaround-") as tmp:
+        a_tx = f"tcp://127.0.0.1:{args.port}"
+        b_tx = f"tcp://127.0.0.1:{args.port + 1}"
+        procs = start_b(args, mode, tmp, a_tx, b_tx)
+        try:
+            time.sleep(args.warmup)
+            done = node_a(args, tmp, a_tx, b_tx)
+        finally:
+            for p in procs: p.terminate()
+            for p in procs:
+                try:
+                    p.wait(timeout=5.0)
+                except subprocess.TimeoutExpired:
+                    p.kill()
+    air_ms = (args.data_bytes + args.ack_bytes) * 4 * args.sps / args.samp_rate * 1e3
+    rtt = [d[3] * 1e3 for d in done if d[1] and d[2] == 0]
+    return {"mode": mode, "gui_load": args.gui_load, "stall_ms": args.stall_ms, "frames": len(done),
+            "delivered": sum(d[1] for d in done), "retransmitted": sum(d[2] > 0 for d in done),
+            "retransmissions": sum(d[2] for d in done), "air_ms": air_ms,
+            "rtt_p50_ms": pct(rtt, 50), "rtt_p90_ms": pct(rtt, 90), "rtt_p99_ms": pct(rtt, 99),
+            "rtt_max_ms": max(rtt, default=float("nan")), "turnaround_p50_ms": pct(rtt, 50) - air_ms,
+            "turnaround_p99_ms": pct(rtt, 99) - air_ms}
+
+
+def main():
+    if "--node-b" in sys.argv[1:2]:
+        node_b(sys.argv[1:])
+        return
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mode", choices=("single", "split", "both"), default="both")
+    ap.add_argument("--gui-load", type=float, default=0.6, help="share of every 100 ms B's GUI thread runs Python")
+    ap.add_argument("--stall-ms", type=float, default=40.0, help="one GIL hold of this length per 100 ms")
+    ap.add_argument("--messages", type=int, default=100)
+    ap.add_argument("--interval", type=float, default=0.2, help="pause after each page is done")
+    ap.add_argument("--link-crypto", choices=("aead", "ctr"), default="ctr")
+    ap.add_argument("--samp-rate", type=float, default=600e3)
+    ap.add_argument("--sps", type=int, default=4)
+    ap.add_argument("--data-bytes", type=int, default=187, help="data frame on air, for the turnaround")
+    ap.add_argument("--ack-bytes", type=int, default=189, help="ACK frame on air, for the turnaround")
+    ap.add_argument("--port", type=int, default=5611, help="A's baseband PUB port; B's is the next one")
+    ap.add_argument("--warmup", type=float, default=3.0, help="seconds for B to start before A pages it")
+    ap.add_argument("--json", default="", help="write the results here")
+    args = ap.parse_args()
+
+    results = [run_mode(args, m) for m in (("single", "split") if args.mode == "both" else (args.mode,))]
+    print(f"GUI load {args.gui_load * 100:.0f}% + {args.stall_ms:g} ms stall per 100 ms, {args.messages} pages, "
+          f"air time data + ACK {results[0]['air_ms']:.1f} ms")
+    print(f"{'mode':8s} {'frames':>6} {'deliv':>6} {'retx':>5} {'rtt p50':>8} {'p90':>7} {'p99':>7} {'max':>7} "
+          f"{'turnaround p50':>15} {'p99':>7}")
+    for r in results:
+        print(f"{r['mode']:8s} {r['frames']:6d} {r['delivered']:6d} {r['retransmitted']:5d} {r['rtt_p50_ms']:8.1f} "
+              f"{r['rtt_p90_ms']:7.1f} {r['rtt_p99_ms']:7.1f} {r['rtt_max_ms']:7.1f} {r['turnaround_p50_ms']:15.1f} "
+              f"{r['turnaround_p99_ms']:7.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
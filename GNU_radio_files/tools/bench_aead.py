@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CRC-32 + AES-CTR vs single-pass AES-GCM per frame
+------------------------------------------------------------
+Builds and checks one data frame per iteration, the way the TX and RX
+blocks do, and reports CPU time and link overhead for:
+    ctr-random : 8B nonce + CTR encrypt, CRC-32 trailer       (nonce_mode='random')
+    ctr-impl   : 2B counter + pooled CTR keystream, CRC-32    (nonce_mode='implicit')
+    gcm        : 2B counter, GCM seal/open with a 4B tag      (link_crypto='aead')
+
+Overhead is everything in the 45-byte frame that is not payload.
+Only the GCM frame is authenticated; CRC-32 detects noise, not forgery.
+
+Usage:
+    python3 bench_aead.py [--frames 20000] [--tag-len 4]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import zlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "common"))
+
+import pager_crypto  # noqa: E402
+
+KEY_HEX = "9F3C7A12D4E8B5C1A0F2D39B7E5648AF"
+FRAME_LEN = 45
+
+
+def measure(fn, frames):
+    lat = []
+    for i in range(frames):
+        t0 = time.perf_counter_ns()
+        fn(i)
+        lat.append(time.perf_counter_ns() - t0)
+    return lat
+
+def report(name, tx, rx, overhead, payload):
+    f = lambda lat: statistics.fmean(lat) / 1000.0
+    print(f"{name:<11} tx {f(tx):6.2f} us   rx {f(rx):6.2f} us   "
+          f"overhead {overhead:2d} B   payload {payload:2d} B")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--frames", type=int, default=20000)
+    ap.add_argument("--tag-len", type=int, default=4)
+    args = ap.parse_args()
+
+    key = pager_crypto.parse_key_hex(KEY_HEX)
+    gen = pager_crypto.CtrKeystream(key)
+    crc = lambda b: (zlib.crc32(b) & 0xFFFFFFFF).to_bytes(4, "big")
+
+    # --- CTR, random nonce: [SEQ | NONCE(8) | CT(32) | CRC(4)] ---
+    pt32 = os.urandom(32)
+    frames = {}
+    def ctr_random_tx(i):
+        nonce = os.urandom(pager_crypto.NONCE_LEN)
+        body = bytes([i & 0xFF]) + nonce + gen.crypt(nonce, pt32)
+        frames[i] = body + crc(body)
+    def ctr_random_rx(i):
+        buf = frames.pop(i)
+        assert crc(buf[:-4]) == buf[-4:]
+        return gen.crypt(buf[1:9], buf[9:-4])
+    tx = measure(ctr_random_tx, args.frames)
+    rx = measure(ctr_random_rx, args.frames)
+    report("ctr-random", tx, rx, FRAME_LEN - 1 - 32, 32)
+
+    # --- CTR, implicit counter: [SEQ | CTR_LO(2) | CT(38) | CRC(4)] ---
+    pt38 = os.urandom(38)
+    counter = pager_crypto.NonceCounter(15)
+    pool = pager_crypto.KeystreamPool(key, length=38, size=args.frames, nonce_fn=counter.next_nonce)
+    pool.fill()
+    nonces = {}
+    def ctr_impl_tx(i):
+        nonce, ct = pool.encrypt(pt38)
+        body = bytes([i & 0xFF]) + nonce[-2:] + ct
+        frames[i] = body + crc(body)
+        nonces[i] = nonce
+    def ctr_impl_rx(i):
+        buf = frames.pop(i)
+        assert crc(buf[:-4]) == buf[-4:]
+        return gen.crypt(nonces.pop(i), buf[3:-4])
+    tx = measure(ctr_impl_tx, args.frames)
+    rx = measure(ctr_impl_rx, args.frames)
+    report("ctr-impl", tx, rx, FRAME_LEN - 1 - 38, 38)
+
+    # --- GCM: [SEQ | CTR_LO(2) | CT(N) | TAG] ---
+    n = FRAME_LEN - 1 - pager_crypto.CTR_WIRE_LEN - args.tag_len
+    ptn = os.urandom(n)
+    gcm = pager_crypto.GcmContext(key, args.tag_len)        # as the session key's context
+    def gcm_tx(i):
+        ctr_lo = (i & 0xFFFF).to_bytes(2, "big")
+        aad = pager_crypto.aead_aad(20, 0x01, i, ctr_lo)
+        frames[i] = bytes([i & 0xFF]) + ctr_lo + gcm.seal(pager_crypto.aead_nonce(i), aad, ptn)
+    def gcm_rx(i):
+        buf = frames.pop(i)
+        aad = pager_crypto.aead_aad(20, 0x01, buf[0], buf[1:3])
+        pt = gcm.open(pager_crypto.aead_nonce(i), aad, buf[3:])
+        assert pt == ptn
+    tx = measure(gcm_tx, args.frames)
+    rx = measure(gcm_rx, args.frames)
+    report("gcm", tx, rx, FRAME_LEN - 1 - n, n)
+
+    # Any flipped bit must fail the tag check
+    gcm_tx(0)
+    bad = bytearray(frames[0]); bad[5] ^= 0x01
+    aad = pager_crypto.aead_aad(20, 0x01, bad[0], bytes(bad[1:3]))
+    assert gcm.open(pager_crypto.aead_nonce(0), aad, bytes(bad[3:])) is None
+
+    print(f"\n{args.frames} frames of {FRAME_LEN} B (SEQ included, address/type excluded)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: AES-CTR per-frame encryption latency
+-----------------------------------------------
+Measures the work done inside pdu_aes_encrypt._handle_msg for one
+32-byte chat payload, three ways:
+    new-cipher : AES.new(key, MODE_CTR, nonce) per frame (original block)
+    no-pool    : cached ECB context, keystream computed per frame
+    pool       : KeystreamPool (precomputed keystream, pop + XOR)
+
+Frames are sent in bursts (--burst) with a pause between bursts
+(--gap-ms) so the pool's background thread has time to refill, the way
+chat traffic arrives. Pool misses are reported.
+
+Usage:
+    python3 bench_aes_pool.py [--frames 20000] [--burst 64] [--gap-ms 2] [--pool-size 256]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "common"))
+
+from Crypto.Cipher import AES  # noqa: E402
+import pager_crypto  # noqa: E402
+
+KEY_HEX = "9F3C7A12D4E8B5C1A0F2D39B7E5648AF"
+
+
+def measure(fn, frames, burst, gap_s, payload):
+    lat = []
+    sent = 0
+    while sent < frames:
+        for _ in range(min(burst, frames - sent)):
+            t0 = time.perf_counter_ns()
+            fn(payload)
+            lat.append(time.perf_counter_ns() - t0)
+            sent += 1
+        if gap_s: time.sleep(gap_s)
+    return lat
+
+def report(name, lat, extra=""):
+    lat = sorted(lat)
+    p = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] / 1000.0
+    print(f"{name:<11} mean {statistics.fmean(lat) / 1000.0:6.2f} us   p50 {p(0.50):6.2f}   "
+          f"p99 {p(0.99):6.2f}   p99.9 {p(0.999):7.2f}  {extra}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--frames", type=int, default=20000)
+    ap.add_argument("--burst", type=int, default=64)
+    ap.add_argument("--gap-ms", type=float, default=2.0)
+    ap.add_argument("--pool-size", type=int, default=256)
+    ap.add_argument("--payload-size", type=int, default=32)
+    args = ap.parse_args()
+
+    key = pager_crypto.parse_key_hex(KEY_HEX)
+    payload = os.urandom(args.payload_size)
+    gap = args.gap_ms / 1000.0
+
+    def new_cipher(pt):
+        nonce = os.urandom(pager_crypto.NONCE_LEN)
+        return nonce + AES.new(key, AES.MODE_CTR, nonce=nonce).encrypt(pt)
+
+    gen = pager_crypto.CtrKeystream(key)
+    def no_pool(pt):
+        nonce = os.urandom(pager_crypto.NONCE_LEN)
+        return nonce + gen.crypt(nonce, pt)
+
+    pool = pager_crypto.KeystreamPool(key, length=args.payload_size, size=args.pool_size)
+    pool.fill()
+    pool.start()
+    def pooled(pt):
+        nonce, ct = pool.encrypt(pt)
+        return nonce + ct
+
+    # Sanity: the pooled output decrypts with a stock CTR cipher
+    out = pooled(payload)
+    assert AES.new(key, AES.MODE_CTR, nonce=out[:8]).decrypt(out[8:]) == payload
+    pool.hits = pool.misses = 0
+
+    print(f"{args.frames} frames of {args.payload_size} B, bursts of {args.burst}, gap {args.gap_ms} ms\n")
+    report("new-cipher", measure(new_cipher, args.frames, args.burst, gap, payload))
+    report("no-pool", measure(no_pool, args.frames, args.burst, gap, payload))
+    lat = measure(pooled, args.frames, args.burst, gap, payload)
+    pool.stop()
+    report("pool", lat, f"(hits={pool.hits} misses={pool.misses})")
+
+
+if __name__ == "__main__":
+    main()
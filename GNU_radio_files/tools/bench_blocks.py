@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-block PDU handling cost of the embedded blocks
+-------------------------------------------------------------
+Calls each block's message handler directly, one PDU at a time, in the
+order a frame goes through the node, and feeds what a block publishes to
+the next one:
+
+  aead  app PDU -> payload_to_pdu_with_seq_arq -> aead_seal -> add_address_block
+        -> address_filter_rx -> aead_verify_and_ack -> (CRC-32) -> add_ack_address_block
+        -> ack_address_filter_rx -> ack_crc32_verify_minimal
+  ctr   app PDU -> pdu_aes_encrypt -> payload_to_pdu_with_seq_arq -> (CRC-32)
+        -> add_address_block -> address_filter_rx -> crc32_verify_and_ack
+        -> pdu_aes_decrypt, and the same ACK path
+  batchN  (--batch N) CRC-32'd frames, N per batch PDU -> add_address_block
+        -> address_filter_rx -> crc32_verify_and_ack, and the same ACK path;
+        the blocks publish single PDUs, so the harness groups each block's
+        output into batches of N again for the next one (nothing in the
+        node produces batches yet)
+
+The ARQ row is one full cycle per frame: PDU in, frame out, ACK in,
+status out (its TX thread is not started; pager_mac is stepped directly).
+Reported per block (for batches, a message is one frame of a batch):
+    msg/s      messages per second of handler time
+    p50 / p99  per-message latency in microseconds (handler call / frames)
+    alloc      bytes allocated per message (tracemalloc peak per call, in a
+               separate pass)
+    objs       net change in live objects per message (what the block keeps,
+               plus its outputs, which the harness holds on to; garbage is
+               collected before and after, never during the run)
+Uses GNU Radio's pmt and gr when they import, else the stand-in in
+tools/standin (plain Python objects, no scheduler); --standin forces it.
+Compare runs with the same runtime only.
+
+Usage:
+    python3 bench_blocks.py [--messages 5000] [--link-crypto both] [--batch 32] [--save baseline.json]
+    python3 bench_blocks.py --baseline baseline.json [--tolerance 0.20]
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import zlib
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "User_1"))
+sys.path.insert(0, os.path.join(HERE, "..", "common"))
+
+KEY_HEX = "9F3C7A12D4E8B5C1A0F2D39B7E5648AF"
+A, B = 15, 20
+pmt = None
+
+
+def load_runtime(force_standin):
+    """ Imports pmt and gnuradio.gr, real or stand-in; returns a label for the report """
+    global pmt
+    if not force_standin:
+        try:
+            import pmt as real_pmt
+            from gnuradio import gr
+            pmt = real_pmt
+            return f"GNU Radio {gr.version()}"
+        except ImportError:
+            pass
+    sys.path.insert(0, os.path.join(HERE, "standin"))
+    for name in ("pmt", "gnuradio", "gnuradio.gr"):
+        sys.modules.pop(name, None)
+    import pmt as standin_pmt
+    pmt = standin_pmt
+    return "stand-in pmt/gr"
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))] if xs else float("nan")
+
+
+def config(my_addr, dest_addr):
+    d = pmt.dict_add(pmt.make_dict(), pmt.intern("my_addr"), pmt.from_long(my_addr))
+    return pmt.dict_add(d, pmt.intern("dest_addr"), pmt.from_long(dest_addr))
+
+
+class Tap:
+    """ Stands in for a block's message_port_pub: keeps what it publishes, per port """
+
+    def __init__(self, blk):
+        self.out = {}
+        blk.message_port_pub = self.pub
+
+    def pub(self, port, msg):
+        self.out.setdefault(pmt.symbol_to_string(port), []).append(msg)
+
+    def take(self, port):
+        return self.out.pop(port, [])
+
+
+def frames_in(pdu):
+    pl = pmt.cdr(pdu)
+    return pmt.length(pl) if pmt.is_vector(pl) else 1
+
+
+def crc_append(pdus):
+    """ What digital.crc_append(32, ...) does between the blocks: CRC-32 trailer, big-endian """
+    import pager_pdu
+    out = []
+    for pdu in pdus:
+        if pager_pdu.is_batch(pmt.cdr(pdu)):
+            rows = pager_pdu.batch_rows(pager_pdu.batch_frames(pmt.cdr(pdu)))
+            crc = pager_pdu.crc32_rows(rows).astype(">u4").view(np.uint8).reshape(-1, 4)
+            out.append(pager_pdu.make_batch(pmt.car(pdu), np.hstack((rows, crc))))
+            continue
+        data = bytes(pmt.u8vector_elements(pmt.cdr(pdu)))
+        data += zlib.crc32(data).to_bytes(4, "big")
+        out.append(pmt.cons(pmt.car(pdu), pmt.init_u8vector(len(data), list(data))))
+    return out
+
+
+def batched(pdus, size):
+    """ Single PDUs -> batch PDUs of `size` frames; meta values that fit a byte become per-frame columns """
+    import pager_pdu
+    out = []
+    for i in range(0, len(pdus), size):
+        group = pdus[i:i + size]
+        metas = [pmt.car(pdu) for pdu in group]
+        meta = metas[0]
+        for key in pmt.dict_keys(meta):
+            vals = [pmt.dict_ref(m, key, pmt.PMT_NIL) for m in metas]
+            if all(pmt.is_integer(v) and 0 <= pmt.to_long(v) < 256 for v in vals):
+                meta = pmt.dict_add(meta, key, pager_pdu.u8vector(bytes(pmt.to_long(v) for v in vals)))
+        out.append(pager_pdu.make_batch(meta, [pager_pdu.pdu_bytes(pmt.cdr(pdu)) for pdu in group]))
+    return out
+
+
+def app_pdus(n, size, seed=1):
+    import random
+    rng = random.Random(seed)
+    pdus = []
+    for i in range(n):
+        meta = pmt.dict_add(pmt.make_dict(), pmt.intern("msg_id"), pmt.from_long(i + 1))
+        meta = pmt.dict_add(meta, pmt.intern("frame_id"), pmt.from_long(i + 1))
+        meta = pmt.dict_add(meta, pmt.intern("dest_addr"), pmt.from_long(B))
+        body = [rng.randrange(256) for _ in range(size)]
+        pdus.append(pmt.cons(meta, pmt.init_u8vector(size, body)))
+    return pdus
+
+
+def framed_pdus(n, batch, seed=1):
+    """ [ SEQ | PAYLOAD(40) | CRC-32 ] as the ARQ and crc_append hand them on, `batch` frames per PDU """
+    import pager_pdu
+    rows = np.random.default_rng(seed).integers(0, 256, (n, 41), dtype=np.uint8)
+    rows[:, 0] = np.arange(n) & 0xFF
+    meta = pmt.dict_add(pmt.make_dict(), pmt.intern("dest_addr"), pmt.from_long(B))
+    return crc_append([pager_pdu.make_batch(meta, rows[i:i + batch]) for i in range(0, n, batch)])
+
+
+class Stage:
+    """ One block in the pipeline: how to build it, configure it and push a PDU into it """
+
+    def __init__(self, name, make, handler, out_port, cfg=None, post=None):
+        self.name, self.make, self.handler = name, make, handler
+        self.out_port, self.cfg, self.post = out_port, cfg, post
+
+
+def arq_cycle(blk, pdu):
+    """ One frame through the ARQ without its thread: PDU in, frame out, ACK in, status out """
+    import pager_mac
+    now = float(-blk._frame_id)         # any increasing clock will do, nothing times out (local ids count down)
+    blk._handle_payload(pdu)
+    for action in blk._arq.poll(now):
+        blk._transmit(*action[1:])
+    next_seq = pager_mac.ack_seq(action[2])
+    ack = pmt.dict_add(pmt.make_dict(), pmt.intern("ack"), pmt.from_long(next_seq))
+    ack = pmt.dict_add(ack, pmt.intern("src_addr"), pmt.from_long(B))
+    blk._handle_ack(pmt.cons(ack, pmt.init_u8vector(1, [next_seq])))
+    for action in blk._arq.poll(now):
+        blk._done(*action[1:])
+
+
+def pipeline(link_crypto):
+    if link_crypto.startswith("batch"):
+        return batch_pipeline()
+
+    import user1_1_epy_block_0_0 as b0_0
+    import user1_1_epy_block_10 as b10
+    import user1_1_epy_block_12 as b12
+    import user1_1_epy_block_1_0 as b1_0
+    import user1_1_epy_block_2 as b2
+    import user1_1_epy_block_6 as b6
+
+    def arq(size, post=None):
+        def make():
+            blk = b10.payload_to_pdu_with_seq_arq(payload_size=size, wait_time_s=0.3, max_retries=10, verbose=False)
+            blk._run.set()              # status events on, TX thread not started
+            return blk
+        return Stage("payload_to_pdu_with_seq_arq", make, arq_cycle, "out", post=post)
+
+    address = Stage("add_address_block", b0_0.add_address_block, "handle_msg", "out", config(A, B))
+    addr_filter = Stage("address_filter_rx", lambda: b2.address_filter_rx(preamble_len=128), "_handle", "out",
+                        config(B, A))
+    ack_path = [
+        Stage("add_ack_address_block", b1_0.add_ack_address_block, "handle_msg", "out", config(B, A)),
+        Stage("ack_address_filter_rx", lambda: b6.ack_address_filter_rx(preamble_len=128), "_handle", "out",
+              config(A, B)),
+        Stage("ack_crc32_verify_minimal", lambda: b12.ack_crc32_verify_minimal(variant="zlib"), "_handle",
+              "ack_out"),
+    ]
+    if link_crypto == "aead":
+        import user1_1_epy_block_13 as b13
+        import user1_1_epy_block_14 as b14
+        return 38, [
+            arq(38),
+            Stage("aead_seal", lambda: b13.aead_seal(key_hex=KEY_HEX, tag_len=4, sync_interval=64), "_handle",
+                  "out", config(A, B)),
+            address,
+            addr_filter,
+            Stage("aead_verify_and_ack", lambda: b14.aead_verify_and_ack(key_hex=KEY_HEX, tag_len=4, window=1024,
+                                                                         payload_len=40),
+                  "_handle", "out", config(B, A)),
+        ] + ack_path
+    import user1_1_epy_block_11 as b11
+    import user1_1_epy_block_4 as b4
+    import user1_1_epy_block_8 as b8
+    return 38, [
+        Stage("pdu_aes_encrypt", lambda: b4.pdu_aes_encrypt(key_hex=KEY_HEX, payload_size=38, pool_size=256,
+                                                            nonce_mode="implicit", verbose=False),
+              "_handle_msg", "out", config(A, B)),
+        arq(40, post=crc_append),
+        address,
+        addr_filter,
+        Stage("crc32_verify_and_ack", lambda: b11.crc32_verify_and_ack(variant="zlib"), "_handle", "out"),
+        Stage("pdu_aes_decrypt", lambda: b8.pdu_aes_decrypt(key_hex=KEY_HEX, nonce_mode="implicit", window=1024,
+                                                            replay_capacity=4096, verbose=False),
+              "_handle_msg", "out", config(B, A)),
+    ] + ack_path
+
+
+def batch_pipeline():
+    """ The blocks that take batch PDUs, framing to CRC check and the ACK path """
+    _, stages = pipeline("ctr")
+    keep = ("add_address_block", "address_filter_rx", "crc32_verify_and_ack", "add_ack_address_block",
+            "ack_address_filter_rx", "ack_crc32_verify_minimal")
+    return None, [s for s in stages if s.name in keep]
+
+
+def run_pipeline(link_crypto, messages, trace):
+    """ Pushes `messages` app PDUs (frames, for batchN) through every stage; returns {block: stats} """
+    size, stages = pipeline(link_crypto)
+    batch = int(link_crypto[5:]) if size is None else 0
+    if batch:
+        pdus = framed_pdus(messages, batch)
+    else:
+        pdus = app_pdus(messages, size)
+    results = {}
+    ack_inputs = None
+    for stage in stages:
+        if stage.name == "add_ack_address_block": pdus = ack_inputs
+        blk = stage.make()
+        tap = Tap(blk)
+        if stage.cfg is not None: blk.handle_config(stage.cfg)
+        started = hasattr(blk, "_senders")
+        if started: blk.start()
+        tap.out.clear()
+        if callable(stage.handler):
+            handler = (lambda fn, b: lambda pdu: fn(b, pdu))(stage.handler, blk)
+        else:
+            handler = getattr(blk, stage.handler)
+        lat, alloc = [], 0
+        # No collection inside the loop: cycles left by earlier stages would
+        # otherwise be freed mid-run and push the count below zero
+        gc.collect()
+        gc.disable()
+        blocks_before = sys.getallocatedblocks()
+        for pdu in pdus:
+            k = frames_in(pdu)
+            if trace:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                handler(pdu)
+                alloc += tracemalloc.get_traced_memory()[1] - base
+            else:
+                t0 = time.perf_counter_ns()
+                handler(pdu)
+                lat += [(time.perf_counter_ns() - t0) / k] * k
+        gc.enable()
+        gc.collect()
+        retained = sys.getallocatedblocks() - blocks_before
+        if started: blk.stop()
+        out = tap.take(stage.out_port)
+        if stage.name in ("aead_verify_and_ack", "crc32_verify_and_ack"):
+            acks = tap.take("ack_out")
+            ack_inputs = crc_append(batched(acks, batch) if batch else acks)
+        if stage.post is not None: out = stage.post(out)
+        n = sum(frames_in(pdu) for pdu in pdus)
+        n_out = sum(frames_in(pdu) for pdu in out)
+        if batch: out = batched(out, batch)
+        if trace:
+            results[stage.name] = {"alloc_bytes": alloc / max(1, n), "retained_per_msg": retained / max(1, n)}
+        else:
+            results[stage.name] = {"messages": n, "out": n_out,
+                                   "msgs_per_s": n / (sum(lat) / 1e9) if lat else 0.0,
+                                   "p50_us": pct(lat, 50) / 1e3, "p99_us": pct(lat, 99) / 1e3}
+        pdus = out
+    return results
+
+
+def compare(now, base, tolerance):
+    """ Prints the change against a saved run; returns the regressions """
+    regressions = []
+    print(f"\nvs. baseline ({base.get('runtime')}, {base.get('python')}):")
+    for key, row in now["blocks"].items():
+        old = base["blocks"].get(key)
+        if old is None:
+            print(f"  {key:44s} (new)")
+            continue
+        d_rate = row["msgs_per_s"] / old["msgs_per_s"] - 1.0 if old["msgs_per_s"] else 0.0
+        d_p99 = row["p99_us"] / old["p99_us"] - 1.0 if old["p99_us"] else 0.0
+        d_alloc = (row["alloc_bytes"] - old["alloc_bytes"]) / old["alloc_bytes"] if old["alloc_bytes"] else 0.0
+        flag = []
+        if d_rate < -tolerance: flag.append("msg/s")
+        if d_p99 > tolerance: flag.append("p99")
+        if d_alloc > tolerance: flag.append("alloc")
+        if flag: regressions.append((key, flag))
+        print(f"  {key:44s} msg/s {d_rate * 100:+6.1f}%  p99 {d_p99 * 100:+6.1f}%  alloc {d_alloc * 100:+6.1f}%"
+              f"{'   REGRESSION: ' + ', '.join(flag) if flag else ''}")
+    if base.get("runtime") != now["runtime"]:
+        print("  note: different runtime than the baseline, numbers are not comparable")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--messages", type=int, default=5000, help="app PDUs per pipeline")
+    ap.add_argument("--link-crypto", choices=("aead", "ctr", "both"), default="both")
+    ap.add_argument("--batch", type=int, default=0, help="also run the batch pipeline, N frames per batch PDU")
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs per pipeline, the best one is kept")
+    ap.add_argument("--standin", action="store_true", help="use tools/standin even if GNU Radio is installed")
+    ap.add_argument("--save", default="", help="write the results as a baseline JSON")
+    ap.add_argument("--baseline", default="", help="compare with a saved baseline JSON")
+    ap.add_argument("--tolerance", type=float, default=0.20, help="relative change counted as a regression")
+    args = ap.parse_args()
+
+    runtime = load_runtime(args.standin)
+    report = {"runtime": runtime, "python": platform.python_version(), "messages": args.messages, "blocks": {}}
+    print(f"{runtime}, Python {report['python']}, {args.messages} messages, best of {args.repeat}")
+    print(f"{'block':44s} {'msg/s':>9} {'p50 us':>8} {'p99 us':>8} {'alloc B':>8} {'objs':>6} {'in -> out':>12}")
+    links = ("aead", "ctr") if args.link_crypto == "both" else (args.link_crypto,)
+    for link in links + ((f"batch{args.batch}",) if args.batch > 0 else ()):
+        best = None
+        for _ in range(max(1, args.repeat)):
+            res = run_pipeline(link, args.messages, trace=False)
+            if best is None:
+                best = res
+            else:
+                for name, row in res.items():
+                    if row["msgs_per_s"] > best[name]["msgs_per_s"]: best[name] = row
+        tracemalloc.start()
+        mem = run_pipeline(link, args.messages, trace=True)
+        tracemalloc.stop()
+        for name, row in best.items():
+            row.update(mem[name])
+            report["blocks"][f"{link}:{name}"] = row
+            print(f"{link + ':' + name:44s} {row['msgs_per_s']:9.0f} {row['p50_us']:8.1f} {row['p99_us']:8.1f} "
+                  f"{row['alloc_bytes']:8.0f} {row['retained_per_msg']:6.2f} {row['messages']:5d} -> {row['out']:<5d}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f"saved {args.save}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            base = json.load(f)
+        if compare(report, base, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
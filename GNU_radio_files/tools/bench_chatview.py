@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark: chat view frame time and memory with a long history
+--------------------------------------------------------------
+Fills the virtualized chat view (pager_chatview) with --messages rows
+and measures:
+    append     : time to add the rows to the model
+    frame      : synchronous viewport repaint at the bottom, in the middle,
+                 and while scrolling (one repaint per wheel step)
+    theme      : light -> dark switch including the repaint
+    memory     : RSS growth and Python allocations per message
+--legacy N builds N rows the old way (QWidget row, two QLabels, layout
+and drop shadow per message) for comparison.
+
+Runs headless with QT_QPA_PLATFORM=offscreen.
+
+Usage:
+    python3 bench_chatview.py [--messages 100000] [--scroll-steps 200] [--legacy 2000]
+"""
+
+import argparse
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "common"))
+
+from PyQt5 import QtWidgets, QtGui  # noqa: E402
+import pager_chatview  # noqa: E402
+
+THEMES = {
+    "light": {"bg_color": "#E5DDD5", "text_primary": "black", "bubble_own": "#DCF8C6",
+              "bubble_other": "#FFFFFF", "time_color": "gray", "tick_color": "#4DF0F0", "border": "#dcdcdc"},
+    "dark": {"bg_color": "#0b141a", "text_primary": "#e9edef", "bubble_own": "#005c4b",
+             "bubble_other": "#202c33", "time_color": "#8696a0", "tick_color": "#53bdeb", "border": "#202c33"},
+}
+WORDS = "meet at the north gate running late copy that battery low please confirm on my way".split()
+
+
+def rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def frame_ms(view):
+    t0 = time.perf_counter()
+    view.viewport().repaint()
+    return (time.perf_counter() - t0) * 1000.0
+
+def text(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 30)))
+
+def stats(name, xs):
+    xs = sorted(xs)
+    print(f"{name:<18} mean {statistics.fmean(xs):7.3f} ms   p95 {xs[int(0.95 * (len(xs) - 1))]:7.3f} ms   "
+          f"max {xs[-1]:7.3f} ms")
+
+
+def bench_view(app, n, steps):
+    rng = random.Random(1)
+    model = pager_chatview.ChatModel()
+    view = pager_chatview.ChatView(model, pager_chatview.BubbleDelegate(THEMES["light"]))
+    view.set_theme(THEMES["light"])
+    view.resize(450, 600)
+    view.show()
+    app.processEvents()
+
+    rss0 = rss_kb()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for i in range(n):
+        row = model.append(text(rng), i % 2 == 0, "12:00")
+        if i % 3 == 0: model.set_delivered(row, "12:01")
+    t_append = time.perf_counter() - t0
+    py_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Let the batched layout finish
+    view.doItemsLayout()
+    t0 = time.perf_counter()
+    while view.verticalScrollBar().maximum() == 0 and time.perf_counter() - t0 < 60:
+        app.processEvents()
+    t_layout = time.perf_counter() - t0
+    print(f"{n} messages: append {t_append:.2f} s ({t_append / n * 1e6:.1f} us/msg), layout {t_layout:.2f} s")
+    print(f"memory: RSS +{(rss_kb() - rss0) / 1024:.1f} MiB, Python {py_bytes / n:.0f} B/msg")
+
+    sb = view.verticalScrollBar()
+    view.scrollToBottom(); app.processEvents()
+    stats("frame @bottom", [frame_ms(view) for _ in range(50)])
+    sb.setValue(sb.maximum() // 2); app.processEvents()
+    stats("frame @middle", [frame_ms(view) for _ in range(50)])
+    scroll = []
+    for _ in range(steps):
+        sb.setValue(sb.value() + 3 * sb.singleStep())
+        scroll.append(frame_ms(view))
+    stats("frame scrolling", scroll)
+
+    t0 = time.perf_counter()
+    view.set_theme(THEMES["dark"])
+    view.viewport().repaint()
+    print(f"theme switch       {(time.perf_counter() - t0) * 1000.0:7.3f} ms")
+
+
+def bench_legacy(app, n):
+    """ The per-message widget construction the view replaced """
+    rng = random.Random(1)
+    area = QtWidgets.QScrollArea()
+    area.setWidgetResizable(True)
+    box = QtWidgets.QWidget()
+    lay = QtWidgets.QVBoxLayout(box)
+    area.setWidget(box)
+    area.resize(450, 600)
+    area.show()
+    rows = []
+    rss0 = rss_kb()
+    t0 = time.perf_counter()
+    for i in range(n):
+        row = QtWidgets.QWidget(); hl = QtWidgets.QHBoxLayout(row)
+        stack = QtWidgets.QWidget(); vl = QtWidgets.QVBoxLayout(stack)
+        bubble, ts = QtWidgets.QLabel(text(rng)), QtWidgets.QLabel("12:00")
+        bubble.setWordWrap(True)
+        vl.addWidget(bubble); vl.addWidget(ts)
+        shadow = QtWidgets.QGraphicsDropShadowEffect(); shadow.setBlurRadius(5)
+        shadow.setColor(QtGui.QColor(0, 0, 0, 40)); stack.setGraphicsEffect(shadow)
+        stack.setStyleSheet("background-color: #DCF8C6; border-radius: 10px;")
+        hl.addWidget(stack); lay.addWidget(row)
+        rows.append((bubble, stack, ts))
+    app.processEvents()
+    t_append = time.perf_counter() - t0
+    print(f"\nlegacy {n} messages: append {t_append:.2f} s ({t_append / n * 1e6:.1f} us/msg), "
+          f"RSS +{(rss_kb() - rss0) / 1024:.1f} MiB")
+    stats("legacy frame", [frame_ms(area) for _ in range(10)])
+    t0 = time.perf_counter()
+    for bubble, stack, ts in rows:
+        stack.setStyleSheet("background-color: #005c4b; border-radius: 10px;")
+        bubble.setStyleSheet("color: #e9edef;")
+    area.viewport().repaint()
+    print(f"legacy theme       {(time.perf_counter() - t0) * 1000.0:7.3f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--messages", type=int, default=100000)
+    ap.add_argument("--scroll-steps", type=int, default=200)
+    ap.add_argument("--legacy", type=int, default=0)
+    args = ap.parse_args()
+
+    app = QtWidgets.QApplication(sys.argv)
+    bench_view(app, args.messages, args.scroll_steps)
+    if args.legacy:
+        bench_legacy(app, args.legacy)
+
+
+if __name__ == "__main__":
+    main()
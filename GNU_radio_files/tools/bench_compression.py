@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: paging payload compression
+-------------------------------------
+Runs every page of a corpus through the chat block's chunking
+(31-byte chunk capacity per 32-byte frame) with:
+    none        : uncompressed (today's behaviour)
+    zlib        : raw DEFLATE, no dictionary
+    preset      : raw DEFLATE + pager_codec.PAGING_DICT  (what the block uses)
+    trained     : raw DEFLATE + dictionary trained on the other half of the corpus
+
+Reports bytes and frames on air relative to "none", and CPU time per
+message for compress + decompress.
+
+Usage:
+    python3 bench_compression.py [--corpus paging_corpus.txt] [--payload-size 32] [--repeat 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+import zlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "common"))
+
+import pager_codec  # noqa: E402
+
+
+def frames_for(n_bytes, chunk_cap):
+    return max(1, (n_bytes + chunk_cap - 1) // chunk_cap)
+
+def deflate(data, zdict):
+    if zdict is None:
+        c = zlib.compressobj(9, zlib.DEFLATED, -15, 9)
+        return c.compress(data) + c.flush()
+    return pager_codec.compress(data, zdict)
+
+def inflate(data, zdict):
+    if zdict is None:
+        return zlib.decompressobj(-15).decompress(data)
+    return pager_codec.decompress(data, zdict)
+
+
+def run(name, pages, chunk_cap, repeat, zdict_for=None):
+    """ zdict_for(page) -> dictionary (None = plain DEFLATE); zdict_for=None = no compression """
+    if zdict_for is None:
+        enc = lambda p: p
+        dec = lambda c, p: c
+    else:
+        enc = lambda p: deflate(p, zdict_for(p))
+        dec = lambda c, p: inflate(c, zdict_for(p))
+
+    raw_bytes = sum(len(p) for p in pages)
+    raw_frames = sum(frames_for(len(p), chunk_cap) for p in pages)
+    out_bytes = out_frames = 0
+    for p in pages:
+        packed = enc(p)
+        assert dec(packed, p) == p
+        # The block only sends the compressed form if it saves a frame
+        n = len(packed) if frames_for(len(packed), chunk_cap) < frames_for(len(p), chunk_cap) else len(p)
+        out_bytes += n
+        out_frames += frames_for(n, chunk_cap)
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for p in pages:
+            dec(enc(p), p)
+    us = (time.perf_counter() - t0) / (repeat * len(pages)) * 1e6
+
+    print(f"{name:<8} bytes {out_bytes:6d} ({out_bytes / raw_bytes:6.1%})   "
+          f"frames {out_frames:5d} ({out_frames / raw_frames:6.1%})   "
+          f"cpu {us:7.1f} us/msg")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--corpus", default=os.path.join(HERE, "paging_corpus.txt"))
+    ap.add_argument("--payload-size", type=int, default=32)
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    with open(args.corpus, "rb") as f:
+        pages = [l.rstrip(b"\r\n") for l in f if l.strip()]
+    chunk_cap = args.payload_size - 1
+
+    # Train on even lines, evaluate on odd lines (and the reverse) to avoid testing on training data
+    half_a, half_b = pages[0::2], pages[1::2]
+    dict_a = pager_codec.train_dictionary(half_a)
+    dict_b = pager_codec.train_dictionary(half_b)
+    trained = {p: dict_b for p in half_a}
+    trained.update({p: dict_a for p in half_b})
+
+    print(f"{len(pages)} pages, {sum(len(p) for p in pages)} bytes, chunk capacity {chunk_cap} B\n")
+    run("none", pages, chunk_cap, args.repeat)
+    run("zlib", pages, chunk_cap, args.repeat, lambda p: None)
+    run("preset", pages, chunk_cap, args.repeat, lambda p: pager_codec.PAGING_DICT)
+    run("trained", pages, chunk_cap, args.repeat, lambda p: trained[p])
+
+
+if __name__ == "__main__":
+    main()
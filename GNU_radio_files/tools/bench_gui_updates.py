@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark: GUI event handling during rx/ACK bursts
+--------------------------------------------------
+A worker thread (standing in for the flowgraph message handlers) posts
+a burst of received messages interleaved with ACKs, the two ways the
+chat block has delivered them to the GUI:
+    per-event : one queued signal per event, each bubble followed by
+                processEvents() and a 10 ms single-shot scroll (old path)
+    batched   : UpdateBatcher, applied at ~60 Hz with one insert and one
+                scroll per tick
+Reports how long the worker is held up, the time until everything is
+on screen, display latency percentiles and GUI-thread time per event.
+
+Runs headless with QT_QPA_PLATFORM=offscreen.
+
+Usage:
+    python3 bench_gui_updates.py [--events 2000] [--ack-every 4] [--rate 0]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "common"))
+
+from PyQt5 import QtWidgets, QtCore  # noqa: E402
+import pager_chatview  # noqa: E402
+
+THEME = {"bg_color": "#E5DDD5", "text_primary": "black", "bubble_own": "#DCF8C6",
+         "bubble_other": "#FFFFFF", "time_color": "gray", "tick_color": "#4DF0F0", "border": "#dcdcdc"}
+
+
+class Harness(QtCore.QObject):
+    rx_sig = QtCore.pyqtSignal(str, float)
+    ack_sig = QtCore.pyqtSignal(float)
+
+    def __init__(self, batched):
+        super().__init__()
+        self.model = pager_chatview.ChatModel()
+        self.view = pager_chatview.ChatView(self.model, pager_chatview.BubbleDelegate(THEME))
+        self.view.resize(450, 600)
+        self.view.show()
+        self.batcher = pager_chatview.UpdateBatcher(self.model, self.view) if batched else None
+        self.latency = []
+        self.gui_s = 0.0
+        self.applied = 0
+        self.own = []
+        self.rx_sig.connect(self.on_rx)
+        self.ack_sig.connect(self.on_ack)
+
+    def on_rx(self, text, posted):
+        t0 = time.monotonic()
+        self.model.append(text, False, "12:00")
+        if self.batcher is None:
+            QtWidgets.QApplication.processEvents()
+            QtCore.QTimer.singleShot(10, self.view.scrollToBottom)
+        else:
+            self.batcher.scroll_to_bottom()
+        self._done(t0, posted)
+
+    def on_ack(self, posted):
+        t0 = time.monotonic()
+        if self.own: self.model.set_delivered(self.own.pop(0), "12:01")
+        self._done(t0, posted)
+
+    def _done(self, t0, posted):
+        t1 = time.monotonic()
+        self.gui_s += t1 - t0
+        self.latency.append(t1 - posted)
+        self.applied += 1
+
+    def post_rx(self, text):
+        if self.batcher: self.batcher.post(self.on_rx, text, time.monotonic())
+        else: self.rx_sig.emit(text, time.monotonic())
+
+    def post_ack(self):
+        if self.batcher: self.batcher.post(self.on_ack, time.monotonic())
+        else: self.ack_sig.emit(time.monotonic())
+
+
+def run(app, batched, events, ack_every, rate):
+    h = Harness(batched)
+    for i in range(events // ack_every + 1):
+        h.own.append(h.model.append(f"sent {i}", True, "12:00"))
+    app.processEvents()
+
+    worker_s = []
+    def worker():
+        t0 = time.monotonic()
+        for i in range(events):
+            if ack_every and i % ack_every == 0: h.post_ack()
+            else: h.post_rx(f"received fragment {i}")
+            if rate: time.sleep(1.0 / rate)
+        worker_s.append(time.monotonic() - t0)
+
+    t0 = time.monotonic()
+    th = threading.Thread(target=worker)
+    th.start()
+    while h.applied < events:
+        app.processEvents(QtCore.QEventLoop.AllEvents, 5)
+    total = time.monotonic() - t0
+    th.join()
+
+    lat = sorted(h.latency)
+    pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] * 1000.0
+    name = "batched" if batched else "per-event"
+    print(f"{name:<10} worker {worker_s[0] * 1000.0:8.1f} ms   on screen {total * 1000.0:8.1f} ms   "
+          f"latency p50 {pct(0.5):7.1f} / p99 {pct(0.99):7.1f} ms   "
+          f"GUI {h.gui_s * 1e6 / events:6.1f} us/event")
+    if h.batcher:
+        st = h.batcher.stats()
+        print(f"{'':<10} {st['ticks']} ticks, mean batch {st['mean_batch']:.1f}, "
+              f"{st['apply_ms_per_tick']:.2f} ms per tick")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--events", type=int, default=2000)
+    ap.add_argument("--ack-every", type=int, default=4)
+    ap.add_argument("--rate", type=float, default=0, help="events/s from the worker (0 = as fast as possible)")
+    args = ap.parse_args()
+
+    app = QtWidgets.QApplication(sys.argv)
+    run(app, False, args.events, args.ack_every, args.rate)
+    run(app, True, args.events, args.ack_every, args.rate)
+
+
+if __name__ == "__main__":
+    main()
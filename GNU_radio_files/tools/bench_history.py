@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark: persistent chat history (pager_history)
+--------------------------------------------------
+Measures, on a database of --messages rows for one peer:
+    append     : caller-side time per message (what the GUI thread pays)
+                 with the batched writer, vs. one committed INSERT per message
+    drain      : time until the writer has everything on disk
+    page       : loading one screen of older messages, at the newest end
+                 and deep in the history
+    search     : FTS query latency
+    export     : streaming the conversation to a file, peak Python memory
+The database is created in a temporary directory and removed afterwards.
+
+Usage:
+    python3 bench_history.py [--messages 100000] [--page 200]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "common"))
+
+import pager_history  # noqa: E402
+
+WORDS = "meet at the north gate running late copy that battery low please confirm on my way".split()
+PEER = 20
+
+
+def text(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 30)))
+
+def timed_ms(fn, reps):
+    xs = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn()
+        xs.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.median(xs)
+
+
+def bench_sync_inserts(path, n):
+    """ The naive alternative: one transaction per message on the caller's thread """
+    rng = random.Random(1)
+    db = sqlite3.connect(path, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute("CREATE TABLE m (id INTEGER PRIMARY KEY, peer INTEGER, ts REAL, is_own INTEGER, status INTEGER, text TEXT)")
+    t0 = time.perf_counter()
+    for i in range(n):
+        db.execute("INSERT INTO m(peer, ts, is_own, status, text) VALUES (?, ?, ?, 0, ?)",
+                   (PEER, time.time(), i % 2, text(rng)))
+    dt = time.perf_counter() - t0
+    db.close()
+    return dt / n * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--messages", type=int, default=100000)
+    ap.add_argument("--page", type=int, default=200)
+    args = ap.parse_args()
+    n = args.messages
+    rng = random.Random(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = pager_history.HistoryStore(os.path.join(tmp, "history.db"))
+        texts = [text(rng) for _ in range(n)]
+        t0 = time.perf_counter()
+        for i, t in enumerate(texts):
+            store.append(PEER, t, i % 2 == 0)
+        t_append = time.perf_counter() - t0
+        store.flush()
+        t_drain = time.perf_counter() - t0
+        st = store.stats()
+        print(f"{n} messages (FTS5: {'yes' if store.fts else 'no, LIKE fallback'})")
+        print(f"append (batched)   {t_append / n * 1e6:7.2f} us/msg on the caller, "
+              f"on disk after {t_drain:.2f} s, {st['batches']} transactions of {st['mean_batch']:.0f}")
+        sync_n = min(n, 5000)
+        print(f"append (per-row)   {bench_sync_inserts(os.path.join(tmp, 'naive.db'), sync_n):7.2f} us/msg "
+              f"({sync_n} committed INSERTs, no FTS)")
+
+        newest = store.page(PEER, limit=args.page)
+        deep = newest[0][0] - n // 2
+        print(f"page newest        {timed_ms(lambda: store.page(PEER, limit=args.page), 20):7.3f} ms")
+        print(f"page middle        {timed_ms(lambda: store.page(PEER, before=deep, limit=args.page), 20):7.3f} ms")
+        for q in ("battery", "north gate", "confirm*"):
+            hits = len(store.search(PEER, q))
+            print(f"search {q!r:<12} {timed_ms(lambda: store.search(PEER, q), 10):7.3f} ms  ({hits} shown)")
+
+        out = os.path.join(tmp, "export.txt")
+        def export():
+            with open(out, "w", encoding="utf-8") as f:
+                for _, _, ts, is_own, _, t in store.export(PEER):
+                    f.write(f"[{ts:.0f}] {'ME' if is_own else PEER}: {t}\n")
+        t0 = time.perf_counter()
+        export()
+        t_export = time.perf_counter() - t0
+        # Second pass for the memory figure (tracemalloc slows the export down)
+        tracemalloc.start()
+        export()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"export             {t_export:.2f} s ({os.path.getsize(out) / 1e6:.1f} MB), "
+              f"peak Python memory {peak / 1024:.0f} KiB")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
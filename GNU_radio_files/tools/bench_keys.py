@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-peer key context lookup
+--------------------------------------
+Cost of getting the cipher context for a peer, the way the crypto
+blocks do on every frame:
+    cold   : HKDF link key + AES/GCM context build (cache miss)
+    cached : KeyManager.get() for a peer already in the LRU
+A traffic mix over --peers peers with an LRU of --capacity entries
+shows the hit rate when the working set does or does not fit.
+
+Usage:
+    python3 bench_keys.py [--lookups 100000] [--peers 4] [--capacity 8]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "common"))
+
+import pager_crypto  # noqa: E402
+
+KEY_HEX = "9F3C7A12D4E8B5C1A0F2D39B7E5648AF"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lookups", type=int, default=100000)
+    ap.add_argument("--peers", type=int, default=4)
+    ap.add_argument("--capacity", type=int, default=8)
+    args = ap.parse_args()
+
+    master = pager_crypto.parse_key_hex(KEY_HEX)
+
+    cold = []
+    for peer in range(256):
+        t0 = time.perf_counter_ns()
+        pager_crypto.PeerContext(peer, pager_crypto.derive_link_key(master, 15, peer), 4)
+        cold.append(time.perf_counter_ns() - t0)
+
+    km = pager_crypto.KeyManager(master, my_addr=15, capacity=args.capacity, tag_len=4)
+    rng = random.Random(1)
+    peers = [rng.randrange(args.peers) for _ in range(args.lookups)]
+    t0 = time.perf_counter_ns()
+    for p in peers:
+        km.get(p)
+    mixed = (time.perf_counter_ns() - t0) / args.lookups
+
+    km.prefetch(0)
+    t0 = time.perf_counter_ns()
+    for _ in range(args.lookups):
+        km.get(0)
+    cached = (time.perf_counter_ns() - t0) / args.lookups
+
+    print(f"cold    {statistics.fmean(cold) / 1000.0:7.2f} us per peer switch")
+    print(f"cached  {cached / 1000.0:7.2f} us per frame")
+    print(f"mixed   {mixed / 1000.0:7.2f} us per frame over {args.peers} peers, LRU {args.capacity}: "
+          f"hits {km.hits - args.lookups}  misses {km.misses}")
+
+
+if __name__ == "__main__":
+    main()
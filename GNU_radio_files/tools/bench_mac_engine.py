@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Benchmark: threaded MAC vs. asyncio MAC engine, latency histograms
+------------------------------------------------------------------
+Runs the headless messaging block and the ARQ against a loopback peer,
+one page at a time, in the two layouts pager_node builds:
+
+  threaded  chat_headless_block + payload_to_pdu_with_seq_arq: the ARQ's
+            handler thread and TX thread (condition variable), the
+            messaging block's handler thread
+  engine    chat_headless_block(mac_engine=True): ARQ, reassembly and API
+            on the pager_engine loop
+
+Each block gets its own thread and message queue, as in GNU Radio's
+scheduler (one thread per block, handlers called in order); the peer is
+one more such block that answers every data frame with its ACK and,
+with --rx, sends a one-frame page back. The ARQ's busy_in is left
+unconnected, so its 150 ms hold after each ACK does not hide the
+handoffs being measured.
+
+Pages go in through send_text() (--driver direct) or a PagerClient on
+the local API socket (--driver api). Reported per layout:
+    send -> on air      send call to the frame reaching the peer
+    ACK -> delivered    ACK published by the peer to the delivery event
+    send -> delivered   the whole page (for --driver api: client send to receipt)
+as log2 histograms in microseconds with p50 / p99, and the context
+switches of the whole process per page (/proc/self/task/*/status).
+Uses GNU Radio's pmt when it imports, else the stand-in in tools/standin;
+gnuradio.gr is always the stand-in (its scheduler is modelled here).
+
+Usage:
+    python3 bench_mac_engine.py [--messages 2000] [--driver direct|api] [--rx]
+    python3 bench_mac_engine.py --layout engine --json engine.json
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "User_1"))
+sys.path.insert(0, os.path.join(HERE, "..", "common"))
+
+A, B = 15, 20
+PAYLOAD = 38
+pmt = gr = None
+
+
+def load_runtime():
+    """ GNU Radio's pmt if it imports, the stand-in gnuradio.gr in any case; returns a label """
+    global pmt, gr
+    label = "stand-in pmt"
+    try:
+        # Loaded into sys.modules here, so the stand-in path added below does not shadow it
+        importlib.import_module("pmt")
+        label = "GNU Radio pmt"
+    except ImportError:
+        pass
+    sys.path.insert(0, os.path.join(HERE, "standin"))
+    for name in ("gnuradio", "gnuradio.gr"):
+        sys.modules.pop(name, None)
+    import pmt as pmt_mod
+    from gnuradio import gr as gr_mod
+    pmt, gr = pmt_mod, gr_mod
+    return label
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))] if xs else float("nan")
+
+
+def ctx_switches():
+    """ Voluntary + involuntary context switches of all threads of this process """
+    total = 0
+    for tid in os.listdir("/proc/self/task"):
+        try:
+            with open(f"/proc/self/task/{tid}/status") as f:
+                for line in f:
+                    if "ctxt_switches" in line:
+                        total += int(line.split()[-1])
+        except OSError:
+            pass
+    return total
+
+
+class Scheduler:
+    """ One thread and queue per block; msg_connect() routes a port to a handler on the receiver's thread """
+
+    def __init__(self):
+        self.blocks = []
+        self._queues = {}
+
+    def add(self, blk):
+        self.blocks.append(blk)
+        self._queues[blk] = queue.SimpleQueue()
+        return blk
+
+    def msg_connect(self, src, src_port, dst, dst_port):
+        q, port = self._queues[dst], pmt.intern(dst_port)
+        src.connect_out(pmt.intern(src_port), lambda msg: q.put((dst, port, msg)))
+
+    def _worker(self, q):
+        while True:
+            item = q.get()
+            if item is None: return
+            blk, port, msg = item
+            blk.post(port, msg)
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._worker, args=(q,), daemon=True) for q in self._queues.values()]
+        for t in self._threads: t.start()
+        for blk in self.blocks: blk.start()
+
+    def stop(self):
+        for blk in self.blocks: blk.stop()
+        for q in self._queues.values(): q.put(None)
+        for t in self._threads: t.join(timeout=2.0)
+
+
+class Peer:
+    """ The other node: ACK for every data frame, and with rx a one-frame page back """
+
+    def __init__(self, rx):
+        self.rx = rx
+        self.block = gr.basic_block("peer")
+        for port in ("ack", "data"): self.block.message_port_register_out(pmt.intern(port))
+        self.block.message_port_register_in(pmt.intern("in"))
+        self.block.set_msg_handler(pmt.intern("in"), self._frame)
+        self.on_air = []                      # time each frame arrived
+        self.acked = []                       # time its ACK was published
+        self._rx_seq = 0
+
+    def _frame(self, pdu):
+        now = time.perf_counter()
+        data = bytes(pmt.u8vector_elements(pmt.cdr(pdu)))
+        seq = data[0]
+        self.on_air.append(now)
+        meta = pmt.dict_add(pmt.make_dict(), pmt.intern("ack"), pmt.from_long((seq + 1) & 0xFF))
+        meta = pmt.dict_add(meta, pmt.intern("src_addr"), pmt.from_long(B))
+        ack = pmt.cons(meta, pmt.init_u8vector(1, [(seq + 1) & 0xFF]))
+        self.acked.append(time.perf_counter())
+        self.block.message_port_pub(pmt.intern("ack"), ack)
+        if self.rx:
+            self._rx_seq = (self._rx_seq + 1) & 0xFF
+            body = list(b"\x01" + f"reply {self._rx_seq}".encode())
+            body += [0] * (PAYLOAD + 1 - len(body))
+            meta = pmt.dict_add(pmt.make_dict(), pmt.intern("seq"), pmt.from_long(self._rx_seq))
+            meta = pmt.dict_add(meta, pmt.intern("src_addr"), pmt.from_long(B))
+            self.block.message_port_pub(pmt.intern("data"), pmt.cons(meta, pmt.init_u8vector(len(body), body)))
+
+
+class Probe:
+    """ MessagingCore listener: the time each frame's delivery event is raised """
+
+    def __init__(self):
+        self.delivered = []                   # time of each delivered / failed event
+        self.cv = threading.Condition()
+        self.count = 0
+
+    def on_arq_status(self, frame_id, seq, status, msg_id):
+        if status == "sent": return
+        with self.cv:
+            self.delivered.append(time.perf_counter())
+            self.count += 1
+            self.cv.notify_all()
+
+    def on_rx_message(self, text, seq, src): pass
+    def on_ack_received(self, ack_val): pass
+    def on_xfer_done(self, xfer_id): pass
+
+
+def build(layout, rx, api_socket, log):
+    import user1_1_epy_block_10 as epy_block_10
+    import user1_1_epy_block_15 as epy_block_15
+    sched = Scheduler()
+    engine = layout == "engine"
+    app = sched.add(epy_block_15.chat_headless_block(payload_size=PAYLOAD, my_id=A, target_id=B, event_log=log,
+                                                     compression=False, api_socket=api_socket, mac_engine=engine,
+                                                     arq_payload_size=PAYLOAD))
+    peer = Peer(rx)
+    sched.add(peer.block)
+    if engine:
+        sched.msg_connect(app, "out", peer.block, "in")
+    else:
+        arq = sched.add(epy_block_10.payload_to_pdu_with_seq_arq(payload_size=PAYLOAD, wait_time_s=0.3,
+                                                                 max_retries=10, verbose=False))
+        sched.msg_connect(app, "out", arq, "in")
+        sched.msg_connect(arq, "out", peer.block, "in")
+        sched.msg_connect(arq, "status", app, "arq_status")
+        sched.msg_connect(peer.block, "ack", arq, "ack_in")
+    sched.msg_connect(peer.block, "ack", app, "ack_in")
+    sched.msg_connect(peer.block, "data", app, "in")
+    probe = Probe()
+    app.core.listeners.append(probe)
+    return sched, app, peer, probe
+
+
+def run_direct(app, probe, n):
+    t_send = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        with probe.cv:
+            target = probe.count + 1
+        app.send_text(f"{i:05d} unit report", B)
+        t_send.append(t0)
+        with probe.cv:
+            probe.cv.wait_for(lambda: probe.count >= target, timeout=5.0)
+    return t_send, []
+
+
+def run_api(path, n):
+    import pager_api
+
+    async def go():
+        t_send, total = [], []
+        async with pager_api.PagerClient(path) as c:
+            for i in range(n):
+                t0 = time.perf_counter()
+                await c.send([(B, f"{i:05d} unit report", 0)])
+                t_send.append(t0)
+                while True:
+                    ev = await asyncio.wait_for(c.next_event(), 5.0)
+                    if ev and ev.get("event") in ("delivered", "failed"): break
+                total.append(time.perf_counter() - t0)
+        return t_send, total
+
+    return asyncio.run(go())
+
+
+def run_layout(args, layout):
+    with tempfile.TemporaryDirectory(prefix="pager-mac-") as tmp:
+        sock = os.path.join(tmp, "api.sock") if args.driver == "api" else ""
+        sched, app, peer, probe = build(layout, args.rx, sock, os.path.join(tmp, "events.log"))
+        sched.start()
+        time.sleep(0.2)
+        drive = (lambda k: run_direct(app, probe, k)) if args.driver == "direct" else (lambda k: run_api(sock, k))
+        drive(args.warmup)
+        peer.on_air.clear(); peer.acked.clear(); probe.delivered.clear()
+        cs0 = ctx_switches()
+        t_send, total = drive(args.messages)
+        cs = ctx_switches() - cs0
+        # An API receipt can reach the client just before the status reaches the probe
+        with probe.cv:
+            probe.cv.wait_for(lambda: len(probe.delivered) >= len(t_send), timeout=2.0)
+        # One frame per page, one page at a time: the i-th of each list belong together
+        on_air, acked, done = list(peer.on_air), list(peer.acked), list(probe.delivered)
+        sched.stop()
+    n = min(len(t_send), len(on_air), len(done))
+    tx = [(on_air[i] - t_send[i]) * 1e6 for i in range(n)]
+    ack = [(done[i] - acked[i]) * 1e6 for i in range(n)]
+    whole = [t * 1e6 for t in total] if total else [(done[i] - t_send[i]) * 1e6 for i in range(n)]
+    return {"layout": layout, "pages": n, "ctx_per_page": cs / max(1, len(t_send)),
+            "send_to_air_us": tx, "ack_to_delivered_us": ack, "send_to_delivered_us": whole}
+
+
+def histogram(title, rows):
+    """ rows: [(label, values)] -> log2 buckets in microseconds, one column per label """
+    allv = [v for _, vs in rows for v in vs]
+    if not allv: return
+    lo = max(1, int(min(allv))).bit_length() - 1
+    hi = int(max(allv)).bit_length()
+    print(f"\n{title} (us)")
+    print(f"{'bucket':>16} " + " ".join(f"{label:>22}" for label, _ in rows))
+    for b in range(lo, hi + 1):
+        lo_v, hi_v = (1 << b), (1 << (b + 1))
+        cells = []
+        for _, vs in rows:
+            c = sum(1 for v in vs if lo_v <= v < hi_v or (b == lo and v < lo_v))
+            bar = "#" * int(round(12 * c / max(1, len(vs))))
+            cells.append(f"{c:6d} {bar:<15}")
+        print(f"{lo_v:>7}-{hi_v:<8} " + " ".join(f"{cell:>22}" for cell in cells))
+    print(f"{'p50 / p99':>16} " + " ".join(f"{pct(vs, 50):9.0f} / {pct(vs, 99):<10.0f}" for _, vs in rows))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--messages", type=int, default=2000)
+    ap.add_argument("--warmup", type=int, default=100)
+    ap.add_argument("--layout", choices=("threaded", "engine", "both"), default="both")
+    ap.add_argument("--driver", choices=("direct", "api"), default="direct")
+    ap.add_argument("--rx", action="store_true", help="the peer pages back once per frame (reassembly load)")
+    ap.add_argument("--json", default="", help="write the summaries here")
+    args = ap.parse_args()
+
+    label = load_runtime()
+    layouts = ("threaded", "engine") if args.layout == "both" else (args.layout,)
+    results = [run_layout(args, layout) for layout in layouts]
+    print(f"{label}, Python {sys.version.split()[0]}, {args.messages} pages, driver {args.driver}"
+          f"{', peer pages back' if args.rx else ''}")
+    for key, title in (("send_to_air_us", "send -> on air"), ("ack_to_delivered_us", "ACK -> delivered"),
+                       ("send_to_delivered_us", "send -> delivered")):
+        histogram(title, [(r["layout"], r[key]) for r in results])
+    print()
+    for r in results:
+        print(f"{r['layout']:9s} {r['pages']:6d} pages  {r['ctx_per_page']:6.1f} context switches per page")
+    if args.json:
+        summary = [{"layout": r["layout"], "pages": r["pages"], "ctx_per_page": r["ctx_per_page"],
+                    **{f"{k}_p{p}": pct(r[k], p) for k in ("send_to_air_us", "ack_to_delivered_us",
+                                                           "send_to_delivered_us") for p in (50, 90, 99)}}
+                   for r in results]
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
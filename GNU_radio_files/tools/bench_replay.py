@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark: replay check cost and memory
+---------------------------------------
+Per-frame cost of the receiver's replay checks over a long run:
+    window : ReplayWindow (highest counter + bitmap), counter nonces
+    filter : NonceFilter (rotating Bloom pair), random nonces
+Also reports the filter's false-positive rate on fresh nonces and that
+memory does not grow with the number of frames.
+
+Usage:
+    python3 bench_replay.py [--frames 200000] [--window 1024] [--capacity 4096]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "common"))
+
+import pager_crypto  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--frames", type=int, default=200000)
+    ap.add_argument("--window", type=int, default=1024)
+    ap.add_argument("--capacity", type=int, default=4096)
+    args = ap.parse_args()
+
+    # Counters arrive mostly in order, shuffled within groups of 8, and every 10th is replayed
+    rng = random.Random(1)
+    counters = []
+    for base in range(0, args.frames, 8):
+        group = list(range(base, min(base + 8, args.frames)))
+        rng.shuffle(group)
+        counters += group
+    counters += counters[::10]
+    win = pager_crypto.ReplayWindow(args.window)
+    replays = 0
+    t0 = time.perf_counter_ns()
+    for c in counters:
+        if win.check(c): win.update(c)
+        else: replays += 1
+    dt = (time.perf_counter_ns() - t0) / len(counters)
+    print(f"window  {dt:7.1f} ns/frame   rejected {replays}/{len(counters) - args.frames} replays   "
+          f"state {(win.bitmap.bit_length() + 7) // 8} B bitmap")
+
+    nonces = [os.urandom(pager_crypto.NONCE_LEN) for _ in range(args.frames)]
+    flt = pager_crypto.NonceFilter(args.capacity)
+    fp = 0
+    t0 = time.perf_counter_ns()
+    for n in nonces:
+        if flt.seen(n): fp += 1
+        else: flt.add(n)
+    dt = (time.perf_counter_ns() - t0) / args.frames
+    replayed = sum(flt.seen(n) for n in nonces[-args.capacity:])
+    print(f"filter  {dt:7.1f} ns/frame   false positives {fp}/{args.frames}   "
+          f"replays caught {replayed}/{args.capacity}   state {2 * len(flt._cur)} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: launch cost of the GUI node vs. the headless node
+------------------------------------------------------------
+Starts each build --runs times in a fresh interpreter and reports the
+median of:
+    import     : importing the flowgraph module (GNU Radio, Qt, blocks)
+    build      : constructing the top block (plus the QApplication and
+                 showing the windows for the GUI build, as its main() does)
+    start      : tb.start() until the flowgraph is running
+    ready      : wall time from spawning the process to running
+    RSS        : peak resident set size of the process (ru_maxrss)
+Builds:
+    gui        : User_1/user1_1.py       (Chat GUI + Qt sinks)
+    headless   : User_1/pager_headless.py (headless block, no Qt)
+Each run happens in a temporary directory, so history databases and
+downloads land there. Both builds bind the same ZMQ addresses and run
+one after the other. Needs GNU Radio; the GUI build also needs a display
+or --offscreen.
+
+Usage:
+    python3 bench_startup.py [--runs 5] [--offscreen]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+NODE = os.path.abspath(os.path.join(HERE, "..", "User_1"))
+
+# Runs in the child; prints one JSON line with its own phase timings
+CHILD = {
+    "gui": """
+import time, json; t0 = time.perf_counter()
+from PyQt5 import Qt
+import user1_1
+t1 = time.perf_counter()
+qapp = Qt.QApplication([])
+tb = user1_1.user1_1()
+tb.show()
+qapp.processEvents()
+t2 = time.perf_counter()
+tb.start(); tb.flowgraph_started.set()
+qapp.processEvents()
+t3 = time.perf_counter()
+print("READY " + json.dumps([t1 - t0, t2 - t1, t3 - t2]), flush=True)
+tb.stop(); tb.wait()
+""",
+    "headless": """
+import time, json, os; t0 = time.perf_counter()
+import pager_headless
+t1 = time.perf_counter()
+tb = pager_headless.pager_headless(event_log=os.devnull)
+t2 = time.perf_counter()
+tb.start()
+t3 = time.perf_counter()
+print("READY " + json.dumps([t1 - t0, t2 - t1, t3 - t2]), flush=True)
+tb.stop(); tb.wait()
+""",
+}
+
+
+def run_once(build, env):
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, "-c", CHILD[build]], cwd=tmp, env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        phases, ready, tail = None, None, []
+        for line in proc.stdout:
+            if line.startswith("READY "):
+                ready = time.perf_counter() - t0
+                phases = json.loads(line[6:])
+            else:
+                tail = (tail + [line])[-20:]
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        proc.stdout.close()
+        if phases is None:
+            raise RuntimeError(f"{build} build did not start (exit {proc.returncode}):\n{''.join(tail).strip()}")
+        # ru_maxrss is in KiB on Linux
+        return phases + [ready, usage.ru_maxrss / 1024.0]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--offscreen", action="store_true", help="QT_QPA_PLATFORM=offscreen for the GUI build")
+    ap.add_argument("--builds", default="gui,headless")
+    args = ap.parse_args()
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = NODE + os.pathsep + env.get("PYTHONPATH", "")
+    if args.offscreen: env["QT_QPA_PLATFORM"] = "offscreen"
+
+    results = {}
+    print(f"{'build':<10} {'import':>9} {'build':>9} {'start':>9} {'ready':>9} {'RSS':>10}")
+    for build in args.builds.split(","):
+        try:
+            runs = [run_once(build, env) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{build:<10} failed: {e}")
+            continue
+        med = [statistics.median(col) for col in zip(*runs)]
+        results[build] = med
+        print(f"{build:<10} {med[0] * 1e3:7.0f}ms {med[1] * 1e3:7.0f}ms {med[2] * 1e3:7.0f}ms "
+              f"{med[3] * 1e3:7.0f}ms {med[4]:7.1f}MiB")
+    if "gui" in results and "headless" in results:
+        g, h = results["gui"], results["headless"]
+        print(f"headless: {g[3] / h[3]:.1f}x faster to ready, {g[4] - h[4]:.0f} MiB less RSS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Loopback harness: two pager nodes through the channel emulator
+--------------------------------------------------------------
+Runs node A (ID 15) and node B (ID 20) in one process and one top block,
+each as pager_node + the headless messaging block, with a
+channel_emulator (pager_channel) in each direction in place of ZMQ:
+
+    A.tx -> gap_filler -> throttle -> channel_emulator -> B.rx
+    B.tx -> gap_filler -> throttle -> channel_emulator -> A.rx
+
+A sends --messages pages of --size bytes to B through the local API
+(pager_api), all at once or at --rate pages/s, and waits for the
+receipts. Reported:
+    goodput    delivered message bytes per second, first submit to last receipt
+    delivery   delivered / failed messages, messages B received intact
+    PER        failed transmissions / transmissions of A's data frames,
+               from the ARQ status port (a lost ACK counts as a lost frame)
+    latency    submit-to-receipt p50 / p90 / p99 (includes queueing at A)
+    fades      share of samples cut by the burst-loss model
+Needs GNU Radio. Runs in real time (throttled at --samp-rate).
+
+--phy pdu takes the modem and the channel emulator out: the nodes'
+frames go as PDUs through a pdu_link (pager_channel) in each direction,
+with --loss, --burst-p / --burst-r per frame, --delay-ms, --jitter-ms
+and --rate-bps, and nothing is throttled. The MAC (ARQ, chunking,
+crypto, reassembly, API) then runs as fast as the CPU allows; 'fades'
+becomes the share of frames the links dropped.
+
+Usage:
+    python3 channel_harness.py [--snr-db 15 --cfo-hz 200 --timing-ppm 20]
+                               [--taps "1,0.3+0.2j"] [--burst-p 0.01 --burst-r 0.3]
+                               [--messages 50 --size 60 --link-crypto aead]
+    python3 channel_harness.py --phy pdu --loss 0.1 --delay-ms 5 --messages 2000 --window 16
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "User_1"))
+sys.path.insert(0, os.path.join(HERE, "..", "common"))
+
+import pmt  # noqa: E402
+from gnuradio import blocks, gr  # noqa: E402
+import pager_api  # noqa: E402
+import pager_channel  # noqa: E402
+import pager_node  # noqa: E402
+import user1_1_epy_block_15 as epy_block_15  # noqa: E402
+
+A_ID, B_ID = 15, 20
+WORDS = "unit report to north gate battery low confirm on my way medical team stand by".split()
+
+
+class arq_probe(gr.basic_block):
+    """ Counts transmissions and failed transmissions from an ARQ 'status' port """
+    def __init__(self):
+        gr.basic_block.__init__(self, name="arq_probe", in_sig=None, out_sig=None)
+        self.message_port_register_in(pmt.intern("in"))
+        self.set_msg_handler(pmt.intern("in"), self._handle)
+        self.frames = self.attempts = self.lost = 0
+
+    def _handle(self, msg):
+        status = pmt.symbol_to_string(pmt.dict_ref(msg, pmt.intern("status"), pmt.intern("")))
+        if status == "sent": return
+        retries = pmt.to_long(pmt.dict_ref(msg, pmt.intern("retries"), pmt.from_long(0)))
+        # delivered: `retries` lost tries then one good one; failed: every try lost
+        self.frames += 1
+        self.attempts += retries + (status == "delivered")
+        self.lost += retries
+
+
+class harness(gr.top_block):
+    def __init__(self, args, tmp):
+        gr.top_block.__init__(self, "channel harness", catch_exceptions=True)
+        chat_size, _ = pager_node.payload_sizes(args.link_crypto, args.nonce_mode)
+        self.a_sock, self.b_sock = os.path.join(tmp, "a.sock"), os.path.join(tmp, "b.sock")
+        self.app_a = epy_block_15.chat_headless_block(payload_size=chat_size, my_id=A_ID, target_id=B_ID,
+                                                      event_log=os.path.join(tmp, "a.log"), api_socket=self.a_sock,
+                                                      api_max_outstanding=args.window)
+        self.app_b = epy_block_15.chat_headless_block(payload_size=chat_size, my_id=B_ID, target_id=A_ID,
+                                                      event_log=os.path.join(tmp, "b.log"), api_socket=self.b_sock)
+        self.node_a = pager_node.pager_node(self.app_a, link_crypto=args.link_crypto, nonce_mode=args.nonce_mode,
+                                            phy=args.phy)
+        self.node_b = pager_node.pager_node(self.app_b, link_crypto=args.link_crypto, nonce_mode=args.nonce_mode,
+                                            phy=args.phy)
+        taps = [complex(t) for t in args.taps.split(",")]
+        self.channels, self.links = [], []
+        for i, (src, dst) in enumerate(((self.node_a, self.node_b), (self.node_b, self.node_a))):
+            if args.phy == 'pdu':
+                link = pager_channel.pdu_link(loss=args.loss, burst_p=args.burst_p, burst_r=args.burst_r,
+                                              delay_ms=args.delay_ms, jitter_ms=args.jitter_ms,
+                                              rate_bps=args.rate_bps, seed=args.seed + 100 * i)
+                self.msg_connect((src, 'air_out'), (link, 'in'))
+                self.msg_connect((link, 'out'), (dst, 'air_in'))
+                self.links.append(link)
+                continue
+            filler = pager_channel.gap_filler()
+            throttle = blocks.throttle(gr.sizeof_gr_complex*1, args.samp_rate, True)
+            chan = pager_channel.channel_emulator(
+                samp_rate=args.samp_rate, snr_db=args.snr_db, cfo_hz=args.cfo_hz, timing_ppm=args.timing_ppm,
+                taps=taps, burst_p=args.burst_p, burst_r=args.burst_r, burst_chunk=args.burst_chunk,
+                seed=args.seed + 100 * i, signal_power=args.signal_power)
+            self.connect((src, 0), (filler, 0))
+            self.connect((filler, 0), (throttle, 0))
+            self.connect((throttle, 0), (chan, 0))
+            self.connect((chan, 0), (dst, 0))
+            self.channels.append((filler, throttle, chan))
+        self.probe = arq_probe()
+        self.msg_connect((self.node_a.epy_block_10, 'status'), (self.probe, 'in'))
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))] if xs else float("nan")
+
+
+async def exchange(args, tb):
+    rng = random.Random(args.seed)
+    texts = []
+    for i in range(args.messages):
+        t = f"{i:04d} "
+        while len(t) < args.size: t += rng.choice(WORDS) + " "
+        texts.append(t[:args.size])
+    received = []
+    async with pager_api.PagerClient(tb.b_sock) as b, pager_api.PagerClient(tb.a_sock) as a:
+        await b.subscribe()
+
+        async def collect_rx():
+            async for ev in b.events():
+                if ev["event"] == "rx": received.append(ev["text"])
+        rx_task = asyncio.ensure_future(collect_rx())
+
+        t0 = time.perf_counter()
+        ids = []
+        for t in texts:
+            ids += await a.send([(B_ID, t, 0)])
+            if args.rate > 0: await asyncio.sleep(1.0 / args.rate)
+        pending, receipts, t_last = set(ids), {}, t0
+        deadline = t0 + args.timeout
+        while pending and time.perf_counter() < deadline:
+            try:
+                ev = await asyncio.wait_for(a.next_event(), deadline - time.perf_counter())
+            except asyncio.TimeoutError:
+                break
+            if ev is None: break
+            if ev.get("msg_id") in pending:
+                pending.discard(ev["msg_id"])
+                receipts[ev["msg_id"]] = ev
+                t_last = time.perf_counter()
+        await asyncio.sleep(0.5)          # last rx events from B
+        rx_task.cancel()
+    return texts, ids, receipts, received, t_last - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--snr-db", type=float, default=20.0)
+    ap.add_argument("--signal-power", type=float, default=0.0, help="TX power per sample for the SNR (0 = estimate)")
+    ap.add_argument("--cfo-hz", type=float, default=0.0)
+    ap.add_argument("--timing-ppm", type=float, default=0.0)
+    ap.add_argument("--taps", default="1", help="comma-separated complex multipath taps")
+    ap.add_argument("--burst-p", type=float, default=0.0, help="good -> fade probability per chunk")
+    ap.add_argument("--burst-r", type=float, default=1.0, help="fade -> good probability per chunk")
+    ap.add_argument("--burst-chunk", type=int, default=2048, help="samples per fade decision")
+    ap.add_argument("--phy", choices=("qpsk", "pdu"), default="qpsk", help="pdu: frames as PDUs, no modem")
+    ap.add_argument("--loss", type=float, default=0.0, help="phy pdu: frame loss probability")
+    ap.add_argument("--delay-ms", type=float, default=0.0, help="phy pdu: one-way delay")
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="phy pdu: up to this much more delay")
+    ap.add_argument("--rate-bps", type=float, default=0.0, help="phy pdu: link rate (0 = unlimited)")
+    ap.add_argument("--samp-rate", type=float, default=600e3)
+    ap.add_argument("--link-crypto", choices=("aead", "ctr"), default="ctr")
+    ap.add_argument("--nonce-mode", choices=("implicit", "random"), default="implicit")
+    ap.add_argument("--messages", type=int, default=50)
+    ap.add_argument("--size", type=int, default=60, help="bytes per message")
+    ap.add_argument("--rate", type=float, default=0.0, help="pages/s submitted (0 = all at once)")
+    ap.add_argument("--window", type=int, default=4, help="API max_outstanding on node A")
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--settle", type=float, default=1.0, help="seconds between start and the first page")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", default="", help="also write the results to this file")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)                     # downloads_node_* and friends stay in the temp dir
+        tb = harness(args, tmp)
+        tb.start()
+        try:
+            time.sleep(args.settle)
+            texts, ids, receipts, received, elapsed = asyncio.run(exchange(args, tb))
+        finally:
+            tb.stop()
+            tb.wait()
+            os.chdir(cwd)
+
+    delivered = [r for r in receipts.values() if r["event"] == "delivered"]
+    lat = [r["latency_ms"] for r in delivered]
+    intact = len(set(received) & set(texts))
+    p = tb.probe
+    if args.phy == 'pdu':
+        fade_share = sum(lk.dropped for lk in tb.links) / max(1, sum(lk.frames for lk in tb.links))
+    else:
+        fades = [c.fades for _, _, c in tb.channels]
+        fade_share = sum(f.bad_chunks for f in fades) / max(1, sum(f.chunks for f in fades))
+    res = {
+        "messages": len(ids), "delivered": len(delivered), "failed": len(receipts) - len(delivered),
+        "no_receipt": len(ids) - len(receipts), "received_intact": intact,
+        "goodput_Bps": sum(len(texts[ids.index(r["msg_id"])].encode()) for r in delivered) / elapsed if elapsed else 0.0,
+        "per": p.lost / p.attempts if p.attempts else float("nan"), "frames": p.frames, "transmissions": p.attempts,
+        "latency_p50_ms": pct(lat, 50), "latency_p90_ms": pct(lat, 90), "latency_p99_ms": pct(lat, 99),
+        "fade_share": fade_share,
+        "elapsed_s": elapsed,
+    }
+    if args.phy == 'pdu':
+        print(f"link     PDU, loss {args.loss}, fades p={args.burst_p} r={args.burst_r}, delay {args.delay_ms} ms "
+              f"+ {args.jitter_ms} ms, rate {args.rate_bps or 'unlimited'} ({res['fade_share'] * 100:.1f}% of frames lost)")
+    else:
+        print(f"channel  SNR {args.snr_db} dB, CFO {args.cfo_hz} Hz, timing {args.timing_ppm} ppm, taps {args.taps}, "
+              f"fades p={args.burst_p} r={args.burst_r} ({res['fade_share'] * 100:.1f}% of samples)")
+    print(f"delivery {res['delivered']}/{res['messages']} delivered, {res['failed']} failed, "
+          f"{res['no_receipt']} without receipt, {intact} received intact by B")
+    print(f"goodput  {res['goodput_Bps']:.0f} B/s over {elapsed:.1f} s")
+    print(f"PER      {res['per'] * 100:.1f}% ({p.lost} of {p.attempts} transmissions, {p.frames} frames)")
+    print(f"latency  p50 {res['latency_p50_ms']:.0f} ms / p90 {res['latency_p90_ms']:.0f} ms / "
+          f"p99 {res['latency_p99_ms']:.0f} ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(dict(res, **vars(args)), f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
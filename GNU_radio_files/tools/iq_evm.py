@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Measurement: EVM and bandwidth of the quantized IQ transport
+------------------------------------------------------------
+Builds the pager's TX baseband in numpy, as generic_mod + multiply_const
+in pager_node / pager_headless make it: differential QPSK at --sps
+samples per symbol, root raised cosine (excess bandwidth 0.5, 11
+symbols), x 0.8. --frames frames of --frame-bytes random bytes take
+--duty of the time, zeros fill the rest (a gap-filled stream, as a radio
+sees it). --snr-db adds AWGN over the whole stream (a receiver's noise
+floor). Or --iq-file reads a complex64 capture instead.
+
+The stream goes through pager_iq's encoder and decoder in --chunk sample
+pieces (a scheduler's work calls) for every format, with and without
+burst-only, and is compared to what went in:
+    MB/s      on the ZMQ link at --samp-rate, block headers included
+              (not pmt / ZMQ framing, some 10-20 bytes per message)
+    ratio     against fc32
+    skipped   share of the samples left out as idle
+    EVM wave  rms(decoded - input) / rms(input), over the frames
+    EVM sym   after the RRC matched filter, at the symbol instants,
+              against the sent symbols (generated stream only); fc32's
+              row is the floor of the filters and the noise
+No GNU Radio needed.
+
+Usage:
+    python3 iq_evm.py
+    python3 iq_evm.py --snr-db 20 --idle-level 0.2 --duty 0.2 --block-len 256
+    python3 iq_evm.py --iq-file rx.cf32 --block-len 512 --idle-level 0.02
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "common"))
+
+import pager_iq  # noqa: E402
+
+QPSK = np.array([0.707+0.707j, -0.707+0.707j, -0.707-0.707j, 0.707-0.707j], np.complex64)
+
+
+def rrc_taps(sps, alpha=0.5, span=11):
+    """ Root raised cosine, span symbols long, DC gain sps (unity after zero-stuffing by sps) """
+    t = (np.arange(span * sps + 1) - span * sps / 2) / sps
+    h = np.empty_like(t)
+    for i, ti in enumerate(t):
+        if abs(ti) < 1e-9:
+            h[i] = 1.0 - alpha + 4 * alpha / np.pi
+        elif abs(abs(4 * alpha * ti) - 1.0) < 1e-9:
+            h[i] = alpha / np.sqrt(2) * ((1 + 2 / np.pi) * np.sin(np.pi / (4 * alpha))
+                                         + (1 - 2 / np.pi) * np.cos(np.pi / (4 * alpha)))
+        else:
+            h[i] = (np.sin(np.pi * ti * (1 - alpha)) + 4 * alpha * ti * np.cos(np.pi * ti * (1 + alpha))) / \
+                   (np.pi * ti * (1 - (4 * alpha * ti) ** 2))
+    return h * (sps / h.sum())
+
+
+def build_stream(args, rng):
+    """ -> stream, [(start, symbols)] per frame, mask of the samples that carry a frame """
+    taps = rrc_taps(args.sps)
+    nsym = args.frame_bytes * 4
+    burst = (nsym - 1) * args.sps + len(taps)
+    idle = int(burst * (1 - args.duty) / args.duty) if args.duty < 1 else 0
+    total = args.frames * (burst + idle) + idle
+    x = np.zeros(total, np.complex64)
+    active = np.zeros(total, bool)
+    frames = []
+    for f in range(args.frames):
+        sym = QPSK[np.cumsum(rng.integers(0, 4, nsym)) % 4]
+        up = np.zeros(nsym * args.sps, np.complex64)
+        up[::args.sps] = sym
+        wave = np.convolve(up, taps)[:burst] * 0.8
+        start = idle + f * (burst + idle)
+        x[start:start + burst] = wave
+        active[start:start + burst] = True
+        frames.append((start, sym))
+    if args.snr_db is not None:
+        p = np.mean(np.abs(x[active]) ** 2)
+        sigma = np.sqrt(p / 10 ** (args.snr_db / 10) / 2)
+        x += ((rng.standard_normal(total) + 1j * rng.standard_normal(total)) * sigma).astype(np.complex64)
+    return x, frames, active
+
+
+def evm_db(e):
+    return 20 * np.log10(e) if e > 0 else float("-inf")
+
+
+def symbol_evm(y, frames, sps):
+    """ Matched filter, symbol instants, one complex gain per frame -> rms EVM over all frames """
+    mf = rrc_taps(sps)
+    mf /= np.sqrt(np.sum(mf ** 2))
+    delay = len(mf) - 1                     # TX and RX filters, span / 2 each
+    err = ref = 0.0
+    for start, sym in frames:
+        seg = y[start:start + (len(sym) - 1) * sps + 2 * len(mf)]
+        r = np.convolve(seg, mf)[delay:delay + len(sym) * sps:sps]
+        n = min(len(r), len(sym))
+        r, s = r[:n], sym[:n]
+        g = np.vdot(s, r) / np.vdot(s, s)
+        err += float(np.sum(np.abs(r - g * s) ** 2))
+        ref += float(np.sum(np.abs(g * s) ** 2))
+    return np.sqrt(err / ref) if ref else float("nan")
+
+
+def run(x, frames, active, fmt, burst_only, args):
+    n = len(x)
+    if fmt == "fc32":
+        y, nbytes, skipped = x, 8 * n, 0
+    else:
+        enc = pager_iq.IqEncoder(fmt, args.block_len, burst_only, args.idle_level)
+        dec = pager_iq.IqDecoder(fill_gaps=True)
+        parts = []
+        for i in range(0, n, args.chunk):
+            parts += [dec.decode(m) for m in enc.encode(x[i:i + args.chunk])]
+        y = np.concatenate(parts) if parts else np.zeros(0, np.complex64)
+        y = np.concatenate((y, np.zeros(n - len(y), np.complex64)))     # idle tail, never followed by a block
+        nbytes, skipped = enc.bytes, enc.skipped
+    e = y[active] - x[active]
+    wave = np.sqrt(np.sum(np.abs(e) ** 2) / np.sum(np.abs(x[active]) ** 2))
+    return {"format": fmt, "burst_only": burst_only, "MBps": nbytes / (n / args.samp_rate) / 1e6,
+            "bytes": nbytes, "skipped": skipped / n, "evm_wave": wave, "evm_wave_db": evm_db(wave),
+            "evm_sym": symbol_evm(y, frames, args.sps) if frames else float("nan")}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--frames", type=int, default=200)
+    ap.add_argument("--frame-bytes", type=int, default=187, help="bytes per frame on air (data frame: 187)")
+    ap.add_argument("--duty", type=float, default=0.5, help="share of the time with a frame on air")
+    ap.add_argument("--snr-db", type=float, default=None, help="AWGN over the stream (default none)")
+    ap.add_argument("--iq-file", default="", help="complex64 capture to use instead of the generated stream")
+    ap.add_argument("--sps", type=int, default=4)
+    ap.add_argument("--samp-rate", type=float, default=600e3)
+    ap.add_argument("--block-len", type=int, default=1024, help="samples per block (one scale each)")
+    ap.add_argument("--idle-level", type=float, default=0.0, help="burst-only: idle at or below this |I|, |Q|")
+    ap.add_argument("--chunk", type=int, default=4096, help="samples per encoder call")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", default="", help="write the results here")
+    args = ap.parse_args()
+
+    if args.iq_file:
+        x = np.fromfile(args.iq_file, np.complex64)
+        frames, active = [], np.abs(x) > args.idle_level
+        source = f"{args.iq_file}: {len(x)} samples"
+    else:
+        x, frames, active = build_stream(args, np.random.default_rng(args.seed))
+        source = (f"{args.frames} frames x {args.frame_bytes} B, duty {args.duty:g}, "
+                  f"SNR {'none' if args.snr_db is None else f'{args.snr_db:g} dB'}: {len(x)} samples")
+    results = [run(x, frames, active, fmt, burst, args)
+               for fmt in ("fc32", "sc16", "sc8") for burst in ((False,) if fmt == "fc32" else (False, True))]
+    base = results[0]["MBps"]
+    print(f"{source}, block {args.block_len}, idle level {args.idle_level:g}, {args.samp_rate / 1e3:g} kS/s")
+    print(f"{'format':12s} {'MB/s':>6} {'ratio':>6} {'skipped':>8} {'EVM wave':>9} {'dB':>7} {'EVM sym':>8} {'dB':>7}")
+    for r in results:
+        name = r["format"] + (" burst" if r["burst_only"] else "")
+        print(f"{name:12s} {r['MBps']:6.2f} {r['MBps'] / base:6.3f} {r['skipped'] * 100:7.1f}% "
+              f"{r['evm_wave'] * 100:8.3f}% {r['evm_wave_db']:7.1f} {r['evm_sym'] * 100:7.3f}% "
+              f"{evm_db(r['evm_sym']):7.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Load test: local messaging API (pager_api)
+------------------------------------------
+--clients concurrent PagerClients each submit --messages pages in
+batches of --batch, with priorities spread over 0..--priorities-1, then
+wait for every delivery receipt. Reports:
+    accept     : pages per second accepted by the node, and the per-batch
+                 request round trip
+    receipts   : delivered / failed, and submit-to-receipt latency
+                 (p50 / p95 / p99) per priority
+Targets a running node (--socket, started with --api-socket / api_socket)
+or, with --loopback, an in-process MessagingCore + ApiServer over a
+simulated stop-and-wait link (--frame-ms per frame, --loss per attempt,
+--retries), which isolates the API and queueing from the radio.
+The loopback needs GNU Radio's pmt module, like the blocks do.
+
+Usage:
+    python3 load_api.py --socket /tmp/pager_node_15.sock [--dest 20]
+    python3 load_api.py --loopback [--clients 4 --messages 500 --batch 50 --frame-ms 5]
+"""
+
+import argparse
+import asyncio
+import os
+import queue
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "common"))
+
+import pager_api  # noqa: E402
+
+WORDS = "unit report to north gate battery low confirm on my way medical team stand by".split()
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))] if xs else float("nan")
+
+
+class LoopbackLink:
+    """ Stop-and-wait stand-in for the ARQ block: one frame at a time, sent/delivered/failed on 'status' """
+
+    def __init__(self, frame_ms, loss, retries, seed=1):
+        import pmt
+        self.pmt = pmt
+        self.frame_s = frame_ms / 1000.0
+        self.loss = loss
+        self.retries = retries
+        self.rng = random.Random(seed)
+        self.core = None
+        self._q = queue.Queue()
+        self._seq = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def publish(self, port, msg):
+        if port == "out": self._q.put(msg)
+
+    def _status(self, frame_id, msg_id, seq, status):
+        # Same keys as pager_pdu.status_msg: the delivery tracker ignores events without msg_id
+        pmt = self.pmt
+        d = pmt.make_dict()
+        d = pmt.dict_add(d, pmt.intern("frame_id"), pmt.from_long(frame_id))
+        d = pmt.dict_add(d, pmt.intern("msg_id"), pmt.from_long(msg_id))
+        d = pmt.dict_add(d, pmt.intern("seq"), pmt.from_long(seq))
+        d = pmt.dict_add(d, pmt.intern("status"), pmt.intern(status))
+        self.core.handle_arq_status(d)
+
+    def _run(self):
+        pmt = self.pmt
+        while True:
+            meta = pmt.car(self._q.get())
+            frame_id = pmt.to_long(pmt.dict_ref(meta, pmt.intern("frame_id"), pmt.PMT_NIL))
+            msg_id = pmt.to_long(pmt.dict_ref(meta, pmt.intern("msg_id"), pmt.PMT_NIL))
+            self._seq = (self._seq + 1) & 0xFF
+            self._status(frame_id, msg_id, self._seq, "sent")
+            for _ in range(self.retries + 1):
+                time.sleep(self.frame_s)
+                if self.rng.random() >= self.loss:
+                    self._status(frame_id, msg_id, self._seq, "delivered")
+                    break
+            else:
+                self._status(frame_id, msg_id, self._seq, "failed")
+
+
+class _NoSink:
+    def on_rx_message(self, *a): pass
+    def on_ack_received(self, *a): pass
+    def on_arq_status(self, *a): pass
+    def on_xfer_done(self, *a): pass
+
+
+def start_loopback(args, path):
+    import pager_messaging
+    link = LoopbackLink(args.frame_ms, args.loss, args.retries)
+    core = pager_messaging.MessagingCore(link.publish, _NoSink(), lambda: args.dest, payload_size=38,
+                                         compression=False)
+    link.core = core
+    api = pager_api.ApiServer(path, core.send_pdus, max_outstanding=args.window, max_queue=args.max_queue)
+    core.listeners.append(api)
+    api.start()
+    return api
+
+
+async def client(args, idx, rtts, lat):
+    rng = random.Random(idx)
+    async with pager_api.PagerClient(args.socket) as c:
+        sent = {}                                  # msg_id -> (priority, submit time)
+        for start in range(0, args.messages, args.batch):
+            batch = []
+            for _ in range(min(args.batch, args.messages - start)):
+                prio = rng.randrange(args.priorities)
+                text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 12)))
+                batch.append((args.dest, text, prio))
+            t0 = time.perf_counter()
+            ids = await c.send(batch)
+            rtts.append((time.perf_counter() - t0) * 1000.0)
+            for mid, (_, _, prio) in zip(ids, batch):
+                sent[mid] = (prio, t0)
+        while sent:
+            ev = await c.next_event()
+            if ev is None: break
+            if ev["event"] not in ("delivered", "failed"): continue
+            prio, t0 = sent.pop(ev["msg_id"])
+            lat.append((prio, ev["event"], (time.perf_counter() - t0) * 1000.0))
+
+
+async def run(args):
+    rtts, lat = [], []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(args, i, rtts, lat) for i in range(args.clients)))
+    total = time.perf_counter() - t0
+    n = args.clients * args.messages
+    async with pager_api.PagerClient(args.socket) as c:
+        st = await c.stats()
+
+    print(f"{args.clients} clients x {args.messages} pages, batches of {args.batch}")
+    print(f"accept   batch round trip p50 {pct(rtts, 50):.2f} ms / p99 {pct(rtts, 99):.2f} ms")
+    ok = [x for x in lat if x[1] == "delivered"]
+    print(f"receipts {len(ok)} delivered, {len(lat) - len(ok)} failed of {n} in {total:.1f} s "
+          f"({n / total:.0f} pages/s end to end)")
+    for p in range(args.priorities - 1, -1, -1):
+        xs = [ms for prio, _, ms in lat if prio == p]
+        if xs:
+            print(f"  priority {p}: p50 {pct(xs, 50):8.1f} ms  p95 {pct(xs, 95):8.1f} ms  "
+                  f"p99 {pct(xs, 99):8.1f} ms  mean {statistics.mean(xs):8.1f} ms  ({len(xs)})")
+    print(f"node stats {st}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--socket", default="")
+    ap.add_argument("--loopback", action="store_true")
+    ap.add_argument("--dest", type=int, default=20)
+    ap.add_argument("--clients", type=int, default=4)
+    ap.add_argument("--messages", type=int, default=250, help="pages per client")
+    ap.add_argument("--batch", type=int, default=50)
+    ap.add_argument("--priorities", type=int, default=3)
+    ap.add_argument("--frame-ms", type=float, default=5.0, help="loopback: time per frame")
+    ap.add_argument("--loss", type=float, default=0.0, help="loopback: loss per attempt")
+    ap.add_argument("--retries", type=int, default=10, help="loopback: ARQ retries")
+    ap.add_argument("--window", type=int, default=4, help="loopback: API max_outstanding")
+    ap.add_argument("--max-queue", type=int, default=10000, help="loopback: API max_queue")
+    args = ap.parse_args()
+    if not args.loopback and not args.socket:
+        ap.error("give --socket of a running node, or --loopback")
+
+    api = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.loopback:
+            args.socket = os.path.join(tmp, "api.sock")
+            api = start_loopback(args, args.socket)
+        try:
+            asyncio.run(run(args))
+        finally:
+            if api: api.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Simulation: stop-and-wait MAC with many pagers on one channel
+-------------------------------------------------------------
+Discrete-event simulation of --nodes pagers sharing one channel, in
+simulated time. Each node runs the ARQ state machine of the ARQ block
+(pager_mac.StopAndWait: sequence numbers, ACK wait, retries, busy_in
+hold) and answers every data frame it receives with an ACK, as the
+verify blocks do. No GNU Radio needed.
+
+Channel model:
+    air time   frame bytes x 4 symbols x --sps / --samp-rate
+    collision  any two transmissions that overlap in time are both lost
+               (no carrier sense, no capture, like the radios); this also
+               covers half duplex, a node does not hear while it transmits
+    --per      extra random loss per frame (noise)
+Each node sends pages as a Poisson process (--rate per hour) to a random
+other node, or to node 0 with --pattern hub. Data and ACK frames leave a
+node's radio in order, one at a time; ACKs go out --turnaround-ms after
+the data frame ends. The busy hold (--busy-ms) starts when a node
+receives an ACK, which is how pager_node wires busy_in, or when it
+sends one (--busy-on ack_tx).
+
+Reported: delivered / failed pages, throughput, channel use, collision
+rate, retransmissions, duplicate frames at the receivers and delivery
+latency (submit to ACK), plus the worst nodes; --csv writes one row per
+node.
+
+Usage:
+    python3 sim_mac.py --nodes 200 --hours 4 --rate 30
+    python3 sim_mac.py --nodes 200 --hours 1 --rate 120 --pattern hub --csv nodes.csv
+"""
+
+import argparse
+import csv
+import heapq
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+from collections import deque
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "common"))
+
+import pager_mac  # noqa: E402
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))] if xs else float("nan")
+
+
+class Frame:
+    __slots__ = ("src", "dest", "kind", "seq", "item", "lost")
+
+    def __init__(self, src, dest, kind, seq, item=None):
+        self.src, self.dest, self.kind, self.seq, self.item = src, dest, kind, seq, item
+        self.lost = False
+
+
+class Sim:
+    """ Event queue in simulated seconds """
+
+    def __init__(self):
+        self.now = 0.0
+        self.events = 0
+        self._q = []
+        self._order = itertools.count()
+
+    def at(self, t, fn, *args):
+        heapq.heappush(self._q, (t, next(self._order), fn, args))
+
+    def run(self, until):
+        q = self._q
+        while q and q[0][0] <= until:
+            self.now, _, fn, args = heapq.heappop(q)
+            self.events += 1
+            fn(*args)
+        self.now = until
+
+
+class Channel:
+    """ Shared medium: frames that overlap in time are all lost """
+
+    def __init__(self):
+        self.on_air = set()
+        self.busy_s = 0.0
+
+    def start(self, frame):
+        if self.on_air:
+            frame.lost = True
+            for other in self.on_air: other.lost = True
+        self.on_air.add(frame)
+
+    def end(self, frame):
+        self.on_air.discard(frame)
+
+
+class Node:
+
+    def __init__(self, sim, addr, args, nodes, channel, rng):
+        self.sim, self.addr, self.args, self.nodes, self.channel, self.rng = sim, addr, args, nodes, channel, rng
+        self.arq = pager_mac.StopAndWait(args.wait_ms / 1e3, args.retries, busy_hold_s=args.busy_ms / 1e3)
+        self.radio = deque()
+        self.radio_busy = False
+        self._timer = 0
+        self.last_seq = {}              # src -> seq of the last data frame received from it
+        self.latency = []
+        self.n = dict.fromkeys(("offered", "delivered", "failed", "tx", "retx", "acks", "collision", "rx",
+                                "dup"), 0)
+
+    # --- traffic ---
+    def arrival(self):
+        if self.args.pattern == "hub" and self.addr != 0:
+            dest = 0
+        else:
+            dest = self.rng.randrange(len(self.nodes) - 1)
+            if dest >= self.addr: dest += 1
+        self.n["offered"] += 1
+        self.arq.submit((self.sim.now, dest), dest)
+        self.kick()
+        if not (self.args.pattern == "hub" and self.addr == 0):
+            self.sim.at(self.sim.now + self.rng.expovariate(self.args.rate / 3600.0), self.arrival)
+
+    # --- ARQ ---
+    def kick(self):
+        now = self.sim.now
+        for action in self.arq.poll(now):
+            if action[0] == "tx":
+                _, item, seq, retries = action
+                self.n["tx"] += 1
+                self.n["retx"] += retries > 0
+                self.send(Frame(self.addr, item[1], "data", seq, item))
+            else:
+                _, item, _, delivered, _ = action
+                if delivered:
+                    self.n["delivered"] += 1
+                    self.latency.append(now - item[0])
+                else:
+                    self.n["failed"] += 1
+        wake = self.arq.wake_time()
+        if wake is not None and wake > now:
+            self._timer += 1
+            self.sim.at(wake, self._wake, self._timer)
+
+    def _wake(self, timer):
+        if timer == self._timer: self.kick()
+
+    # --- radio ---
+    def send(self, frame):
+        self.radio.append(frame)
+        if not self.radio_busy: self._next()
+
+    def _next(self):
+        frame = self.radio.popleft()
+        self.radio_busy = True
+        self.channel.start(frame)
+        air = self.args.ack_air_s if frame.kind == "ack" else self.args.data_air_s
+        self.channel.busy_s += air
+        self.sim.at(self.sim.now + air, self._sent, frame)
+
+    def _sent(self, frame):
+        self.channel.end(frame)
+        self.radio_busy = False
+        if frame.lost:
+            self.n["collision"] += 1
+        elif self.rng.random() >= self.args.per:
+            self.nodes[frame.dest].receive(frame)
+        if self.radio: self._next()
+
+    def receive(self, frame):
+        now = self.sim.now
+        if frame.kind == "data":
+            self.n["rx"] += 1
+            if self.last_seq.get(frame.src) == frame.seq: self.n["dup"] += 1
+            self.last_seq[frame.src] = frame.seq
+            self.sim.at(now + self.args.turnaround_ms / 1e3, self._ack, frame.src, pager_mac.ack_seq(frame.seq))
+        else:
+            if self.args.busy_on == "ack_rx": self.arq.on_busy(now)
+            self.arq.on_ack(frame.seq, frame.src)
+            self.kick()
+
+    def _ack(self, dest, next_seq):
+        self.n["acks"] += 1
+        self.send(Frame(self.addr, dest, "ack", next_seq))
+        if self.args.busy_on == "ack_tx":
+            self.arq.on_busy(self.sim.now)
+            self.kick()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--nodes", type=int, default=200)
+    ap.add_argument("--hours", type=float, default=1.0, help="simulated time")
+    ap.add_argument("--rate", type=float, default=30.0, help="pages per node per hour")
+    ap.add_argument("--pattern", choices=("uniform", "hub"), default="uniform")
+    ap.add_argument("--data-bytes", type=int, default=187, help="data frame on air: header, preamble, addressing, "
+                                                                "SEQ, payload, tag")
+    ap.add_argument("--ack-bytes", type=int, default=189, help="ACK frame on air")
+    ap.add_argument("--sps", type=int, default=4)
+    ap.add_argument("--samp-rate", type=float, default=600e3)
+    ap.add_argument("--wait-ms", type=float, default=300.0, help="ARQ wait_time_s")
+    ap.add_argument("--retries", type=int, default=10, help="ARQ max_retries")
+    ap.add_argument("--busy-ms", type=float, default=150.0, help="busy_in hold")
+    ap.add_argument("--busy-on", choices=("ack_rx", "ack_tx", "off"), default="ack_rx")
+    ap.add_argument("--turnaround-ms", type=float, default=5.0, help="end of a data frame to its ACK going out")
+    ap.add_argument("--per", type=float, default=0.0, help="random loss per frame on top of collisions")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--csv", default="", help="write per-node results here")
+    ap.add_argument("--worst", type=int, default=5, help="worst nodes to list")
+    args = ap.parse_args()
+    if args.nodes < 2: ap.error("--nodes must be at least 2")
+    args.data_air_s = args.data_bytes * 4 * args.sps / args.samp_rate
+    args.ack_air_s = args.ack_bytes * 4 * args.sps / args.samp_rate
+
+    rng = random.Random(args.seed)
+    sim, nodes = Sim(), []
+    channel = Channel()
+    for addr in range(args.nodes):
+        nodes.append(Node(sim, addr, args, nodes, channel, random.Random(rng.random())))
+        if not (args.pattern == "hub" and addr == 0):
+            sim.at(rng.expovariate(args.rate / 3600.0), nodes[-1].arrival)
+    duration = args.hours * 3600.0
+    t0 = time.perf_counter()
+    sim.run(duration)
+    wall = time.perf_counter() - t0
+
+    tot = {k: sum(n.n[k] for n in nodes) for k in nodes[0].n}
+    lat = [x for n in nodes for x in n.latency]
+    on_air = tot["tx"] + tot["acks"]
+    print(f"{args.nodes} nodes, {args.hours:g} h at {args.rate:g} pages/node/h ({args.pattern}), "
+          f"frames {args.data_air_s * 1e3:.2f} / {args.ack_air_s * 1e3:.2f} ms on air")
+    print(f"simulated in {wall:.1f} s ({duration / wall:.0f}x real time, {sim.events / wall / 1e3:.0f}k events/s)")
+    print(f"pages    {tot['offered']} offered, {tot['delivered']} delivered, {tot['failed']} failed, "
+          f"{tot['offered'] - tot['delivered'] - tot['failed']} still queued")
+    print(f"channel  {channel.busy_s / duration * 100:.1f}% busy, throughput {tot['delivered'] / duration * 3600:.0f} "
+          f"pages/h")
+    print(f"frames   {on_air} sent ({tot['retx']} retransmissions, {tot['acks']} ACKs), "
+          f"{tot['collision'] / max(1, on_air) * 100:.2f}% collided, {tot['dup']} duplicates received")
+    print(f"latency  p50 {pct(lat, 50) * 1e3:.0f} ms / p90 {pct(lat, 90) * 1e3:.0f} ms / "
+          f"p99 {pct(lat, 99) * 1e3:.0f} ms / max {max(lat, default=float('nan')) * 1e3:.0f} ms")
+
+    rows = []
+    for n in nodes:
+        done = n.n["delivered"] + n.n["failed"]
+        rows.append(dict(node=n.addr, **n.n, delivery=n.n["delivered"] / done if done else float("nan"),
+                         throughput_pph=n.n["delivered"] / duration * 3600,
+                         collision_rate=n.n["collision"] / max(1, n.n["tx"] + n.n["acks"]),
+                         lat_p50_ms=pct(n.latency, 50) * 1e3, lat_p99_ms=pct(n.latency, 99) * 1e3))
+    ratios = [r["delivery"] for r in rows if r["delivery"] == r["delivery"]]
+    if ratios:
+        print(f"per node delivery min {min(ratios) * 100:.1f}% / median {statistics.median(ratios) * 100:.1f}%, "
+              f"throughput {min(r['throughput_pph'] for r in rows):.1f} .. "
+              f"{max(r['throughput_pph'] for r in rows):.1f} pages/h")
+    for r in sorted(rows, key=lambda r: (r["delivery"], -r["lat_p99_ms"]))[:args.worst]:
+        print(f"  node {r['node']:3d}: {r['delivered']}/{r['delivered'] + r['failed']} delivered, "
+              f"{r['collision_rate'] * 100:.1f}% collided, p99 {r['lat_p99_ms']:.0f} ms")
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=list(rows[0]))
+            w.writeheader()
+            w.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Stand-in gnuradio package for tools/bench_blocks.py: only gr.basic_block (see gr.py)."""
@@ -0,0 +1,50 @@
+"""
+Stand-in for gnuradio.gr (tools/bench_blocks.py only)
+
+basic_block keeps the message handlers and publishes to whatever is
+attached with connect_out(); there is no scheduler, callers invoke the
+handlers themselves.
+"""
+
+
+def version():
+    return "stand-in"
+
+
+class basic_block:
+
+    def __init__(self, name="", in_sig=None, out_sig=None):
+        self._name = name
+        self._handlers = {}
+        self._subscribers = {}
+
+    def name(self):
+        return self._name
+
+    def message_port_register_in(self, port):
+        pass
+
+    def message_port_register_out(self, port):
+        self._subscribers.setdefault(port, [])
+
+    def set_msg_handler(self, port, handler):
+        self._handlers[port] = handler
+
+    def message_port_pub(self, port, msg):
+        for fn in self._subscribers.get(port, ()):
+            fn(msg)
+
+    def connect_out(self, port, fn):
+        self._subscribers.setdefault(port, []).append(fn)
+
+    def post(self, port, msg):
+        self._handlers[port](msg)
+
+    def start(self):
+        return True
+
+    def stop(self):
+        return True
+
+
+sync_block = basic_block
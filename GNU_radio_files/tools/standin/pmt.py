@@ -0,0 +1,153 @@
+"""
+Stand-in for GNU Radio's pmt module (tools/bench_blocks.py only)
+
+Just the calls the embedded blocks make, on plain Python objects:
+symbols are str, dicts are dict (dict_add copies, as pmt dicts are
+immutable), pairs are tuples, vectors are lists and u8vectors are a
+bytes subclass. Good enough to drive a block's handlers and compare
+block versions against each other; absolute numbers differ from the
+real pmt.
+"""
+
+PMT_NIL = None
+PMT_T = True
+PMT_F = False
+
+
+class _u8vector(bytes):
+    __slots__ = ()
+
+
+_symbols = {}
+
+
+def intern(name):
+    return _symbols.setdefault(name, name)
+
+
+string_to_symbol = intern
+
+
+def symbol_to_string(sym):
+    return sym
+
+
+def is_symbol(obj):
+    return isinstance(obj, str)
+
+
+def make_dict():
+    return {}
+
+
+def is_dict(obj):
+    return isinstance(obj, dict)
+
+
+def dict_add(d, key, value):
+    d = dict(d)
+    d[key] = value
+    return d
+
+
+def dict_has_key(d, key):
+    return key in d
+
+
+def dict_ref(d, key, not_found):
+    return d.get(key, not_found)
+
+
+def dict_keys(d):
+    return list(d)
+
+
+def cons(car_, cdr_):
+    return (car_, cdr_)
+
+
+def is_pair(obj):
+    return type(obj) is tuple and len(obj) == 2
+
+
+def car(pair):
+    return pair[0]
+
+
+def cdr(pair):
+    return pair[1]
+
+
+def from_long(x):
+    return int(x)
+
+
+def to_long(x):
+    return int(x)
+
+
+def is_integer(obj):
+    return isinstance(obj, int) and not isinstance(obj, bool)
+
+
+def from_bool(x):
+    return bool(x)
+
+
+def to_bool(x):
+    return bool(x)
+
+
+def from_double(x):
+    return float(x)
+
+
+def to_double(x):
+    return float(x)
+
+
+def init_u8vector(n, items):
+    return _u8vector(bytes(items)[:n])
+
+
+def is_u8vector(obj):
+    return isinstance(obj, _u8vector)
+
+
+def u8vector_elements(v):
+    return list(v)
+
+
+def length(v):
+    return len(v)
+
+
+def make_vector(n, fill):
+    return [fill] * n
+
+
+def is_vector(obj):
+    return isinstance(obj, list)
+
+
+def vector_ref(v, i):
+    return v[i]
+
+
+def vector_set(v, i, obj):
+    v[i] = obj
+
+
+def is_null(obj):
+    return obj is None
+
+
+def eq(a, b):
+    return a == b
+
+
+def to_python(obj):
+    if isinstance(obj, _u8vector):
+        import numpy
+        return numpy.frombuffer(obj, dtype=numpy.uint8)
+    return obj
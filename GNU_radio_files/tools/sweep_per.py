@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Sweep: PHY bit and packet error rate over a grid of operating points
+--------------------------------------------------------------------
+Runs the pager's QPSK TX and RX chains (as in pager_node) with no
+throttle and no ZMQ, through the channel emulator (pager_channel), once
+per grid point and seed, each as its own flowgraph in a process pool:
+
+    frames -> protocol_formatter_bb + mux -> generic_mod -> channel_emulator
+           -> symbol_sync -> linear_equalizer -> costas -> decoder
+           -> diff_decoder -> map -> unpack -> correlate_access_code -> PDUs
+
+Each frame is the 128-byte preamble, a 16-bit frame number and random
+bytes up to --frame-len. Reported per point:
+    per        1 - frames received bit-exact / frames sent
+    missed     frames whose access code / header was never found
+    ber        bit errors / bits, over the frames that were found
+    frame_ms   air time of one frame at --samp-rate (for the ARQ timeout)
+Grid axes take "a,b,c" or "start:stop:step" (stop included):
+    --snr-db --cfo-hz --timing-ppm --phase-bw --eq-taps --eq-mu --threshold
+Each point is split into --trials flowgraphs of --frames frames with their
+own seeds, so the pool stays busy with few points. Results go to --out,
+CSV, or Parquet when the name ends in .parquet (needs pandas + pyarrow).
+Workers are spawned processes; use --jobs up to the number of cores.
+
+Usage:
+    python3 sweep_per.py --snr-db 0:16:2 --cfo-hz 0,500 --out per.csv
+    python3 sweep_per.py --snr-db 8 --phase-bw 0.02,0.0628,0.1 --eq-mu 1e-4,1e-3 --jobs 8
+"""
+
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "User_1"))
+sys.path.insert(0, os.path.join(HERE, "..", "common"))
+
+PREAMBLE = bytes([0xD3, 0x42, 0xA1, 0x7F, 0x9C, 0xE2, 0x55, 0xAA, 0x13, 0x87, 0x4E, 0xB1, 0x2C, 0xF0, 0x99, 0x6D,
+                  0x3A, 0xC4, 0x1F, 0x82, 0x5B, 0xD8, 0x66, 0xE7, 0x24, 0x91, 0x7C, 0x0B, 0x38, 0xF2, 0x4D, 0xC6] * 4)
+HEADER_BYTES = 12               # header_format_default: 64-bit access code + 2 x 16-bit length
+FILLER = 0xFFFF                 # frame number of the lead-in / tail frames, not counted
+AXES = ("snr_db", "cfo_hz", "timing_ppm", "phase_bw", "eq_taps", "eq_mu", "threshold")
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+def parse_axis(text, kind=float):
+    """ "a,b,c" or "start:stop:step" (stop included) -> list """
+    if ":" in text:
+        start, stop, step = (float(x) for x in text.split(":"))
+        n = int(round((stop - start) / step)) + 1
+        return [kind(start + i * step) for i in range(max(1, n))]
+    return [kind(x) for x in text.split(",")]
+
+
+def make_frames(n, frame_len, rng):
+    frames = []
+    for i in range(n):
+        body = rng.integers(0, 256, frame_len - len(PREAMBLE) - 2, dtype=np.uint8).tobytes()
+        frames.append(PREAMBLE + i.to_bytes(2, "big") + body)
+    return frames
+
+
+def run_point(task):
+    """ One flowgraph: task['frames'] frames through the chain at one operating point -> counters """
+    import pmt
+    from gnuradio import blocks, digital, gr, pdu
+    import pager_channel
+    import pager_node
+
+    rng = np.random.default_rng(task["seed"])
+    frames = make_frames(task["frames"], task["frame_len"], rng)
+    filler = [rng.integers(0, 256, task["frame_len"], dtype=np.uint8).tobytes()[:-2] + FILLER.to_bytes(2, "big")
+              for _ in range(task["lead"] * 2)]
+    stream = filler[:task["lead"]] + frames + filler[task["lead"]:]   # lock-in ahead, flush the filters behind
+    data, tags, pos = bytearray(), [], 0
+    for f in stream:
+        tags.append(gr.tag_utils.python_to_tag((pos, pmt.intern("packet_len"), pmt.from_long(len(f)),
+                                                pmt.intern("sweep"))))
+        data += f
+        pos += len(f)
+
+    sps = task["sps"]
+    qpsk = digital.constellation_rect([0.707+0.707j, -0.707+0.707j, -0.707-0.707j, 0.707-0.707j], [0, 1, 2, 3],
+        4, 2, 2, 1, 1).base()
+    hdr_format = digital.header_format_default(pager_node.ACCESS_KEY, 0)
+
+    tb = gr.top_block("sweep_per", catch_exceptions=False)
+    src = blocks.vector_source_b(list(data), False, 1, tags)
+    formatter = digital.protocol_formatter_bb(hdr_format, "packet_len")
+    mux = blocks.tagged_stream_mux(gr.sizeof_char*1, "packet_len", 0)
+    mod = digital.generic_mod(constellation=qpsk, differential=True, samples_per_symbol=sps, pre_diff_code=True,
+                              excess_bw=0.5, verbose=False, log=False, truncate=False)
+    chan = pager_channel.channel_emulator(samp_rate=task["samp_rate"], snr_db=task["snr_db"], cfo_hz=task["cfo_hz"],
+                                          timing_ppm=task["timing_ppm"], taps=task["taps"], seed=task["seed"])
+    sync = digital.symbol_sync_cc(digital.TED_SIGNAL_TIMES_SLOPE_ML, sps, task["phase_bw"], 1.0, 1.0, 1.5, 2,
+                                  digital.constellation_bpsk().base(), digital.IR_MMSE_8TAP, 128, [])
+    eq = digital.linear_equalizer(task["eq_taps"], 2, digital.adaptive_algorithm_cma(qpsk, task["eq_mu"], 4).base(),
+                                  True, [], 'corr_est')
+    costas = digital.costas_loop_cc(task["phase_bw"], 4, False)
+    decoder = digital.constellation_decoder_cb(qpsk)
+    diff = digital.diff_decoder_bb(4, digital.DIFF_DIFFERENTIAL)
+    mapper = digital.map_bb([0, 1, 2, 3])
+    unpack = blocks.unpack_k_bits_bb(2)
+    corr = digital.correlate_access_code_bb_ts(pager_node.ACCESS_KEY, task["threshold"], 'packet_len')
+    repack = blocks.repack_bits_bb(1, 8, "packet_len", False, gr.GR_MSB_FIRST)
+    to_pdu = pdu.tagged_stream_to_pdu(gr.types.byte_t, 'packet_len')
+    store = blocks.message_debug(True)
+
+    tb.connect((src, 0), (formatter, 0))
+    tb.connect((formatter, 0), (mux, 0))
+    tb.connect((src, 0), (mux, 1))
+    tb.connect(mux, mod, chan, sync, eq, costas, decoder, diff, mapper, unpack, corr, repack, to_pdu)
+    tb.msg_connect((to_pdu, 'pdus'), (store, 'store'))
+
+    t0 = time.perf_counter()
+    tb.run()
+    elapsed = time.perf_counter() - t0
+
+    ok, bit_errors, bits, seen = 0, 0, 0, set()
+    ref = [np.frombuffer(f, dtype=np.uint8) for f in frames]
+    for i in range(store.num_messages()):
+        rx = np.frombuffer(bytes(pmt.u8vector_elements(pmt.cdr(store.get_message(i)))), dtype=np.uint8)
+        if len(rx) < len(PREAMBLE) + 2: continue
+        n = int.from_bytes(rx[len(PREAMBLE):len(PREAMBLE) + 2].tobytes(), "big")
+        if n >= len(ref) or n in seen or len(rx) != len(ref[n]): continue
+        errors = int(POPCOUNT[rx ^ ref[n]].sum())
+        if errors > len(rx) * 2: continue          # > 25 % wrong: a frame number hit by noise, not frame n
+        seen.add(n)
+        ok += errors == 0
+        bit_errors += errors
+        bits += len(rx) * 8
+    return dict({k: task[k] for k in AXES}, frames=len(frames), found=len(seen), ok=ok,
+                bit_errors=bit_errors, bits=bits, cpu_s=elapsed)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--snr-db", default="0:16:2")
+    ap.add_argument("--cfo-hz", default="0")
+    ap.add_argument("--timing-ppm", default="0")
+    ap.add_argument("--phase-bw", default="0.0628", help="symbol_sync and Costas loop bandwidth")
+    ap.add_argument("--eq-taps", default="15", help="linear equalizer taps")
+    ap.add_argument("--eq-mu", default="0.0001", help="CMA step size")
+    ap.add_argument("--threshold", default="2", help="access code bit errors allowed")
+    ap.add_argument("--taps", default="1", help="multipath taps, comma-separated complex (same at every point)")
+    ap.add_argument("--frames", type=int, default=500, help="frames per trial")
+    ap.add_argument("--trials", type=int, default=4, help="flowgraphs per point, each with its own seed")
+    ap.add_argument("--frame-len", type=int, default=176, help="bytes after the header, preamble included")
+    ap.add_argument("--lead", type=int, default=4, help="filler frames before and after")
+    ap.add_argument("--sps", type=int, default=4)
+    ap.add_argument("--samp-rate", type=float, default=600e3)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--jobs", type=int, default=os.cpu_count())
+    ap.add_argument("--out", default="per_sweep.csv")
+    args = ap.parse_args()
+    if not len(PREAMBLE) + 2 < args.frame_len:
+        ap.error(f"--frame-len must be more than {len(PREAMBLE) + 2}")
+    if args.frames >= FILLER:
+        ap.error(f"--frames must be below {FILLER}")
+    pandas = None
+    if args.out.endswith(".parquet"):
+        try:
+            import pandas
+        except ImportError:
+            ap.error("Parquet output needs pandas and pyarrow")
+
+    grid = list(itertools.product(parse_axis(args.snr_db), parse_axis(args.cfo_hz), parse_axis(args.timing_ppm),
+                                  parse_axis(args.phase_bw), parse_axis(args.eq_taps, int),
+                                  parse_axis(args.eq_mu), parse_axis(args.threshold, int)))
+    taps = [complex(t) for t in args.taps.split(",")]
+    tasks = [dict(zip(AXES, point), seed=args.seed + 1000 * p + t, frames=args.frames, frame_len=args.frame_len,
+                  lead=args.lead, sps=args.sps, samp_rate=args.samp_rate, taps=taps)
+             for p, point in enumerate(grid) for t in range(args.trials)]
+    frame_ms = (HEADER_BYTES + args.frame_len) * 4 * args.sps / args.samp_rate * 1000.0
+    print(f"{len(grid)} points x {args.trials} trials x {args.frames} frames on {args.jobs} workers "
+          f"({frame_ms:.2f} ms per frame)")
+
+    totals = {}
+    t0 = time.perf_counter()
+    # spawn: each worker gets a clean interpreter, GNU Radio is only loaded there
+    with ProcessPoolExecutor(max_workers=args.jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for done, fut in enumerate(as_completed([pool.submit(run_point, t) for t in tasks]), 1):
+            r = fut.result()
+            key = tuple(r[k] for k in AXES)
+            acc = totals.setdefault(key, dict.fromkeys(("frames", "found", "ok", "bit_errors", "bits", "cpu_s"), 0))
+            for k in acc: acc[k] += r[k]
+            if done % max(1, len(tasks) // 20) == 0 or done == len(tasks):
+                print(f"  {done}/{len(tasks)} trials, {time.perf_counter() - t0:.1f} s")
+    wall = time.perf_counter() - t0
+
+    rows = []
+    for key in grid:
+        acc = totals[key]
+        rows.append(dict(zip(AXES, key), frames=acc["frames"], missed=acc["frames"] - acc["found"],
+                         per=1.0 - acc["ok"] / acc["frames"],
+                         ber=acc["bit_errors"] / acc["bits"] if acc["bits"] else float("nan"),
+                         bit_errors=acc["bit_errors"], bits=acc["bits"], frame_ms=round(frame_ms, 3),
+                         cpu_s=round(acc["cpu_s"], 3)))
+    if pandas is not None:
+        pandas.DataFrame(rows).to_parquet(args.out, index=False)
+    else:
+        with open(args.out, "w", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=list(rows[0]))
+            w.writeheader()
+            w.writerows(rows)
+
+    print(f"{'SNR dB':>7} {'CFO Hz':>7} {'ppm':>5} {'loop bw':>8} {'taps':>4} {'mu':>8} {'thr':>3}"
+          f" {'PER':>8} {'BER':>9} {'missed':>6}")
+    for r in rows:
+        print(f"{r['snr_db']:7.1f} {r['cfo_hz']:7.0f} {r['timing_ppm']:5.0f} {r['phase_bw']:8.4f} {r['eq_taps']:4d}"
+              f" {r['eq_mu']:8.1e} {r['threshold']:3d} {r['per']:8.4f} {r['ber']:9.2e} {r['missed']:6d}")
+    cpu = sum(acc["cpu_s"] for acc in totals.values())
+    print(f"wall {wall:.1f} s, flowgraph time {cpu:.1f} s: {cpu / wall:.2f}x speed-up on {args.jobs} workers "
+          f"({cpu / wall / args.jobs * 100:.0f}% efficiency) -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()